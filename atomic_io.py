@@ -0,0 +1,186 @@
+"""
+Crash-safe file writes for Mr. Pumpkin.
+
+This module provides:
+- AtomicWriter: Write a file through a temporary file that is fsynced and
+  moved into place only once it is complete
+- atomic_write: Write bytes or text to a file in one call
+- sync_directory / flush_directory_syncs: Make renames durable, coalescing
+  syncs of the same directory
+
+Design decisions:
+- Temporary files are created next to the destination (same filesystem, so
+  the final rename is atomic) with unique hidden names, so concurrent
+  writers never share one; they end in .tmp and are never listed as
+  recordings
+- A power loss leaves either the old file or the new one, never a
+  truncated file
+- Exclusive writes (uploads) hard-link the finished file into place, which
+  fails if the name is already taken; there is no window between checking
+  for an existing file and creating it
+- The directory holding a renamed file is fsynced a moment later rather
+  than immediately, so a burst of writes to one directory (uploading a
+  library of clips) costs one directory sync
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Set, Union
+
+
+DIR_SYNC_DELAY_S = 0.25  # Writes to a directory within this window share one sync
+
+_dir_sync_lock = threading.Lock()
+_pending_dirs: Set[str] = set()
+_dir_sync_timer: Optional[threading.Timer] = None
+
+
+class AtomicWriter:
+    """File written to a temporary file and moved into place on commit.
+
+    Use as a context manager (commits when the block succeeds, discards the
+    temporary file when it raises) or call commit()/discard() directly for
+    writes that span several calls.
+
+    Attributes:
+        filepath: Destination file
+        file: Open file object of the temporary file
+    """
+
+    def __init__(self, filepath: Path, mode: str = 'w', exclusive: bool = False,
+                 encoding: Optional[str] = 'utf-8'):
+        """Open the temporary file.
+
+        Args:
+            filepath: Destination file (its directory is created if needed)
+            mode: 'w' for text or 'wb' for bytes
+            exclusive: Fail on commit if the destination exists instead of
+                replacing it
+            encoding: Text encoding (ignored for binary mode)
+        """
+        self.filepath = Path(filepath)
+        self.exclusive = exclusive
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.filepath.parent, prefix=f".{self.filepath.name}.", suffix=".tmp")
+        self.tmp_path = Path(tmp_name)
+        self.file = os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding)
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def commit(self):
+        """Flush and fsync the file and move it into place.
+
+        Raises:
+            FileExistsError: If exclusive and the destination exists (the
+                temporary file is discarded)
+        """
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            if self.exclusive:
+                _link_into_place(self.tmp_path, self.filepath)
+            else:
+                os.replace(self.tmp_path, self.filepath)
+        except BaseException:
+            self.discard()
+            raise
+        sync_directory(self.filepath.parent)
+
+    def discard(self):
+        """Close and delete the temporary file."""
+        if not self.file.closed:
+            self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def _link_into_place(tmp_path: Path, filepath: Path):
+    """Move a finished file to a name that must not exist yet."""
+    try:
+        os.link(tmp_path, filepath)
+    except FileExistsError:
+        raise FileExistsError(f"File already exists: {filepath.name}")
+    except OSError:
+        # No hard links on this filesystem: reserve the name, then replace it
+        try:
+            os.close(os.open(filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise FileExistsError(f"File already exists: {filepath.name}")
+        os.replace(tmp_path, filepath)
+        return
+    os.unlink(tmp_path)
+
+
+def atomic_write(filepath: Path, data: Union[str, bytes], exclusive: bool = False):
+    """Write a whole file atomically.
+
+    Args:
+        filepath: Destination file
+        data: Text or bytes to write
+        exclusive: Fail if the destination exists instead of replacing it
+
+    Raises:
+        FileExistsError: If exclusive and the destination exists
+    """
+    with AtomicWriter(filepath, 'wb' if isinstance(data, bytes) else 'w', exclusive=exclusive) as f:
+        f.write(data)
+
+
+def _fsync_directory(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Directories can't be opened on Windows; renames there are already durable
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def sync_directory(directory: Path, delay_s: float = DIR_SYNC_DELAY_S):
+    """Make renames in a directory durable.
+
+    Args:
+        directory: Directory to fsync
+        delay_s: Wait this long so later writes to the directory share the
+            sync (0 to sync now)
+    """
+    global _dir_sync_timer
+    if delay_s <= 0:
+        _fsync_directory(str(directory))
+        return
+    with _dir_sync_lock:
+        _pending_dirs.add(str(directory))
+        if _dir_sync_timer is None:
+            _dir_sync_timer = threading.Timer(delay_s, flush_directory_syncs)
+            _dir_sync_timer.daemon = True
+            _dir_sync_timer.start()
+
+
+def flush_directory_syncs():
+    """Sync every directory with writes waiting for a directory sync."""
+    global _dir_sync_timer
+    with _dir_sync_lock:
+        directories = sorted(_pending_dirs)
+        _pending_dirs.clear()
+        if _dir_sync_timer is not None and _dir_sync_timer is not threading.current_thread():
+            _dir_sync_timer.cancel()
+        _dir_sync_timer = None
+    for directory in directories:
+        _fsync_directory(directory)
+
+
+atexit.register(flush_directory_syncs)
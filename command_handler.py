@@ -1,5 +1,5 @@
 import json
-import time
+import threading
 
 class CommandRouter:
     """
@@ -11,6 +11,8 @@ class CommandRouter:
         """Initialize router with PumpkinFace instance."""
         self.pumpkin = pumpkin_face
         self.Expression = expression_class
+        self.bakes = {}  # Recording filename -> bake progress ("baking", "OK ..." or "ERROR ...")
+        self._bake_lock = threading.Lock()
     
     def execute(self, command_str: str) -> str:
         """
@@ -358,7 +360,10 @@ class CommandRouter:
         # Reset command (clears recording and playback state)
         if data == "reset":
             self.pumpkin.recording_session.cancel()
+            self.pumpkin.show_queue.stop()
+            self.pumpkin.layers.stop_all()
             self.pumpkin.timeline_playback.stop()
+            self.pumpkin.curves.clear()  # Stop tweens the playback started
             self.pumpkin.timeline_playback.filename = None  # Clear loaded filename
             self.pumpkin.timeline_playback.timeline = None  # Clear loaded timeline
             response = "OK Reset complete"
@@ -440,19 +445,38 @@ class CommandRouter:
                 elif self.pumpkin.recording_session.is_recording:
                     response = "ERROR Cannot control playback while recording"
                 else:
-                    self.pumpkin.timeline_playback.play(filename)
+                    # The nested recordings are checked on the prefetch thread;
+                    # a broken tree stops playback before it is reached
+                    self.pumpkin.timeline_playback.play(filename, strict=True)
                     duration = self.pumpkin.timeline_playback.timeline.duration_ms
                     response = f"OK Playing {self.pumpkin.timeline_playback.filename} ({duration}ms)"
             except FileNotFoundError as e:
                 response = f"ERROR File not found: {filename}"
             except ValueError as e:
-                response = f"ERROR Invalid timeline file: {filename}"
+                response = f"ERROR Invalid timeline file: {filename}: {e}"
             except Exception as e:
                 response = f"ERROR {e}"
             
             print(response)
             return response
         
+        if data.startswith("validate_recording "):
+            parts = data.split(maxsplit=1)
+            filename = parts[1]
+            
+            # Validate filename (no path separators)
+            if '/' in filename or '\\' in filename:
+                response = "ERROR Invalid filename: path separators not allowed"
+                print(response)
+                return response
+            
+            problems = self.pumpkin.timeline_playback.validate(filename)
+            if not filename.endswith('.json'):
+                filename = f"{filename}.json"
+            response = json.dumps({"filename": filename, "valid": not problems, "problems": problems})
+            print(response)
+            return response
+        
         if data == "pause":
             if self.pumpkin.timeline_playback.state.value != "playing":
                 response = "ERROR No active playback"
@@ -509,6 +533,277 @@ class CommandRouter:
             print(response)
             return response
         
+        if data.startswith("playback_rate "):
+            parts = data.split()
+            if len(parts) != 2:
+                response = "ERROR Usage: playback_rate <rate> (0.25 to 4, negative for reverse)"
+            else:
+                try:
+                    rate = float(parts[1].rstrip("xX"))
+                    self.pumpkin.timeline_playback.set_rate(rate)
+                    response = f"OK Playback rate {rate:g}x"
+                except ValueError as e:
+                    response = f"ERROR {e}"
+            
+            print(response)
+            return response
+        
+        # Show queue commands
+        if data.startswith("queue_add "):
+            try:
+                parts = data.split()
+                filename = parts[1]
+                
+                # Validate filename (no path separators)
+                if '/' in filename or '\\' in filename:
+                    response = "ERROR Invalid filename: path separators not allowed"
+                    print(response)
+                    return response
+                
+                start_at = None
+                if len(parts) > 2:
+                    from show_queue import parse_start_time
+                    start_at = parse_start_time(parts[2])
+                
+                item = self.pumpkin.show_queue.enqueue(filename, start_at)
+                if start_at is not None:
+                    response = f"OK Queued {item.filename} at {parts[2]}"
+                else:
+                    response = f"OK Queued {item.filename}"
+            except ValueError as e:
+                response = f"ERROR {e}"
+            
+            print(response)
+            return response
+        
+        if data == "queue_start":
+            if self.pumpkin.show_queue.is_running:
+                response = "ERROR Show queue already running"
+            elif self.pumpkin.timeline_playback.state.value == "playing":
+                response = f"ERROR Playback already active: {self.pumpkin.timeline_playback.filename}"
+            elif self.pumpkin.recording_session.is_recording:
+                response = "ERROR Cannot control playback while recording"
+            else:
+                try:
+                    self.pumpkin.show_queue.start()
+                    response = f"OK Show queue started ({len(self.pumpkin.show_queue.items)} items)"
+                except ValueError as e:
+                    response = f"ERROR {e}"
+            print(response)
+            return response
+        
+        if data == "queue_stop":
+            if not self.pumpkin.show_queue.is_running:
+                response = "ERROR Show queue not running"
+            else:
+                self.pumpkin.show_queue.stop()
+                response = "OK Show queue stopped"
+            print(response)
+            return response
+        
+        if data == "queue_skip":
+            if not self.pumpkin.show_queue.is_running:
+                response = "ERROR Show queue not running"
+            else:
+                self.pumpkin.show_queue.skip()
+                response = "OK Skipping to next item"
+            print(response)
+            return response
+        
+        if data == "queue_clear":
+            self.pumpkin.show_queue.clear()
+            response = "OK Show queue cleared"
+            print(response)
+            return response
+        
+        if data.startswith("queue_loop ") or data.startswith("queue_shuffle "):
+            parts = data.split()
+            if len(parts) != 2 or parts[1] not in ("on", "off"):
+                response = f"ERROR Usage: {parts[0]} on|off"
+            elif parts[0] == "queue_loop":
+                self.pumpkin.show_queue.set_loop(parts[1] == "on")
+                response = f"OK Loop {parts[1]}"
+            else:
+                self.pumpkin.show_queue.set_shuffle(parts[1] == "on")
+                response = f"OK Shuffle {parts[1]}"
+            print(response)
+            return response
+        
+        if data == "queue_status":
+            response = json.dumps(self.pumpkin.show_queue.get_status())
+            return response
+        
+        # Layer commands (timelines running concurrently with the main playback)
+        if data.startswith("layer_play "):
+            parts = data.split()
+            if len(parts) < 3:
+                response = "ERROR Usage: layer_play <name> <filename> [priority] [loop]"
+                print(response)
+                return response
+            
+            name, filename = parts[1], parts[2]
+            
+            # Validate filename (no path separators)
+            if '/' in filename or '\\' in filename:
+                response = "ERROR Invalid filename: path separators not allowed"
+                print(response)
+                return response
+            
+            try:
+                priority = 0
+                loop = False
+                for option in parts[3:]:
+                    if option == "loop":
+                        loop = True
+                    elif option.lstrip('-').isdigit():
+                        priority = int(option)
+                    else:
+                        raise ValueError(f"Invalid layer option: {option}")
+                layer = self.pumpkin.layers.play(name, filename, priority, loop)
+                response = f"OK Layer {name} playing {layer.filename} (priority {priority}{', loop' if loop else ''})"
+            except FileNotFoundError:
+                response = f"ERROR File not found: {filename}"
+            except ValueError as e:
+                response = f"ERROR {e}"
+            
+            print(response)
+            return response
+        
+        if data.startswith("layer_stop "):
+            name = data.split(maxsplit=1)[1].strip()
+            if name == "all":
+                self.pumpkin.layers.stop_all()
+                response = "OK All layers stopped"
+            else:
+                try:
+                    self.pumpkin.layers.stop(name)
+                    response = f"OK Layer {name} stopped"
+                except KeyError:
+                    response = f"ERROR No such layer: {name}"
+            print(response)
+            return response
+        
+        if data == "layer_status":
+            response = json.dumps(self.pumpkin.layers.get_status())
+            return response
+        
+        # Recording simplification (gaze/eyebrow/offset streams become curves)
+        if data.startswith("record_tolerance "):
+            value = data.split(maxsplit=1)[1].strip()
+            try:
+                tolerance = None if value == "off" else float(value)
+                if tolerance is not None and tolerance < 0:
+                    raise ValueError
+                self.pumpkin.recording_session.simplify_tolerance = tolerance
+                response = f"OK Recording tolerance {value}"
+            except ValueError:
+                response = "ERROR Usage: record_tolerance <value|off>"
+            print(response)
+            return response
+        
+        if data.startswith("optimize_recording "):
+            parts = data.split()
+            filename = parts[1]
+            
+            # Validate filename (no path separators)
+            if '/' in filename or '\\' in filename:
+                response = "ERROR Invalid filename: path separators not allowed"
+                print(response)
+                return response
+            
+            try:
+                from timeline_optimize import optimize_recording
+                from timeline_simplify import DEFAULT_TOLERANCE
+                tolerance = float(parts[2]) if len(parts) > 2 else DEFAULT_TOLERANCE
+                if not filename.endswith('.json'):
+                    filename = f"{filename}.json"
+                before, after = optimize_recording(self.pumpkin.timeline_playback.recordings_dir / filename, tolerance)
+                response = f"OK Optimized {filename}: {before} -> {after} commands"
+            except FileNotFoundError:
+                response = f"ERROR File not found: {filename}"
+            except ValueError as e:
+                response = f"ERROR {e}"
+            
+            print(response)
+            return response
+        
+        # Baked playback commands (per-frame face tracks instead of command dispatch)
+        if data.startswith("bake_recording "):
+            filename = data.split(maxsplit=1)[1].strip()
+            
+            # Validate filename (no path separators)
+            if '/' in filename or '\\' in filename:
+                response = "ERROR Invalid filename: path separators not allowed"
+                print(response)
+                return response
+            
+            recordings_dir = self.pumpkin.timeline_playback.recordings_dir
+            if not filename.endswith('.json'):
+                filename = f"{filename}.json"
+            
+            with self._bake_lock:
+                if not (recordings_dir / filename).exists():
+                    response = f"ERROR File not found: {filename}"
+                elif self.bakes.get(filename) == "baking":
+                    response = f"ERROR Already baking {filename}"
+                else:
+                    # Baking plays the whole recording through a face, so it
+                    # runs off the network thread; timeline_status reports it
+                    self.bakes[filename] = "baking"
+                    threading.Thread(target=self._bake, args=(recordings_dir, filename),
+                                     name=f"bake-{filename}", daemon=True).start()
+                    response = f"OK Baking {filename}"
+            
+            print(response)
+            return response
+        
+        if data.startswith("baked_playback "):
+            parts = data.split()
+            if len(parts) != 2 or parts[1] not in ("on", "off"):
+                response = "ERROR Usage: baked_playback on|off"
+            else:
+                self.pumpkin.timeline_playback.use_baked = parts[1] == "on"
+                response = f"OK Baked playback {parts[1]}"
+            print(response)
+            return response
+        
+        # Binary timeline copies (memory-mapped, no JSON parsing on load)
+        if data.startswith("convert_recording "):
+            filename = data.split(maxsplit=1)[1].strip()
+            
+            # Validate filename (no path separators)
+            if '/' in filename or '\\' in filename:
+                response = "ERROR Invalid filename: path separators not allowed"
+                print(response)
+                return response
+            
+            from timeline_binary import convert_recording
+            recordings_dir = self.pumpkin.timeline_playback.recordings_dir
+            if filename == "all":
+                converted, failed = 0, []
+                for path in sorted(recordings_dir.glob('*.json')):
+                    try:
+                        convert_recording(path)
+                        converted += 1
+                    except (OSError, ValueError):
+                        failed.append(path.name)
+                response = f"OK Converted {converted} recordings"
+                if failed:
+                    response += f" (skipped invalid: {', '.join(failed)})"
+            else:
+                if not filename.endswith('.json'):
+                    filename = f"{filename}.json"
+                try:
+                    count = convert_recording(recordings_dir / filename)
+                    response = f"OK Converted {filename} ({count} commands)"
+                except FileNotFoundError:
+                    response = f"ERROR File not found: {filename}"
+                except ValueError as e:
+                    response = f"ERROR {e}"
+            
+            print(response)
+            return response
+        
         # Help command
         if data == "help":
             help_text = (
@@ -553,10 +848,28 @@ class CommandRouter:
                 "  record_stop [filename]             - Stop recording and save (optional filename)\n"
                 "  record_cancel                      - Cancel active recording without saving\n"
                 "  play <filename>                    - Play a saved timeline file\n"
+                "  validate_recording <filename>      - Check a timeline and its nested recordings (JSON)\n"
                 "  pause                              - Pause active playback\n"
                 "  resume                             - Resume paused playback\n"
                 "  stop                               - Stop active playback\n"
                 "  seek <ms>                          - Seek timeline to position in milliseconds\n"
+                "  playback_rate <rate>               - Playback speed 0.25-4x, negative reverses (muted unless 1x)\n"
+                "  queue_add <filename> [HH:MM]       - Add a timeline to the show queue (optional start time)\n"
+                "  queue_start                        - Start playing the show queue\n"
+                "  queue_stop                         - Stop the show queue\n"
+                "  queue_skip                         - Skip to the next queued timeline\n"
+                "  queue_clear                        - Stop and empty the show queue\n"
+                "  queue_loop <on|off>                - Repeat the show queue when it ends\n"
+                "  queue_shuffle <on|off>             - Play the show queue in random order\n"
+                "  queue_status                       - Get show queue status (JSON)\n"
+                "  layer_play <name> <file> [prio] [loop] - Play a timeline on a concurrent layer\n"
+                "  layer_stop <name|all>              - Stop a layer (or every layer)\n"
+                "  layer_status                       - Get layer and channel ownership status (JSON)\n"
+                "  record_tolerance <value|off>       - Max error when simplifying recorded gaze/eyebrow/offset\n"
+                "  optimize_recording <file> [tol]    - Drop no-op commands and simplify streams in a saved timeline\n"
+                "  bake_recording <filename>          - Compile a timeline into per-frame face tracks\n"
+                "  baked_playback <on|off>            - Play baked tracks instead of commands when up to date\n"
+                "  convert_recording <filename|all>   - Write memory-mapped binary copies of timelines\n"
                 "  timeline_status                    - Get timeline and recording status (JSON)\n"
                 "  recording_status                   - Get current recording status (JSON)\n"
                 "  list_recordings                    - List saved timeline files (JSON)\n"
@@ -581,18 +894,17 @@ class CommandRouter:
         if data == "timeline_status":
             status = self.pumpkin.timeline_playback.get_status()
             status["recording"] = self.pumpkin.recording_session.is_recording
+            with self._bake_lock:
+                status["bakes"] = dict(self.bakes)
             response = json.dumps(status)
             return response
         
         if data == "recording_status":
             status = {
                 "is_recording": self.pumpkin.recording_session.is_recording,
-                "command_count": len(self.pumpkin.recording_session.commands),
-                "duration_ms": 0
+                "command_count": self.pumpkin.recording_session.command_count,
+                "duration_ms": self.pumpkin.recording_session.elapsed_ms()
             }
-            if self.pumpkin.recording_session.is_recording and self.pumpkin.recording_session.start_time:
-                current_time_ms = time.time() * 1000
-                status["duration_ms"] = int(current_time_ms - self.pumpkin.recording_session.start_time)
             response = json.dumps(status)
             return response
         
@@ -716,7 +1028,9 @@ class CommandRouter:
         is_timeline_command = data in ["record_start", "record start", "record_cancel", "record cancel", 
                                        "pause", "resume", "stop", "timeline_status", 
                                        "recording_status", "list_recordings", "list"] or \
-                             data.startswith(("record_stop", "record stop", "play ", "seek ", 
+                             data.startswith(("record_stop", "record stop", "play ", "seek ", "playback_rate ", "validate_recording ", "queue_", "layer_",
+                                             "bake_recording ", "baked_playback ", "record_tolerance ", "optimize_recording ",
+                                             "convert_recording ",
                                              "delete_recording ", "rename_recording ", "upload_timeline ", "download_timeline "))
         
         if not is_timeline_command and self.pumpkin.timeline_playback.state.value == "playing":
@@ -738,3 +1052,20 @@ class CommandRouter:
             response = f"ERROR Unknown expression: {data}"
             print(f"Unknown expression: {data}")
             return response
+    
+    def _bake(self, recordings_dir, filename: str):
+        """Bake a recording on a worker thread and record the outcome in self.bakes."""
+        from timeline_bake import bake_timeline, baked_path
+        try:
+            # A headless face of its own; the live face keeps running meanwhile
+            baked = bake_timeline(recordings_dir, filename)
+            baked.save(baked_path(recordings_dir / filename))
+            result = f"OK Baked {filename} ({baked.frame_count} frames: {', '.join(baked.channels)})"
+        except FileNotFoundError:
+            result = f"ERROR File not found: {filename}"
+        except Exception as e:
+            result = f"ERROR {e}"
+        
+        with self._bake_lock:
+            self.bakes[filename] = result
+        print(result)
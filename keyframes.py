@@ -0,0 +1,150 @@
+"""
+Keyframe curves for Mr. Pumpkin.
+
+This module provides:
+- EASINGS: Easing functions by name
+- Curve: Keyframed values evaluated at any time since the curve started
+- CURVE_COMMANDS: Track driven by each tweened/curve timeline command
+- curve_from_command: Build a Curve from a gaze_to/eyebrow_to/offset_to or
+  *_curve command and the face's current values
+
+Design decisions:
+- One command replaces a whole sweep or ramp: the engine evaluates the curve
+  every frame instead of the timeline carrying one command per step
+- *_to commands tween from wherever the face is when they run; *_curve
+  commands carry their own keyframes (times relative to the command)
+- Easing applies between each pair of keyframes; ease_in_out is the same
+  cubic (3t^2 - 2t^3) the head movement animation uses
+- Every track has a fixed number of values (gaze: lx, ly, rx, ry;
+  eyebrow: left, right; offset: x, y); shorthand forms are expanded here
+"""
+
+from bisect import bisect_right
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+EASINGS: Dict[str, Callable[[float], float]] = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t * t,
+    "ease_out": lambda t: 1.0 - (1.0 - t) ** 3,
+    "ease_in_out": lambda t: t * t * (3.0 - 2.0 * t),
+    "step": lambda t: 0.0,
+}
+
+# Track driven by each command (track values: gaze lx, ly, rx, ry;
+# eyebrow left, right; offset x, y)
+CURVE_COMMANDS = {
+    "gaze_to": "gaze",
+    "gaze_curve": "gaze",
+    "eyebrow_to": "eyebrow",
+    "eyebrow_curve": "eyebrow",
+    "offset_to": "offset",
+    "offset_curve": "offset",
+}
+
+
+class Curve:
+    """Keyframed values with easing between keys.
+
+    Attributes:
+        times: Keyframe times in milliseconds (ascending, first is 0)
+        values: Value tuple at each keyframe
+        easing: Name of the easing used between keyframes
+    """
+
+    def __init__(self, keys: Sequence[Tuple[float, Tuple[float, ...]]], easing: str = "linear"):
+        """Create a curve.
+
+        Args:
+            keys: (time_ms, values) pairs in ascending time order
+            easing: Easing name from EASINGS
+
+        Raises:
+            ValueError: If there are no keys, times go backwards, value
+                counts differ or the easing is unknown
+        """
+        if not keys:
+            raise ValueError("Curve needs at least one keyframe")
+        if easing not in EASINGS:
+            raise ValueError(f"Unknown easing: {easing}")
+        self.times: List[float] = [float(t) for t, _ in keys]
+        self.values: List[Tuple[float, ...]] = [tuple(float(v) for v in values) for _, values in keys]
+        if any(b < a for a, b in zip(self.times, self.times[1:])):
+            raise ValueError("Keyframe times must be ascending")
+        if len({len(values) for values in self.values}) != 1:
+            raise ValueError("Keyframes must all have the same number of values")
+        self.easing = easing
+        self._ease = EASINGS[easing]
+
+    @property
+    def duration_ms(self) -> float:
+        return self.times[-1]
+
+    def evaluate(self, t_ms: float) -> Tuple[float, ...]:
+        """Values at a time since the curve started (clamped to the keys)."""
+        if t_ms <= self.times[0]:
+            return self.values[0]
+        if t_ms >= self.times[-1]:
+            return self.values[-1]
+        i = bisect_right(self.times, t_ms)
+        t0, t1 = self.times[i - 1], self.times[i]
+        a, b = self.values[i - 1], self.values[i]
+        u = self._ease((t_ms - t0) / (t1 - t0))
+        return tuple(x + (y - x) * u for x, y in zip(a, b))
+
+
+def _expand(track: str, values: Sequence[float]) -> Tuple[float, ...]:
+    """Expand shorthand values to the track's full value tuple."""
+    values = tuple(float(v) for v in values)
+    if track == "gaze" and len(values) == 2:
+        return values + values
+    if track == "eyebrow" and len(values) == 1:
+        return values + values
+    expected = {"gaze": 4, "eyebrow": 2, "offset": 2}[track]
+    if len(values) != expected:
+        raise ValueError(f"{track} keyframes need {expected} values, got {len(values)}")
+    return values
+
+
+def _target(track: str, args: dict) -> Tuple[float, ...]:
+    """Read a *_to command's target values from its args."""
+    if track == "gaze":
+        if all(args.get(k) is not None for k in ("lx", "ly", "rx", "ry")):
+            return _expand(track, [args["lx"], args["ly"], args["rx"], args["ry"]])
+        return _expand(track, [args.get("x", 0), args.get("y", 0)])
+    if track == "eyebrow":
+        if args.get("left") is not None and args.get("right") is not None:
+            return _expand(track, [args["left"], args["right"]])
+        return _expand(track, [args.get("value", 0)])
+    return _expand(track, [args.get("x", 0), args.get("y", 0)])
+
+
+def curve_from_command(command: str, args: dict, current: Tuple[float, ...]) -> Curve:
+    """Build the curve a tweened/curve timeline command describes.
+
+    Args:
+        command: Command name from CURVE_COMMANDS
+        args: Command arguments
+        current: The track's current values (start of *_to tweens)
+
+    Returns:
+        Curve with times relative to the command
+
+    Raises:
+        ValueError: If the arguments are invalid
+    """
+    track = CURVE_COMMANDS[command]
+    try:
+        if command.endswith("_to"):
+            duration_ms = float(args.get("duration_ms", 500))
+            if duration_ms < 0:
+                raise ValueError("duration_ms must be non-negative")
+            keys = [(0.0, current), (duration_ms, _target(track, args))]
+            return Curve(keys, args.get("easing", "ease_in_out"))
+
+        keys = args.get("keys")
+        if not isinstance(keys, list) or not keys:
+            raise ValueError("keys must be a non-empty list of [time_ms, value, ...]")
+        return Curve([(key[0], _expand(track, key[1:])) for key in keys], args.get("easing", "linear"))
+    except (TypeError, IndexError) as e:
+        raise ValueError(f"Invalid {command} args: {e}")
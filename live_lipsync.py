@@ -0,0 +1,331 @@
+"""
+Live amplitude-driven lip-sync for Mr. Pumpkin.
+
+This module provides:
+- LiveLipSync: Turns raw PCM audio, as it arrives, into mouth visemes
+- LiveLipSyncServer: Local TCP socket (and named pipe) that feeds a
+  LiveLipSync from a live audio source such as a narrator's microphone
+
+Design decisions:
+- The stream is raw signed 16-bit little-endian PCM with no header (what
+  `arecord -t raw -f S16_LE` or `ffmpeg -f s16le` produce), so any audio
+  tool can feed it; the sample rate and channel count are fixed per server
+- Each 10ms hop looks at the last 20ms of audio: loudness decides whether
+  the mouth is open, and the share of energy in low and high frequency
+  bands picks between open, rounded and wide
+- Hysteresis keeps the mouth from chattering: it opens above open_db but
+  only closes below the lower close_db, and a new open shape must win
+  several hops in a row before it replaces the current one
+- The stream thread only records the latest viseme; the render loop picks
+  it up at the start of its next frame and applies it through
+  set_mouth_viseme, bypassing the text command router, so the mouth is at
+  most one frame behind the audio
+- After release_ms of silence, or when the stream ends, the mouth is handed
+  back to the expression
+"""
+
+import socket
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+LIVE_LIPSYNC_PORT = 5002
+
+LOW_BAND_HZ = (80.0, 700.0)      # Jaw/rounded vowel energy (OO, OH)
+HIGH_BAND_HZ = (2500.0, 6000.0)  # Spread vowels and sibilants (EE, S)
+
+
+class LiveLipSync:
+    """Incremental PCM → viseme tracker.
+
+    feed() is called from the thread reading the stream; take() from the
+    render loop.
+
+    Attributes:
+        sample_rate: Samples per second per channel
+        channels: Interleaved channels (averaged to mono)
+        viseme: Current viseme ("closed", "open", "wide", "rounded") or
+            "neutral" when the mouth is released
+    """
+
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, window_ms: float = 20.0,
+                 hop_ms: float = 10.0, open_db: float = -30.0, close_db: float = -40.0,
+                 hold_ms: float = 30.0, release_ms: float = 400.0):
+        """Set up the tracker.
+
+        Args:
+            sample_rate: Samples per second per channel
+            channels: Interleaved channels in the stream
+            window_ms: Analysis window length
+            hop_ms: Time between analyses
+            open_db: Loudness (dBFS) at which a closed mouth opens
+            close_db: Loudness (dBFS) below which an open mouth closes
+            hold_ms: How long a new open shape must persist before it is shown
+            release_ms: Silence after which the mouth returns to the expression
+
+        Raises:
+            ImportError: If numpy is not installed
+            ValueError: If the thresholds or timings are inconsistent
+        """
+        if np is None:
+            raise ImportError("Live lip-sync requires numpy. Install it with: pip install numpy")
+        if close_db >= open_db:
+            raise ValueError("close_db must be below open_db")
+        if sample_rate <= 0 or channels <= 0 or hop_ms <= 0 or window_ms < hop_ms:
+            raise ValueError("Invalid stream format or window")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.open_db = open_db
+        self.close_db = close_db
+        self.hop = max(1, int(round(sample_rate * hop_ms / 1000.0)))
+        self.window = max(self.hop, int(round(sample_rate * window_ms / 1000.0)))
+        self.hold_hops = max(1, int(round(hold_ms / hop_ms)))
+        self.release_hops = max(1, int(round(release_ms / hop_ms)))
+
+        self._hann = np.hanning(self.window).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.window, 1.0 / sample_rate)
+        self._low = (freqs >= LOW_BAND_HZ[0]) & (freqs < LOW_BAND_HZ[1])
+        self._high = (freqs >= HIGH_BAND_HZ[0]) & (freqs < HIGH_BAND_HZ[1])
+        self._voice = (freqs >= LOW_BAND_HZ[0]) & (freqs < HIGH_BAND_HZ[1])
+        self._lock = threading.Lock()
+        self.viseme = "neutral"
+        self._changed = False
+        self.reset()
+
+    def reset(self):
+        """Forget buffered audio and release the mouth (start of a new stream).
+
+        A change the render loop has not taken yet (such as the release
+        queued by end()) stays pending.
+        """
+        self._pending = b""
+        self._samples = np.zeros(self.window, dtype=np.float32)
+        self._filled = 0  # Samples received since reset, capped at the window size
+        self._since_hop = 0
+        self._candidate = None
+        self._candidate_hops = 0
+        self._silent_hops = self.release_hops
+        with self._lock:
+            if self.viseme != "neutral":
+                self.viseme = "neutral"
+                self._changed = True
+
+    def feed(self, pcm: bytes) -> str:
+        """Analyse newly received audio.
+
+        Args:
+            pcm: Any number of bytes of the stream (partial samples are kept
+                for the next call)
+
+        Returns:
+            Current viseme after the new audio
+        """
+        data = self._pending + pcm
+        frame_bytes = 2 * self.channels
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        if usable:
+            samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+            if self.channels > 1:
+                samples = samples.reshape(-1, self.channels).mean(axis=1)
+            self._consume(samples)
+        return self.viseme
+
+    def end(self):
+        """The stream ended: hand the mouth back to the expression."""
+        self.reset()
+        with self._lock:
+            self._changed = True
+
+    def take(self) -> Optional[str]:
+        """Viseme to apply this frame.
+
+        Returns:
+            The current viseme if it changed since the last call, else None
+        """
+        with self._lock:
+            if not self._changed:
+                return None
+            self._changed = False
+            return self.viseme
+
+    def _consume(self, samples):
+        """Slide the window over new samples, analysing at every hop boundary."""
+        hops = []
+        offset = 0
+        while offset < len(samples):
+            take = min(self.hop - self._since_hop, len(samples) - offset)
+            chunk = samples[offset:offset + take]
+            self._samples = np.concatenate((self._samples[take:], chunk))
+            self._filled = min(self.window, self._filled + take)
+            self._since_hop += take
+            offset += take
+            if self._since_hop == self.hop:
+                self._since_hop = 0
+                if self._filled == self.window:
+                    hops.append(self._samples)
+        if not hops:
+            return
+        frames = np.stack(hops)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        level_db = 20.0 * np.log10(np.maximum(rms, 1e-6))
+        power = np.abs(np.fft.rfft(frames * self._hann, axis=1)) ** 2
+        voice = power[:, self._voice].sum(axis=1) + 1e-12
+        low_share = power[:, self._low].sum(axis=1) / voice
+        high_share = power[:, self._high].sum(axis=1) / voice
+        for db, low, high in zip(level_db, low_share, high_share):
+            self._step(float(db), float(low), float(high))
+
+    def _step(self, level_db: float, low_share: float, high_share: float):
+        """Advance the hysteresis state machine by one hop."""
+        viseme = self.viseme
+        sounding = viseme in ("open", "wide", "rounded")
+        if level_db >= self.open_db or (sounding and level_db >= self.close_db):
+            self._silent_hops = 0
+            shape = "wide" if high_share > 0.25 else "rounded" if low_share > 0.8 else "open"
+            if not sounding:
+                viseme = shape  # Opening is never delayed
+                self._candidate, self._candidate_hops = None, 0
+            elif shape != viseme:
+                if shape == self._candidate:
+                    self._candidate_hops += 1
+                else:
+                    self._candidate, self._candidate_hops = shape, 1
+                if self._candidate_hops >= self.hold_hops:
+                    viseme = shape
+                    self._candidate, self._candidate_hops = None, 0
+            else:
+                self._candidate, self._candidate_hops = None, 0
+        else:
+            self._silent_hops += 1
+            self._candidate, self._candidate_hops = None, 0
+            viseme = "neutral" if self._silent_hops >= self.release_hops else "closed"
+        if viseme != self.viseme:
+            with self._lock:
+                self.viseme = viseme
+                self._changed = True
+
+
+def read_stream(lipsync: LiveLipSync, stream: BinaryIO, stop: Optional[threading.Event] = None,
+                chunk_bytes: int = 640):
+    """Feed a LiveLipSync from a file-like stream until it ends.
+
+    Args:
+        lipsync: Tracker to feed (reset before reading, released at the end)
+        stream: Binary stream of PCM, e.g. a named pipe
+        stop: Optional event that ends reading early
+        chunk_bytes: Read size (small reads keep latency low)
+    """
+    read = getattr(stream, "read1", stream.read)  # Don't wait for a full chunk on buffered streams
+    lipsync.reset()
+    try:
+        while stop is None or not stop.is_set():
+            data = read(chunk_bytes)
+            if not data:
+                break
+            lipsync.feed(data)
+    finally:
+        lipsync.end()
+
+
+class LiveLipSyncServer:
+    """Accepts live PCM streams and feeds them to a LiveLipSync.
+
+    One source is streamed at a time; a second connection waits until the
+    first ends.
+
+    Attributes:
+        lipsync: Tracker the streams feed
+        host: Interface to listen on
+        port: TCP port (0 picks a free one; the chosen port is stored here),
+            or None to read only the named pipe
+        pipe_path: Optional named pipe to read as well
+    """
+
+    def __init__(self, lipsync: LiveLipSync, host: str = 'localhost', port: Optional[int] = LIVE_LIPSYNC_PORT,
+                 pipe_path: Optional[Path] = None):
+        self.lipsync = lipsync
+        self.host = host
+        self.port = port
+        self.pipe_path = Path(pipe_path) if pipe_path is not None else None
+        self._stop = threading.Event()
+        self._stream_lock = threading.Lock()
+        self._server: Optional[socket.socket] = None
+        self._threads = []
+
+    def start(self):
+        """Listen for streams on background threads.
+
+        Raises:
+            OSError: If the port can't be bound
+        """
+        self._stop.clear()
+        self._threads = []
+        if self.port is not None:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((self.host, self.port))
+            self._server.listen()
+            self._server.settimeout(0.5)
+            self.port = self._server.getsockname()[1]
+            self._threads.append(threading.Thread(target=self._accept_loop, name="live-lipsync", daemon=True))
+        if self.pipe_path is not None:
+            self._threads.append(threading.Thread(target=self._pipe_loop, name="live-lipsync-pipe", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop listening and release the mouth."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for thread in self._threads:
+            if thread.name != "live-lipsync-pipe":  # Blocked in open() until a writer appears
+                thread.join()
+        self._threads = []
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                client, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with client, self._stream_lock:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client.settimeout(0.5)
+                self._stream_socket(client)
+
+    def _stream_socket(self, client: socket.socket):
+        self.lipsync.reset()
+        try:
+            while not self._stop.is_set():
+                try:
+                    data = client.recv(4096)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                self.lipsync.feed(data)
+        finally:
+            self.lipsync.end()
+
+    def _pipe_loop(self):
+        while not self._stop.is_set():
+            try:
+                with open(self.pipe_path, 'rb', buffering=0) as stream:
+                    with self._stream_lock:
+                        read_stream(self.lipsync, stream, self._stop)
+            except OSError as e:
+                print(f"Live lip-sync pipe error: {e}")
+                self._stop.wait(1.0)
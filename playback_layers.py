@@ -0,0 +1,334 @@
+"""
+Layered timeline playback for Mr. Pumpkin.
+
+This module provides:
+- COMMAND_CHANNELS: Face channel driven by each timeline command
+- Layer: One timeline running on its own Playback engine with a priority
+- LayeredPlayback: Runs several layers at once and merges them every frame
+
+Design decisions:
+- Each layer has its own Playback (position, nesting stack, looping), so an
+  idle loop can run under a speech track without being baked into it
+- A channel is owned by the highest-priority playing layer whose current
+  timeline drives it; other layers' commands for that channel are dropped
+- The main playback (play command / show queue) is the foreground and
+  outranks every layer on the channels its timeline drives
+- Layer commands are collected while the layers update and executed once,
+  in scheduled-time order; channel sets are computed once per timeline
+  (extended as a streaming timeline loads)
+- Layers never touch the shared music stream
+"""
+
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from timeline import Playback, PlaybackState, Timeline, resolve_recording_tree
+
+
+# Face channel driven by each command; commands of one channel override each other
+COMMAND_CHANNELS = {
+    "set_expression": "expression",
+    "blink": "eyes",
+    "wink_left": "eyes",
+    "wink_right": "eyes",
+    "roll_clockwise": "eyes",
+    "roll_counterclockwise": "eyes",
+    "gaze": "eyes",
+    "gaze_to": "eyes",
+    "gaze_curve": "eyes",
+    "eyebrow_raise": "eyebrows",
+    "eyebrow_lower": "eyebrows",
+    "eyebrow_raise_left": "eyebrows",
+    "eyebrow_lower_left": "eyebrows",
+    "eyebrow_raise_right": "eyebrows",
+    "eyebrow_lower_right": "eyebrows",
+    "eyebrow_reset": "eyebrows",
+    "eyebrow": "eyebrows",
+    "eyebrow_to": "eyebrows",
+    "eyebrow_curve": "eyebrows",
+    "projection_reset": "head",
+    "jog_offset": "head",
+    "set_offset": "head",
+    "offset_to": "head",
+    "offset_curve": "head",
+    "turn_left": "head",
+    "turn_right": "head",
+    "turn_up": "head",
+    "turn_down": "head",
+    "center_head": "head",
+    "twitch_nose": "nose",
+    "scrunch_nose": "nose",
+    "wiggle_nose": "nose",
+    "reset_nose": "nose",
+    "mouth_closed": "mouth",
+    "mouth_open": "mouth",
+    "mouth_wide": "mouth",
+    "mouth_rounded": "mouth",
+    "mouth_neutral": "mouth",
+}
+
+CHANNELS = frozenset(COMMAND_CHANNELS.values())
+
+
+class Layer:
+    """Single timeline playing on its own channel set.
+
+    Attributes:
+        name: Layer name (unique within a LayeredPlayback)
+        filename: Timeline filename (with .json extension)
+        priority: Higher priorities own shared channels
+        loop: Restart the timeline when it ends
+        channels: Channels this layer may drive (all channels if None)
+        playback: Playback engine running the timeline
+    """
+
+    def __init__(self, name: str, filename: str, playback: Playback, priority: int = 0,
+                 loop: bool = False, channels: Optional[Iterable[str]] = None):
+        self.name = name
+        self.filename = filename
+        self.playback = playback
+        self.priority = priority
+        self.loop = loop
+        self.channels: Optional[FrozenSet[str]] = frozenset(channels) if channels is not None else None
+        self.pending: List[Tuple[float, str, Dict[str, Any]]] = []  # (late_ms, command, args) this frame
+        self.tree: Optional[Tuple[Dict[str, Any], List[str]]] = None  # Resolved recording tree for loop restarts
+        self.passes = 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to dictionary for JSON status responses."""
+        return {
+            "name": self.name,
+            "filename": self.filename,
+            "priority": self.priority,
+            "loop": self.loop,
+            "channels": sorted(self.channels) if self.channels is not None else None,
+            "state": self.playback.state.value,
+            "position_ms": self.playback.current_position_ms,
+            "passes": self.passes
+        }
+
+
+class LayeredPlayback:
+    """Runs several timelines concurrently and merges them per channel.
+
+    Call update(dt) every frame after the foreground playback has updated.
+
+    Attributes:
+        recordings_dir: Directory for timeline files
+        foreground: Main playback engine, which outranks every layer
+        layers: Active layers by name
+    """
+
+    def __init__(self, callback: Callable, recordings_dir: Optional[Path] = None,
+                 foreground: Optional[Playback] = None):
+        """Initialize layered playback.
+
+        Args:
+            callback: Function taking (command, args, late_ms) that executes a command
+            recordings_dir: Directory for timeline files (default: ~/.mr-pumpkin/recordings)
+            foreground: Main playback engine whose channels layers must not drive
+        """
+        if recordings_dir is None:
+            home = Path.home()
+            self.recordings_dir = home / '.mr-pumpkin' / 'recordings'
+        else:
+            self.recordings_dir = Path(recordings_dir)
+
+        self.foreground = foreground
+        self.layers: Dict[str, Layer] = {}
+        self._callback = callback
+        self._ordered: List[Layer] = []  # Layers by descending priority, then start order
+        self._lock = threading.Lock()
+        self._channel_cache: "weakref.WeakKeyDictionary[Timeline, Tuple[int, FrozenSet[str]]]" = weakref.WeakKeyDictionary()
+
+    def play(self, name: str, filename: str, priority: int = 0, loop: bool = False,
+             channels: Optional[Iterable[str]] = None) -> Layer:
+        """Start a timeline on a layer, replacing any layer with the same name.
+
+        Args:
+            name: Layer name
+            filename: Timeline filename (.json extension optional)
+            priority: Higher priorities own shared channels
+            loop: Restart the timeline when it ends
+            channels: Restrict the layer to these channels
+
+        Returns:
+            The started layer
+
+        Raises:
+            FileNotFoundError: If the timeline doesn't exist
+            ValueError: If the timeline is invalid or a channel is unknown
+        """
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        if channels is not None:
+            unknown = set(channels) - CHANNELS
+            if unknown:
+                raise ValueError(f"Unknown channel(s): {', '.join(sorted(unknown))}")
+
+        # Resolve the tree once so loop restarts never touch the disk
+        library = self.foreground.library if self.foreground is not None else None
+        tree = resolve_recording_tree(self.recordings_dir, filename, library=library)
+        if isinstance(tree[0].get(filename), Exception):
+            raise tree[0][filename]
+
+        playback = Playback(recordings_dir=self.recordings_dir)
+        playback.play_audio = False
+        layer = Layer(name, filename, playback, priority, loop, channels)
+        layer.tree = tree
+        playback.set_command_callback(
+            lambda command, args, late_ms: layer.pending.append((late_ms, command, args)),
+            timed=True
+        )
+        playback.play(filename, preloaded=tree)
+
+        with self._lock:
+            old = self.layers.pop(name, None)
+            if old is not None:
+                old.playback.stop()
+            self.layers[name] = layer
+            self._reorder()
+        return layer
+
+    def stop(self, name: str):
+        """Stop and remove a layer.
+
+        Raises:
+            KeyError: If no layer has that name
+        """
+        with self._lock:
+            layer = self.layers.pop(name)
+            self._reorder()
+        layer.playback.stop()
+
+    def stop_all(self):
+        """Stop and remove every layer."""
+        with self._lock:
+            layers = list(self.layers.values())
+            self.layers = {}
+            self._ordered = []
+        for layer in layers:
+            layer.playback.stop()
+
+    def update(self, dt_ms: float) -> List[str]:
+        """Advance every layer and execute the merged commands (call every frame).
+
+        Args:
+            dt_ms: Delta time since last frame in milliseconds
+
+        Returns:
+            List of error messages from the layers
+        """
+        layers = self._ordered
+        if not layers:
+            return []
+
+        errors: List[str] = []
+        active: List[Layer] = []
+        for layer in layers:
+            layer.pending = []
+            playback = layer.playback
+            if playback.state != PlaybackState.PLAYING:
+                continue
+            active.append(layer)
+            errors.extend(f"Layer '{layer.name}': {e}" for e in playback.update(dt_ms))
+            if playback.state == PlaybackState.STOPPED:
+                if layer.loop:
+                    playback.play(layer.filename, preloaded=layer.tree)
+                    layer.passes += 1
+                else:
+                    self._remove(layer)
+
+        # Layers that finished this frame still own their channels for its commands
+        owners = self._channel_owners(active)
+
+        merged = []
+        for rank, layer in enumerate(active):
+            for late_ms, command, args in layer.pending:
+                channel = COMMAND_CHANNELS.get(command)
+                if channel is not None and owners.get(channel) is not layer:
+                    continue
+                merged.append((-late_ms, rank, command, args, layer))
+        merged.sort(key=lambda item: (item[0], item[1]))
+
+        failed = set()
+        for neg_late_ms, _, command, args, layer in merged:
+            if layer.name in failed:
+                continue
+            try:
+                self._callback(command, args, -neg_late_ms)
+            except Exception as e:
+                errors.append(f"Layer '{layer.name}': Error executing command '{command}': {e}")
+                # Invalid command stops the layer
+                failed.add(layer.name)
+                layer.playback.stop()
+                self._remove(layer)
+
+        return errors
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get current layer status.
+
+        Returns:
+            Dictionary with the layers (highest priority first) and channel owners
+        """
+        layers = self._ordered
+        owners = self._channel_owners([layer for layer in layers if layer.playback.state == PlaybackState.PLAYING])
+        return {
+            "layers": [layer.to_dict() for layer in layers],
+            "owners": {
+                channel: (owner.name if isinstance(owner, Layer) else "main")
+                for channel, owner in sorted(owners.items())
+            }
+        }
+
+    def _channel_owners(self, layers: List[Layer]) -> Dict[str, Any]:
+        """Map each driven channel to its owner (foreground playback or a layer).
+
+        Args:
+            layers: Layers that take part, highest priority first
+        """
+        owners: Dict[str, Any] = {}
+        foreground = self.foreground
+        if foreground is not None and foreground.state == PlaybackState.PLAYING and foreground.timeline is not None:
+            for channel in self._timeline_channels(foreground.timeline):
+                owners[channel] = foreground
+        for layer in layers:
+            timeline = layer.playback.timeline
+            if timeline is None:
+                continue
+            channels = self._timeline_channels(timeline)
+            if layer.channels is not None:
+                channels = channels & layer.channels
+            for channel in channels:
+                owners.setdefault(channel, layer)
+        return owners
+
+    def _timeline_channels(self, timeline: Timeline) -> FrozenSet[str]:
+        """Channels a timeline drives (cached per timeline object).
+
+        Timelines still streaming in are rescanned from where the last scan
+        stopped, so channels appear as their commands are parsed.
+        """
+        scanned, channels = self._channel_cache.get(timeline, (0, frozenset()))
+        count = len(timeline.commands)
+        if count > scanned or not scanned:
+            channels = channels | frozenset(
+                COMMAND_CHANNELS[cmd.command] for cmd in timeline.commands[scanned:count]
+                if cmd.command in COMMAND_CHANNELS
+            )
+            self._channel_cache[timeline] = (count, channels)
+        return channels
+
+    def _remove(self, layer: Layer):
+        """Drop a finished or failed layer (if it is still the named layer)."""
+        with self._lock:
+            if self.layers.get(layer.name) is layer:
+                del self.layers[layer.name]
+                self._reorder()
+
+    def _reorder(self):
+        """Rebuild the priority order (lock held)."""
+        self._ordered = sorted(self.layers.values(), key=lambda layer: -layer.priority)
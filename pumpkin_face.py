@@ -8,7 +8,12 @@ import json
 import asyncio
 from enum import Enum
 from typing import Tuple
-from timeline import Playback, RecordingSession, FileManager
+from timeline import Playback, PlaybackState, RecordingSession, FileManager
+from show_queue import ShowQueue
+from playback_layers import LayeredPlayback
+from recording_library import RecordingLibrary
+from live_lipsync import LIVE_LIPSYNC_PORT, LiveLipSync, LiveLipSyncServer
+from keyframes import CURVE_COMMANDS, curve_from_command
 from command_handler import CommandRouter
 
 try:
@@ -41,13 +46,16 @@ EYEBROW_BASELINES = {
 }
 
 class PumpkinFace:
-    def __init__(self, width: int = 1920, height: int = 1080, monitor: int = 0, fullscreen: bool = True, host: str = 'localhost', port: int = 5000):
+    def __init__(self, width: int = 1920, height: int = 1080, monitor: int = 0, fullscreen: bool = True, host: str = 'localhost', port: int = 5000,
+                 lipsync_port: int = None, lipsync_pipe: str = None):
         self.width = width
         self.height = height
         self.monitor = monitor
         self.fullscreen = fullscreen
         self.host = host
         self.port = port
+        self.lipsync_port = lipsync_port  # Live PCM lip-sync stream port (None: off, opt-in)
+        self.lipsync_pipe = lipsync_pipe  # Optional named pipe carrying the same stream
         self.clock = pygame.time.Clock()
         self.running = True
         self.current_expression = Expression.NEUTRAL
@@ -118,6 +126,10 @@ class PumpkinFace:
         self.mouth_viseme = None            # Current viseme override: None or "closed"|"open"|"wide"|"rounded"
         self.mouth_transition_progress = 1.0    # 0.0 → 1.0 transition to target viseme
         self.mouth_transition_speed = 0.15      # Faster than expression transitions (0.05) for snappy speech
+        self.live_lipsync = None                # LiveLipSync fed by a live audio stream (set up in run())
+        
+        # Keyframe curves (gaze_to, eyebrow_curve, ...) evaluated every frame
+        self.curves = {}  # Track ("gaze"|"eyebrow"|"offset") -> (Curve, elapsed_ms)
         
         # Colors - optimized for projection mapping
         self.BACKGROUND_COLOR = (0, 0, 0)  # Black background for projection
@@ -127,11 +139,16 @@ class PumpkinFace:
         self.timeline_playback = Playback()
         self.recording_session = RecordingSession()
         self.file_manager = FileManager()
-        self.timeline_playback.set_command_callback(self._execute_timeline_command)
+        self.show_queue = ShowQueue(self.timeline_playback)
+        self.timeline_playback.set_command_callback(self._execute_timeline_command, timed=True)
+        self.layers = LayeredPlayback(self._execute_timeline_command,
+                                      self.timeline_playback.recordings_dir,
+                                      foreground=self.timeline_playback)
+        self._applied_bake = None  # BakedTimeline applied last frame (released when playback moves on)
         
         # Initialize command router
         self.command_router = CommandRouter(self, Expression)
-        self.last_update_time = time.time()  # For delta time calculation
+        self.last_update_time = time.monotonic()  # For delta time calculation
     
     @property
     def left_eye_gaze_x(self):
@@ -548,38 +565,46 @@ class PumpkinFace:
             left: Offset for left eyebrow (if right not provided, applies to both)
             right: Offset for right eyebrow (optional)
         """
+        self.curves.pop("eyebrow", None)
         def clamp(v): return max(-50.0, min(50.0, float(v)))
         self.eyebrow_left_offset = clamp(left)
         self.eyebrow_right_offset = clamp(right if right is not None else left)
 
     def raise_eyebrows(self, step: float = 10.0):
         """Raise both eyebrows by step pixels."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_left_offset = max(-50.0, self.eyebrow_left_offset - step)
         self.eyebrow_right_offset = max(-50.0, self.eyebrow_right_offset - step)
 
     def lower_eyebrows(self, step: float = 10.0):
         """Lower both eyebrows by step pixels."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_left_offset = min(50.0, self.eyebrow_left_offset + step)
         self.eyebrow_right_offset = min(50.0, self.eyebrow_right_offset + step)
 
     def raise_eyebrow_left(self, step: float = 10.0):
         """Raise left eyebrow by step pixels."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_left_offset = max(-50.0, self.eyebrow_left_offset - step)
 
     def lower_eyebrow_left(self, step: float = 10.0):
         """Lower left eyebrow by step pixels."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_left_offset = min(50.0, self.eyebrow_left_offset + step)
 
     def raise_eyebrow_right(self, step: float = 10.0):
         """Raise right eyebrow by step pixels."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_right_offset = max(-50.0, self.eyebrow_right_offset - step)
 
     def lower_eyebrow_right(self, step: float = 10.0):
         """Lower right eyebrow by step pixels."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_right_offset = min(50.0, self.eyebrow_right_offset + step)
 
     def reset_eyebrows(self):
         """Reset both eyebrows to neutral position."""
+        self.curves.pop("eyebrow", None)
         self.eyebrow_left_offset = 0.0
         self.eyebrow_right_offset = 0.0
 
@@ -607,6 +632,7 @@ class PumpkinFace:
             dx: Horizontal offset change in pixels (positive = right)
             dy: Vertical offset change in pixels (positive = down)
         """
+        self.curves.pop("offset", None)
         def clamp(v): return max(-500, min(500, int(v)))
         self.projection_offset_x = clamp(self.projection_offset_x + dx)
         self.projection_offset_y = clamp(self.projection_offset_y + dy)
@@ -619,6 +645,7 @@ class PumpkinFace:
             x: Horizontal offset in pixels (positive = right)
             y: Vertical offset in pixels (positive = down)
         """
+        self.curves.pop("offset", None)
         def clamp(v): return max(-500, min(500, int(v)))
         self.projection_offset_x = clamp(x)
         self.projection_offset_y = clamp(y)
@@ -626,6 +653,7 @@ class PumpkinFace:
     
     def reset_projection_offset(self):
         """Reset projection offset to center (0, 0)."""
+        self.curves.pop("offset", None)
         self.projection_offset_x = 0
         self.projection_offset_y = 0
         print("Projection offset reset to (0, 0)")
@@ -637,6 +665,7 @@ class PumpkinFace:
             target_x: Target horizontal offset in pixels
             target_y: Target vertical offset in pixels
         """
+        self.curves.pop("offset", None)
         def clamp(v): return max(-500, min(500, int(v)))
         self.is_moving_head = True
         self.head_movement_progress = 0.0
@@ -865,6 +894,7 @@ class PumpkinFace:
         Angles are clamped to [-90, 90] range.
         0 degrees = straight ahead, +X = right, +Y = up
         """
+        self.curves.pop("gaze", None)
         # Clamp values to ±90°
         def clamp(value: float) -> float:
             return max(-90.0, min(90.0, value))
@@ -945,12 +975,14 @@ class PumpkinFace:
         """Reset nose to neutral position."""
         self._reset_nose()
     
-    def _execute_timeline_command(self, command: str, args: dict):
+    def _execute_timeline_command(self, command: str, args: dict, late_ms: float = 0.0):
         """Execute a command from timeline playback.
         
         Args:
             command: Command name (e.g., "set_expression", "blink")
             args: Dictionary of command arguments
+            late_ms: How long ago the command was scheduled to run; animations
+                it starts are advanced by this much
         """
         # Expression commands
         if command == "set_expression":
@@ -1065,25 +1097,147 @@ class PumpkinFace:
         elif command == "mouth_neutral":
             self.set_mouth_viseme("neutral")
         
+        # Tweened / keyframed commands (the curve is evaluated every frame)
+        elif command in CURVE_COMMANDS:
+            self._start_curve(command, args, late_ms)
+        
         else:
             raise ValueError(f"Unknown timeline command: {command}")
+        
+        if late_ms > 0:
+            self._apply_phase_offset(command, late_ms)
+    
+    def _curve_values(self, track: str) -> tuple:
+        """Current values of a curve track (start point for *_to tweens)."""
+        if track == "gaze":
+            return tuple(self.pupil_angle_left) + tuple(self.pupil_angle_right)
+        if track == "eyebrow":
+            return (self.eyebrow_left_offset, self.eyebrow_right_offset)
+        return (float(self.projection_offset_x), float(self.projection_offset_y))
+    
+    def _set_curve_values(self, track: str, values: tuple):
+        """Write a curve track's values to the face (clamped like the setters)."""
+        if track == "gaze":
+            def clamp(v): return max(-90.0, min(90.0, v))
+            self.pupil_angle_left = (clamp(values[0]), clamp(values[1]))
+            self.pupil_angle_right = (clamp(values[2]), clamp(values[3]))
+        elif track == "eyebrow":
+            def clamp(v): return max(-50.0, min(50.0, v))
+            self.eyebrow_left_offset = clamp(values[0])
+            self.eyebrow_right_offset = clamp(values[1])
+        else:
+            def clamp(v): return max(-500, min(500, int(round(v))))
+            self.projection_offset_x = clamp(values[0])
+            self.projection_offset_y = clamp(values[1])
+    
+    def _start_curve(self, command: str, args: dict, late_ms: float = 0.0):
+        """Start a tweened/keyframed command, replacing any curve on its track.
+        
+        Args:
+            command: Command name from CURVE_COMMANDS
+            args: Command arguments
+            late_ms: Time since the command's scheduled start in milliseconds
+            
+        Raises:
+            ValueError: If the arguments are invalid
+        """
+        track = CURVE_COMMANDS[command]
+        curve = curve_from_command(command, args, self._curve_values(track))
+        if track == "offset":
+            self.is_moving_head = False  # The curve takes over the head position
+        self._set_curve_values(track, curve.evaluate(late_ms))
+        if late_ms < curve.duration_ms:
+            self.curves[track] = (curve, late_ms)
+        else:
+            self.curves.pop(track, None)
+    
+    def _update_curves(self, dt_ms: float):
+        """Advance running curves by one frame and apply their values."""
+        for track, (curve, elapsed_ms) in list(self.curves.items()):
+            elapsed_ms += dt_ms
+            self._set_curve_values(track, curve.evaluate(elapsed_ms))
+            if elapsed_ms >= curve.duration_ms:
+                del self.curves[track]
+            else:
+                self.curves[track] = (curve, elapsed_ms)
+    
+    def _apply_phase_offset(self, command: str, late_ms: float):
+        """Advance an animation a timeline command just started to its scheduled phase.
+        
+        Playback runs commands at frame boundaries, up to a frame after their
+        timestamp. Only animations the command actually (re)started are moved.
+        
+        Args:
+            command: Timeline command that was executed
+            late_ms: Time since the command's scheduled start in milliseconds
+        """
+        frames = late_ms * 60.0 / 1000.0  # Animations advance once per frame at 60 FPS
+        frame_s = 1.0 / 60.0
+        
+        if command == "blink" and self.is_blinking and self.blink_progress == 0.0:
+            self.blink_progress = min(1.0, frames * self.blink_speed)
+        elif command in ("wink_left", "wink_right") and self.is_winking and self.wink_progress == 0.0:
+            self.wink_progress = min(1.0, frames * self.wink_speed)
+        elif command in ("roll_clockwise", "roll_counterclockwise") and self.is_rolling and self.rolling_progress == 0.0:
+            self.rolling_progress = min(1.0, frames * frame_s / self.rolling_duration)
+        elif (command in ("turn_left", "turn_right", "turn_up", "turn_down", "center_head")
+              and self.is_moving_head and self.head_movement_progress == 0.0):
+            self.head_movement_progress = min(1.0, frames * frame_s / self.head_movement_duration)
+        elif (command in ("twitch_nose", "scrunch_nose", "wiggle_nose")
+              and (self.is_twitching or self.is_scrunching) and self.nose_animation_progress == 0.0):
+            self.nose_animation_progress = min(1.0, frames * frame_s / self.nose_animation_duration)
+        elif command.startswith("mouth_") and self.mouth_transition_progress == 0.0:
+            self.mouth_transition_progress = min(1.0, frames * self.mouth_transition_speed)
+        elif command == "set_expression" and self.transition_progress == 0.0:
+            self.transition_progress = min(1.0, frames * self.transition_speed)
     
     def update(self):
         # Calculate delta time for timeline playback
-        current_time = time.time()
+        current_time = time.monotonic()
         dt_seconds = current_time - self.last_update_time
         self.last_update_time = current_time
         dt_ms = dt_seconds * 1000  # Convert to milliseconds
         
-        # Update timeline playback
-        if self.timeline_playback.state.value == "playing":
-            errors = self.timeline_playback.update(dt_ms)
-            if errors:
-                for error in errors:
-                    print(f"Timeline error: {error}")
+        errors = self.step(dt_ms)
+        if errors:
+            for error in errors:
+                print(f"Timeline error: {error}")
+    
+    def _apply_baked(self):
+        """Apply the current frame of a baked recording.
+        
+        Returns:
+            Channels set by the bake this frame (their animations are skipped)
+        """
+        playback = self.timeline_playback
+        baked = playback.baked if playback.state != PlaybackState.STOPPED else None
+        if self._applied_bake is not None and self._applied_bake is not baked:
+            self._applied_bake.release(self)
+        self._applied_bake = baked
+        if baked is None:
+            return ()
+        baked.apply(self, playback.current_position_ms)
+        return baked.channels
+    
+    def step(self, dt_ms: float):
+        """Advance playback and animations by one frame.
+        
+        Args:
+            dt_ms: Time since the previous frame in milliseconds
+            
+        Returns:
+            List of timeline error messages from this frame
+        """
+        # Advance running curves first so ones started this frame begin at their phase
+        self._update_curves(dt_ms)
+        
+        # Update timeline playback (the show queue hands off between queued recordings)
+        errors = self.show_queue.update(dt_ms)
+        errors.extend(self.layers.update(dt_ms))  # Concurrent layers under the main playback
+        baked_channels = self._apply_baked()
         
         # Handle blink animation
-        if self.is_blinking:
+        if self.is_blinking and "eyes" not in baked_channels:
             self.blink_progress += self.blink_speed
             if self.blink_progress >= 1.0:
                 self.is_blinking = False
@@ -1092,7 +1246,7 @@ class PumpkinFace:
                 self.current_expression = self.pre_blink_expression
         
         # Handle wink animation
-        if self.is_winking:
+        if self.is_winking and "eyes" not in baked_channels:
             self.wink_progress += self.wink_speed
             
             # Closing phase (0.0 to 0.5)
@@ -1120,7 +1274,7 @@ class PumpkinFace:
                 self.right_eye_scale = 1.0
         
         # Handle rolling eyes animation (pauses during blink or wink)
-        if self.is_rolling and not (self.is_blinking or self.is_winking):
+        if self.is_rolling and not (self.is_blinking or self.is_winking) and "eyes" not in baked_channels:
             delta_time = 1.0 / 60.0  # Assume 60 FPS
             self.rolling_progress += delta_time / self.rolling_duration
             if self.rolling_progress >= 1.0:
@@ -1141,7 +1295,7 @@ class PumpkinFace:
             pass
         
         # Handle head movement animation
-        if self.is_moving_head:
+        if self.is_moving_head and "head" not in baked_channels:
             delta_time = 1.0 / 60.0  # Assume 60 FPS
             self.head_movement_progress += delta_time / self.head_movement_duration
             
@@ -1162,18 +1316,27 @@ class PumpkinFace:
                 self.projection_offset_y = int(self.head_start_y + (self.head_target_y - self.head_start_y) * eased_t)
         
         # Handle nose animations
-        self._update_nose_animation()
+        if "nose" not in baked_channels:
+            self._update_nose_animation()
+        
+        # Live audio stream drives the mouth directly (latest viseme, at most one frame old)
+        if self.live_lipsync is not None and "mouth" not in baked_channels:
+            viseme = self.live_lipsync.take()
+            if viseme is not None:
+                self.set_mouth_viseme(viseme)
         
         # Update mouth viseme transition
-        if self.mouth_transition_progress < 1.0:
+        if self.mouth_transition_progress < 1.0 and "mouth" not in baked_channels:
             self.mouth_transition_progress = min(1.0, self.mouth_transition_progress + self.mouth_transition_speed)
         
         # Handle expression transitions
-        if self.transition_progress < 1.0:
+        if self.transition_progress < 1.0 and "expression" not in baked_channels:
             self.transition_progress += self.transition_speed
             if self.transition_progress >= 1.0:
                 self.current_expression = self.target_expression
                 self.transition_progress = 1.0
+        
+        return errors
     
     def _capture_command_for_recording(self, data: str):
         """Capture a command for the active recording session.
@@ -1324,6 +1487,14 @@ class PumpkinFace:
     def run(self):
         pygame.init()
         
+        # Save takes a crash or power cut left in recording journals
+        for filename in self.recording_session.recover_journals():
+            print(f"Recovered interrupted recording: {filename}")
+        
+        # Keep the recordings directory pre-parsed so new content plays without parse latency
+        self.timeline_playback.library = RecordingLibrary(self.timeline_playback.recordings_dir)
+        self.timeline_playback.library.start()
+        
         # Start network servers FIRST (before display initialization)
         # This ensures socket servers are ready even if display fails
         try:
@@ -1350,6 +1521,20 @@ class PumpkinFace:
         else:
             print("Warning: websockets library not available (WebSocket server disabled)")
         
+        if self.lipsync_port is not None or self.lipsync_pipe:
+            try:
+                self.live_lipsync = LiveLipSync()
+                lipsync_server = LiveLipSyncServer(self.live_lipsync, self.host, self.lipsync_port,
+                                                   pipe_path=self.lipsync_pipe)
+                lipsync_server.start()
+                if lipsync_server.port is not None:
+                    print(f"Live lip-sync stream listening on {self.host}:{lipsync_server.port}")
+                if self.lipsync_pipe:
+                    print(f"Live lip-sync stream reading {self.lipsync_pipe}")
+            except (ImportError, OSError) as e:
+                self.live_lipsync = None
+                print(f"Warning: live lip-sync disabled ({e})")
+        
         # Try to create display, but continue if it fails (headless mode)
         screen = None
         try:
@@ -1517,34 +1702,51 @@ class PumpkinFace:
                                 # Read JSON content until END_UPLOAD marker.
                                 # Use a line buffer so JSON and END_UPLOAD arriving
                                 # in the same TCP segment are handled correctly.
-                                json_lines = []
+                                # Lines are validated and written to disk as they
+                                # arrive; after an error the rest of the upload is
+                                # drained so the connection stays in sync.
+                                upload = None
+                                upload_error = None
+                                try:
+                                    upload = self.file_manager.open_upload(filename)
+                                except (FileExistsError, ValueError) as e:
+                                    upload_error = e
                                 upload_buf = b""
                                 upload_done = False
-                                while True:
-                                    chunk = client_socket.recv(4096)
-                                    if not chunk:
-                                        response = "ERROR Connection lost while reading JSON"
-                                        client_socket.sendall((response + '\n').encode('utf-8'))
-                                        print(response)
-                                        break
-                                    upload_buf += chunk
-                                    while b"\n" in upload_buf:
-                                        line_bytes, upload_buf = upload_buf.split(b"\n", 1)
-                                        json_line = line_bytes.decode('utf-8').strip()
-                                        if json_line == "END_UPLOAD":
-                                            json_content = '\n'.join(json_lines)
-                                            self.file_manager.upload_timeline(filename, json_content)
-                                            if not filename.endswith('.json'):
-                                                filename = f"{filename}.json"
-                                            response = f"OK Uploaded {filename}"
+                                try:
+                                    while True:
+                                        chunk = client_socket.recv(4096)
+                                        if not chunk:
+                                            response = "ERROR Connection lost while reading JSON"
                                             client_socket.sendall((response + '\n').encode('utf-8'))
                                             print(response)
-                                            upload_done = True
                                             break
-                                        if json_line:
-                                            json_lines.append(json_line)
-                                    if upload_done:
-                                        break
+                                        upload_buf += chunk
+                                        while b"\n" in upload_buf:
+                                            line_bytes, upload_buf = upload_buf.split(b"\n", 1)
+                                            json_line = line_bytes.decode('utf-8').strip()
+                                            if json_line == "END_UPLOAD":
+                                                if upload_error is not None:
+                                                    raise upload_error
+                                                upload.finish()
+                                                upload = None
+                                                if not filename.endswith('.json'):
+                                                    filename = f"{filename}.json"
+                                                response = f"OK Uploaded {filename}"
+                                                client_socket.sendall((response + '\n').encode('utf-8'))
+                                                print(response)
+                                                upload_done = True
+                                                break
+                                            if json_line and upload_error is None:
+                                                try:
+                                                    upload.write(json_line + '\n')
+                                                except ValueError as e:
+                                                    upload_error = e
+                                        if upload_done:
+                                            break
+                                finally:
+                                    if upload is not None:
+                                        upload.abort()
                             except FileExistsError:
                                 response = f"ERROR File already exists: {filename}"
                                 client_socket.sendall((response + '\n').encode('utf-8'))
@@ -1689,6 +1891,8 @@ if __name__ == "__main__":
     fullscreen = True
     host = 'localhost'
     port = 5000
+    lipsync_port = None
+    lipsync_pipe = None
     
     # Parse command-line arguments
     i = 1
@@ -1717,6 +1921,26 @@ if __name__ == "__main__":
                 print(f"Error: Invalid port number: {sys.argv[i + 1]}")
                 sys.exit(1)
             i += 1
+        elif arg == '--lipsync-port':
+            if i + 1 >= len(sys.argv):
+                print("Error: --lipsync-port requires an argument")
+                sys.exit(1)
+            try:
+                lipsync_port = int(sys.argv[i + 1])
+                if lipsync_port < 0 or lipsync_port > 65535:
+                    print(f"Error: lip-sync port must be 0-65535.")
+                    sys.exit(1)
+                lipsync_port = lipsync_port or None  # 0 keeps the listener off
+            except ValueError:
+                print(f"Error: Invalid port number: {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 1
+        elif arg == '--lipsync-pipe':
+            if i + 1 >= len(sys.argv):
+                print("Error: --lipsync-pipe requires an argument")
+                sys.exit(1)
+            lipsync_pipe = sys.argv[i + 1]
+            i += 1
         elif arg in ['-h', '--help']:
             print(f"Usage: python pumpkin_face.py [OPTIONS] [monitor_number]")
             print(f"")
@@ -1725,6 +1949,8 @@ if __name__ == "__main__":
             print(f"  --fullscreen          Run in fullscreen mode")
             print(f"  --host HOST           IP address or hostname to bind to (default: localhost)")
             print(f"  --port PORT           Port number to listen on (default: 5000)")
+            print(f"  --lipsync-port PORT   Listen for a live PCM lip-sync stream on PORT, e.g. {LIVE_LIPSYNC_PORT} (default: off)")
+            print(f"  --lipsync-pipe PATH   Read the live lip-sync stream from a named pipe (default: off)")
             print(f"  -h, --help            Show this help message")
             print(f"")
             print(f"Examples:")
@@ -1746,5 +1972,6 @@ if __name__ == "__main__":
                 sys.exit(1)
         i += 1
     
-    pumpkin = PumpkinFace(monitor=monitor, fullscreen=fullscreen, host=host, port=port)
+    pumpkin = PumpkinFace(monitor=monitor, fullscreen=fullscreen, host=host, port=port,
+                          lipsync_port=lipsync_port, lipsync_pipe=lipsync_pipe)
     pumpkin.run()
@@ -0,0 +1,258 @@
+"""
+Recordings directory watcher for Mr. Pumpkin.
+
+This module provides:
+- RecordingLibrary: In-memory view of the recordings directory, kept
+  current by a background thread that pre-parses new and changed timelines
+
+Design decisions:
+- Linux inotify (through ctypes, no extra dependency) reports files as they
+  are closed after writing or renamed into place (atomic saves, rsync);
+  other platforms, or a directory that doesn't exist yet, fall back to
+  polling its listing
+- Every lookup checks the file's size and mtime, so a stale entry is never
+  returned even if the watcher hasn't caught up yet
+- A changed file is parsed into a new Timeline object that replaces the old
+  entry; timelines are never modified in place, so anything already playing
+  the old version keeps a consistent copy until it next loads the file
+- Files over max_parse_bytes are left to playback's streaming loader
+  rather than held in memory, and parsed timelines are kept within a total
+  of max_cache_bytes (file sizes), evicting the least recently used; an
+  evicted recording is read from disk again when it is played
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from timeline import Timeline
+
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class _Inotify:
+    """Minimal inotify watch on one directory."""
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def read(self, timeout_s: float) -> Optional[List[Tuple[int, str]]]:
+        """Wait for events.
+
+        Returns:
+            (mask, name) pairs (empty on timeout), or None if the queue
+            overflowed or the directory went away
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout_s)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].split(b"\0", 1)[0]
+            offset += _EVENT.size + length
+            if mask & (_IN_Q_OVERFLOW | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                return None
+            events.append((mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RecordingLibrary:
+    """Pre-parsed view of the recordings directory.
+
+    Attributes:
+        recordings_dir: Directory being watched
+        poll_interval_s: Seconds between directory scans when polling
+        max_parse_bytes: Larger files are not parsed ahead of time
+        max_cache_bytes: Total size of the files kept parsed
+        using_inotify: Whether changes are currently reported by inotify
+    """
+
+    def __init__(self, recordings_dir: Path, poll_interval_s: float = 2.0,
+                 max_parse_bytes: int = 4 << 20, max_cache_bytes: int = 16 << 20):
+        self.recordings_dir = Path(recordings_dir)
+        self.poll_interval_s = poll_interval_s
+        self.max_parse_bytes = max_parse_bytes
+        self.max_cache_bytes = max_cache_bytes
+        self.using_inotify = False
+        self._entries: Dict[str, Tuple[int, int, Any]] = {}  # filename -> (mtime_ns, size, Timeline or error)
+        self._parsed: "OrderedDict[str, int]" = OrderedDict()  # filenames holding a Timeline, least recent first
+        self._parsed_bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Scan the directory and start watching it on a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="recording-library", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching (entries stay available)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, filename: str) -> Optional[Timeline]:
+        """Pre-parsed timeline for a recording.
+
+        Args:
+            filename: Recording filename (.json extension optional)
+
+        Returns:
+            The timeline, or None if it isn't parsed or the file has changed
+            since it was
+        """
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        with self._lock:
+            entry = self._entries.get(filename)
+        if entry is None or not isinstance(entry[2], Timeline):
+            return None
+        try:
+            stat = (self.recordings_dir / filename).stat()
+        except OSError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != entry[:2]:
+            return None
+        with self._lock:
+            if filename in self._parsed:
+                self._parsed.move_to_end(filename)
+        return entry[2]
+
+    def filenames(self) -> List[str]:
+        """Recordings currently in the directory, as last seen by the watcher."""
+        with self._lock:
+            return sorted(self._entries)
+
+    def refresh(self, filename: Optional[str] = None):
+        """Bring one recording (or, with None, the whole directory) up to date."""
+        if filename is not None:
+            self._update(filename)
+            return
+        try:
+            present = {p.name for p in self.recordings_dir.glob('*.json')}
+        except OSError:
+            present = set()
+        with self._lock:
+            removed = set(self._entries) - present
+            for name in removed:
+                self._set_entry(name, None)
+        for name in sorted(present):
+            self._update(name)
+
+    def _update(self, filename: str):
+        """Re-parse a recording if it changed; forget it if it is gone."""
+        if not filename.endswith('.json') or filename.startswith('.'):
+            return
+        path = self.recordings_dir / filename
+        try:
+            stat = path.stat()
+        except OSError:
+            with self._lock:
+                self._set_entry(filename, None)
+            return
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(filename)
+        if entry is not None and entry[:2] == key:
+            return
+
+        value: Any = None
+        if stat.st_size <= self.max_parse_bytes:
+            try:
+                value = Timeline.load(path)
+            except Exception as e:
+                value = e
+        with self._lock:
+            self._set_entry(filename, key + (value,))
+
+    def _set_entry(self, filename: str, entry: Optional[Tuple[int, int, Any]]):
+        """Replace (or with None, forget) an entry and keep the cache within budget (lock held)."""
+        self._entries.pop(filename, None)
+        self._parsed_bytes -= self._parsed.pop(filename, 0)
+        if entry is None:
+            return
+        self._entries[filename] = entry
+        if isinstance(entry[2], Timeline):
+            self._parsed[filename] = entry[1]
+            self._parsed_bytes += entry[1]
+        while self._parsed_bytes > self.max_cache_bytes and self._parsed:
+            evicted, size = self._parsed.popitem(last=False)
+            self._parsed_bytes -= size
+            mtime_ns, size, _ = self._entries[evicted]
+            self._entries[evicted] = (mtime_ns, size, None)  # Still listed; loaded from disk when played
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            watch = None
+            try:
+                watch = _Inotify(self.recordings_dir)
+            except (OSError, AttributeError) as e:
+                logger.debug("inotify unavailable for %s (%s); polling", self.recordings_dir, e)
+            if watch is None:
+                self.using_inotify = False
+                self._stop.wait(self.poll_interval_s)
+                continue
+
+            self.using_inotify = True
+            try:
+                self.refresh()  # Catch changes made before the watch was added
+                self._watch(watch)
+            finally:
+                watch.close()
+                self.using_inotify = False
+
+    def _watch(self, watch: _Inotify):
+        """Apply inotify events until stopped or the watch is lost."""
+        while not self._stop.is_set():
+            events = watch.read(0.5)
+            if events is None:
+                return  # Overflow or directory replaced: rescan and re-watch
+            changed = {name for _, name in events}
+            if changed:
+                time.sleep(0.05)  # Let a burst of events settle before parsing
+                for name in sorted(changed):
+                    self._update(name)
@@ -23,6 +23,17 @@ def create_release_package():
     include_files = [
         "pumpkin_face.py",
         "timeline.py",
+        "show_queue.py",
+        "playback_layers.py",
+        "timeline_bake.py",
+        "keyframes.py",
+        "timeline_simplify.py",
+        "timeline_stream.py",
+        "timeline_binary.py",
+        "timeline_optimize.py",
+        "atomic_io.py",
+        "recording_library.py",
+        "live_lipsync.py",
         "command_handler.py",
         "client_example.py",
         "requirements.txt",
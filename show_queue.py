@@ -0,0 +1,365 @@
+"""
+Show queue scheduler for Mr. Pumpkin.
+
+This module provides:
+- QueueItem: One queued recording with an optional wall-clock start time
+- ShowQueue: Playlist that drives a Playback engine back to back
+
+Design decisions:
+- The queue is advanced from the frame loop (update(dt) each frame), never
+  from the network thread, so hand-offs happen between two frames
+- The next item (its nested recordings and bake) is loaded on a background
+  thread while the current item plays; switching does no file I/O, and if
+  that load hasn't finished the hand-off waits a frame instead of blocking
+- Time left over in the frame where an item ends is carried into the next
+  item so back-to-back recordings play without a gap
+- Loop mode starts a new pass when the playlist runs out; shuffle reorders
+  every pass
+- Scheduled items wait for their wall-clock start time; in loop mode they
+  repeat at the same time the next day
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from timeline import Playback, PlaybackState, Timeline, resolve_recording_tree
+
+
+class QueueItem:
+    """Single recording in the show queue.
+
+    Attributes:
+        filename: Timeline filename (with .json extension)
+        start_at: Wall-clock start time (epoch seconds), or None to play as
+            soon as the previous item ends
+    """
+
+    def __init__(self, filename: str, start_at: Optional[float] = None):
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        self.filename = filename
+        self.start_at = start_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to dictionary for JSON status responses."""
+        item = {"filename": self.filename}
+        if self.start_at is not None:
+            item["start_at"] = datetime.fromtimestamp(self.start_at).isoformat(timespec="seconds")
+        return item
+
+
+def parse_start_time(text: str, now: Optional[datetime] = None) -> float:
+    """Parse an HH:MM or HH:MM:SS wall-clock time into the next matching epoch time.
+
+    Args:
+        text: Time of day (24-hour clock)
+        now: Reference time (default: current local time)
+
+    Returns:
+        Epoch seconds of the next occurrence of that time (today or tomorrow)
+
+    Raises:
+        ValueError: If text is not a valid time of day
+    """
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            clock = datetime.strptime(text, fmt).time()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Invalid start time: {text} (use HH:MM or HH:MM:SS)")
+
+    now = now or datetime.now()
+    start = datetime.combine(now.date(), clock)
+    if start <= now:
+        start += timedelta(days=1)
+    return start.timestamp()
+
+
+class ShowQueue:
+    """Playlist scheduler on top of a Playback engine.
+
+    Call update(dt) every frame instead of Playback.update(dt); it advances
+    the active recording and hands off to the next queued item.
+
+    Attributes:
+        playback: Playback engine driven by the queue
+        items: Queued recordings in enqueue order
+        loop: Start a new pass when the last item finishes
+        shuffle: Play each pass in random order
+        is_running: Whether the queue is advancing
+    """
+
+    def __init__(self, playback: Playback):
+        """Initialize show queue.
+
+        Args:
+            playback: Playback engine to drive
+        """
+        self.playback = playback
+        self.items: List[QueueItem] = []
+        self.loop = False
+        self.shuffle = False
+        self.is_running = False
+        self._order: List[int] = []  # Item indices for the current pass
+        self._position = 0  # Next index into _order
+        self._current: Optional[QueueItem] = None
+        self._passes = 0
+        self._skip_requested = False
+        self._lock = threading.Lock()
+
+        # Background prefetch of the next item: (item, thread, result holder)
+        self._prefetch: Optional[Tuple[QueueItem, threading.Thread, Dict[str, Any]]] = None
+
+    def enqueue(self, filename: str, start_at: Optional[float] = None) -> QueueItem:
+        """Add a recording to the end of the queue.
+
+        Args:
+            filename: Timeline filename (.json extension optional)
+            start_at: Optional wall-clock start time (epoch seconds)
+
+        Returns:
+            The queued item
+        """
+        item = QueueItem(filename, start_at)
+        with self._lock:
+            self.items.append(item)
+            self._order.append(len(self.items) - 1)
+        return item
+
+    def clear(self):
+        """Stop the queue and remove all items."""
+        self.stop()
+        with self._lock:
+            self.items = []
+            self._order = []
+            self._position = 0
+
+    def start(self):
+        """Start (or restart) playing the queue from its first item.
+
+        Raises:
+            ValueError: If the queue is empty
+        """
+        with self._lock:
+            if not self.items:
+                raise ValueError("Show queue is empty")
+            self._passes = 0
+            self._new_pass()
+            self.is_running = True
+            self._current = None
+        self._prefetch_next()
+
+    def stop(self):
+        """Stop the queue and the recording it is playing."""
+        was_playing = self._current is not None
+        self.is_running = False
+        self._current = None
+        self._prefetch = None
+        if was_playing and self.playback.state != PlaybackState.STOPPED:
+            self.playback.stop()
+
+    def skip(self):
+        """End the current item; the next one starts on the following frame."""
+        if self.is_running:
+            self._skip_requested = True
+
+    def set_loop(self, enabled: bool):
+        """Enable or disable looping over the whole queue."""
+        self.loop = enabled
+
+    def set_shuffle(self, enabled: bool):
+        """Enable or disable shuffled order (applies to the remaining items of this pass)."""
+        with self._lock:
+            self.shuffle = enabled
+            remaining = self._order[self._position:]
+            if enabled:
+                random.shuffle(remaining)
+            else:
+                remaining.sort()
+            self._order[self._position:] = remaining
+        self._prefetch = None
+        if self.is_running:
+            self._prefetch_next()
+
+    def update(self, dt_ms: float) -> List[str]:
+        """Advance playback and the queue (call every frame).
+
+        Args:
+            dt_ms: Delta time since last frame in milliseconds
+
+        Returns:
+            List of error messages from playback and queue hand-offs
+        """
+        playback = self.playback
+
+        if not self.is_running:
+            if playback.state == PlaybackState.PLAYING:
+                return playback.update(dt_ms)
+            return []
+
+        if self._skip_requested:
+            self._skip_requested = False
+            if self._current is not None:
+                self._current = None
+                playback.stop()
+
+        if self._current is None:
+            return self._advance(0)
+
+        if playback.state == PlaybackState.STOPPED:
+            # Stopped outside the frame loop (stop/reset command) — halt the show
+            self.is_running = False
+            self._current = None
+            return []
+
+        if playback.state != PlaybackState.PLAYING:
+            return []
+
+        remaining_ms = None
+        if playback.timeline is not None and not playback._stack:
+            remaining_ms = max(0.0, playback.get_duration() - playback.current_position_ms)
+
+        errors = playback.update(dt_ms)
+
+        if playback.state == PlaybackState.STOPPED and self.is_running:
+            # Current item ended during this frame: hand off without a gap
+            self._current = None
+            carry_ms = dt_ms - remaining_ms if remaining_ms is not None else 0.0
+            errors.extend(self._advance(max(0.0, carry_ms)))
+
+        return errors
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get current queue status.
+
+        Returns:
+            Dictionary with running state, options, current item, upcoming items
+        """
+        with self._lock:
+            upcoming = [self.items[i].to_dict() for i in self._order[self._position:]]
+        return {
+            "is_running": self.is_running,
+            "loop": self.loop,
+            "shuffle": self.shuffle,
+            "current": self._current.filename if self._current else None,
+            "upcoming": upcoming,
+            "item_count": len(self.items),
+            "passes": self._passes
+        }
+
+    def _new_pass(self):
+        """Build the play order for a new pass over the queue (lock held)."""
+        self._order = list(range(len(self.items)))
+        if self.shuffle:
+            random.shuffle(self._order)
+        self._position = 0
+        self._passes += 1
+
+    def _peek_next(self) -> Optional[QueueItem]:
+        """Return the item that will play next without consuming it (lock held)."""
+        if self._position < len(self._order):
+            return self.items[self._order[self._position]]
+        if self.loop and self.items:
+            self._new_pass()
+            return self.items[self._order[0]]
+        return None
+
+    def _prefetch_next(self):
+        """Load the next item and its nested recordings on a background thread."""
+        with self._lock:
+            item = self._peek_next()
+        if item is None or (self._prefetch is not None and self._prefetch[0] is item):
+            return
+
+        result: Dict[str, Any] = {}
+        recordings_dir = self.playback.recordings_dir
+        max_depth = self.playback._max_depth
+        use_baked = self.playback.use_baked
+        library = self.playback.library
+
+        def worker():
+            try:
+                result["tree"] = resolve_recording_tree(recordings_dir, item.filename, max_depth, library=library)
+                if use_baked:
+                    from timeline_bake import load_baked
+                    result["baked"] = load_baked(recordings_dir, item.filename)
+            except Exception as e:
+                result["error"] = e  # The item is skipped rather than loaded in the frame
+
+        thread = threading.Thread(target=worker, name="show-queue-prefetch", daemon=True)
+        self._prefetch = (item, thread, result)
+        thread.start()
+
+    def _advance(self, carry_ms: float) -> List[str]:
+        """Start the next due item, skipping items that fail to load.
+
+        Args:
+            carry_ms: Time already elapsed past the end of the previous item
+
+        Returns:
+            List of error messages
+        """
+        errors: List[str] = []
+
+        for _ in range(len(self.items) + 1):
+            with self._lock:
+                item = self._peek_next()
+                if item is None:
+                    self.is_running = False
+                    return errors
+                prefetch = self._prefetch
+                if item.start_at is not None and time.time() < item.start_at:
+                    waiting = True
+                elif prefetch is None or prefetch[0] is not item or prefetch[1].is_alive():
+                    waiting = True  # Still loading; never join the prefetch in the frame
+                else:
+                    waiting = False
+                    self._position += 1
+
+            if waiting:
+                self._prefetch_next()
+                return errors
+
+            _, _, result = prefetch
+            self._prefetch = None
+            if "error" in result:
+                errors.append(f"Show queue skipped '{item.filename}': {result['error']}")
+                continue
+            tree, problems = result["tree"]
+            root = tree.get(item.filename)
+            if not isinstance(root, Timeline):
+                # Missing or invalid: play() would only try the disk again in the frame
+                errors.append(f"Show queue skipped '{item.filename}': {root}")
+                continue
+            baked = result.get("baked")
+
+            if self.loop and item.start_at is not None:
+                # Repeat scheduled items at the same time on the next pass
+                while item.start_at <= time.time():
+                    item.start_at += 24 * 60 * 60
+
+            try:
+                self.playback.play(item.filename, preloaded=(tree, problems), baked=baked)
+            except Exception as e:
+                errors.append(f"Show queue skipped '{item.filename}': {e}")
+                continue
+
+            self._current = item
+            self._prefetch_next()
+            if carry_ms > 0:
+                remaining_ms = self.playback.get_duration()
+                errors.extend(self.playback.update(carry_ms))
+                if self.playback.state == PlaybackState.STOPPED:
+                    # Item shorter than the carried-over time: keep handing off
+                    self._current = None
+                    carry_ms = max(0.0, carry_ms - remaining_ms)
+                    continue
+            return errors
+
+        self.is_running = False
+        return errors
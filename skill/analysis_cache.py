@@ -0,0 +1,96 @@
+"""
+On-disk cache of audio analysis results for Mr. Pumpkin lip-sync.
+
+Analysing a file (uploading it to Gemini, waiting for it to become active,
+running the timing and emotion passes) is the slow, paid part of the
+lip-sync pipeline, and its result only depends on the audio and on how it
+was analysed. Caching it lets the choreography prompt be iterated on
+without re-analysing the same file.
+
+Usage:
+    from skill.analysis_cache import AnalysisCache
+    cache = AnalysisCache()
+    key = cache.key("song.mp3", provider.cache_identity())
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = provider.analyze_audio("song.mp3")
+        cache.put(key, analysis)
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+
+from skill.audio_analyzer import AudioAnalysis, BeatEvent, PauseSegment, WordTiming
+from skill.disk_cache import DEFAULT_MAX_BYTES, DiskCache, default_cache_dir
+
+CACHE_FORMAT = 1  # Bump when the stored layout changes
+
+
+class AnalysisCache(DiskCache):
+    """Content-addressed store of AudioAnalysis results.
+
+    Entries are keyed by a hash of the audio bytes together with everything
+    that shapes the result (provider, model, analysis prompts), so renaming
+    or moving a file still hits the cache and editing it never does. When
+    the cache grows past max_bytes the least recently used entries are
+    evicted.
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir if cache_dir is not None else default_cache_dir("analysis"), max_bytes)
+
+    def key(self, audio_path: str, identity: dict) -> str:
+        """Cache key for analysing an audio file with the given settings.
+
+        Args:
+            audio_path: Audio file to hash
+            identity: Settings that determine the result
+                (AudioAnalysisProvider.cache_identity())
+
+        Raises:
+            OSError: If the audio file can't be read
+        """
+        digest = hashlib.sha256()
+        with open(audio_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        material = json.dumps({"format": CACHE_FORMAT, "audio": digest.hexdigest(), **identity},
+                              sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, audio_path: str | None = None) -> AudioAnalysis | None:
+        """Look up a cached analysis.
+
+        Args:
+            key: Key from key()
+            audio_path: Path to report in the returned analysis (the cached
+                one may have been made from a copy under another name)
+
+        Returns:
+            The analysis, or None on a miss (unreadable entries are dropped)
+        """
+        data = self.read(key)
+        if data is None:
+            return None
+        try:
+            return AudioAnalysis(
+                speech_segments=[WordTiming(**seg) for seg in data["speech_segments"]],
+                beats=[BeatEvent(**beat) for beat in data["beats"]],
+                pauses=[PauseSegment(**pause) for pause in data["pauses"]],
+                emotion=data["emotion"],
+                duration_ms=data["duration_ms"],
+                audio_path=audio_path if audio_path is not None else data["audio_path"],
+            )
+        except (KeyError, TypeError) as e:
+            self.discard(key, e)
+            return None
+
+    def put(self, key: str, analysis: AudioAnalysis) -> None:
+        """Store an analysis, then evict old entries if over the size limit.
+
+        Raises:
+            OSError: If the cache directory can't be written
+        """
+        self.write(key, asdict(analysis))
@@ -3,7 +3,8 @@ Audio analysis for Mr. Pumpkin lip-sync and beat-driven animation.
 
 Translates audio files (speech, music, ambient sound) into structured timing data
 (word segments, beats, pauses, emotion) using AI analysis. Supports pluggable
-providers; defaults to Gemini multimodal audio analysis.
+providers; defaults to Gemini multimodal audio analysis. The "local" provider
+analyses the signal offline with NumPy instead.
 
 Usage:
     from skill.audio_analyzer import AudioAnalysis, get_provider
@@ -14,8 +15,10 @@ Usage:
 import json
 import logging
 import os
+import threading
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_EXCEPTION, CancelledError, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 
 
@@ -50,6 +53,81 @@ def _measure_audio_duration_ms(audio_path: str) -> int | None:
 
 logger = logging.getLogger(__name__)
 
+# Prompts shared by the AI providers (part of their cache identity: editing
+# one invalidates cached analyses)
+TIMING_PROMPT = """Analyze this audio file. Return ONLY valid JSON in this exact format:
+{
+  "duration_ms": <int>,
+  "speech_segments": [
+    {"word": "<word>", "start_ms": <int>, "end_ms": <int>, "phoneme_group": "<bilabial|open_vowel|spread_vowel|round_vowel|neutral>"}
+  ],
+  "beats": [
+    {"time_ms": <int>, "strength": "<strong|bar1|normal>"}
+  ],
+  "pauses": [
+    {"start_ms": <int>, "end_ms": <int>, "duration_ms": <int>}
+  ]
+}
+
+Phoneme group rules — classify by the DOMINANT VOWEL sound in the word, not the starting consonant:
+- round_vowel: words whose most prominent sound is OO or OH (e.g., "boo", "moon", "ghost", "spooky", "no", "oh", "go")
+- open_vowel: words whose most prominent sound is AH, AA, or AW (e.g., "ahh", "ha", "bat", "father", "scary")
+- spread_vowel: words whose most prominent sound is EE or IH (e.g., "eek", "see", "think", "it", "teeth")
+- bilabial: ONLY words where lip-closure is the dominant feature — sustained humming or pure consonant sounds (e.g., "mmm", "bam", "pop"). Do NOT classify vowel-dominant words like "boo" as bilabial just because they start with B or M.
+- neutral: all others (consonant clusters, unstressed syllables, unclear vowels)
+
+Beat detection: only include beats if audio has musical rhythm. Bar 1 beats are the strongest downbeats (one per musical bar).
+Pauses: include gaps between words >= 300ms."""
+
+STRICT_TIMING_PROMPT = """Return ONLY a valid JSON object. No explanations, no markdown, no extra text.
+The JSON must match this exact structure:
+{"duration_ms": 0, "speech_segments": [], "beats": [], "pauses": []}
+
+Analyze the audio and populate the arrays."""
+
+EMOTION_PROMPT = """Listen to this audio. What is the dominant emotional tone?
+Return ONLY one word from: happy, sad, excited, neutral, solemn"""
+
+
+def _run_passes(*passes):
+    """Run independent analysis passes concurrently.
+
+    The passes spend their time waiting on the provider's API, so running
+    them on threads makes an analysis take as long as its slowest pass
+    rather than the sum of all of them. Each pass is called with a shared
+    threading.Event that is set as soon as any pass fails; passes check it
+    before issuing further requests (retries).
+
+    Args:
+        *passes: Callables taking the cancel event
+
+    Returns:
+        List of the passes' results, in order
+
+    Raises:
+        The first pass's exception if any fails. Passes still running are
+        not waited for, so the caller can clean up (delete the uploaded
+        file) immediately; their results are discarded.
+    """
+    cancel = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(passes), thread_name_prefix="audio-pass")
+    try:
+        futures = [executor.submit(run, cancel) for run in passes]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in futures:
+            if future in done and future.exception() is not None:
+                cancel.set()
+                raise future.exception()
+        return [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _check_cancelled(cancel: threading.Event | None) -> None:
+    """Stop a pass before its next request if another pass has failed."""
+    if cancel is not None and cancel.is_set():
+        raise CancelledError("Analysis cancelled: another pass failed")
+
 
 @dataclass
 class WordTiming:
@@ -101,6 +179,14 @@ class AudioAnalysisProvider(ABC):
             AudioAnalysis dataclass with speech segments, beats, pauses, emotion, duration.
         """
 
+    def cache_identity(self) -> dict:
+        """Settings that determine this provider's results.
+
+        Analyses of the same audio by providers with equal identities are
+        interchangeable, so this keys the on-disk analysis cache.
+        """
+        return {"provider": type(self).__name__}
+
 
 class GeminiAudioProvider(AudioAnalysisProvider):
     """Audio analysis provider backed by Google Gemini multimodal API.
@@ -150,6 +236,10 @@ class GeminiAudioProvider(AudioAnalysisProvider):
         self._types = types
         self.model = model or self.DEFAULT_MODEL
 
+    def cache_identity(self) -> dict:
+        return {"provider": "gemini", "model": self.model,
+                "prompts": [TIMING_PROMPT, STRICT_TIMING_PROMPT, EMOTION_PROMPT]}
+
     def _get_mime_type(self, audio_path: str) -> str:
         """Determine MIME type from file extension."""
         ext = os.path.splitext(audio_path.lower())[1]
@@ -184,10 +274,12 @@ class GeminiAudioProvider(AudioAnalysisProvider):
     def analyze_audio(self, audio_path: str, prompt: str = "") -> AudioAnalysis:
         """Analyze audio file using Gemini multimodal API.
 
-        Two-pass approach:
+        Two-pass approach (the passes run concurrently):
         - Pass 1: Upload audio and extract structured timing data (speech/beats/pauses)
         - Pass 2: Determine dominant emotion using same uploaded file
 
+        The uploaded file is deleted as soon as both passes finish or either fails.
+
         Args:
             audio_path: Path to audio file
             prompt: Optional user guidance (currently unused, reserved for future)
@@ -219,11 +311,12 @@ class GeminiAudioProvider(AudioAnalysisProvider):
             # Wait for file to be processed
             self._wait_for_file_active(file_name)
 
-            # Pass 1: Extract structured timing data
-            timing_data = self._extract_timing_data(file_uri, mime_type)
-
-            # Pass 2: Extract emotion using the same uploaded file
-            emotion = self._extract_emotion(file_uri, mime_type)
+            # Pass 1 (structured timing data) and pass 2 (emotion) use the
+            # same uploaded file and run concurrently
+            timing_data, emotion = _run_passes(
+                lambda cancel: self._extract_timing_data(file_uri, mime_type, cancel),
+                lambda cancel: self._extract_emotion(file_uri, mime_type),
+            )
 
             # Measure real duration independently — Gemini can underreport this.
             measured_ms = _measure_audio_duration_ms(audio_path)
@@ -274,12 +367,14 @@ class GeminiAudioProvider(AudioAnalysisProvider):
             except Exception as e:
                 logger.warning(f"Failed to delete uploaded file {file_name}: {e}")
 
-    def _extract_timing_data(self, file_uri: str, mime_type: str) -> dict:
+    def _extract_timing_data(self, file_uri: str, mime_type: str,
+                             cancel: threading.Event | None = None) -> dict:
         """Pass 1: Extract structured timing data from audio.
         
         Args:
             file_uri: Full Gemini file URI (e.g., "https://generativelanguage.googleapis.com/v1beta/files/abc123")
             mime_type: MIME type of the audio file
+            cancel: Set when the emotion pass failed (skips the retry)
             
         Returns:
             Dict with duration_ms, speech_segments, beats, pauses
@@ -287,35 +382,11 @@ class GeminiAudioProvider(AudioAnalysisProvider):
         Raises:
             ValueError: If JSON parsing fails after retry
         """
-        timing_prompt = """Analyze this audio file. Return ONLY valid JSON in this exact format:
-{
-  "duration_ms": <int>,
-  "speech_segments": [
-    {"word": "<word>", "start_ms": <int>, "end_ms": <int>, "phoneme_group": "<bilabial|open_vowel|spread_vowel|round_vowel|neutral>"}
-  ],
-  "beats": [
-    {"time_ms": <int>, "strength": "<strong|bar1|normal>"}
-  ],
-  "pauses": [
-    {"start_ms": <int>, "end_ms": <int>, "duration_ms": <int>}
-  ]
-}
-
-Phoneme group rules — classify by the DOMINANT VOWEL sound in the word, not the starting consonant:
-- round_vowel: words whose most prominent sound is OO or OH (e.g., "boo", "moon", "ghost", "spooky", "no", "oh", "go")
-- open_vowel: words whose most prominent sound is AH, AA, or AW (e.g., "ahh", "ha", "bat", "father", "scary")
-- spread_vowel: words whose most prominent sound is EE or IH (e.g., "eek", "see", "think", "it", "teeth")
-- bilabial: ONLY words where lip-closure is the dominant feature — sustained humming or pure consonant sounds (e.g., "mmm", "bam", "pop"). Do NOT classify vowel-dominant words like "boo" as bilabial just because they start with B or M.
-- neutral: all others (consonant clusters, unstressed syllables, unclear vowels)
-
-Beat detection: only include beats if audio has musical rhythm. Bar 1 beats are the strongest downbeats (one per musical bar).
-Pauses: include gaps between words >= 300ms."""
-
         response = self._client.models.generate_content(
             model=self.model,
             contents=[
                 self._types.Part.from_uri(file_uri=file_uri, mime_type=mime_type),
-                timing_prompt,
+                TIMING_PROMPT,
             ],
         )
 
@@ -335,17 +406,12 @@ Pauses: include gaps between words >= 300ms."""
             logger.warning(f"JSON parse failed on first attempt: {e}. Retrying with stricter prompt...")
             
             # Retry with stricter prompt
-            strict_prompt = """Return ONLY a valid JSON object. No explanations, no markdown, no extra text.
-The JSON must match this exact structure:
-{"duration_ms": 0, "speech_segments": [], "beats": [], "pauses": []}
-
-Analyze the audio and populate the arrays."""
-
+            _check_cancelled(cancel)
             retry_response = self._client.models.generate_content(
                 model=self.model,
                 contents=[
                     self._types.Part.from_uri(file_uri=file_uri, mime_type=mime_type),
-                    strict_prompt,
+                    STRICT_TIMING_PROMPT,
                 ],
             )
 
@@ -376,14 +442,11 @@ Analyze the audio and populate the arrays."""
         Returns:
             Emotion string: "happy", "sad", "excited", "neutral", or "solemn"
         """
-        emotion_prompt = """Listen to this audio. What is the dominant emotional tone?
-Return ONLY one word from: happy, sad, excited, neutral, solemn"""
-
         response = self._client.models.generate_content(
             model=self.model,
             contents=[
                 self._types.Part.from_uri(file_uri=file_uri, mime_type=mime_type),
-                emotion_prompt,
+                EMOTION_PROMPT,
             ],
         )
 
@@ -442,6 +505,10 @@ class OpenAIAudioProvider(AudioAnalysisProvider):
         self._client = OpenAI(api_key=api_key)
         self._model = model or self.MODEL
 
+    def cache_identity(self) -> dict:
+        return {"provider": "openai", "model": self._model,
+                "prompts": [TIMING_PROMPT, STRICT_TIMING_PROMPT, EMOTION_PROMPT]}
+
     def _get_audio_format(self, audio_path: str) -> str:
         """Determine audio format from file extension."""
         ext = os.path.splitext(audio_path.lower())[1]
@@ -457,7 +524,7 @@ class OpenAIAudioProvider(AudioAnalysisProvider):
     def analyze_audio(self, audio_path: str, prompt: str = "") -> AudioAnalysis:
         """Analyze audio file using OpenAI audio preview API.
 
-        Two-pass approach:
+        Two-pass approach (the passes run concurrently):
         - Pass 1: Extract structured timing data (speech/beats/pauses)
         - Pass 2: Determine dominant emotion
 
@@ -486,11 +553,11 @@ class OpenAIAudioProvider(AudioAnalysisProvider):
         
         logger.info(f"Analyzing {audio_path} ({audio_format}) with OpenAI...")
 
-        # Pass 1: Extract structured timing data
-        timing_data = self._extract_timing_data(base64_audio, audio_format)
-
-        # Pass 2: Extract emotion
-        emotion = self._extract_emotion(base64_audio, audio_format)
+        # Pass 1 (structured timing data) and pass 2 (emotion) run concurrently
+        timing_data, emotion = _run_passes(
+            lambda cancel: self._extract_timing_data(base64_audio, audio_format, cancel),
+            lambda cancel: self._extract_emotion(base64_audio, audio_format),
+        )
 
         # Measure real duration independently
         measured_ms = _measure_audio_duration_ms(audio_path)
@@ -533,12 +600,14 @@ class OpenAIAudioProvider(AudioAnalysisProvider):
 
         return analysis
 
-    def _extract_timing_data(self, base64_audio: str, audio_format: str) -> dict:
+    def _extract_timing_data(self, base64_audio: str, audio_format: str,
+                             cancel: threading.Event | None = None) -> dict:
         """Pass 1: Extract structured timing data from audio.
         
         Args:
             base64_audio: Base64-encoded audio data
             audio_format: Audio format string (e.g., "mp3", "wav")
+            cancel: Set when the emotion pass failed (skips the retry)
             
         Returns:
             Dict with duration_ms, speech_segments, beats, pauses
@@ -546,30 +615,6 @@ class OpenAIAudioProvider(AudioAnalysisProvider):
         Raises:
             ValueError: If JSON parsing fails after retry
         """
-        timing_prompt = """Analyze this audio file. Return ONLY valid JSON in this exact format:
-{
-  "duration_ms": <int>,
-  "speech_segments": [
-    {"word": "<word>", "start_ms": <int>, "end_ms": <int>, "phoneme_group": "<bilabial|open_vowel|spread_vowel|round_vowel|neutral>"}
-  ],
-  "beats": [
-    {"time_ms": <int>, "strength": "<strong|bar1|normal>"}
-  ],
-  "pauses": [
-    {"start_ms": <int>, "end_ms": <int>, "duration_ms": <int>}
-  ]
-}
-
-Phoneme group rules — classify by the DOMINANT VOWEL sound in the word, not the starting consonant:
-- round_vowel: words whose most prominent sound is OO or OH (e.g., "boo", "moon", "ghost", "spooky", "no", "oh", "go")
-- open_vowel: words whose most prominent sound is AH, AA, or AW (e.g., "ahh", "ha", "bat", "father", "scary")
-- spread_vowel: words whose most prominent sound is EE or IH (e.g., "eek", "see", "think", "it", "teeth")
-- bilabial: ONLY words where lip-closure is the dominant feature — sustained humming or pure consonant sounds (e.g., "mmm", "bam", "pop"). Do NOT classify vowel-dominant words like "boo" as bilabial just because they start with B or M.
-- neutral: all others (consonant clusters, unstressed syllables, unclear vowels)
-
-Beat detection: only include beats if audio has musical rhythm. Bar 1 beats are the strongest downbeats (one per musical bar).
-Pauses: include gaps between words >= 300ms."""
-
         response = self._client.chat.completions.create(
             model=self._model,
             modalities=["text"],
@@ -586,7 +631,7 @@ Pauses: include gaps between words >= 300ms."""
                         },
                         {
                             "type": "text",
-                            "text": timing_prompt
+                            "text": TIMING_PROMPT
                         }
                     ]
                 }
@@ -609,12 +654,7 @@ Pauses: include gaps between words >= 300ms."""
             logger.warning(f"JSON parse failed on first attempt: {e}. Retrying with stricter prompt...")
             
             # Retry with stricter prompt
-            strict_prompt = """Return ONLY a valid JSON object. No explanations, no markdown, no extra text.
-The JSON must match this exact structure:
-{"duration_ms": 0, "speech_segments": [], "beats": [], "pauses": []}
-
-Analyze the audio and populate the arrays."""
-
+            _check_cancelled(cancel)
             retry_response = self._client.chat.completions.create(
                 model=self._model,
                 modalities=["text"],
@@ -631,7 +671,7 @@ Analyze the audio and populate the arrays."""
                             },
                             {
                                 "type": "text",
-                                "text": strict_prompt
+                                "text": STRICT_TIMING_PROMPT
                             }
                         ]
                     }
@@ -665,9 +705,6 @@ Analyze the audio and populate the arrays."""
         Returns:
             Emotion string: "happy", "sad", "excited", "neutral", or "solemn"
         """
-        emotion_prompt = """Listen to this audio. What is the dominant emotional tone?
-Return ONLY one word from: happy, sad, excited, neutral, solemn"""
-
         response = self._client.chat.completions.create(
             model=self._model,
             modalities=["text"],
@@ -684,7 +721,7 @@ Return ONLY one word from: happy, sad, excited, neutral, solemn"""
                         },
                         {
                             "type": "text",
-                            "text": emotion_prompt
+                            "text": EMOTION_PROMPT
                         }
                     ]
                 }
@@ -702,11 +739,567 @@ Return ONLY one word from: happy, sad, excited, neutral, solemn"""
         return emotion
 
 
+class LocalAudioProvider(AudioAnalysisProvider):
+    """Offline audio analysis computed on this machine with NumPy.
+
+    No network access or API key is needed, so it also works on air-gapped
+    show machines. All analysis is vectorized over 10 ms frames:
+    - RMS energy -> pauses (silences of at least min_pause_ms between sounds)
+    - Spectral flux -> onsets, which split sounding stretches into
+      syllable-sized speech segments
+    - Onset autocorrelation and dynamic-programming beat tracking -> beats
+      (only for audio with a clear pulse)
+
+    Words cannot be recognised locally: speech segments carry the word "~"
+    and a phoneme group estimated from spectral brightness (dark sounds are
+    round vowels, bright ones spread vowels). Emotion is a coarse guess from
+    the tempo.
+
+    WAV files (8/16/24/32-bit PCM) are decoded with the standard library;
+    other formats are decoded with ffmpeg when it is installed.
+
+    Raises:
+        ImportError: If numpy is not installed.
+    """
+
+    HOP_MS = 10
+    MIN_BPM = 60
+    MAX_BPM = 200
+
+    def __init__(self, api_key: str = None, model: str = None,
+                 silence_db: float = -35.0, min_pause_ms: int = 300):
+        """Create the provider.
+
+        Args:
+            api_key: Ignored (accepted so the provider is interchangeable)
+            model: Ignored
+            silence_db: Frames this far below the loudest frame count as silence
+            min_pause_ms: Shortest silence reported as a pause
+        """
+        try:
+            import numpy
+        except ImportError as exc:
+            raise ImportError(
+                "numpy is required for LocalAudioProvider. "
+                "Install it with: pip install numpy"
+            ) from exc
+
+        self._np = numpy
+        self.silence_db = silence_db
+        self.min_pause_ms = min_pause_ms
+
+    def cache_identity(self) -> dict:
+        return {"provider": "local", "hop_ms": self.HOP_MS, "bpm": [self.MIN_BPM, self.MAX_BPM],
+                "silence_db": self.silence_db, "min_pause_ms": self.min_pause_ms}
+
+    def analyze_audio(self, audio_path: str, prompt: str = "") -> AudioAnalysis:
+        """Analyze an audio file locally.
+
+        Args:
+            audio_path: Path to audio file
+            prompt: Optional user guidance (unused)
+
+        Returns:
+            AudioAnalysis dataclass with segments, beats, pauses and emotion
+
+        Raises:
+            FileNotFoundError: If audio_path doesn't exist
+            ValueError: If the file can't be decoded
+        """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+        np = self._np
+        samples, sample_rate = self._decode(audio_path)
+        duration_ms = int(len(samples) * 1000 / sample_rate)
+        samples, sample_rate = self._downsample(samples, sample_rate)
+        hop = max(1, sample_rate * self.HOP_MS // 1000)
+        frame_ms = hop * 1000 / sample_rate  # Exact frame length (HOP_MS rounded to whole samples)
+
+        energy_db = self._energy_db(samples, hop)
+        flux, centroid = self._spectral_features(samples, sample_rate, hop)
+        sounding = energy_db > self.silence_db
+
+        pauses = self._pauses(sounding, frame_ms)
+        onsets = self._onsets(flux)
+        beats = self._beats(flux, energy_db, sounding, frame_ms)
+        segments = self._segments(sounding, onsets, centroid, energy_db, frame_ms)
+
+        emotion = self._emotion(beats)
+
+        analysis = AudioAnalysis(
+            speech_segments=segments,
+            beats=beats,
+            pauses=pauses,
+            emotion=emotion,
+            duration_ms=duration_ms,
+            audio_path=audio_path,
+        )
+
+        logger.info(
+            f"Local analysis complete: {len(segments)} segments, {len(beats)} beats, "
+            f"{len(pauses)} pauses, emotion={emotion}, duration={duration_ms}ms"
+        )
+        return analysis
+
+    # ----- decoding -----
+
+    def _decode(self, audio_path: str):
+        """Decode to mono float32 samples in [-1, 1] and the sample rate."""
+        np = self._np
+        if audio_path.lower().endswith(".wav"):
+            import wave
+            try:
+                with wave.open(audio_path, "rb") as wf:
+                    channels = wf.getnchannels()
+                    width = wf.getsampwidth()
+                    sample_rate = wf.getframerate()
+                    raw = wf.readframes(wf.getnframes())
+            except (wave.Error, EOFError) as e:
+                logger.debug(f"wave could not read {audio_path}: {e}")
+            else:
+                if width == 1:
+                    data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+                elif width == 3:
+                    b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+                    ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8
+                    data = ints.astype(np.float32) / (1 << 23)
+                elif width in (2, 4):
+                    dtype = np.int16 if width == 2 else np.int32
+                    data = np.frombuffer(raw, dtype=f"<i{width}").astype(np.float32) / np.iinfo(dtype).max
+                else:
+                    raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+                return data.reshape(-1, channels).mean(axis=1), sample_rate
+
+        return self._decode_ffmpeg(audio_path)
+
+    def _decode_ffmpeg(self, audio_path: str, sample_rate: int = 22050):
+        """Decode any format ffmpeg understands to mono 16-bit PCM."""
+        import shutil
+        import subprocess
+
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise ValueError(
+                f"LocalAudioProvider decodes WAV files only without ffmpeg; convert "
+                f"{os.path.basename(audio_path)} to .wav or install ffmpeg"
+            )
+        result = subprocess.run(
+            [ffmpeg, "-v", "error", "-i", audio_path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise ValueError(f"ffmpeg could not decode {audio_path}: {result.stderr.decode(errors='replace').strip()}")
+        data = self._np.frombuffer(result.stdout, dtype="<i2").astype(self._np.float32) / 32767
+        return data, sample_rate
+
+    def _downsample(self, samples, sample_rate: int, target_rate: int = 16000):
+        """Average blocks of samples down to roughly target_rate.
+
+        Everything analysed here lies well below 8 kHz, and fewer samples
+        make the FFTs several times cheaper.
+        """
+        factor = sample_rate // target_rate
+        if factor < 2:
+            return samples, sample_rate
+        usable = len(samples) // factor * factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1), sample_rate // factor
+
+    # ----- features -----
+
+    def _energy_db(self, samples, hop: int):
+        """RMS energy of each frame in dB relative to the loudest frame."""
+        np = self._np
+        frames = len(samples) // hop
+        if frames == 0:
+            return np.full(0, self.silence_db - 1)
+        power = (samples[:frames * hop].astype(np.float64) ** 2).reshape(frames, hop).mean(axis=1)
+        rms = np.sqrt(power)
+        peak = rms.max()
+        if peak <= 0:
+            return np.full(frames, -120.0)
+        return 20 * np.log10(np.maximum(rms / peak, 1e-6))
+
+    def _spectral_features(self, samples, sample_rate: int, hop: int, block: int = 1024):
+        """Spectral flux onset strength and spectral centroid (Hz) per frame."""
+        np = self._np
+        frames = len(samples) // hop
+        n_fft = 1 << int(np.ceil(np.log2(hop * 2)))
+        padded = np.concatenate([np.zeros(n_fft // 2, np.float32), samples.astype(np.float32),
+                                 np.zeros(n_fft, np.float32)])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop][:frames]
+        hann = np.hanning(n_fft).astype(np.float32)
+        freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+
+        flux = np.zeros(frames)
+        centroid = np.zeros(frames)
+        previous = None
+        for start in range(0, frames, block):
+            magnitude = np.abs(np.fft.rfft(windows[start:start + block] * hann, axis=1))
+            total = magnitude.sum(axis=1)
+            centroid[start:start + block] = (magnitude @ freqs) / np.maximum(total, 1e-9)
+            compressed = np.log1p(100 * magnitude)
+            if previous is not None:
+                compressed = np.vstack([previous, compressed])
+            diff = np.maximum(np.diff(compressed, axis=0), 0).sum(axis=1)
+            if previous is None:
+                diff = np.concatenate([[0.0], diff])
+            flux[start:start + block] = diff
+            previous = compressed[-1:]
+        if frames and flux.max() > 0:
+            flux /= flux.max()
+        return flux, centroid
+
+    def _onsets(self, flux, window: int = 10, delta: float = 0.05, min_gap: int = 5):
+        """Frames where the onset strength peaks above its local average."""
+        np = self._np
+        if len(flux) < 3:
+            return np.zeros(0, dtype=int)
+        kernel = np.ones(2 * window + 1) / (2 * window + 1)
+        local_mean = np.convolve(flux, kernel, mode="same")
+        local_max = np.lib.stride_tricks.sliding_window_view(
+            np.pad(flux, 3, mode="edge"), 7).max(axis=1)
+        candidates = np.flatnonzero((flux == local_max) & (flux > local_mean + delta))
+        onsets = []
+        for frame in candidates:
+            if not onsets or frame - onsets[-1] >= min_gap:
+                onsets.append(frame)
+        return np.array(onsets, dtype=int)
+
+    def _tempo_period(self, flux, frame_ms: float):
+        """Beat period in frames, or None if the audio has no clear pulse."""
+        np = self._np
+        envelope = flux - flux.mean()
+        n = len(envelope)
+        min_lag = int(round(60000 / self.MAX_BPM / frame_ms))
+        max_lag = int(round(60000 / self.MIN_BPM / frame_ms))
+        if n < max_lag * 4:
+            return None
+        spectrum = np.fft.rfft(envelope, 2 * n)
+        autocorr = np.fft.irfft(spectrum * np.conj(spectrum))[:max_lag + 1]
+        if autocorr[0] <= 0:
+            return None
+        lags = np.arange(min_lag, max_lag + 1)
+        # Prefer tempos near 120 BPM to avoid picking half or double time
+        weight = np.exp(-0.5 * (np.log2(lags * frame_ms / 500.0)) ** 2)
+        scores = autocorr[min_lag:max_lag + 1] / autocorr[0]
+        best = int(np.argmax(scores * weight))
+        if scores[best] < 0.2:
+            return None
+        return int(lags[best])
+
+    def _beats(self, flux, energy_db, sounding, frame_ms: float) -> list[BeatEvent]:
+        """Track beats with dynamic programming (Ellis 2007) over the onset strength."""
+        np = self._np
+        period = self._tempo_period(flux, frame_ms)
+        if period is None:
+            return []
+
+        n = len(flux)
+        score = flux.copy()
+        backlink = np.full(n, -1)
+        # Predecessors lie between 2 and 1/2 periods back; penalize off-tempo gaps
+        far, near = 2 * period, period // 2
+        penalty = -100.0 * np.log(np.arange(far, near - 1, -1) / period) ** 2
+        for t in range(near, n):
+            first = t - far
+            skip = max(0, -first)
+            values = score[first + skip:t - near + 1] + penalty[skip:]
+            best = int(values.argmax())
+            score[t] = flux[t] + values[best]
+            backlink[t] = first + skip + best
+
+        # Start from the best-scoring frame in the last beat period
+        tail = max(0, n - period)
+        frame = tail + int(np.argmax(score[tail:]))
+        frames = []
+        while frame >= 0:
+            frames.append(frame)
+            frame = backlink[frame]
+        frames = np.array(frames[::-1])
+        frames = frames[sounding[frames]]
+        if len(frames) < 4:
+            return []
+
+        # Accent: loudest frame around each beat
+        loudness = np.lib.stride_tricks.sliding_window_view(
+            np.pad(10 ** (energy_db / 20), 3, mode="edge"), 7).max(axis=1)
+        strengths = loudness[frames]
+        downbeat = int(np.argmax([strengths[phase::4].sum() for phase in range(4)]))
+        strong = np.percentile(strengths, 75)
+        beats = []
+        for i, (frame, strength) in enumerate(zip(frames, strengths)):
+            if i % 4 == downbeat:
+                label = "bar1"
+            elif strength >= strong:
+                label = "strong"
+            else:
+                label = "normal"
+            beats.append(BeatEvent(time_ms=int(frame * frame_ms), strength=label))
+        return beats
+
+    def _runs(self, mask):
+        """(start, end) frame ranges where mask is True."""
+        np = self._np
+        edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+        return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+    def _pauses(self, sounding, frame_ms: float) -> list[PauseSegment]:
+        """Silences of at least min_pause_ms between two sounding stretches."""
+        if not sounding.any():
+            return []
+        pauses = []
+        for start, end in self._runs(~sounding):
+            if start == 0 or end == len(sounding):
+                continue  # Leading/trailing silence isn't a pause
+            duration_ms = int((end - start) * frame_ms)
+            if duration_ms >= self.min_pause_ms:
+                pauses.append(PauseSegment(start_ms=int(start * frame_ms), end_ms=int(end * frame_ms),
+                                           duration_ms=duration_ms))
+        return pauses
+
+    def _segments(self, sounding, onsets, centroid, energy_db, frame_ms: float,
+                  min_frames: int = 6) -> list[WordTiming]:
+        """Split sounding stretches at onsets into syllable-sized segments."""
+        np = self._np
+        segments = []
+        for start, end in self._runs(sounding):
+            cuts = [start] + [int(o) for o in onsets if start + min_frames <= o <= end - min_frames] + [end]
+            for a, b in zip(cuts, cuts[1:]):
+                if b - a < min_frames:
+                    continue
+                weights = 10 ** (energy_db[a:b] / 20)
+                brightness = float(np.average(centroid[a:b], weights=weights))
+                if float(energy_db[a:b].max()) < self.silence_db / 2:
+                    group = "neutral"
+                elif brightness < 900:
+                    group = "round_vowel"
+                elif brightness > 2500:
+                    group = "spread_vowel"
+                else:
+                    group = "open_vowel"
+                segments.append(WordTiming(word="~", start_ms=int(a * frame_ms), end_ms=int(b * frame_ms),
+                                           phoneme_group=group))
+        return segments
+
+    def _emotion(self, beats: list[BeatEvent]) -> str:
+        """Coarse emotion guess from the tempo."""
+        if len(beats) >= 2:
+            bpm = 60000 / float(self._np.median(self._np.diff([b.time_ms for b in beats])))
+            if bpm >= 120:
+                return "excited"
+            if bpm < 80:
+                return "solemn"
+            return "happy"
+        return "neutral"
+
+
+class WindowedAudioProvider(AudioAnalysisProvider):
+    """Analyses long audio as overlapping windows, in parallel.
+
+    AI providers time out, or return drifting timestamps, on long files. This
+    wraps another provider: audio longer than window_ms is cut into evenly
+    sized windows that overlap by overlap_ms, the windows are analysed
+    concurrently (at most max_workers at a time), and the results are
+    stitched back into one AudioAnalysis.
+
+    Stitching:
+    - Window timestamps are offset by the window's start
+    - Each overlap is split at its midpoint; a word, beat or pause belongs
+      to the window whose half contains its middle, so items seen by both
+      windows are kept once
+    - Words and beats that still coincide across a boundary (the two
+      windows timed them slightly differently) are merged, and pauses that
+      touch are joined
+    - Emotion is the one covering the most audio
+
+    WAV windows are cut with the standard library; other formats are cut
+    to 16 kHz mono WAV with ffmpeg. Without ffmpeg, or when the duration
+    can't be measured, the whole file is analysed in one request.
+    """
+
+    DEDUPE_MS = 100  # Beats (and same-word starts) closer than this are the same event
+
+    def __init__(self, provider: AudioAnalysisProvider, window_ms: int = 120_000,
+                 overlap_ms: int = 10_000, max_workers: int = 4):
+        """Wrap a provider.
+
+        Args:
+            provider: Provider that analyses each window
+            window_ms: Longest audio analysed in one request
+            overlap_ms: Audio shared by neighbouring windows (so words at a
+                cut are heard whole by at least one of them)
+            max_workers: Windows analysed at the same time
+
+        Raises:
+            ValueError: If the overlap doesn't fit in the window
+        """
+        if not 0 <= overlap_ms < window_ms // 2:
+            raise ValueError("overlap_ms must be at least 0 and under half of window_ms")
+        self.provider = provider
+        self.window_ms = window_ms
+        self.overlap_ms = overlap_ms
+        self.max_workers = max(1, max_workers)
+
+    def cache_identity(self) -> dict:
+        return {**self.provider.cache_identity(), "window_ms": self.window_ms,
+                "overlap_ms": self.overlap_ms}
+
+    def analyze_audio(self, audio_path: str, prompt: str = "") -> AudioAnalysis:
+        """Analyze an audio file, in windows if it is long.
+
+        Args:
+            audio_path: Path to audio file
+            prompt: Optional user guidance (passed to every window)
+
+        Returns:
+            AudioAnalysis of the whole file
+
+        Raises:
+            Whatever the wrapped provider raises for any window
+        """
+        duration_ms = _measure_audio_duration_ms(audio_path)
+        if duration_ms is None or duration_ms <= self.window_ms:
+            return self.provider.analyze_audio(audio_path, prompt=prompt)
+
+        windows = self._plan(duration_ms)
+        import tempfile
+        with tempfile.TemporaryDirectory(prefix="mr-pumpkin-windows-") as tmp_dir:
+            paths = []
+            for index, (start_ms, end_ms) in enumerate(windows):
+                path = os.path.join(tmp_dir, f"window{index:03d}.wav")
+                if not self._cut(audio_path, start_ms, end_ms, path):
+                    logger.warning(f"Can't cut {audio_path} into windows (install ffmpeg); analysing it whole")
+                    return self.provider.analyze_audio(audio_path, prompt=prompt)
+                paths.append(path)
+
+            logger.info(f"Analysing {audio_path} as {len(windows)} windows of "
+                        f"{windows[0][1] - windows[0][0]}ms, {self.max_workers} at a time")
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="audio-window")
+            try:
+                futures = [executor.submit(self.provider.analyze_audio, path, prompt) for path in paths]
+                results = [future.result() for future in futures]
+            finally:
+                # Running windows still read their files: let them finish before the
+                # directory is removed (queued ones are cancelled)
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return self._stitch(windows, results, duration_ms, audio_path)
+
+    def _plan(self, duration_ms: int) -> list[tuple[int, int]]:
+        """Evenly sized overlapping windows covering the audio."""
+        step = self.window_ms - self.overlap_ms
+        count = -(-(duration_ms - self.overlap_ms) // step)  # Ceiling division
+        length = -(-(duration_ms + (count - 1) * self.overlap_ms) // count)
+        windows = []
+        for index in range(count):
+            start_ms = index * (length - self.overlap_ms)
+            windows.append((start_ms, min(start_ms + length, duration_ms)))
+        return windows
+
+    def _cut(self, audio_path: str, start_ms: int, end_ms: int, out_path: str) -> bool:
+        """Write one window as a WAV file. Returns False if it can't be cut."""
+        if audio_path.lower().endswith(".wav"):
+            import wave
+            try:
+                with wave.open(audio_path, "rb") as src:
+                    rate = src.getframerate()
+                    src.setpos(int(start_ms * rate / 1000))
+                    frames = src.readframes(int((end_ms - start_ms) * rate / 1000))
+                    with wave.open(out_path, "wb") as dst:
+                        dst.setnchannels(src.getnchannels())
+                        dst.setsampwidth(src.getsampwidth())
+                        dst.setframerate(rate)
+                        dst.writeframes(frames)
+                return True
+            except (wave.Error, EOFError) as e:
+                logger.debug(f"wave could not cut {audio_path}: {e}")
+
+        import shutil
+        import subprocess
+
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            return False
+        result = subprocess.run(
+            [ffmpeg, "-v", "error", "-y", "-ss", f"{start_ms / 1000:.3f}", "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+             "-i", audio_path, "-ac", "1", "-ar", "16000", out_path],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise ValueError(f"ffmpeg could not cut {audio_path}: {result.stderr.decode(errors='replace').strip()}")
+        return True
+
+    def _stitch(self, windows, results, duration_ms: int, audio_path: str) -> AudioAnalysis:
+        """Combine per-window analyses into one."""
+        # Each window owns the audio up to the middle of its overlaps
+        bounds = [0] + [(windows[i][1] + windows[i + 1][0]) // 2 for i in range(len(windows) - 1)] + [duration_ms]
+        words, beats, pauses = [], [], []
+        emotion_ms: dict[str, int] = {}
+        for index, ((offset, _), result) in enumerate(zip(windows, results)):
+            low, high = bounds[index], bounds[index + 1]
+            last = index == len(windows) - 1
+
+            def owned(start, end):
+                middle = offset + (start + end) / 2
+                return low <= middle < high or (last and middle >= high)
+
+            words += [WordTiming(w.word, w.start_ms + offset, w.end_ms + offset, w.phoneme_group)
+                      for w in result.speech_segments if owned(w.start_ms, w.end_ms)]
+            beats += [BeatEvent(b.time_ms + offset, b.strength)
+                      for b in result.beats if owned(b.time_ms, b.time_ms)]
+            pauses += [PauseSegment(p.start_ms + offset, p.end_ms + offset, p.duration_ms)
+                       for p in result.pauses if owned(p.start_ms, p.end_ms)]
+            emotion_ms[result.emotion] = emotion_ms.get(result.emotion, 0) + high - low
+
+        return AudioAnalysis(
+            speech_segments=self._dedupe_words(words),
+            beats=self._dedupe_beats(beats),
+            pauses=self._merge_pauses(pauses),
+            emotion=max(emotion_ms, key=emotion_ms.get),
+            duration_ms=duration_ms,
+            audio_path=audio_path,
+        )
+
+    def _dedupe_words(self, words: list[WordTiming]) -> list[WordTiming]:
+        """Drop repeats of a word both windows heard at nearly the same time."""
+        kept: list[WordTiming] = []
+        for word in sorted(words, key=lambda w: w.start_ms):
+            if (kept and word.word.lower() == kept[-1].word.lower()
+                    and abs(word.start_ms - kept[-1].start_ms) < self.DEDUPE_MS):
+                continue
+            kept.append(word)
+        return kept
+
+    def _dedupe_beats(self, beats: list[BeatEvent]) -> list[BeatEvent]:
+        """Merge beats closer than DEDUPE_MS, keeping the stronger label."""
+        rank = {"normal": 0, "strong": 1, "bar1": 2}
+        kept: list[BeatEvent] = []
+        for beat in sorted(beats, key=lambda b: b.time_ms):
+            if kept and beat.time_ms - kept[-1].time_ms < self.DEDUPE_MS:
+                if rank.get(beat.strength, 0) > rank.get(kept[-1].strength, 0):
+                    kept[-1] = BeatEvent(kept[-1].time_ms, beat.strength)
+                continue
+            kept.append(beat)
+        return kept
+
+    def _merge_pauses(self, pauses: list[PauseSegment]) -> list[PauseSegment]:
+        """Join pauses that overlap or touch."""
+        merged: list[PauseSegment] = []
+        for pause in sorted(pauses, key=lambda p: p.start_ms):
+            if merged and pause.start_ms <= merged[-1].end_ms:
+                end_ms = max(merged[-1].end_ms, pause.end_ms)
+                merged[-1] = PauseSegment(merged[-1].start_ms, end_ms, end_ms - merged[-1].start_ms)
+            else:
+                merged.append(pause)
+        return merged
+
+
 def get_provider(name: str = "gemini", **kwargs) -> AudioAnalysisProvider:
     """Factory function to create an audio analysis provider.
 
     Args:
-        name: Provider name. Supported: "gemini", "openai".
+        name: Provider name. Supported: "gemini", "openai", "local".
         **kwargs: Additional keyword arguments passed to the provider constructor.
 
     Returns:
@@ -719,4 +1312,6 @@ def get_provider(name: str = "gemini", **kwargs) -> AudioAnalysisProvider:
         return GeminiAudioProvider(**kwargs)
     elif name == "openai":
         return OpenAIAudioProvider(**kwargs)
+    elif name == "local":
+        return LocalAudioProvider(**kwargs)
     raise ValueError(f"Unknown audio analysis provider: {name}")
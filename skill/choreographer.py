@@ -0,0 +1,338 @@
+"""
+Rule-based lip-sync choreography for Mr. Pumpkin.
+
+Compiles an AudioAnalysis straight into timeline JSON using the same rules
+build_lipsync_prompt() spells out for the LLM: viseme per word,
+mouth_closed after every word, eyebrow reactions on strong beats, blinks
+in pauses, mouth_neutral at the end. No API call is made, so generation is
+instant and the same analysis always produces the same timeline.
+
+Long clips are embellished in segments: plan_segments() cuts the analysis
+at natural pauses, face_state() gives the state each segment starts in, and
+merge_segments() joins the per-segment results into one timeline.
+
+Usage:
+    from skill.choreographer import compile_lipsync_timeline
+    timeline_dict = compile_lipsync_timeline(analysis)
+"""
+
+import os
+import sys
+
+from skill.audio_analyzer import AudioAnalysis, PauseSegment
+
+# Allow importing keyframes.py from the project root when running as a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from keyframes import CURVE_COMMANDS, curve_from_command  # noqa: E402
+
+# Analysis emotions -> face expressions (the face has no excited/solemn)
+EMOTION_EXPRESSIONS = {
+    "happy": "happy",
+    "sad": "sad",
+    "excited": "happy",
+    "solemn": "sad",
+    "neutral": "neutral",
+}
+
+PHONEME_VISEMES = {
+    "bilabial": "mouth_closed",
+    "open_vowel": "mouth_open",
+    "spread_vowel": "mouth_wide",
+    "round_vowel": "mouth_rounded",
+    "neutral": "mouth_neutral",
+}
+
+MOUTH_COMMANDS = frozenset(PHONEME_VISEMES.values())
+
+BLINK_PAUSE_MS = 400        # Pauses at least this long get a blink
+BLINK_MS = 300              # Blink animation length (centred in the pause)
+GAZE_PAUSE_MS = 700         # Pauses at least this long (phrase breaks) shift the gaze
+GAZE_SHIFT_DEG = 15.0
+EYEBROW_HOLD_MS = 200       # Eyebrow raise on a strong beat is reset this much later
+HEAD_NOD_PX = 30
+HEAD_HOLD_MS = 250          # bar1 head tilt returns to centre this much later
+HEAD_SETTLE_MS = 500        # Minimum time between head movements
+END_BUFFER_MS = 300
+SEGMENT_MS = 30_000         # Longest stretch of audio embellished in one LLM request
+
+EYEBROW_STEP = 10.0         # eyebrow_raise/eyebrow_lower move the eyebrows this far
+HEAD_TURN_PX = 50           # Default turn_* amount
+
+# Face state at rest, as the commands face_state() reduces each part to
+NEUTRAL_STATE = {
+    "expression": {"command": "set_expression", "args": {"expression": "neutral"}},
+    "gaze": {"command": "gaze", "args": {"x": 0.0, "y": 0.0}},
+    "eyebrows": {"command": "eyebrow_reset"},
+    "head": {"command": "center_head"},
+}
+
+
+def compile_lipsync_timeline(analysis: AudioAnalysis) -> dict:
+    """Compile a lip-sync timeline from audio analysis.
+
+    Rules:
+    - set_expression for the overall emotion at 0ms
+    - Each word: its viseme at start_ms, mouth_closed at end_ms (skipped when
+      the next word starts by then); mouth_neutral after the last word
+    - strong and bar1 beats: eyebrow_raise, eyebrow_reset 200ms later
+      (unless another reaction comes first); bar1 beats also tilt the head
+      up and back when the head has had time to settle
+    - Pauses of 400ms or more: blink in the middle of the pause
+    - Pauses of 700ms or more (phrase breaks): gaze shifts alternately left
+      and right, back to centre after the last word or pause
+
+    Args:
+        analysis: Audio analysis to choreograph
+
+    Returns:
+        Timeline dict (version, duration_ms, commands) in time order
+    """
+    events = []  # (time_ms, command, args)
+
+    def add(time_ms, command, args=None):
+        events.append((int(time_ms), command, args))
+
+    add(0, "set_expression", {"expression": EMOTION_EXPRESSIONS.get(analysis.emotion, "neutral")})
+
+    words = sorted(analysis.speech_segments, key=lambda w: w.start_ms)
+    for index, word in enumerate(words):
+        add(word.start_ms, PHONEME_VISEMES.get(word.phoneme_group, "mouth_neutral"))
+        next_start = words[index + 1].start_ms if index + 1 < len(words) else None
+        if next_start is None or next_start > word.end_ms:
+            add(word.end_ms, "mouth_closed")
+    if words:
+        add(max(w.end_ms for w in words), "mouth_neutral")
+
+    reactions = [b for b in sorted(analysis.beats, key=lambda b: b.time_ms) if b.strength in ("strong", "bar1")]
+    last_head_ms = None
+    for index, beat in enumerate(reactions):
+        add(beat.time_ms, "eyebrow_raise")
+        reset_ms = beat.time_ms + EYEBROW_HOLD_MS
+        if index + 1 == len(reactions) or reactions[index + 1].time_ms > reset_ms:
+            add(reset_ms, "eyebrow_reset")
+        if beat.strength == "bar1" and (last_head_ms is None or beat.time_ms - last_head_ms >= HEAD_SETTLE_MS):
+            add(beat.time_ms, "turn_up", {"amount": HEAD_NOD_PX})
+            add(beat.time_ms + HEAD_HOLD_MS, "center_head")
+            last_head_ms = beat.time_ms
+
+    gaze_direction = -1
+    gaze_shifted = False
+    for pause in sorted(analysis.pauses, key=lambda p: p.start_ms):
+        if pause.duration_ms >= BLINK_PAUSE_MS:
+            add(pause.start_ms + (pause.duration_ms - BLINK_MS) // 2, "blink")
+        if pause.duration_ms >= GAZE_PAUSE_MS:
+            add(pause.start_ms, "gaze", {"x": gaze_direction * GAZE_SHIFT_DEG, "y": 0.0})
+            gaze_direction = -gaze_direction
+            gaze_shifted = True
+    if gaze_shifted:
+        add(max([w.end_ms for w in words] + [p.end_ms for p in analysis.pauses]), "gaze", {"x": 0.0, "y": 0.0})
+
+    events.sort(key=lambda e: e[0])  # Stable: same-time commands keep rule order
+    commands = []
+    for time_ms, command, args in events:
+        entry = {"time_ms": time_ms, "command": command}
+        if args is not None:
+            entry["args"] = args
+        commands.append(entry)
+
+    return {
+        "version": "1.0",
+        "duration_ms": max(analysis.duration_ms, commands[-1]["time_ms"] + END_BUFFER_MS),
+        "commands": commands,
+    }
+
+
+def merge_embellishments(base: dict, embellished: dict) -> dict:
+    """Combine an LLM-embellished timeline with the compiled mouth track.
+
+    The LLM may add or change anything except the mouth: its mouth commands
+    are replaced by the compiled ones, so lip-sync timing stays exact.
+
+    Args:
+        base: Timeline from compile_lipsync_timeline()
+        embellished: Timeline returned by the LLM pass
+
+    Returns:
+        Timeline dict with the LLM's non-mouth commands and base's mouth commands
+    """
+    commands = [c for c in embellished.get("commands", []) if c.get("command") not in MOUTH_COMMANDS]
+    commands += [c for c in base["commands"] if c["command"] in MOUTH_COMMANDS]
+    commands.sort(key=lambda c: c["time_ms"])
+    merged = dict(embellished)
+    merged["version"] = "1.0"
+    merged["commands"] = commands
+    merged["duration_ms"] = max(base["duration_ms"], embellished.get("duration_ms", 0))
+    return merged
+
+
+def plan_segments(analysis: AudioAnalysis, segment_ms: int = SEGMENT_MS) -> list[tuple[int, int]]:
+    """Cut the audio into segments of at most segment_ms at natural pauses.
+
+    Each cut is made in the middle of the longest pause in the second half
+    of the segment; without one, in the longest gap between words there, and
+    failing that (non-stop speech) after the word running at the limit.
+    The last segment ends at the end of the audio, or of the last word if
+    that is later.
+
+    Args:
+        analysis: Audio analysis to segment
+        segment_ms: Longest segment
+
+    Returns:
+        (start_ms, end_ms) of each segment, in order; one segment for short audio
+    """
+    words = sorted(analysis.speech_segments, key=lambda w: w.start_ms)
+    end_ms = max([analysis.duration_ms] + [w.end_ms for w in words])
+    gaps = list(analysis.pauses) + [PauseSegment(a.end_ms, b.start_ms, b.start_ms - a.end_ms)
+                                    for a, b in zip(words, words[1:]) if b.start_ms > a.end_ms]
+
+    segments = []
+    start_ms = 0
+    while end_ms - start_ms > segment_ms:
+        low, high = start_ms + segment_ms // 2, start_ms + segment_ms
+        candidates = [g for g in gaps if low <= (g.start_ms + g.end_ms) // 2 <= high]
+        if candidates:
+            gap = max(candidates, key=lambda g: (g.end_ms - g.start_ms, g.start_ms))
+            cut = (gap.start_ms + gap.end_ms) // 2
+        else:
+            cut = max([high] + [w.end_ms for w in words if w.start_ms < high < w.end_ms])
+        segments.append((start_ms, cut))
+        start_ms = cut
+    segments.append((start_ms, end_ms))
+    return segments
+
+
+def slice_analysis(analysis: AudioAnalysis, start_ms: int, end_ms: int) -> AudioAnalysis:
+    """The words, beats and pauses starting within [start_ms, end_ms).
+
+    Times stay absolute, so a segment's timeline lines up with the whole clip.
+    """
+    return AudioAnalysis(
+        speech_segments=[w for w in analysis.speech_segments if start_ms <= w.start_ms < end_ms],
+        beats=[b for b in analysis.beats if start_ms <= b.time_ms < end_ms],
+        pauses=[p for p in analysis.pauses if start_ms <= p.start_ms < end_ms],
+        emotion=analysis.emotion,
+        duration_ms=analysis.duration_ms,
+        audio_path=analysis.audio_path,
+    )
+
+
+def face_state(commands: list[dict], time_ms: int | None = None) -> dict[str, dict]:
+    """Face state left by the commands before time_ms (all of them if None).
+
+    Relative commands (eyebrow_raise, turn_left, jog_offset...) and tweens
+    are played through, so each part is reduced to one absolute command
+    that puts the face back in that state from any other: set_expression,
+    gaze, eyebrow/eyebrow_reset, and set_offset/center_head for the head.
+
+    Returns:
+        Absolute command (without time_ms) for each part of the face the
+        commands set ("expression", "gaze", "eyebrows", "head"); parts never
+        set are missing
+    """
+    expression = gaze = eyebrows = head = None
+    for entry in commands:
+        if time_ms is not None and entry["time_ms"] >= time_ms:
+            break
+        command, args = entry["command"], entry.get("args") or {}
+        brows = eyebrows or (0.0, 0.0)
+        x, y = head or (0, 0)
+        if command == "set_expression":
+            expression = args.get("expression", "neutral")
+        elif command == "gaze":
+            if all(args.get(k) is not None for k in ("lx", "ly", "rx", "ry")):
+                gaze = tuple(float(args[k]) for k in ("lx", "ly", "rx", "ry"))
+            else:
+                gaze = (float(args.get("x", 0)), float(args.get("y", 0))) * 2
+        elif command.startswith(("eyebrow_raise", "eyebrow_lower")):
+            step = -EYEBROW_STEP if command.startswith("eyebrow_raise") else EYEBROW_STEP
+            left = brows[0] + (step if not command.endswith("_right") else 0)
+            right = brows[1] + (step if not command.endswith("_left") else 0)
+            eyebrows = (max(-50.0, min(50.0, left)), max(-50.0, min(50.0, right)))
+        elif command == "eyebrow_reset":
+            eyebrows = (0.0, 0.0)
+        elif command == "eyebrow":
+            if args.get("left") is not None and args.get("right") is not None:
+                eyebrows = (float(args["left"]), float(args["right"]))
+            else:
+                eyebrows = (float(args.get("value", 0)),) * 2
+        elif command in ("turn_left", "turn_right", "turn_up", "turn_down"):
+            amount = int(args.get("amount", HEAD_TURN_PX))
+            dx, dy = {"turn_left": (-amount, 0), "turn_right": (amount, 0),
+                      "turn_up": (0, -amount), "turn_down": (0, amount)}[command]
+            head = (x + dx, y + dy)
+        elif command == "jog_offset":
+            head = (x + int(args.get("dx", 0)), y + int(args.get("dy", 0)))
+        elif command == "set_offset":
+            head = (int(args.get("x", 0)), int(args.get("y", 0)))
+        elif command in ("center_head", "projection_reset"):
+            head = (0, 0)
+        elif command in CURVE_COMMANDS:
+            track = CURVE_COMMANDS[command]
+            current = {"gaze": gaze or (0.0,) * 4, "eyebrow": brows, "offset": (float(x), float(y))}[track]
+            try:
+                curve = curve_from_command(command, args, current)
+            except ValueError:
+                continue
+            end = curve.evaluate(curve.duration_ms)
+            if track == "gaze":
+                gaze = end
+            elif track == "eyebrow":
+                eyebrows = end
+            else:
+                head = (int(round(end[0])), int(round(end[1])))
+        if head is not None:
+            head = (max(-500, min(500, head[0])), max(-500, min(500, head[1])))
+
+    state = {}
+    if expression is not None:
+        state["expression"] = {"command": "set_expression", "args": {"expression": expression}}
+    if gaze is not None:
+        lx, ly, rx, ry = gaze
+        state["gaze"] = {"command": "gaze", "args": {"x": lx, "y": ly} if (lx, ly) == (rx, ry)
+                         else {"lx": lx, "ly": ly, "rx": rx, "ry": ry}}
+    if eyebrows is not None:
+        left, right = eyebrows
+        state["eyebrows"] = ({"command": "eyebrow_reset"} if left == right == 0 else
+                             {"command": "eyebrow", "args": {"value": left} if left == right
+                              else {"left": left, "right": right}})
+    if head is not None:
+        state["head"] = ({"command": "center_head"} if head == (0, 0) else
+                         {"command": "set_offset", "args": {"x": head[0], "y": head[1]}})
+    return state
+
+
+def merge_segments(base: dict, segments: list[tuple[int, int, dict, dict]]) -> dict:
+    """Join per-segment embellished timelines into one timeline.
+
+    Each segment keeps only the commands within its own time window. Where
+    the face is left in a different state than the next segment was told it
+    would start in (parts it wasn't told about are neutral), that state is
+    restored at the cut, so every segment plays out as generated. The mouth track comes from base as in
+    merge_embellishments().
+
+    Args:
+        base: Timeline from compile_lipsync_timeline() for the whole clip
+        segments: (start_ms, end_ms, starting face state, embellished
+            timeline) for each segment, in order
+
+    Returns:
+        Timeline dict in time order, lasting at least as long as base
+    """
+    commands = []
+    for index, (start_ms, end_ms, state, embellished) in enumerate(segments):
+        last = index == len(segments) - 1
+        if index:
+            left = face_state(commands)
+            for part, neutral in NEUTRAL_STATE.items():
+                # A part missing from the state was described as neutral
+                entry = state.get(part, neutral)
+                if left.get(part, neutral) != entry:
+                    commands.append({"time_ms": start_ms, **entry})
+        commands += [c for c in embellished.get("commands", [])
+                     if start_ms <= c["time_ms"] and (last or c["time_ms"] < end_ms)]
+
+    merged = merge_embellishments(base, {"version": "1.0", "commands": commands})
+    if merged["commands"]:
+        merged["duration_ms"] = max(merged["duration_ms"], merged["commands"][-1]["time_ms"] + END_BUFFER_MS)
+    return merged
@@ -7,6 +7,11 @@ it to the Mr. Pumpkin server.
 Usage:
     python -m skill.cli "make the pumpkin look surprised then blink" --filename my_show
     python -m skill.cli "wave hello" -f wave --host 192.168.1.10 --protocol ws
+    python -m skill.cli "wave hello" -f wave --no-cache   # Ask the LLM again for the same prompt
+
+The response is streamed and each command is validated as it arrives; an
+invalid response is abandoned at the first bad command and requested again.
+Nothing is uploaded until a complete, valid timeline has been generated.
 
 Exit codes:
     0 — success
@@ -45,6 +50,10 @@ def _build_parser() -> argparse.ArgumentParser:
         "--provider", default="gemini",
         help="LLM provider to use (default: gemini).",
     )
+    p.add_argument(
+        "--no-cache", action="store_true",
+        help="Ask the LLM again instead of reusing the cached response to the same prompt.",
+    )
     return p
 
 
@@ -54,7 +63,8 @@ def main(argv=None) -> int:
 
     # Resolve LLM provider
     try:
-        from skill.generator import generate_timeline, GeminiProvider
+        from skill.generator import stream_timeline, GeminiProvider
+        from skill.response_cache import ResponseCache
         if args.provider.lower() == "gemini":
             provider = GeminiProvider()
         else:
@@ -67,10 +77,14 @@ def main(argv=None) -> int:
         print(f"ERROR: {exc}", file=sys.stderr)
         return 1
 
+    def restart():
+        print("  Generated timeline was invalid; retrying")
+
     # Generate timeline
     print(f"Generating timeline for: {args.prompt!r}")
     try:
-        timeline = generate_timeline(args.prompt, provider=provider)
+        timeline = stream_timeline(args.prompt, provider=provider, on_restart=restart,
+                                   cache=None if args.no_cache else ResponseCache())
     except ValueError as exc:
         print(f"ERROR: Generation failed — {exc}", file=sys.stderr)
         return 1
@@ -0,0 +1,118 @@
+"""
+Size-limited on-disk JSON cache shared by the Mr. Pumpkin skill tools.
+
+Holds the storage side of the analysis and LLM response caches: one JSON
+file per entry, written atomically, with the least recently used entries
+evicted once the directory grows past its size limit. Subclasses decide
+what a key is made of and what an entry holds.
+
+Usage:
+    from skill.disk_cache import DiskCache, default_cache_dir
+    cache = DiskCache(default_cache_dir("things"))
+    cache.write(key, {"value": 1})
+    data = cache.read(key)
+"""
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir(kind: str = "analysis") -> Path:
+    """Cache directory for one kind of entry.
+
+    Under $MR_PUMPKIN_CACHE_DIR if set, else the user cache directory
+    (~/.cache/mr-pumpkin).
+    """
+    return cache_root() / kind
+
+
+def cache_root() -> Path:
+    """Base directory of all Mr. Pumpkin caches."""
+    if os.environ.get("MR_PUMPKIN_CACHE_DIR"):
+        return Path(os.environ["MR_PUMPKIN_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "mr-pumpkin"
+
+
+class DiskCache:
+    """Directory of JSON entries with least-recently-used eviction.
+
+    Reading an entry marks it as recently used; when a write takes the
+    directory past max_bytes, the least recently used entries are removed.
+    Unreadable entries are dropped and reported as misses.
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def read(self, key: str):
+        """Stored JSON data for a key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.discard(key, e)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return data
+
+    def discard(self, key: str, reason=None) -> None:
+        """Remove one entry (logging why, if a reason is given)."""
+        path = self._entry_path(key)
+        if reason is not None:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {reason}")
+        path.unlink(missing_ok=True)
+
+    def write(self, key: str, data) -> None:
+        """Store JSON data, then evict old entries if over the size limit.
+
+        Raises:
+            OSError: If the cache directory can't be written
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_name, self._entry_path(key))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
@@ -9,15 +9,24 @@ Usage:
     timeline_dict = generate_timeline("Make the pumpkin look surprised then blink twice")
 """
 
+import hashlib
 import json
+import logging
 import os
 import re
 import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from typing import Callable, Iterator
 
 # Allow importing timeline.py from the project root when running as a package
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from timeline import Timeline  # noqa: E402
+from timeline import Timeline, TimelineEntry  # noqa: E402
+from timeline_stream import TimelineStreamParser  # noqa: E402
+from skill.response_cache import ResponseCache  # noqa: E402
+
+logger = logging.getLogger(__name__)
 
 
 _SYSTEM_PROMPT = """\
@@ -57,6 +66,7 @@ Respond with ONLY a valid JSON object matching this exact schema — no prose, n
 | roll_counterclockwise   | (none)                                                   | Eyes roll counter-clockwise (~1000 ms)   |
 | gaze                    | {"x": float, "y": float}                                 | Both eyes; -90 to +90 degrees            |
 | gaze                    | {"lx": float, "ly": float, "rx": float, "ry": float}     | Independent eye control                  |
+| gaze_to                 | {"x": float, "y": float, "duration_ms": int, "easing": "<name>"} | Smooth eye sweep; easing linear, ease_in, ease_out, ease_in_out (default) |
 | eyebrow_raise           | (none)                                                   | Raise both eyebrows                      |
 | eyebrow_lower           | (none)                                                   | Lower both eyebrows                      |
 | eyebrow_raise_left      | (none)                                                   | Raise left eyebrow only                  |
@@ -66,6 +76,7 @@ Respond with ONLY a valid JSON object matching this exact schema — no prose, n
 | eyebrow_reset           | (none)                                                   | Reset eyebrows to neutral                |
 | eyebrow                 | {"value": float}                                         | Both eyebrows to numeric offset          |
 | eyebrow                 | {"left": float, "right": float}                          | Independent eyebrow control              |
+| eyebrow_to              | {"value": float, "duration_ms": int, "easing": "<name>"} | Smooth eyebrow ramp (also left/right)    |
 | turn_left               | {"amount": int}                                          | Head turn left; default 50 px            |
 | turn_right              | {"amount": int}                                          | Head turn right; default 50 px           |
 | turn_up                 | {"amount": int}                                          | Head tilt up; default 50 px              |
@@ -153,13 +164,14 @@ Now generate a timeline for the user's animation description. Reply with ONLY th
 
 _VALID_COMMANDS = {
     "set_expression", "blink", "wink_left", "wink_right",
-    "roll_clockwise", "roll_counterclockwise", "gaze",
+    "roll_clockwise", "roll_counterclockwise", "gaze", "gaze_to", "gaze_curve",
     "eyebrow_raise", "eyebrow_lower", "eyebrow_raise_left", "eyebrow_lower_left",
     "eyebrow_raise_right", "eyebrow_lower_right", "eyebrow_reset", "eyebrow",
+    "eyebrow_to", "eyebrow_curve",
     "turn_left", "turn_right", "turn_up", "turn_down", "center_head",
     "twitch_nose", "wiggle_nose", "scrunch_nose", "reset_nose",
     "mouth_closed", "mouth_open", "mouth_wide", "mouth_rounded", "mouth_neutral",
-    "projection_reset", "jog_offset", "set_offset",
+    "projection_reset", "jog_offset", "set_offset", "offset_to", "offset_curve",
     "play_recording",
 }
 
@@ -179,6 +191,42 @@ class LLMProvider(ABC):
             Raw text response from the model.
         """
 
+    def generate_stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """Call the LLM and yield its text response as it is produced.
+
+        Closing the iterator early abandons the request. Providers without
+        streaming support yield the whole response at once.
+
+        Args:
+            system_prompt: System-level instructions for the model.
+            user_prompt: User request to fulfil.
+
+        Yields:
+            Successive chunks of the raw text response.
+        """
+        yield self.generate(system_prompt, user_prompt)
+
+    def cache_identity(self) -> dict:
+        """Settings that shape this provider's responses.
+
+        Responses to the same prompts from providers with equal identities
+        are interchangeable, so this keys the on-disk response cache.
+        """
+        return {"provider": type(self).__name__}
+
+
+def _is_context_cache_gone(exc: Exception) -> bool:
+    """Whether a request failed because its context cache was deleted or expired."""
+    text = str(exc).lower()
+    return "cache" in text and (getattr(exc, "code", None) == 404
+                                or any(word in text for word in ("not found", "expired", "does not exist")))
+
+
+def _is_context_caching_unsupported(exc: Exception) -> bool:
+    """Whether creating a context cache failed for good (model or prompt size), not transiently."""
+    text = str(exc).lower()
+    return any(word in text for word in ("not supported", "does not support", "too small", "min_total_token_count"))
+
 
 class GeminiProvider(LLMProvider):
     """LLM provider backed by Google Gemini (gemini-1.5-flash).
@@ -186,12 +234,18 @@ class GeminiProvider(LLMProvider):
     API key is read from the ``GEMINI_API_KEY`` environment variable,
     falling back to ``GOOGLE_API_KEY``.
 
+    When the same system prompt is sent a second time, it is stored once as
+    a Gemini context cache and later requests refer to it by name instead of
+    resending the full text. Models or accounts that don't support context
+    caching fall back to sending the text.
+
     Raises:
         EnvironmentError: If no API key is found in the environment.
         ImportError: If the ``google-genai`` package is not installed.
     """
 
     DEFAULT_MODEL = "gemini-flash-latest"
+    CONTEXT_CACHE_TTL_S = 3600
 
     def __init__(self, api_key: str = None, model: str = None):
         try:
@@ -214,6 +268,63 @@ class GeminiProvider(LLMProvider):
         self._client = genai.Client(api_key=api_key)
         self._types = types
         self.model = model or self.DEFAULT_MODEL
+        self._context_lock = threading.Lock()
+        self._context_caches = {}  # system prompt hash -> (cache name, expiry on time.monotonic())
+        self._prompt_uses = {}  # system prompt hash -> requests sent with the full text
+        self._context_creating = set()  # system prompt hashes with a caches.create in flight
+        self._context_cache_supported = True
+
+    def cache_identity(self) -> dict:
+        return {"provider": "gemini", "model": self.model}
+
+    def _context_cache_name(self, system_prompt: str) -> str | None:
+        """Name of a context cache holding system_prompt, or None to send the text.
+
+        The first request with a system prompt sends it in full; a repeat
+        creates the context cache, so one-off requests never pay for one.
+        Requests made while the cache is being created send the text rather
+        than wait for it.
+        """
+        digest = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        with self._context_lock:
+            if not self._context_cache_supported:
+                return None
+            name, expires = self._context_caches.get(digest, (None, 0.0))
+            if name is not None and time.monotonic() < expires - 60:  # Leave a margin for the request
+                return name
+            self._prompt_uses[digest] = self._prompt_uses.get(digest, 0) + 1
+            if self._prompt_uses[digest] < 2 or digest in self._context_creating:
+                return None
+            self._context_creating.add(digest)
+        try:
+            cached = self._client.caches.create(
+                model=self.model,
+                config=self._types.CreateCachedContentConfig(
+                    system_instruction=system_prompt,
+                    ttl=f"{self.CONTEXT_CACHE_TTL_S}s",
+                    display_name="mr-pumpkin-system-prompt",
+                ),
+            )
+        except Exception as exc:
+            with self._context_lock:
+                self._context_creating.discard(digest)
+                if _is_context_caching_unsupported(exc):
+                    # Model can't cache, or the prompt is below the minimum size
+                    logger.info(f"Gemini context caching unavailable, sending the system prompt: {exc}")
+                    self._context_cache_supported = False
+                else:
+                    logger.warning(f"Creating Gemini context cache failed, will retry: {exc}")
+            return None
+        with self._context_lock:
+            self._context_creating.discard(digest)
+            self._context_caches[digest] = (cached.name, time.monotonic() + self.CONTEXT_CACHE_TTL_S)
+        return cached.name
+
+    def _drop_context_cache(self, cache_name: str, exc: Exception) -> None:
+        """Forget a context cache that was deleted or expired server-side."""
+        logger.warning(f"Request with context cache {cache_name} failed, resending system prompt: {exc}")
+        with self._context_lock:
+            self._context_caches = {k: v for k, v in self._context_caches.items() if v[0] != cache_name}
 
     def generate(self, system_prompt: str, user_prompt: str) -> str:
         """Generate a response using Gemini.
@@ -225,6 +336,19 @@ class GeminiProvider(LLMProvider):
         Returns:
             Generated text response.
         """
+        cache_name = self._context_cache_name(system_prompt)
+        if cache_name is not None:
+            try:
+                response = self._client.models.generate_content(
+                    model=self.model,
+                    contents=user_prompt,
+                    config=self._types.GenerateContentConfig(cached_content=cache_name),
+                )
+                return response.text
+            except Exception as exc:
+                if not _is_context_cache_gone(exc):
+                    raise  # Rate limits and timeouts are not fixed by resending the prompt
+                self._drop_context_cache(cache_name, exc)
         response = self._client.models.generate_content(
             model=self.model,
             contents=user_prompt,
@@ -234,6 +358,40 @@ class GeminiProvider(LLMProvider):
         )
         return response.text
 
+    def generate_stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """Stream a response from Gemini (see LLMProvider.generate_stream)."""
+        cache_name = self._context_cache_name(system_prompt)
+        if cache_name is not None:
+            try:
+                stream = self._client.models.generate_content_stream(
+                    model=self.model,
+                    contents=user_prompt,
+                    config=self._types.GenerateContentConfig(cached_content=cache_name),
+                )
+                first = next(stream, None)  # Request errors surface with the first chunk
+            except Exception as exc:
+                if not _is_context_cache_gone(exc):
+                    raise
+                self._drop_context_cache(cache_name, exc)
+            else:
+                for chunk in ([first] if first is not None else []):
+                    if chunk.text:
+                        yield chunk.text
+                for chunk in stream:
+                    if chunk.text:
+                        yield chunk.text
+                return
+        stream = self._client.models.generate_content_stream(
+            model=self.model,
+            contents=user_prompt,
+            config=self._types.GenerateContentConfig(
+                system_instruction=system_prompt,
+            )
+        )
+        for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
 
 class OpenAIProvider(LLMProvider):
     """LLM provider backed by OpenAI (gpt-4o).
@@ -241,6 +399,10 @@ class OpenAIProvider(LLMProvider):
     API key is read from the ``OPENAI_API_KEY`` environment variable.
     Base URL defaults to ``https://api.openai.com/v1``.
 
+    OpenAI caches repeated prompt prefixes automatically, and the system
+    prompt is always sent first; against the OpenAI API a prompt_cache_key
+    derived from it keeps requests routed to the same cache.
+
     Raises:
         EnvironmentError: If no API key is found in the environment.
         ImportError: If the ``openai`` package is not installed.
@@ -267,6 +429,10 @@ class OpenAIProvider(LLMProvider):
 
         self._client = OpenAI(api_key=api_key, base_url=base_url)
         self._model = model or self.MODEL
+        self._base_url = base_url
+
+    def cache_identity(self) -> dict:
+        return {"provider": "openai", "model": self._model, "base_url": self._base_url}
 
     def generate(self, system_prompt: str, user_prompt: str) -> str:
         """Generate a response using OpenAI.
@@ -278,14 +444,34 @@ class OpenAIProvider(LLMProvider):
         Returns:
             Generated text response.
         """
-        response = self._client.chat.completions.create(
+        response = self._client.chat.completions.create(**self._request(system_prompt, user_prompt))
+        return response.choices[0].message.content
+
+    def generate_stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """Stream a response from OpenAI (see LLMProvider.generate_stream)."""
+        stream = self._client.chat.completions.create(**self._request(system_prompt, user_prompt), stream=True)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()  # Stop the server generating the rest
+
+    def _request(self, system_prompt: str, user_prompt: str) -> dict:
+        """Keyword arguments of a chat completion request."""
+        kwargs = {}
+        if self._base_url == "https://api.openai.com/v1":  # Compatible servers may reject the parameter
+            kwargs["prompt_cache_key"] = "mr-pumpkin-" + hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+        return dict(
             model=self._model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
-            ]
+            ],
+            **kwargs
         )
-        return response.choices[0].message.content
 
 
 def _validate_extra(data: dict) -> None:
@@ -310,19 +496,25 @@ def _validate_extra(data: dict) -> None:
 
     prev_time = -1
     for entry in commands:
-        name = entry.get("command", "")
-        if name not in _VALID_COMMANDS:
-            raise ValueError(
-                f"Unknown command: {name!r}. Must be one of the recognised vocabulary commands."
-            )
-        t = entry.get("time_ms", 0)
-        if t < prev_time:
-            raise ValueError(
-                f"Commands must be in ascending time_ms order. "
-                f"Found time_ms={t} after previous time_ms={prev_time}."
-            )
-        prev_time = t
+        prev_time = _validate_command(entry.get("command", ""), entry.get("time_ms", 0), prev_time)
+
 
+def _validate_command(name: str, t, prev_time) -> int:
+    """Check one command's name and ordering; returns its time_ms.
+
+    Raises:
+        ValueError: If the command is unknown or earlier than the previous one.
+    """
+    if name not in _VALID_COMMANDS:
+        raise ValueError(
+            f"Unknown command: {name!r}. Must be one of the recognised vocabulary commands."
+        )
+    if t < prev_time:
+        raise ValueError(
+            f"Commands must be in ascending time_ms order. "
+            f"Found time_ms={t} after previous time_ms={prev_time}."
+        )
+    return t
 
 
 def _repair(data: dict) -> dict:
@@ -331,18 +523,19 @@ def _repair(data: dict) -> dict:
     Currently handles:
     - Normalises ``timestamp_ms`` → ``time_ms`` in command entries.
     """
-    commands = data.get("commands", [])
-    repaired = []
-    for entry in commands:
-        if "timestamp_ms" in entry and "time_ms" not in entry:
-            entry = dict(entry)
-            entry["time_ms"] = entry.pop("timestamp_ms")
-        repaired.append(entry)
     data = dict(data)
-    data["commands"] = repaired
+    data["commands"] = [_repair_command(entry) for entry in data.get("commands", [])]
     return data
 
 
+def _repair_command(entry: dict) -> dict:
+    """Apply the command-level repairs of _repair() to one command entry."""
+    if "timestamp_ms" in entry and "time_ms" not in entry:
+        entry = dict(entry)
+        entry["time_ms"] = entry.pop("timestamp_ms")
+    return entry
+
+
 def _extract_json(text: str) -> str:
     """Strip markdown code fences from an LLM response, if present."""
     # Match ```json ... ``` or ``` ... ```
@@ -352,12 +545,55 @@ def _extract_json(text: str) -> str:
     return text.strip()
 
 
-def generate_timeline(prompt: str, provider: LLMProvider | None = None) -> dict:
+def _parse_timeline(raw: str) -> dict:
+    """Parse, repair and validate an LLM response into a timeline dict.
+
+    Raises:
+        ValueError: If the response isn't valid JSON or fails validation.
+    """
+    json_text = _extract_json(raw)
+
+    try:
+        data = json.loads(json_text)
+    except json.JSONDecodeError as exc:
+        raise ValueError(
+            f"LLM returned non-JSON output. JSONDecodeError: {exc}\n\nRaw response:\n{raw}"
+        ) from exc
+
+    return validate_timeline(_repair(data))
+
+
+def validate_timeline(data: dict) -> dict:
+    """Check a timeline dict with the rules generated timelines must meet.
+
+    Returns:
+        data, unchanged
+
+    Raises:
+        ValueError: If the timeline fails _validate_extra() or
+            ``Timeline.from_dict()`` validation.
+    """
+    _validate_extra(data)
+
+    try:
+        Timeline.from_dict(data)
+    except Exception as exc:
+        raise ValueError(
+            f"Generated timeline failed validation: {exc}\n\nTimeline dict:\n{json.dumps(data, indent=2)}"
+        ) from exc
+
+    return data
+
+
+def generate_timeline(prompt: str, provider: LLMProvider | None = None,
+                      cache: ResponseCache | None = None) -> dict:
     """Generate a validated timeline dict from a natural language prompt.
 
     Args:
         prompt: Natural language description of the desired animation.
         provider: LLM provider to use. Defaults to ``GeminiProvider``.
+        cache: Response cache to replay earlier responses to the same
+            prompt from (and store new valid ones in). None disables caching.
 
     Returns:
         A validated timeline dict ready for ``Timeline.from_dict()`` or JSON
@@ -370,25 +606,165 @@ def generate_timeline(prompt: str, provider: LLMProvider | None = None) -> dict:
     if provider is None:
         provider = GeminiProvider()
 
+    cache, key, data = _cache_lookup(cache, provider, prompt)
+    if data is not None:
+        return data
+
     raw = provider.generate(_SYSTEM_PROMPT, prompt)
-    json_text = _extract_json(raw)
+    data = _parse_timeline(raw)
+    _cache_store(cache, key, raw)
+    return data
 
-    try:
-        data = json.loads(json_text)
-    except json.JSONDecodeError as exc:
-        raise ValueError(
-            f"LLM returned non-JSON output. JSONDecodeError: {exc}\n\nRaw response:\n{raw}"
-        ) from exc
 
-    data = _repair(data)
+def _cache_lookup(cache: ResponseCache | None, provider: LLMProvider, prompt: str):
+    """Look up a cached response to prompt.
+
+    Returns:
+        (cache, or None if it can't be used; key; cached timeline dict or None)
+    """
+    if cache is None:
+        return None, None, None
+    try:
+        key = cache.key(provider.cache_identity(), _SYSTEM_PROMPT, prompt)
+        raw = cache.get(key)
+    except (OSError, TypeError, ValueError) as exc:
+        logger.warning(f"Response cache unavailable: {exc}")
+        return None, None, None
+    if raw is not None:
+        try:
+            return cache, key, _parse_timeline(raw)
+        except ValueError:
+            cache.discard(key)  # Stored under older validation rules
+    return cache, key, None
 
-    _validate_extra(data)
 
+def _cache_store(cache: ResponseCache | None, key: str, raw: str) -> None:
+    """Store a validated response, if caching."""
+    if cache is None:
+        return
     try:
-        Timeline.from_dict(data)
-    except Exception as exc:
-        raise ValueError(
-            f"Generated timeline failed validation: {exc}\n\nTimeline dict:\n{json.dumps(data, indent=2)}"
-        ) from exc
+        cache.put(key, raw)
+    except OSError as exc:
+        logger.warning(f"Could not cache response: {exc}")
 
-    return data
+
+class _StreamCheck:
+    """Validates a streamed LLM response command by command.
+
+    Text before the opening brace (a code fence, a sentence) is skipped and
+    anything from a closing fence on is ignored, like _extract_json().
+    """
+
+    def __init__(self):
+        self.parser = TimelineStreamParser(repair=_repair_command)
+        self.chunks = []
+        self._started = False
+        self._ended = False
+        self._prev_time = -1
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def feed(self, text: str) -> list[dict]:
+        """Parse the next chunk; returns the commands it completed.
+
+        Raises:
+            ValueError: As soon as the output is not a valid timeline.
+        """
+        self.chunks.append(text)
+        if self._ended:
+            return []
+        if not self._started:
+            start = text.find("{")
+            if start < 0:
+                return []
+            text = text[start:]
+            self._started = True
+        fence = text.find("`")
+        if fence >= 0:
+            text = text[:fence]
+            self._ended = True
+        return self._check(self.parser.feed(text))
+
+    def close(self) -> list[dict]:
+        """Finish parsing; returns the last commands.
+
+        Raises:
+            ValueError: If the output is incomplete or not a valid timeline.
+        """
+        if not self._started:
+            raise ValueError(f"LLM returned no timeline JSON.\n\nRaw response:\n{self.text}")
+        return self._check(self.parser.close())
+
+    def _check(self, entries: list[TimelineEntry]) -> list[dict]:
+        if entries and self.parser.fields.get("version", "1.0") != "1.0":
+            raise ValueError(f"Invalid timeline version: {self.parser.fields['version']!r}. Expected '1.0'.")
+        for entry in entries:
+            self._prev_time = _validate_command(entry.command, entry.time_ms, self._prev_time)
+        return [entry.to_dict() for entry in entries]
+
+
+def stream_timeline(prompt: str, provider: LLMProvider | None = None,
+                    on_commands: Callable[[list[dict]], None] | None = None,
+                    on_restart: Callable[[], None] | None = None,
+                    attempts: int = 3, cache: ResponseCache | None = None) -> dict:
+    """Generate a validated timeline, checking each command as it streams in.
+
+    The same checks as generate_timeline() run on every command as soon as
+    it is complete, so an unknown command or out-of-order time_ms stops the
+    request at that point instead of after the whole response. The request
+    is then retried.
+
+    Args:
+        prompt: Natural language description of the desired animation.
+        provider: LLM provider to use. Defaults to ``GeminiProvider``.
+        on_commands: Called with each batch of validated commands, in order,
+            as they arrive (e.g. to show progress).
+        on_restart: Called before a retry; commands passed to on_commands
+            by the failed attempt must be discarded.
+        attempts: Number of requests to make before giving up.
+        cache: Response cache (see generate_timeline()).
+
+    Returns:
+        The validated timeline dict, as generate_timeline() would return it.
+
+    Raises:
+        ValueError: If every attempt produced an invalid timeline.
+    """
+    if provider is None:
+        provider = GeminiProvider()
+
+    cache, key, data = _cache_lookup(cache, provider, prompt)
+    if data is not None:
+        if on_commands is not None:
+            on_commands(data["commands"])
+        return data
+
+    error = None
+    for attempt in range(attempts):
+        if attempt and on_restart is not None:
+            on_restart()
+        check = _StreamCheck()
+        stream = provider.generate_stream(_SYSTEM_PROMPT, prompt)
+        try:
+            for text in stream:
+                commands = check.feed(text)
+                if commands and on_commands is not None:
+                    on_commands(commands)
+            commands = check.close()
+            if commands and on_commands is not None:
+                on_commands(commands)
+            data = _parse_timeline(check.text)
+        except ValueError as exc:
+            error = exc
+            logger.warning(f"Generated timeline invalid after {check.parser.command_count} commands "
+                           f"(attempt {attempt + 1}/{attempts}): {str(exc).splitlines()[0]}")
+            continue
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()  # Abandon the rest of an invalid response
+        _cache_store(cache, key, check.text)
+        return data
+    raise ValueError(f"No valid timeline after {attempts} attempts. Last error: {error}")
@@ -0,0 +1,407 @@
+"""
+Mr. Pumpkin batch lip-sync tool — run the lip-sync pipeline over many clips.
+
+Takes a directory of audio files (or a manifest listing them) and runs the
+mr-pumpkin-lipsync pipeline for each: analysis, choreography, then audio and
+timeline upload. The stages are pipelined, so one clip is uploading while
+the next is being choreographed and others are being analysed, and each
+stage has its own worker limit. Failed steps are retried with exponential
+backoff. Progress is recorded in a manifest after every step, so an
+interrupted batch resumes where it stopped.
+
+Usage:
+    python -m skill.lipsync_batch clips/
+    python -m skill.lipsync_batch season.txt --prompt "spooky narrator" --analysis-workers 4
+    python -m skill.lipsync_batch clips/ --dry-run
+
+Arguments:
+    source                  Directory of audio files (.mp3, .wav, .ogg), or a manifest
+                            file listing one audio path per line (relative paths are
+                            relative to the manifest; blank lines and # comments ignored)
+    --state-dir             Progress, timelines and report (default: .lipsync-batch next to source)
+    --restart               Ignore earlier progress and process every clip again
+    --analysis-workers      Clips analysed at once (default: 2)
+    --choreograph-workers   Clips choreographed at once (default: 4)
+    --upload-workers        Clips uploaded at once (default: 1)
+    --retries               Retries per failed step (default: 3)
+    --backoff               Seconds before the first retry, doubled on each retry (default: 2)
+    Every other option (--prompt, --embellish, --host, --provider, --dry-run, ...)
+    is the same as for mr-pumpkin-lipsync and applies to every clip.
+
+Exit codes:
+    0 — every clip succeeded
+    1 — one or more clips failed
+    2 — argument error
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from skill.lipsync_cli import (add_pipeline_arguments, analyze, choreograph, make_audio_provider, make_caches,
+                               make_llm_provider)
+from skill.uploader import upload_audio, upload_timeline
+
+logger = logging.getLogger(__name__)
+
+AUDIO_SUFFIXES = (".mp3", ".wav", ".ogg")
+PROGRESS_FORMAT = 1  # Bump when the progress manifest layout changes
+
+# Options that change what a clip's timeline or upload looks like; progress
+# recorded under different values is not resumed
+_SETTING_OPTIONS = ("prompt", "embellish", "audio_provider", "audio_model", "provider", "model",
+                    "analysis_window", "segment", "host", "tcp_port", "ws_port", "protocol", "dry_run")
+
+
+@dataclass
+class Clip:
+    """One audio file of a batch, stored on the server as name."""
+    audio_path: Path
+    name: str
+
+
+def find_clips(source: Path) -> list[Clip]:
+    """List the clips of a batch.
+
+    Args:
+        source: Directory of audio files, or a manifest file with one audio
+            path per line
+
+    Returns:
+        Clips sorted by file name (directory) or in manifest order
+
+    Raises:
+        FileNotFoundError: If source doesn't exist
+        ValueError: If two clips would be stored under the same name
+    """
+    if source.is_dir():
+        paths = sorted(p for p in source.iterdir() if p.is_file() and p.suffix.lower() in AUDIO_SUFFIXES)
+    else:
+        paths = []
+        for line in source.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                path = Path(line)
+                paths.append(path if path.is_absolute() else source.parent / path)
+
+    clips = []
+    seen = {}
+    for path in paths:
+        if path.stem in seen:
+            raise ValueError(f"{path} and {seen[path.stem]} would both be stored as '{path.stem}'")
+        seen[path.stem] = path
+        clips.append(Clip(path, path.stem))
+    return clips
+
+
+def _write_json(path: Path, data) -> None:
+    """Write JSON through a temporary file, so an interrupted batch never leaves half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _fingerprint(path: Path) -> dict:
+    """Size and modification time, enough to notice an edited audio file."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class BatchProgress:
+    """Progress manifest of a batch, saved to disk after every change.
+
+    Records, per clip, the last stage it completed (status: analyzed,
+    choreographed or uploaded) and, if a later stage then failed, which one,
+    the error and the number of attempts. The manifest belongs to one set of
+    settings: loading it with different ones starts afresh. Safe to update
+    from several threads.
+    """
+
+    def __init__(self, path: Path, settings: dict, restart: bool = False):
+        self.path = Path(path)
+        self.settings = settings
+        self.clips = {}
+        self._lock = threading.Lock()
+        if restart:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable progress manifest {self.path}: {e}")
+            return
+        if data.get("format") != PROGRESS_FORMAT or data.get("settings") != settings:
+            print("Settings changed since the last run; processing every clip again")
+            return
+        self.clips = data.get("clips", {})
+
+    def resume_point(self, clip: Clip) -> str | None:
+        """Status to resume a clip from: "uploaded", "choreographed" or None (start over).
+
+        A clip is only resumed if its audio is unchanged since it was recorded.
+        """
+        entry = self.clips.get(clip.name)
+        if entry is None or entry.get("status") not in ("choreographed", "uploaded"):
+            return None
+        try:
+            if entry.get("audio") != str(clip.audio_path) or entry.get("file") != _fingerprint(clip.audio_path):
+                return None
+        except OSError:
+            return None
+        return entry["status"]
+
+    def record(self, clip: Clip, **fields) -> None:
+        """Update a clip's entry and save the manifest."""
+        with self._lock:
+            entry = self.clips.setdefault(clip.name, {})
+            entry["audio"] = str(clip.audio_path)
+            entry.update(fields)
+            self._save()
+
+    def _save(self) -> None:
+        _write_json(self.path, {"format": PROGRESS_FORMAT, "settings": self.settings, "clips": self.clips})
+
+
+class LipsyncBatch:
+    """Pipelined analysis → choreography → upload over a list of clips.
+
+    Each stage runs on its own thread pool; a clip moves to the next pool as
+    soon as a stage completes, so the stages overlap across clips. Choreographed
+    timelines are written to timeline_dir, so a resumed batch uploads them
+    without re-running the LLM. Analyses are reused through the analysis cache.
+
+    Args:
+        stage functions (each may raise; failures are retried):
+            analyze_fn(clip) -> analysis
+            choreograph_fn(clip, analysis) -> timeline dict
+            upload_fn(clip, timeline_dict) -> None, or None to stop after choreography
+    """
+
+    def __init__(self, analyze_fn, choreograph_fn, upload_fn, progress: BatchProgress, timeline_dir: Path,
+                 workers: dict | None = None, retries: int = 3, backoff_s: float = 2.0, sleep=time.sleep):
+        self.analyze_fn = analyze_fn
+        self.choreograph_fn = choreograph_fn
+        self.upload_fn = upload_fn
+        self.progress = progress
+        self.timeline_dir = Path(timeline_dir)
+        self.workers = {"analyze": 2, "choreograph": 4, "upload": 1, **(workers or {})}
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._sleep = sleep
+        self._pools = {}
+        self._results = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def run(self, clips: list[Clip]) -> dict:
+        """Process every clip; returns {name: result entry} (see _finish())."""
+        self._results = {}
+        self._total = len(clips)
+        final_status = "uploaded" if self.upload_fn is not None else "choreographed"
+        # Pools are shut down from the first stage to the last: each stage
+        # hands its clips on before its pool finishes, so nothing is dropped.
+        with ThreadPoolExecutor(self.workers["upload"], thread_name_prefix="lipsync-upload") as upload_pool, \
+             ThreadPoolExecutor(self.workers["choreograph"], thread_name_prefix="lipsync-choreograph") as choreograph_pool, \
+             ThreadPoolExecutor(self.workers["analyze"], thread_name_prefix="lipsync-analyze") as analyze_pool:
+            self._pools = {"analyze": analyze_pool, "choreograph": choreograph_pool, "upload": upload_pool}
+            for clip in clips:
+                resume = self.progress.resume_point(clip)
+                if resume == final_status:
+                    self._finish(clip, "skipped")
+                elif resume == "choreographed" and self._timeline_path(clip).exists():
+                    upload_pool.submit(self._upload, clip, None)
+                else:
+                    analyze_pool.submit(self._analyze, clip)
+        return self._results
+
+    def _timeline_path(self, clip: Clip) -> Path:
+        return self.timeline_dir / f"{clip.name}.json"
+
+    def _attempt(self, clip: Clip, stage: str, fn):
+        """Run one stage for a clip with retries; returns (ok, result)."""
+        for attempt in range(self.retries + 1):
+            try:
+                return True, fn()
+            except FileNotFoundError as exc:  # Retrying won't make the file appear
+                error = exc
+                break
+            except Exception as exc:
+                error = exc
+                if attempt < self.retries:
+                    delay = self.backoff_s * 2 ** attempt
+                    print(f"  {clip.name}: {stage} failed ({exc}); retrying in {delay:g}s")
+                    self._sleep(delay)
+        self.progress.record(clip, failed_stage=stage, error=str(error), attempts=attempt + 1)
+        self._finish(clip, "failed", stage=stage, error=str(error))
+        return False, None
+
+    def _analyze(self, clip: Clip) -> None:
+        started = time.monotonic()
+        ok, result = self._attempt(clip, "analyze", lambda: (self.analyze_fn(clip), _fingerprint(clip.audio_path)))
+        if not ok:
+            return
+        analysis, fingerprint = result
+        self.progress.record(clip, status="analyzed", file=fingerprint, failed_stage=None, error=None, attempts=None)
+        self._timing(clip, "analyze", started)
+        self._pools["choreograph"].submit(self._choreograph, clip, analysis)
+
+    def _choreograph(self, clip: Clip, analysis) -> None:
+        started = time.monotonic()
+
+        def step():
+            timeline_dict = self.choreograph_fn(clip, analysis)
+            _write_json(self._timeline_path(clip), timeline_dict)
+            return timeline_dict
+
+        ok, timeline_dict = self._attempt(clip, "choreograph", step)
+        if not ok:
+            return
+        self.progress.record(clip, status="choreographed", timeline=str(self._timeline_path(clip)))
+        self._timing(clip, "choreograph", started)
+        if self.upload_fn is None:
+            self._finish(clip, "choreographed")
+        else:
+            self._pools["upload"].submit(self._upload, clip, timeline_dict)
+
+    def _upload(self, clip: Clip, timeline_dict: dict | None) -> None:
+        started = time.monotonic()
+
+        def step():
+            # A resumed clip uploads the timeline choreographed by an earlier run
+            data = timeline_dict or json.loads(self._timeline_path(clip).read_text(encoding="utf-8"))
+            self.upload_fn(clip, data)
+
+        ok, _ = self._attempt(clip, "upload", step)
+        if not ok:
+            return
+        self.progress.record(clip, status="uploaded", failed_stage=None, error=None, attempts=None)
+        self._timing(clip, "upload", started)
+        self._finish(clip, "uploaded")
+
+    def _timing(self, clip: Clip, stage: str, started: float) -> None:
+        with self._lock:
+            self._results.setdefault(clip.name, {}).setdefault("seconds", {})[stage] = \
+                round(time.monotonic() - started, 2)
+
+    def _finish(self, clip: Clip, status: str, **fields) -> None:
+        with self._lock:
+            entry = self._results.setdefault(clip.name, {})
+            entry.update(status=status, audio=str(clip.audio_path), **fields)
+            done = sum(1 for e in self._results.values() if "status" in e)
+        print(f"[{done}/{self._total}] {clip.name}: {status}" + (f" at {fields['stage']} — {fields['error']}" if status == "failed" else ""))
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="mr-pumpkin-lipsync-batch",
+        description="Generate and upload lip-synced Mr. Pumpkin recordings for a directory of audio files.",
+    )
+    p.add_argument("source", help="Directory of audio files, or a manifest file listing one audio path per line.")
+    p.add_argument("--state-dir", help="Progress, timelines and report (default: .lipsync-batch next to source).")
+    p.add_argument("--restart", action="store_true", help="Ignore earlier progress and process every clip again.")
+    p.add_argument("--analysis-workers", type=int, default=2, help="Clips analysed at once (default: 2).")
+    p.add_argument("--choreograph-workers", type=int, default=4, help="Clips choreographed at once (default: 4).")
+    p.add_argument("--upload-workers", type=int, default=1, help="Clips uploaded at once (default: 1).")
+    p.add_argument("--retries", type=int, default=3, help="Retries per failed step (default: 3).")
+    p.add_argument("--backoff", type=float, default=2.0, metavar="SECONDS",
+                   help="Delay before the first retry, doubled on each retry (default: 2).")
+    add_pipeline_arguments(p)
+    return p
+
+
+def main(argv=None) -> int:
+    """Main entry point for the batch lip-sync CLI."""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if min(args.analysis_workers, args.choreograph_workers, args.upload_workers) < 1 or args.retries < 0:
+        print("ERROR: Worker counts must be at least 1 and --retries at least 0", file=sys.stderr)
+        return 2
+
+    source = Path(args.source)
+    try:
+        clips = find_clips(source)
+    except (OSError, ValueError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    if not clips:
+        print(f"ERROR: No audio files ({', '.join(AUDIO_SUFFIXES)}) in {source}", file=sys.stderr)
+        return 2
+
+    try:
+        audio_provider = make_audio_provider(args)
+        llm_provider = make_llm_provider(args) if args.prompt or args.embellish else None
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    except (EnvironmentError, ImportError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+    cache, response_cache = make_caches(args)
+
+    def analyze_clip(clip):
+        return analyze(clip.audio_path, audio_provider, cache, prompt=args.prompt)[0]
+
+    def choreograph_clip(clip, analysis):
+        timeline_dict = choreograph(analysis, llm_provider, prompt=args.prompt, response_cache=response_cache,
+                                    segment_ms=int(args.segment * 1000))
+        timeline_dict["audio_file"] = f"{clip.name}{clip.audio_path.suffix}"
+        return timeline_dict
+
+    def upload_clip(clip, timeline_dict):
+        target = dict(host=args.host, tcp_port=args.tcp_port, ws_port=args.ws_port, protocol=args.protocol)
+        upload_audio(timeline_dict["audio_file"], clip.audio_path.read_bytes(), **target)
+        upload_timeline(clip.name, timeline_dict, **target)
+
+    state_dir = Path(args.state_dir) if args.state_dir else \
+        (source if source.is_dir() else source.parent) / ".lipsync-batch"
+    settings = {name: getattr(args, name) for name in _SETTING_OPTIONS}
+    progress = BatchProgress(state_dir / "progress.json", settings, restart=args.restart)
+    batch = LipsyncBatch(
+        analyze_clip, choreograph_clip, None if args.dry_run else upload_clip,
+        progress, state_dir / "timelines",
+        workers={"analyze": args.analysis_workers, "choreograph": args.choreograph_workers,
+                 "upload": args.upload_workers},
+        retries=args.retries, backoff_s=args.backoff,
+    )
+
+    print(f"Processing {len(clips)} clips from {source}...")
+    started = time.monotonic()
+    results = batch.run(clips)
+    elapsed = time.monotonic() - started
+
+    counts = {}
+    for entry in results.values():
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    report = {"source": str(source), "clips": len(clips), "seconds": round(elapsed, 1),
+              "counts": counts, "results": results}
+    report_path = state_dir / "report.json"
+    _write_json(report_path, report)
+
+    print(f"\nDone in {elapsed:.1f}s: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    failed = sorted(name for name, entry in results.items() if entry["status"] == "failed")
+    for name in failed:
+        print(f"  FAILED {name} at {results[name]['stage']}: {results[name]['error']}", file=sys.stderr)
+    print(f"Report: {report_path}")
+    if failed:
+        print("Run the same command again to retry the failed clips.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
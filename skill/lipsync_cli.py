@@ -3,7 +3,8 @@ Mr. Pumpkin Audio Lip-Sync Recording Tool — Command-line interface.
 
 Two-pass audio-to-animation pipeline:
   1. Audio analysis via Gemini multimodal (or another provider) → structured timing data
-  2. LLM choreography generation (Gemini or OpenAI) → timeline JSON
+  2. Rule-based choreography compiled locally → timeline JSON, optionally
+     embellished by an LLM (Gemini or OpenAI) when --prompt or --embellish is given
 
 Usage:
     python -m skill.lipsync_cli audio.mp3 --filename my_song
@@ -15,17 +16,22 @@ Usage:
 Arguments:
     audio_file              Path to audio file (.mp3, .wav, .ogg)
     -f / --filename         Recording name on server (default: audio file stem)
-    --prompt                Artistic guidance for animation style
+    --prompt                Artistic guidance for animation style (runs the LLM embellishment pass)
+    --embellish             Run the LLM embellishment pass even without --prompt
     --host                  Mr. Pumpkin server hostname (default: localhost)
     --tcp-port              TCP port (default: 5000)
     --ws-port               WebSocket port (default: 5001)
     --protocol              Upload protocol: tcp (default) or ws
-    --audio-provider        Provider for audio analysis (default: gemini)
+    --audio-provider        Provider for audio analysis (default: gemini; also: openai, local)
     --provider              LLM provider for timeline generation (default: gemini; also: openai)
     --model                 Override default LLM model (e.g., gpt-4o, gemini-1.5-pro)
     --audio-model           Override default model for audio analysis
+    --analysis-window       Analyze longer audio as parallel windows of this many seconds (default: 120; 0 = whole file)
+    --segment               Embellish longer audio as parallel segments of up to this many seconds (default: 30; 0 = one request)
     --api-key               API key override (overrides GEMINI_API_KEY / OPENAI_API_KEY env vars)
     --dry-run               Analyze and generate, print JSON, do NOT upload
+    --no-cache              Re-analyze and re-generate even if cached results exist
+    --cache-dir             Base directory of the analysis and LLM response caches (default: ~/.cache/mr-pumpkin)
 
 Exit codes:
     0 — success
@@ -37,10 +43,16 @@ import argparse
 import json
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from skill.audio_analyzer import get_provider as get_audio_provider, AudioAnalysis
-from skill.generator import generate_timeline, GeminiProvider, OpenAIProvider
+from skill.analysis_cache import AnalysisCache
+from skill.audio_analyzer import (get_provider as get_audio_provider, AudioAnalysis, AudioAnalysisProvider,
+                                  WindowedAudioProvider)
+from skill.choreographer import (compile_lipsync_timeline, face_state, merge_embellishments, merge_segments,
+                                 plan_segments, slice_analysis, SEGMENT_MS)
+from skill.generator import generate_timeline, validate_timeline, GeminiProvider, LLMProvider, OpenAIProvider
+from skill.response_cache import ResponseCache
 from skill.uploader import upload_timeline, upload_audio
 
 logger = logging.getLogger(__name__)
@@ -124,6 +136,66 @@ def build_lipsync_prompt(analysis: AudioAnalysis, user_prompt: str) -> str:
     return "\n".join(lines)
 
 
+def build_embellish_prompt(analysis: AudioAnalysis, user_prompt: str, base_timeline: dict) -> str:
+    """Build the prompt for the optional LLM embellishment pass.
+
+    The LLM sees the usual lip-sync prompt plus the compiled timeline, and is
+    asked to keep it and layer artistic touches on top. Its mouth commands
+    are discarded afterwards (see merge_embellishments()).
+
+    Args:
+        analysis: Structured audio analysis.
+        user_prompt: Optional user guidance for artistic direction.
+        base_timeline: Timeline from compile_lipsync_timeline().
+
+    Returns:
+        Prompt string ready for generate_timeline().
+    """
+    lines = [
+        build_lipsync_prompt(analysis, user_prompt),
+        "",
+        "BASE TIMELINE (already follows the rules above):",
+        json.dumps(base_timeline),
+        "",
+        "Return the base timeline with artistic embellishments added: expression changes, gaze,",
+        "eyebrows, head and nose movements that fit the artistic direction. Keep every mouth_*",
+        "command exactly as given; the mouth track is fixed.",
+    ]
+    return "\n".join(lines)
+
+
+def build_segment_prompt(analysis: AudioAnalysis, user_prompt: str, base_timeline: dict,
+                         segment: tuple[int, int], index: int, count: int, state: dict) -> str:
+    """Build the embellishment prompt for one segment of a long clip.
+
+    Args:
+        analysis: Analysis of the whole clip
+        user_prompt: Optional user guidance for artistic direction.
+        base_timeline: Timeline from compile_lipsync_timeline() for the whole clip
+        segment: (start_ms, end_ms) of the segment
+        index: Position of the segment (0-based)
+        count: Number of segments
+        state: Face state at the start of the segment (from face_state())
+
+    Returns:
+        Prompt string ready for generate_timeline().
+    """
+    start_ms, end_ms = segment
+    base_segment = dict(base_timeline)
+    base_segment["commands"] = [c for c in base_timeline["commands"] if start_ms <= c["time_ms"] < end_ms]
+    lines = [
+        build_embellish_prompt(slice_analysis(analysis, start_ms, end_ms), user_prompt, base_segment),
+        "",
+        f"SEGMENT: this is part {index + 1} of {count}, covering {start_ms}ms to {end_ms}ms of the clip.",
+        f"Only return commands with {start_ms} <= time_ms < {end_ms}, timed against the whole clip.",
+    ]
+    if state:
+        lines.append(f"At {start_ms}ms the face is already in this state (carried over from before):")
+        lines += [f"  {json.dumps(entry)}" for entry in state.values()]
+        lines.append("Continue from it; don't open with a set_expression unless the expression changes.")
+    return "\n".join(lines)
+
+
 def _phoneme_to_viseme_cmd(phoneme_group: str) -> str:
     """Map phoneme group to the exact viseme command name."""
     mapping = {
@@ -158,10 +230,20 @@ def _build_parser() -> argparse.ArgumentParser:
         "-f", "--filename",
         help="Name to store recording as on server (default: audio file stem, e.g., 'my_song').",
     )
+    add_pipeline_arguments(p)
+    return p
+
+
+def add_pipeline_arguments(p: argparse.ArgumentParser) -> None:
+    """Add the analysis, choreography and upload options (shared with mr-pumpkin-lipsync-batch)."""
     p.add_argument(
         "--prompt",
         default="",
-        help="Optional artistic guidance (e.g., 'pumpkin sings this joyfully').",
+        help="Optional artistic guidance, applied by an LLM pass (e.g., 'pumpkin sings this joyfully').",
+    )
+    p.add_argument(
+        "--embellish", action="store_true",
+        help="Have the LLM add artistic touches to the compiled choreography (implied by --prompt).",
     )
     p.add_argument("--host", default="localhost", help="Mr. Pumpkin server hostname (default: localhost).")
     p.add_argument("--tcp-port", type=int, default=5000, help="TCP port (default: 5000).")
@@ -172,7 +254,7 @@ def _build_parser() -> argparse.ArgumentParser:
     )
     p.add_argument(
         "--audio-provider", default="gemini",
-        help="Audio analysis provider (default: gemini).",
+        help="Audio analysis provider (default: gemini; also: openai, local).",
     )
     p.add_argument(
         "--provider", default="gemini",
@@ -186,6 +268,15 @@ def _build_parser() -> argparse.ArgumentParser:
         "--audio-model",
         help="Override default model for audio analysis (e.g., gpt-4o-audio-preview).",
     )
+    p.add_argument(
+        "--analysis-window", type=float, default=120.0, metavar="SECONDS",
+        help="Analyze audio longer than this as overlapping windows in parallel (default: 120; 0 = whole file).",
+    )
+    p.add_argument(
+        "--segment", type=float, default=SEGMENT_MS / 1000, metavar="SECONDS",
+        help="Embellish audio longer than this as segments cut at pauses, in parallel "
+             f"(default: {SEGMENT_MS // 1000}; 0 = one request).",
+    )
     p.add_argument(
         "--api-key",
         help="API key for providers. Overrides environment variables (GEMINI_API_KEY, OPENAI_API_KEY).",
@@ -194,7 +285,157 @@ def _build_parser() -> argparse.ArgumentParser:
         "--dry-run", action="store_true",
         help="Analyze and generate timeline, print JSON, but do NOT upload.",
     )
-    return p
+    p.add_argument(
+        "--no-cache", action="store_true",
+        help="Re-analyze the audio and re-run the LLM instead of reusing cached results.",
+    )
+    p.add_argument(
+        "--cache-dir",
+        help="Base directory of the analysis and LLM response caches "
+             "(default: $MR_PUMPKIN_CACHE_DIR or ~/.cache/mr-pumpkin).",
+    )
+
+
+def make_audio_provider(args: argparse.Namespace) -> AudioAnalysisProvider:
+    """Create the audio analysis provider selected on the command line.
+
+    Audio longer than --analysis-window is analysed in parallel windows
+    (except by the local provider, which is fast enough on whole files).
+
+    Raises:
+        ValueError: If the provider name is unknown
+        EnvironmentError: If the provider's API key is missing
+        ImportError: If the provider's SDK is not installed
+    """
+    kwargs = {}
+    if args.api_key:
+        kwargs["api_key"] = args.api_key
+    if args.audio_model:
+        kwargs["model"] = args.audio_model
+    provider = get_audio_provider(args.audio_provider, **kwargs)
+    if args.analysis_window > 0 and args.audio_provider != "local":
+        window_ms = int(args.analysis_window * 1000)
+        provider = WindowedAudioProvider(provider, window_ms=window_ms, overlap_ms=min(10_000, window_ms // 4))
+    return provider
+
+
+def make_llm_provider(args: argparse.Namespace) -> LLMProvider:
+    """Create the LLM provider used for the embellishment pass.
+
+    Raises:
+        ValueError: If the provider name is unknown
+        EnvironmentError: If the provider's API key is missing
+        ImportError: If the provider's SDK is not installed
+    """
+    kwargs = {}
+    if args.api_key:
+        kwargs["api_key"] = args.api_key
+    if args.model:
+        kwargs["model"] = args.model
+    if args.provider.lower() == "gemini":
+        return GeminiProvider(**kwargs)
+    if args.provider.lower() == "openai":
+        return OpenAIProvider(**kwargs)
+    raise ValueError(f"Unknown provider '{args.provider}'. Supported: gemini, openai")
+
+
+def make_caches(args: argparse.Namespace) -> tuple[AnalysisCache | None, ResponseCache | None]:
+    """Analysis and LLM response caches, or (None, None) with --no-cache."""
+    if args.no_cache:
+        return None, None
+    if args.cache_dir:
+        return AnalysisCache(Path(args.cache_dir) / "analysis"), ResponseCache(Path(args.cache_dir) / "responses")
+    return AnalysisCache(), ResponseCache()
+
+
+def analyze(audio_path: Path, audio_provider: AudioAnalysisProvider, cache: AnalysisCache | None,
+            prompt: str = "") -> tuple[AudioAnalysis, bool]:
+    """Pass 1: analyse an audio file, reusing a cached analysis when there is one.
+
+    Args:
+        audio_path: Audio file to analyse
+        audio_provider: Provider from make_audio_provider()
+        cache: Analysis cache, or None to always analyse
+        prompt: Optional user guidance passed to the provider
+
+    Returns:
+        (analysis, True if it came from the cache)
+
+    Raises:
+        FileNotFoundError: If the audio file doesn't exist
+        Exception: Whatever the provider raises when analysis fails
+    """
+    cache_key = None
+    if cache is not None:
+        try:
+            cache_key = cache.key(str(audio_path), audio_provider.cache_identity())
+            analysis = cache.get(cache_key, audio_path=str(audio_path))
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(f"Analysis cache unavailable: {exc}")
+            cache = None
+        else:
+            if analysis is not None:
+                return analysis, True
+    
+    analysis = audio_provider.analyze_audio(str(audio_path), prompt=prompt)
+    if cache is not None:
+        try:
+            cache.put(cache_key, analysis)
+        except OSError as exc:
+            logger.warning(f"Could not cache analysis: {exc}")
+    return analysis, False
+
+
+def choreograph(analysis: AudioAnalysis, llm_provider: LLMProvider | None = None, prompt: str = "",
+                response_cache: ResponseCache | None = None, segment_ms: int = SEGMENT_MS,
+                max_workers: int = 4) -> dict:
+    """Pass 2: compile the choreography, then embellish it if an LLM is given.
+
+    Audio longer than segment_ms is embellished in segments cut at pauses,
+    generated concurrently: one request for a long clip has to return every
+    command in one huge response, which is slow and often cut short.
+
+    Args:
+        analysis: Result of analyze()
+        llm_provider: Provider for the embellishment pass, or None to skip it
+        prompt: Optional user guidance for the embellishment pass
+        response_cache: Cache of earlier LLM responses, or None to always ask
+        segment_ms: Longest audio embellished in one request (0 = no limit)
+        max_workers: Segments embellished at the same time
+
+    Returns:
+        Timeline dict (without audio_file)
+
+    Raises:
+        ValueError: If the LLM returns an invalid timeline
+    """
+    timeline_dict = compile_lipsync_timeline(analysis)
+    if llm_provider is None:
+        return timeline_dict
+    
+    segments = plan_segments(analysis, segment_ms) if segment_ms > 0 else []
+    if len(segments) < 2:
+        # The mouth track stays as compiled
+        embellished = generate_timeline(build_embellish_prompt(analysis, prompt, timeline_dict),
+                                        provider=llm_provider, cache=response_cache)
+        return merge_embellishments(timeline_dict, embellished)
+
+    # Each segment starts from the compiled face state; merge_segments() restores it at the cuts
+    states = [face_state(timeline_dict["commands"], start_ms) for start_ms, _ in segments]
+    prompts = [build_segment_prompt(analysis, prompt, timeline_dict, segment, index, len(segments), state)
+               for index, (segment, state) in enumerate(zip(segments, states))]
+    logger.info(f"Embellishing {len(segments)} segments, {max_workers} at a time")
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="lipsync-segment")
+    try:
+        futures = [executor.submit(generate_timeline, segment_prompt, provider=llm_provider, cache=response_cache)
+                   for segment_prompt in prompts]
+        results = [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return validate_timeline(merge_segments(
+        timeline_dict, [(start_ms, end_ms, state, result)
+                        for (start_ms, end_ms), state, result in zip(segments, states, results)]))
 
 
 def main(argv=None) -> int:
@@ -225,12 +466,7 @@ def main(argv=None) -> int:
     # Pass 1: Audio analysis
     print(f"Analyzing audio: {audio_path.name}...")
     try:
-        audio_provider_kwargs = {}
-        if args.api_key:
-            audio_provider_kwargs["api_key"] = args.api_key
-        if args.audio_model:
-            audio_provider_kwargs["model"] = args.audio_model
-        audio_provider = get_audio_provider(args.audio_provider, **audio_provider_kwargs)
+        audio_provider = make_audio_provider(args)
     except ValueError as exc:
         print(f"ERROR: {exc}", file=sys.stderr)
         return 2
@@ -238,14 +474,17 @@ def main(argv=None) -> int:
         print(f"ERROR: {exc}", file=sys.stderr)
         return 1
     
+    cache, response_cache = make_caches(args)
     try:
-        analysis = audio_provider.analyze_audio(str(audio_path), prompt=args.prompt)
+        analysis, cached = analyze(audio_path, audio_provider, cache, prompt=args.prompt)
     except FileNotFoundError as exc:
         print(f"ERROR: {exc}", file=sys.stderr)
         return 1
     except Exception as exc:
         print(f"ERROR: Audio analysis failed — {exc}", file=sys.stderr)
         return 1
+    if cached:
+        print("  Using cached analysis (--no-cache to re-analyze)")
     
     print(f"  Duration: {analysis.duration_ms}ms, Emotion: {analysis.emotion}")
     print(f"  Words: {len(analysis.speech_segments)}, Beats: {len(analysis.beats)}, Pauses: {len(analysis.pauses)}")
@@ -254,37 +493,29 @@ def main(argv=None) -> int:
         for seg in analysis.speech_segments:
             print(f"    {seg.start_ms:>6}ms – {seg.end_ms:>6}ms  \"{seg.word}\" ({seg.phoneme_group})")
     
-    # Pass 2: Generate timeline
-    print("Generating choreography...")
-    
-    try:
-        llm_provider_kwargs = {}
-        if args.api_key:
-            llm_provider_kwargs["api_key"] = args.api_key
-        if args.model:
-            llm_provider_kwargs["model"] = args.model
-        
-        if args.provider.lower() == "gemini":
-            llm_provider = GeminiProvider(**llm_provider_kwargs)
-        elif args.provider.lower() == "openai":
-            llm_provider = OpenAIProvider(**llm_provider_kwargs)
-        else:
-            print(f"ERROR: Unknown provider '{args.provider}'. Supported: gemini, openai", file=sys.stderr)
+    # Pass 2: Compile choreography from the analysis (instant, reproducible)
+    llm_provider = None
+    if args.prompt or args.embellish:
+        try:
+            llm_provider = make_llm_provider(args)
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
             return 2
-    except (EnvironmentError, ImportError) as exc:
-        print(f"ERROR: {exc}", file=sys.stderr)
-        return 1
-    
-    enriched_prompt = build_lipsync_prompt(analysis, args.prompt)
+        except (EnvironmentError, ImportError) as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            return 1
     
+    print("Compiling choreography" + (" and embellishing it..." if llm_provider else "..."))
     try:
-        timeline_dict = generate_timeline(enriched_prompt, provider=llm_provider)
+        timeline_dict = choreograph(analysis, llm_provider, prompt=args.prompt, response_cache=response_cache,
+                                    segment_ms=int(args.segment * 1000))
     except ValueError as exc:
         print(f"ERROR: Timeline generation failed — {exc}", file=sys.stderr)
         return 1
     except Exception as exc:
         print(f"ERROR: Unexpected error during generation — {exc}", file=sys.stderr)
         return 1
+    print(f"  {len(timeline_dict['commands'])} commands")
     
     # Inject audio_file metadata
     timeline_dict["audio_file"] = audio_filename
@@ -0,0 +1,76 @@
+"""
+On-disk cache of LLM responses for Mr. Pumpkin timeline generation.
+
+Generating a timeline from the same prompt with the same provider, model
+and system prompt gives an equally good answer every time, so the raw
+response is kept and replayed instead of paying for another request.
+Entries expire after a time to live, and the least recently used ones are
+evicted when the cache grows past its size limit.
+
+Usage:
+    from skill.response_cache import ResponseCache
+    timeline_dict = generate_timeline(prompt, provider=provider, cache=ResponseCache())
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from skill.disk_cache import DiskCache, default_cache_dir
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_TTL_S = 7 * 24 * 3600
+CACHE_FORMAT = 1  # Bump when the stored layout changes
+
+
+class ResponseCache(DiskCache):
+    """Store of raw LLM responses keyed by provider, model and prompts.
+
+    The system prompt is part of the key through its hash, so editing it
+    (or the command vocabulary it describes) never replays old responses.
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike | None = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_s: float = DEFAULT_TTL_S):
+        super().__init__(cache_dir if cache_dir is not None else default_cache_dir("responses"), max_bytes)
+        self.ttl_s = ttl_s
+
+    def key(self, identity: dict, system_prompt: str, user_prompt: str) -> str:
+        """Cache key for one request.
+
+        Args:
+            identity: Provider settings that shape the response
+                (LLMProvider.cache_identity())
+            system_prompt: System prompt sent with the request
+            user_prompt: User prompt sent with the request
+        """
+        material = json.dumps({
+            "format": CACHE_FORMAT,
+            "system": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            "prompt": user_prompt,
+            **identity,
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Cached response text, or None on a miss (expired entries are dropped)."""
+        data = self.read(key)
+        if data is None:
+            return None
+        try:
+            if time.time() - data["created"] > self.ttl_s:
+                self.discard(key)
+                return None
+            return data["response"]
+        except (KeyError, TypeError) as e:
+            self.discard(key, e)
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response, then evict old entries if over the size limit.
+
+        Raises:
+            OSError: If the cache directory can't be written
+        """
+        self.write(key, {"created": time.time(), "response": response})
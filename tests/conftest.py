@@ -4,3 +4,17 @@ import pytest
 
 # Add parent directory to Python path so tests can import pumpkin_face module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture
+def save_timeline():
+    """Save a recording built from (time_ms, command[, args]) tuples."""
+    from timeline import Timeline
+
+    def save(dir_path, name, commands, duration_ms):
+        timeline = Timeline()
+        for time_ms, cmd, *args in commands:
+            timeline.add_command(time_ms, cmd, args[0] if args else None)
+        timeline.duration_ms = duration_ms
+        timeline.save(dir_path / f"{name}.json")
+    return save
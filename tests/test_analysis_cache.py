@@ -0,0 +1,126 @@
+"""
+Test suite for skill/analysis_cache.py — on-disk audio analysis cache.
+
+Tests that analyses are stored by audio content and provider settings, that
+the cache stays within its size limit, and that the lip-sync CLI skips
+analysis on a hit.
+
+Test Coverage:
+- Round trip of an AudioAnalysis; renamed copies hit, edited audio misses
+- Provider identity (model, prompts, local settings) is part of the key
+- Corrupt entries are dropped; least recently used entries are evicted
+- lipsync_cli reuses the cached analysis across --prompt changes
+- --no-cache always re-analyzes
+"""
+
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from skill.analysis_cache import AnalysisCache, default_cache_dir
+from skill.audio_analyzer import (AudioAnalysis, BeatEvent, LocalAudioProvider, PauseSegment,
+                                  WordTiming)
+from skill.lipsync_cli import main
+
+
+def make_analysis(audio_path="song.mp3", emotion="happy"):
+    return AudioAnalysis(
+        speech_segments=[WordTiming("boo", 100, 400, "round_vowel")],
+        beats=[BeatEvent(500, "bar1")],
+        pauses=[PauseSegment(400, 900, 500)],
+        emotion=emotion,
+        duration_ms=2000,
+        audio_path=audio_path,
+    )
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"ID3 audio bytes")
+    return path
+
+
+def test_round_trip_by_content(tmp_path, audio):
+    cache = AnalysisCache(tmp_path / "cache")
+    key = cache.key(str(audio), {"provider": "gemini", "model": "m"})
+    assert cache.get(key) is None
+
+    cache.put(key, make_analysis(str(audio)))
+
+    copy = tmp_path / "renamed.mp3"
+    copy.write_bytes(audio.read_bytes())
+    copy_key = cache.key(str(copy), {"provider": "gemini", "model": "m"})
+    assert copy_key == key
+    assert cache.get(copy_key, audio_path=str(copy)) == make_analysis(str(copy))
+
+    audio.write_bytes(b"ID3 edited audio")
+    assert cache.key(str(audio), {"provider": "gemini", "model": "m"}) != key
+
+
+def test_identity_is_part_of_key(tmp_path, audio):
+    cache = AnalysisCache(tmp_path)
+
+    assert cache.key(str(audio), {"provider": "gemini", "model": "a"}) != \
+        cache.key(str(audio), {"provider": "gemini", "model": "b"})
+    assert LocalAudioProvider().cache_identity() != LocalAudioProvider(silence_db=-20).cache_identity()
+
+
+def test_corrupt_entry_dropped(tmp_path, audio):
+    cache = AnalysisCache(tmp_path)
+    key = cache.key(str(audio), {})
+    (tmp_path / f"{key}.json").write_text("{not json")
+
+    assert cache.get(key) is None
+    assert not (tmp_path / f"{key}.json").exists()
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = AnalysisCache(tmp_path, max_bytes=10 ** 6)
+    for name in ("a", "b", "c"):
+        cache.put(name, make_analysis())
+    entry_size = (tmp_path / "a.json").stat().st_size
+    old = time.time() - 100
+    for age, name in enumerate(("a", "b", "c")):
+        os.utime(tmp_path / f"{name}.json", (old + age, old + age))
+    assert cache.get("a") is not None  # Now the most recently used
+
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["a", "c"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_default_dir_from_environment(tmp_path):
+    with patch.dict(os.environ, {"MR_PUMPKIN_CACHE_DIR": str(tmp_path)}):
+        assert default_cache_dir() == tmp_path / "analysis"
+
+
+def run_lipsync(audio, cache_dir, *extra):
+    provider = MagicMock()
+    provider.cache_identity.return_value = {"provider": "gemini", "model": "m"}
+    provider.analyze_audio.return_value = make_analysis(str(audio))
+    with patch("skill.lipsync_cli.get_audio_provider", return_value=provider), \
+         patch("skill.lipsync_cli.GeminiProvider"), \
+         patch("skill.lipsync_cli.generate_timeline", return_value={"commands": []}) as generate:
+        rc = main([str(audio), "--dry-run", "--cache-dir", str(cache_dir), *extra])
+    assert rc == 0
+    return provider.analyze_audio.call_count, generate.call_args[0][0] if generate.called else None
+
+
+def test_cli_reuses_analysis_across_prompts(tmp_path, audio):
+    assert run_lipsync(audio, tmp_path / "cache", "--prompt", "spooky")[0] == 1
+
+    calls, prompt = run_lipsync(audio, tmp_path / "cache", "--prompt", "joyful")
+
+    assert calls == 0
+    assert "joyful" in prompt and "boo" in prompt
+
+
+def test_cli_no_cache(tmp_path, audio):
+    run_lipsync(audio, tmp_path / "cache")
+
+    assert run_lipsync(audio, tmp_path / "cache", "--no-cache")[0] == 1
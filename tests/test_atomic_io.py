@@ -0,0 +1,158 @@
+"""
+Test suite for crash-safe file writes.
+
+Tests that AtomicWriter only ever exposes complete files, that exclusive
+writes never replace an existing file, and that directory syncs of one
+directory are coalesced.
+
+Test Coverage:
+- Commit replaces the destination; a failed write leaves the old file
+- Concurrent writers use separate temporary files
+- Exclusive commits fail if the destination appeared meanwhile
+- Directory syncs within the delay window share one fsync
+- Timeline.save, uploads, audio uploads and record_stop write atomically
+"""
+
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from atomic_io import AtomicWriter, atomic_write, flush_directory_syncs, sync_directory
+from timeline import FileManager, RecordingSession, Timeline
+
+
+def leftovers(directory):
+    return [p.name for p in directory.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_commit_replaces_destination(tmp_path):
+    path = tmp_path / "show.json"
+    path.write_text("old")
+
+    with AtomicWriter(path) as f:
+        f.write("new")
+        assert path.read_text() == "old"  # Not visible until committed
+
+    assert path.read_text() == "new"
+    assert leftovers(tmp_path) == []
+
+
+def test_failed_write_keeps_old_file(tmp_path):
+    path = tmp_path / "show.json"
+    path.write_text("old")
+
+    with pytest.raises(RuntimeError):
+        with AtomicWriter(path) as f:
+            f.write("half")
+            raise RuntimeError("power cut")
+
+    assert path.read_text() == "old"
+    assert leftovers(tmp_path) == []
+
+
+def test_concurrent_writers_use_separate_temp_files(tmp_path):
+    first = AtomicWriter(tmp_path / "show.json")
+    second = AtomicWriter(tmp_path / "show.json")
+
+    assert first.tmp_path != second.tmp_path
+    first.file.write("first")
+    second.file.write("second")
+    first.commit()
+    second.commit()
+    assert (tmp_path / "show.json").read_text() == "second"
+
+
+def test_exclusive_commit_refuses_existing_file(tmp_path):
+    writer = AtomicWriter(tmp_path / "clip.wav", 'wb', exclusive=True)
+    writer.file.write(b"mine")
+    (tmp_path / "clip.wav").write_bytes(b"theirs")  # Another upload finished first
+
+    with pytest.raises(FileExistsError):
+        writer.commit()
+
+    assert (tmp_path / "clip.wav").read_bytes() == b"theirs"
+    assert leftovers(tmp_path) == []
+
+
+def test_exclusive_commit_without_hard_links(tmp_path):
+    with patch("atomic_io.os.link", side_effect=PermissionError("no links")):
+        atomic_write(tmp_path / "a.json", "data", exclusive=True)
+        with pytest.raises(FileExistsError):
+            atomic_write(tmp_path / "a.json", "other", exclusive=True)
+
+    assert (tmp_path / "a.json").read_text() == "data"
+    assert leftovers(tmp_path) == []
+
+
+def test_directory_syncs_are_coalesced(tmp_path):
+    flush_directory_syncs()  # Syncs left pending by earlier writes
+    synced = []
+    with patch("atomic_io._fsync_directory", side_effect=synced.append):
+        for i in range(20):
+            atomic_write(tmp_path / f"clip{i}.json", "{}")
+        assert synced == []
+        flush_directory_syncs()
+        assert synced == [str(tmp_path)]
+
+        sync_directory(tmp_path, delay_s=0)
+        assert synced == [str(tmp_path)] * 2
+
+
+def test_directory_sync_timer_fires(tmp_path):
+    done = threading.Event()
+    with patch("atomic_io._fsync_directory", side_effect=lambda d: done.set()):
+        sync_directory(tmp_path, delay_s=0.01)
+        assert done.wait(2)
+
+
+def test_timeline_save_is_atomic(tmp_path):
+    timeline = Timeline()
+    timeline.add_command(0, "blink")
+    timeline.save(tmp_path / "show.json")
+
+    with patch("atomic_io.os.replace", side_effect=OSError("disk full")):
+        timeline.add_command(100, "wink_left")
+        with pytest.raises(OSError):
+            timeline.save(tmp_path / "show.json")
+
+    assert [c.command for c in Timeline.load(tmp_path / "show.json").commands] == ["blink"]
+    assert leftovers(tmp_path) == []
+
+
+def test_upload_loses_race_cleanly(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+    upload = manager.open_upload("lips")
+    upload.write('{"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}]}')
+    manager.upload_timeline("lips", '{"version": "1.0", "commands": []}')
+
+    with pytest.raises(FileExistsError, match="lips.json"):
+        upload.finish()
+
+    assert Timeline.load(tmp_path / "lips.json").commands == []
+    assert leftovers(tmp_path) == []
+
+
+def test_upload_audio_is_exclusive(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+    manager.upload_audio("song.mp3", b"ID3")
+
+    with pytest.raises(FileExistsError, match="Audio file already exists"):
+        manager.upload_audio("song.mp3", b"other")
+
+    assert (tmp_path / "song.mp3").read_bytes() == b"ID3"
+
+
+def test_record_stop_does_not_replace_file(tmp_path):
+    session = RecordingSession(recordings_dir=tmp_path)
+    session.start()
+    session.record_command("blink")
+
+    original = os.path.exists
+    with patch("pathlib.Path.exists", lambda self: False if self.name == "take.json" else original(self)):
+        (tmp_path / "take.json").write_text("keep")
+        with pytest.raises(FileExistsError, match="take.json"):
+            session.stop("take")
+
+    assert (tmp_path / "take.json").read_text() == "keep"
@@ -3,7 +3,8 @@ Test suite for skill/audio_analyzer.py — Audio Analysis Provider (Issue #72)
 
 Tests the AudioAnalysisProvider ABC and GeminiAudioProvider implementation.
 Validates contract enforcement, Gemini API mocking, phoneme mapping, beat/pause
-detection, error handling, and file cleanup behavior.
+detection, error handling, file cleanup behavior, concurrent analysis passes,
+and windowed analysis of long audio.
 
 Author: Mylo (Tester)
 Date: 2026-03-05
@@ -14,6 +15,7 @@ import pytest
 import json
 import os
 import sys
+import time
 from unittest.mock import Mock, patch, MagicMock, call
 from abc import ABC
 
@@ -29,7 +31,8 @@ try:
         get_provider,
         WordTiming,
         BeatEvent,
-        PauseSegment
+        PauseSegment,
+        EMOTION_PROMPT,
     )
     SKILL_AVAILABLE = True
 except ImportError:
@@ -75,6 +78,16 @@ def _make_mock_gemini_response(analysis_json, emotion):
     return mock_response, mock_emotion_response
 
 
+def _by_prompt(timing_responses, emotion_response):
+    """side_effect answering each pass by its prompt (the passes run concurrently)."""
+    timing = iter(timing_responses)
+
+    def respond(*args, **kwargs):
+        request = str(kwargs.get("contents") or kwargs.get("messages"))
+        return emotion_response if EMOTION_PROMPT.splitlines()[0] in request else next(timing)
+    return respond
+
+
 # ============================================================================
 # AudioAnalysis DATACLASS TESTS
 # ============================================================================
@@ -237,7 +250,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         # Create provider and analyze
         provider = GeminiAudioProvider(api_key="test_key")
@@ -265,7 +278,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -295,7 +308,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -324,7 +337,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -352,7 +365,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, "excited"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -382,11 +395,10 @@ class TestGeminiAudioProvider:
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
         
-        mock_client.models.generate_content.side_effect = [
-            bad_response,  # First attempt fails
-            good_response,  # Retry succeeds
+        mock_client.models.generate_content.side_effect = _by_prompt(
+            [bad_response, good_response],  # First attempt fails, retry succeeds
             emotion_response  # Emotion pass
-        ]
+        )
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -439,7 +451,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         provider.analyze_audio(str(audio_file), "test prompt")
@@ -466,7 +478,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             SAMPLE_ANALYSIS_JSON, SAMPLE_EMOTION
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         provider.analyze_audio(str(audio_file), "test prompt")
@@ -498,7 +510,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             empty_analysis, "neutral"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -534,7 +546,7 @@ class TestGeminiAudioProvider:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             speech_only_analysis, "neutral"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -612,7 +624,7 @@ class TestPhonemeGroupMapping:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             bilabial_analysis, "neutral"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -648,7 +660,7 @@ class TestPhonemeGroupMapping:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             open_vowel_analysis, "neutral"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -684,7 +696,7 @@ class TestPhonemeGroupMapping:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             spread_vowel_analysis, "neutral"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -720,7 +732,7 @@ class TestPhonemeGroupMapping:
         mock_response, mock_emotion_response = _make_mock_gemini_response(
             round_vowel_analysis, "neutral"
         )
-        mock_client.models.generate_content.side_effect = [mock_response, mock_emotion_response]
+        mock_client.models.generate_content.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = GeminiAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -760,7 +772,7 @@ class TestOpenAIAudioProvider:
         mock_emotion_response.choices = [Mock()]
         mock_emotion_response.choices[0].message.content = SAMPLE_EMOTION
         
-        mock_client.chat.completions.create.side_effect = [mock_response, mock_emotion_response]
+        mock_client.chat.completions.create.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         # Create provider and analyze
         provider = OpenAIAudioProvider(api_key="test_key")
@@ -792,7 +804,7 @@ class TestOpenAIAudioProvider:
         mock_emotion_response.choices = [Mock()]
         mock_emotion_response.choices[0].message.content = SAMPLE_EMOTION
         
-        mock_client.chat.completions.create.side_effect = [mock_response, mock_emotion_response]
+        mock_client.chat.completions.create.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = OpenAIAudioProvider(api_key="test_key")
         provider.analyze_audio(str(audio_file), "test prompt")
@@ -839,7 +851,7 @@ class TestOpenAIAudioProvider:
         mock_emotion_response.choices = [Mock()]
         mock_emotion_response.choices[0].message.content = SAMPLE_EMOTION
         
-        mock_client.chat.completions.create.side_effect = [mock_response, mock_emotion_response]
+        mock_client.chat.completions.create.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = OpenAIAudioProvider(api_key="test_key")
         provider.analyze_audio(str(audio_file), "test prompt")
@@ -870,7 +882,7 @@ class TestOpenAIAudioProvider:
         mock_emotion_response.choices = [Mock()]
         mock_emotion_response.choices[0].message.content = SAMPLE_EMOTION
         
-        mock_client.chat.completions.create.side_effect = [mock_response, mock_emotion_response]
+        mock_client.chat.completions.create.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = OpenAIAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -911,11 +923,10 @@ class TestOpenAIAudioProvider:
         emotion_response.choices = [Mock()]
         emotion_response.choices[0].message.content = SAMPLE_EMOTION
         
-        mock_client.chat.completions.create.side_effect = [
-            bad_response,  # First attempt fails
-            good_response,  # Retry succeeds
+        mock_client.chat.completions.create.side_effect = _by_prompt(
+            [bad_response, good_response],  # First attempt fails, retry succeeds
             emotion_response  # Emotion pass
-        ]
+        )
         
         provider = OpenAIAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
@@ -959,9 +970,360 @@ class TestOpenAIAudioProvider:
         mock_emotion_response.choices = [Mock()]
         mock_emotion_response.choices[0].message.content = "excited"
         
-        mock_client.chat.completions.create.side_effect = [mock_response, mock_emotion_response]
+        mock_client.chat.completions.create.side_effect = _by_prompt([mock_response], mock_emotion_response)
         
         provider = OpenAIAudioProvider(api_key="test_key")
         result = provider.analyze_audio(str(audio_file), "test prompt")
         
         assert result.emotion == "excited"
+
+
+# ============================================================================
+# CONCURRENT PASS TESTS
+# ============================================================================
+
+class _StubGeminiClient:
+    """Gemini client stub whose generate_content takes real time."""
+
+    def __init__(self, timing_text, emotion_text, delay_s=0.3, emotion_error=None):
+        self.files = Mock()
+        self.files.upload.return_value = Mock(uri="https://example.test/files/a")
+        self.files.upload.return_value.name = "files/a"
+        self.files.get.return_value.state = "ACTIVE"
+        self.models = Mock()
+        self.models.generate_content.side_effect = self._generate
+        self.timing_calls = 0
+        self._timing_text = timing_text
+        self._emotion_text = emotion_text
+        self._delay_s = delay_s
+        self._emotion_error = emotion_error
+
+    def _generate(self, model, contents):
+        if contents[-1] == EMOTION_PROMPT:
+            if self._emotion_error is not None:
+                raise self._emotion_error
+            time.sleep(self._delay_s)
+            return Mock(text=self._emotion_text)
+        self.timing_calls += 1
+        time.sleep(self._delay_s)
+        return Mock(text=self._timing_text)
+
+
+class TestConcurrentPasses:
+    """The timing and emotion passes overlap and fail together."""
+
+    @patch('google.genai.Client')
+    def test_gemini_passes_overlap(self, mock_client_class, tmp_path):
+        """Analysis takes about as long as one pass, not two."""
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"fake audio data")
+        mock_client_class.return_value = _StubGeminiClient(json.dumps(SAMPLE_ANALYSIS_JSON), "happy")
+
+        start = time.monotonic()
+        result = GeminiAudioProvider(api_key="test_key").analyze_audio(str(audio_file))
+
+        assert time.monotonic() - start < 0.5
+        assert result.emotion == "happy"
+        assert len(result.speech_segments) == len(SAMPLE_ANALYSIS_JSON["speech_segments"])
+
+    @patch('google.genai.Client')
+    def test_gemini_failure_cleans_up_and_cancels_retry(self, mock_client_class, tmp_path):
+        """A failed emotion pass deletes the upload at once; the timing retry is skipped."""
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"fake audio data")
+        client = _StubGeminiClient("not json", "happy", emotion_error=RuntimeError("quota"))
+        mock_client_class.return_value = client
+
+        start = time.monotonic()
+        with pytest.raises(RuntimeError, match="quota"):
+            GeminiAudioProvider(api_key="test_key").analyze_audio(str(audio_file))
+
+        assert time.monotonic() - start < 0.25  # Didn't wait for the slow timing pass
+        client.files.delete.assert_called_once_with(name="files/a")
+        time.sleep(0.5)
+        assert client.timing_calls == 1  # Malformed reply, but no retry after the failure
+
+    @patch('openai.OpenAI')
+    def test_openai_passes_overlap(self, mock_openai_class, tmp_path):
+        """OpenAI timing and emotion requests are issued concurrently."""
+        from skill.audio_analyzer import OpenAIAudioProvider
+        audio_file = tmp_path / "test.mp3"
+        audio_file.write_bytes(b"fake audio data")
+
+        def create(model, modalities, messages):
+            time.sleep(0.3)
+            is_emotion = messages[0]["content"][1]["text"] == EMOTION_PROMPT
+            content = "solemn" if is_emotion else json.dumps(SAMPLE_ANALYSIS_JSON)
+            return Mock(choices=[Mock(message=Mock(content=content))])
+
+        mock_openai_class.return_value.chat.completions.create.side_effect = create
+
+        start = time.monotonic()
+        result = OpenAIAudioProvider(api_key="test_key").analyze_audio(str(audio_file))
+
+        assert time.monotonic() - start < 0.5
+        assert result.emotion == "solemn"
+
+
+# ============================================================================
+# LOCAL (OFFLINE) PROVIDER TESTS
+# ============================================================================
+
+def _write_wav(path, samples, sample_rate=22050, width=2):
+    """Write mono float samples in [-1, 1] as a PCM WAV file."""
+    import wave
+    np = pytest.importorskip("numpy")
+    scale = (1 << (8 * width - 1)) - 1
+    ints = (np.clip(samples, -1, 1) * scale).astype("<i4")
+    if width == 3:
+        data = ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()  # Low three bytes of each sample
+    else:
+        data = ints.astype(f"<i{width}").tobytes()
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(width)
+        wf.setframerate(sample_rate)
+        wf.writeframes(data)
+
+
+class TestLocalAudioProvider:
+    """LocalAudioProvider: offline NumPy analysis of synthetic audio."""
+
+    @pytest.fixture
+    def np(self):
+        return pytest.importorskip("numpy")
+
+    def test_get_provider_local(self, np):
+        """get_provider('local') returns LocalAudioProvider and ignores API keys."""
+        from skill.audio_analyzer import LocalAudioProvider
+
+        provider = get_provider("local", api_key="unused", model="unused")
+
+        assert isinstance(provider, LocalAudioProvider)
+
+    def test_beats_at_track_tempo(self, np, tmp_path):
+        """A 120 BPM click track yields beats every 500ms with a bar1 every 4 beats."""
+        from skill.audio_analyzer import LocalAudioProvider
+        rate = 22050
+        rng = np.random.default_rng(1)
+        samples = 0.01 * rng.standard_normal(rate * 20)
+        click = rng.standard_normal(int(0.05 * rate)) * np.exp(-np.arange(int(0.05 * rate)) / (0.01 * rate))
+        for k in range(40):
+            start = int(k * 0.5 * rate)
+            samples[start:start + len(click)] += click * (1.0 if k % 4 == 0 else 0.5)
+        _write_wav(tmp_path / "clicks.wav", samples, rate)
+
+        result = LocalAudioProvider().analyze_audio(str(tmp_path / "clicks.wav"))
+
+        times = [b.time_ms for b in result.beats]
+        assert len(times) >= 36
+        assert np.median(np.diff(times)) == pytest.approx(500, abs=20)
+        assert all(abs(t - round(t / 500) * 500) <= 30 for t in times)
+        bar1 = [b.time_ms for b in result.beats if b.strength == "bar1"]
+        assert np.median(np.diff(bar1)) == pytest.approx(2000, abs=40)
+        assert result.duration_ms == 20000
+        assert result.emotion == "excited"
+
+    def test_pauses_and_segments(self, np, tmp_path):
+        """Tone bursts separated by silence give pauses and one segment per burst."""
+        from skill.audio_analyzer import LocalAudioProvider
+        rate = 16000
+        samples = np.zeros(rate * 3)
+        tone = np.arange(int(0.2 * rate)) / rate
+        bursts = [(0.2, 300), (0.5, 3000), (1.3, 300)]  # (start s, frequency Hz)
+        for start, freq in bursts:
+            i = int(start * rate)
+            samples[i:i + len(tone)] += 0.5 * np.sin(2 * np.pi * freq * tone)
+        _write_wav(tmp_path / "speech.wav", samples, rate, width=3)
+
+        result = LocalAudioProvider().analyze_audio(str(tmp_path / "speech.wav"))
+
+        assert len(result.pauses) == 1
+        pause = result.pauses[0]
+        assert pause.start_ms == pytest.approx(700, abs=20)
+        assert pause.end_ms == pytest.approx(1300, abs=20)
+        assert [(s.start_ms // 10 * 10, s.phoneme_group) for s in result.speech_segments] == [
+            (200, "round_vowel"), (500, "spread_vowel"), (1300, "round_vowel")]
+        assert result.beats == []
+
+    def test_silence(self, np, tmp_path):
+        """Silent audio has no events."""
+        from skill.audio_analyzer import LocalAudioProvider
+        _write_wav(tmp_path / "quiet.wav", np.zeros(22050), 22050)
+
+        result = LocalAudioProvider().analyze_audio(str(tmp_path / "quiet.wav"))
+
+        assert (result.speech_segments, result.beats, result.pauses) == ([], [], [])
+        assert result.emotion == "neutral"
+
+    def test_non_wav_without_ffmpeg_raises(self, np, tmp_path):
+        """Formats other than WAV need ffmpeg."""
+        from skill.audio_analyzer import LocalAudioProvider
+        (tmp_path / "song.mp3").write_bytes(b"ID3")
+
+        with patch("shutil.which", return_value=None):
+            with pytest.raises(ValueError, match="ffmpeg"):
+                LocalAudioProvider().analyze_audio(str(tmp_path / "song.mp3"))
+
+    def test_missing_file(self, np):
+        from skill.audio_analyzer import LocalAudioProvider
+        with pytest.raises(FileNotFoundError):
+            LocalAudioProvider().analyze_audio("/nonexistent.wav")
+
+
+# ============================================================================
+# WINDOWED (LONG AUDIO) PROVIDER TESTS
+# ============================================================================
+
+class _TimecodeProvider(AudioAnalysisProvider):
+    """Stub provider for timecode WAVs (1 kHz, each sample holds its own ms).
+
+    Reports the ground-truth events that lie wholly inside the window it is
+    given, relative to the window start, like a real provider would.
+    """
+
+    def __init__(self, words, beats, pauses, delay_s=0.0, fail_at_ms=None):
+        import threading
+        self.words, self.beats, self.pauses = words, beats, pauses
+        self.delay_s = delay_s
+        self.fail_at_ms = fail_at_ms
+        self.calls = []
+        self.active = self.max_active = 0
+        self._lock = threading.Lock()
+
+    def analyze_audio(self, audio_path, prompt=""):
+        import wave
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            with wave.open(audio_path, "rb") as wf:
+                n = wf.getnframes()
+                codes = wf.readframes(n)
+            start = int.from_bytes(codes[:4], "little")
+            end = start + n
+            self.calls.append((start, end))
+            time.sleep(self.delay_s)
+            if self.fail_at_ms is not None and start <= self.fail_at_ms < end:
+                raise RuntimeError("window failed")
+            inside = lambda a, b: start <= a and b <= end
+            return AudioAnalysis(
+                speech_segments=[WordTiming(w.word, w.start_ms - start, w.end_ms - start, w.phoneme_group)
+                                 for w in self.words if inside(w.start_ms, w.end_ms)],
+                beats=[BeatEvent(b.time_ms - start, b.strength) for b in self.beats if inside(b.time_ms, b.time_ms)],
+                pauses=[PauseSegment(p.start_ms - start, p.end_ms - start, p.duration_ms)
+                        for p in self.pauses if inside(p.start_ms, p.end_ms)],
+                emotion="sad" if start > 200_000 else "happy",
+                duration_ms=n,
+                audio_path=audio_path,
+            )
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _write_timecode_wav(path, duration_ms):
+    import struct
+    import wave
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(4)
+        wf.setframerate(1000)
+        wf.writeframes(struct.pack(f"<{duration_ms}i", *range(duration_ms)))
+
+
+class TestWindowedAudioProvider:
+    """Long audio is analysed as parallel windows and stitched back together."""
+
+    WORDS = [WordTiming(f"w{i}", t, t + 300, "open_vowel") for i, t in enumerate(range(100, 299_000, 700))]
+    BEATS = [BeatEvent(t, "bar1" if t % 2000 == 0 else "normal") for t in range(0, 300_000, 500)]
+    PAUSES = [PauseSegment(t, t + 500, 500) for t in range(10_000, 300_000, 25_000)]
+
+    def _provider(self, **kwargs):
+        return _TimecodeProvider(self.WORDS, self.BEATS, self.PAUSES, **kwargs)
+
+    def test_short_audio_analysed_whole(self, tmp_path):
+        from skill.audio_analyzer import WindowedAudioProvider
+        audio_file = tmp_path / "short.wav"
+        _write_timecode_wav(audio_file, 30_000)
+        inner = self._provider()
+
+        WindowedAudioProvider(inner, window_ms=60_000, overlap_ms=5_000).analyze_audio(str(audio_file))
+
+        assert inner.calls == [(0, 30_000)]
+
+    def test_windows_stitched_without_duplicates(self, tmp_path):
+        from skill.audio_analyzer import WindowedAudioProvider
+        audio_file = tmp_path / "long.wav"
+        _write_timecode_wav(audio_file, 300_000)
+        inner = self._provider()
+
+        result = WindowedAudioProvider(inner, window_ms=60_000, overlap_ms=10_000).analyze_audio(str(audio_file))
+
+        windows = sorted(inner.calls)
+        assert len(windows) == 6
+        assert all(b[0] < a[1] - 9_000 for a, b in zip(windows, windows[1:]))  # Overlapping
+        assert result.speech_segments == self.WORDS
+        assert result.beats == self.BEATS
+        assert result.pauses == self.PAUSES
+        assert result.duration_ms == 300_000
+        assert result.emotion == "happy"
+        assert result.audio_path == str(audio_file)
+
+    def test_near_duplicates_merged(self):
+        from skill.audio_analyzer import WindowedAudioProvider
+        provider = WindowedAudioProvider(Mock(), window_ms=60_000, overlap_ms=10_000)
+
+        words = provider._dedupe_words([WordTiming("Boo", 1000, 1300, "round_vowel"),
+                                        WordTiming("boo", 1040, 1310, "round_vowel"),
+                                        WordTiming("boo", 1500, 1800, "round_vowel")])
+        beats = provider._dedupe_beats([BeatEvent(1000, "normal"), BeatEvent(1030, "bar1"), BeatEvent(1500, "normal")])
+        pauses = provider._merge_pauses([PauseSegment(0, 500, 500), PauseSegment(400, 900, 500)])
+
+        assert [w.start_ms for w in words] == [1000, 1500]
+        assert beats == [BeatEvent(1000, "bar1"), BeatEvent(1500, "normal")]
+        assert pauses == [PauseSegment(0, 900, 900)]
+
+    def test_windows_run_in_parallel_with_bounded_concurrency(self, tmp_path):
+        from skill.audio_analyzer import WindowedAudioProvider
+        audio_file = tmp_path / "long.wav"
+        _write_timecode_wav(audio_file, 300_000)
+        inner = self._provider(delay_s=0.2)
+
+        start = time.monotonic()
+        WindowedAudioProvider(inner, window_ms=60_000, overlap_ms=10_000, max_workers=3).analyze_audio(str(audio_file))
+
+        assert time.monotonic() - start < 0.9  # 6 windows, 3 at a time: ~0.4s rather than 1.2s
+        assert inner.max_active == 3
+
+    def test_window_failure_raises(self, tmp_path):
+        from skill.audio_analyzer import WindowedAudioProvider
+        audio_file = tmp_path / "long.wav"
+        _write_timecode_wav(audio_file, 300_000)
+
+        with pytest.raises(RuntimeError, match="window failed"):
+            WindowedAudioProvider(self._provider(fail_at_ms=150_000), window_ms=60_000,
+                                  overlap_ms=10_000).analyze_audio(str(audio_file))
+
+    def test_failure_waits_for_running_windows(self, tmp_path):
+        """Windows still running when another fails keep their files until they finish."""
+        from skill.audio_analyzer import WindowedAudioProvider
+        audio_file = tmp_path / "long.wav"
+        _write_timecode_wav(audio_file, 300_000)
+        inner = self._provider(fail_at_ms=10_000)
+        analyze = inner.analyze_audio
+        files_present = []
+
+        def slow_analyze(audio_path, prompt=""):
+            if not audio_path.endswith("window000.wav"):
+                time.sleep(0.2)
+                files_present.append(os.path.exists(audio_path))
+            return analyze(audio_path, prompt)
+
+        inner.analyze_audio = slow_analyze
+        with pytest.raises(RuntimeError, match="window failed"):
+            WindowedAudioProvider(inner, window_ms=60_000, overlap_ms=10_000,
+                                  max_workers=3).analyze_audio(str(audio_file))
+
+        assert files_present == [True, True]  # The two running windows; queued ones were cancelled
+        assert inner.active == 0
@@ -0,0 +1,126 @@
+"""
+Test suite for skill/choreographer.py — rule-based lip-sync choreography.
+
+Tests that compile_lipsync_timeline() turns an AudioAnalysis into a valid,
+reproducible timeline following the lip-sync rules, and that the LLM pass
+is only used for embellishment.
+
+Test Coverage:
+- Visemes at word starts, mouth_closed at word ends, mouth_neutral at the end
+- Eyebrow and head reactions on strong and bar1 beats
+- Blinks in pauses of 400ms or more, gaze shifts at phrase breaks
+- Emotion mapped to a face expression; output loads as a Timeline
+- Same analysis, same timeline
+- merge_embellishments keeps the compiled mouth track
+- lipsync_cli skips the LLM without --prompt/--embellish
+"""
+
+from unittest.mock import MagicMock, patch
+
+from skill.audio_analyzer import AudioAnalysis, BeatEvent, PauseSegment, WordTiming
+from skill.choreographer import compile_lipsync_timeline, merge_embellishments
+from skill.lipsync_cli import main
+from timeline import Timeline
+
+
+def make_analysis(emotion="excited"):
+    return AudioAnalysis(
+        speech_segments=[
+            WordTiming("boo", 100, 400, "round_vowel"),
+            WordTiming("eek", 400, 700, "spread_vowel"),  # Starts as "boo" ends
+            WordTiming("ha", 1600, 1900, "open_vowel"),
+        ],
+        beats=[BeatEvent(0, "bar1"), BeatEvent(150, "strong"), BeatEvent(500, "normal"), BeatEvent(2000, "bar1")],
+        pauses=[PauseSegment(700, 1600, 900), PauseSegment(1900, 2200, 300)],
+        emotion=emotion,
+        duration_ms=2500,
+        audio_path="song.mp3",
+    )
+
+
+def at(timeline, command):
+    return [c["time_ms"] for c in timeline["commands"] if c["command"] == command]
+
+
+def test_mouth_track():
+    timeline = compile_lipsync_timeline(make_analysis())
+
+    mouth = [(c["time_ms"], c["command"]) for c in timeline["commands"] if c["command"].startswith("mouth_")]
+    assert mouth == [
+        (100, "mouth_rounded"),
+        (400, "mouth_wide"),  # No mouth_closed between touching words
+        (700, "mouth_closed"),
+        (1600, "mouth_open"),
+        (1900, "mouth_closed"),
+        (1900, "mouth_neutral"),
+    ]
+
+
+def test_beats_pauses_and_expression():
+    timeline = compile_lipsync_timeline(make_analysis())
+
+    assert timeline["commands"][0] == {"time_ms": 0, "command": "set_expression", "args": {"expression": "happy"}}
+    assert at(timeline, "eyebrow_raise") == [0, 150, 2000]
+    assert at(timeline, "eyebrow_reset") == [350, 2200]  # The 0ms raise is held into the 150ms one
+    assert at(timeline, "turn_up") == [0, 2000]
+    assert at(timeline, "center_head") == [250, 2250]
+    assert at(timeline, "blink") == [1000]  # Only the 900ms pause
+    assert at(timeline, "gaze") == [700, 2200]  # Shift at the phrase break, centre after the last pause
+    assert timeline["duration_ms"] == 2550
+
+
+def test_valid_and_reproducible():
+    first = compile_lipsync_timeline(make_analysis("solemn"))
+
+    assert first == compile_lipsync_timeline(make_analysis("solemn"))
+    assert first["commands"][0]["args"] == {"expression": "sad"}
+    times = [c["time_ms"] for c in first["commands"]]
+    assert times == sorted(times)
+    assert len(Timeline.from_dict(first).commands) == len(first["commands"])
+
+
+def test_empty_analysis():
+    timeline = compile_lipsync_timeline(AudioAnalysis([], [], [], "neutral", 0, "x.wav"))
+
+    assert [c["command"] for c in timeline["commands"]] == ["set_expression"]
+    assert timeline["duration_ms"] == 300
+
+
+def test_merge_keeps_compiled_mouth():
+    base = compile_lipsync_timeline(make_analysis())
+    embellished = {
+        "version": "1.0",
+        "duration_ms": 3000,
+        "commands": [
+            {"time_ms": 0, "command": "set_expression", "args": {"expression": "surprised"}},
+            {"time_ms": 120, "command": "mouth_open"},  # LLM drifted off the word timing
+            {"time_ms": 2600, "command": "wink_left"},
+        ],
+    }
+
+    merged = merge_embellishments(base, embellished)
+
+    assert merged["duration_ms"] == 3000
+    assert at(merged, "wink_left") == [2600]
+    assert at(merged, "mouth_open") == [1600]
+    assert at(merged, "mouth_rounded") == [100]
+
+
+def test_cli_compiles_without_llm(tmp_path):
+    audio = tmp_path / "song.mp3"
+    audio.write_bytes(b"ID3")
+    provider = MagicMock()
+    provider.analyze_audio.return_value = make_analysis()
+    with patch("skill.lipsync_cli.get_audio_provider", return_value=provider), \
+         patch("skill.lipsync_cli.GeminiProvider") as gemini, \
+         patch("skill.lipsync_cli.generate_timeline") as generate, \
+         patch("skill.lipsync_cli.upload_audio"), \
+         patch("skill.lipsync_cli.upload_timeline") as upload:
+        rc = main([str(audio), "--no-cache"])
+
+    assert rc == 0
+    gemini.assert_not_called()
+    generate.assert_not_called()
+    uploaded = upload.call_args[0][1]
+    assert uploaded["audio_file"] == "song.mp3"
+    assert at(uploaded, "mouth_rounded") == [100]
@@ -0,0 +1,141 @@
+"""
+Test suite for keyframe curves and tweened timeline commands.
+
+Tests that gaze_to/eyebrow_to/offset_to and *_curve commands are evaluated
+per frame by PumpkinFace instead of needing one command per step.
+
+Test Coverage:
+- Curve evaluation, easing and clamping to the keys
+- Shorthand keyframe values expand to the full track
+- Invalid args raise ValueError
+- *_to commands tween from the current face state
+- Curves keep running across frames and end on their last key
+- Absolute commands on the same feature cancel a running curve
+- Late dispatch starts the curve at its scheduled phase
+- Timeline playback of a curve command
+"""
+
+import pygame
+import pytest
+
+from keyframes import Curve, EASINGS, curve_from_command
+from pumpkin_face import PumpkinFace
+from timeline import Timeline
+
+
+FRAME_MS = 1000.0 / 60.0
+
+
+@pytest.fixture
+def face():
+    pygame.init()
+    face = PumpkinFace(width=1920, height=1080)
+    yield face
+    pygame.quit()
+
+
+def test_curve_linear_interpolation():
+    curve = Curve([(0, (0.0, 10.0)), (100, (10.0, 20.0)), (300, (30.0, 20.0))])
+
+    assert curve.evaluate(-5) == (0.0, 10.0)
+    assert curve.evaluate(50) == (5.0, 15.0)
+    assert curve.evaluate(200) == (20.0, 20.0)
+    assert curve.evaluate(1000) == (30.0, 20.0)
+    assert curve.duration_ms == 300
+
+
+@pytest.mark.parametrize("easing", sorted(EASINGS))
+def test_easings_hit_both_ends(easing):
+    curve = Curve([(0, (0.0,)), (100, (10.0,))], easing)
+
+    assert curve.evaluate(0) == (0.0,)
+    assert curve.evaluate(100) == (10.0,)
+    assert 0.0 <= curve.evaluate(50)[0] <= 10.0
+
+
+def test_ease_in_out_matches_head_movement_cubic():
+    curve = Curve([(0, (0.0,)), (100, (100.0,))], "ease_in_out")
+
+    assert curve.evaluate(25)[0] == pytest.approx(100 * (0.25 * 0.25 * (3 - 0.5)))
+
+
+def test_shorthand_keys_expand():
+    gaze = curve_from_command("gaze_curve", {"keys": [[0, 10, 20], [100, 30, 40]]}, (0, 0, 0, 0))
+    brows = curve_from_command("eyebrow_curve", {"keys": [[0, -10]]}, (0, 0))
+
+    assert gaze.evaluate(0) == (10.0, 20.0, 10.0, 20.0)
+    assert brows.evaluate(0) == (-10.0, -10.0)
+
+
+@pytest.mark.parametrize("command,args", [
+    ("gaze_curve", {}),
+    ("gaze_curve", {"keys": [[0, 1, 2, 3]]}),
+    ("offset_curve", {"keys": [[100, 0, 0], [50, 1, 1]]}),
+    ("offset_curve", {"keys": [[0, 0, 0]], "easing": "bouncy"}),
+    ("eyebrow_to", {"value": 10, "duration_ms": -1}),
+    ("eyebrow_curve", {"keys": [5]}),
+])
+def test_invalid_args_raise(command, args):
+    with pytest.raises(ValueError):
+        curve_from_command(command, args, (0, 0, 0, 0) if command.startswith("gaze") else (0, 0))
+
+
+def test_gaze_to_tweens_from_current_gaze(face):
+    face.set_gaze(-20, 0)
+    face._execute_timeline_command("gaze_to", {"x": 20, "y": 10, "duration_ms": 100, "easing": "linear"})
+
+    assert face.pupil_angle_left == (-20.0, 0.0)
+    for _ in range(3):
+        face.step(FRAME_MS)
+    assert face.pupil_angle_left == pytest.approx((-20 + 40 * 0.5, 5.0))
+
+    for _ in range(10):
+        face.step(FRAME_MS)
+    assert face.pupil_angle_left == (20.0, 10.0)
+    assert face.pupil_angle_right == (20.0, 10.0)
+    assert "gaze" not in face.curves
+
+
+def test_offset_curve_drives_projection_offset(face):
+    face._execute_timeline_command("offset_curve", {"keys": [[0, 0, 0], [100, 100, -50]]})
+
+    for _ in range(3):
+        face.step(FRAME_MS)
+
+    assert face.projection_offset_x == 50
+    assert face.projection_offset_y == -25
+    assert isinstance(face.projection_offset_x, int)
+
+
+def test_absolute_command_cancels_curve(face):
+    face._execute_timeline_command("eyebrow_to", {"value": -40, "duration_ms": 1000})
+    face.step(FRAME_MS)
+
+    face._execute_timeline_command("eyebrow", {"value": 20})
+    face.step(FRAME_MS)
+
+    assert "eyebrow" not in face.curves
+    assert face.eyebrow_left_offset == 20.0
+
+
+def test_late_dispatch_starts_at_phase(face):
+    face._execute_timeline_command("eyebrow_to", {"value": -40, "duration_ms": 100, "easing": "linear"},
+                                   late_ms=25.0)
+
+    assert face.eyebrow_left_offset == pytest.approx(-10.0)
+
+
+def test_curve_from_timeline_playback(tmp_path, face):
+    timeline = Timeline()
+    timeline.add_command(0, "gaze_curve", {"keys": [[0, 0, 0], [500, 45, 0], [1000, 0, 0]]})
+    timeline.duration_ms = 1000
+    timeline.save(tmp_path / "sweep.json")
+    playback = face.timeline_playback
+    playback.recordings_dir = tmp_path
+    playback.play_audio = False
+    playback.play("sweep")
+
+    for _ in range(30):
+        face.step(FRAME_MS)
+
+    assert face.pupil_angle_left[0] == pytest.approx(45.0, abs=1.0)
@@ -0,0 +1,187 @@
+"""
+Test suite for skill/lipsync_batch.py — batch lip-sync pipeline.
+
+Tests that a batch of clips is analysed, choreographed and uploaded as a
+pipeline with per-stage worker limits, retries and resumable progress.
+
+Test Coverage:
+- Clips from a directory or a manifest; clashing names are rejected
+- Stages overlap across clips and respect their worker limits
+- Failed steps are retried with exponential backoff; missing files are not
+- An interrupted batch resumes: uploaded clips are skipped, choreographed
+  ones are only uploaded, edited audio and changed settings start over
+- The CLI runs a directory end to end and writes a report
+"""
+
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from skill.audio_analyzer import AudioAnalysis, WordTiming
+from skill.lipsync_batch import BatchProgress, Clip, LipsyncBatch, find_clips, main
+
+
+@pytest.fixture
+def clips(tmp_path):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    for name in ("a", "b", "c"):
+        (audio_dir / f"{name}.mp3").write_bytes(b"ID3 " + name.encode())
+    return [Clip(audio_dir / f"{name}.mp3", name) for name in ("a", "b", "c")]
+
+
+def make_batch(tmp_path, analyze=None, choreograph=None, upload=None, settings=None, **kwargs):
+    progress = BatchProgress(tmp_path / "state" / "progress.json", settings or {"prompt": ""})
+    return LipsyncBatch(
+        analyze or (lambda clip: f"analysis {clip.name}"),
+        choreograph or (lambda clip, analysis: {"commands": [], "from": analysis}),
+        upload if upload is not None else (lambda clip, timeline: None),
+        progress, tmp_path / "state" / "timelines", sleep=lambda s: None, **kwargs,
+    )
+
+
+def test_find_clips(tmp_path):
+    (tmp_path / "b.wav").write_bytes(b"")
+    (tmp_path / "a.mp3").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("")
+    assert [c.name for c in find_clips(tmp_path)] == ["a", "b"]
+
+    manifest = tmp_path / "season.txt"
+    manifest.write_text("# Episode 1\nb.wav\n\n/abs/c.ogg\n")
+    assert find_clips(manifest) == [Clip(tmp_path / "b.wav", "b"), Clip(tmp_path / "/abs/c.ogg", "c")]
+
+    manifest.write_text("one/intro.mp3\ntwo/intro.mp3\n")
+    with pytest.raises(ValueError, match="intro"):
+        find_clips(manifest)
+
+
+def test_stages_overlap(tmp_path, clips):
+    uploading = threading.Event()
+
+    def analyze(clip):
+        if clip.name == "b":  # Only finishes once clip a is already uploading
+            assert uploading.wait(5)
+        return clip.name
+
+    def upload(clip, timeline):
+        uploading.set()
+
+    results = make_batch(tmp_path, analyze=analyze, upload=upload,
+                         workers={"analyze": 1, "choreograph": 1, "upload": 1}).run(clips[:2])
+
+    assert {name: r["status"] for name, r in results.items()} == {"a": "uploaded", "b": "uploaded"}
+
+
+def test_worker_limits(tmp_path, clips):
+    active = {"analyze": 0, "upload": 0}
+    peak = {"analyze": 0, "upload": 0}
+    lock = threading.Lock()
+
+    def busy(stage):
+        with lock:
+            active[stage] += 1
+            peak[stage] = max(peak[stage], active[stage])
+        time.sleep(0.05)
+        with lock:
+            active[stage] -= 1
+
+    make_batch(tmp_path, analyze=lambda clip: busy("analyze"), upload=lambda clip, t: busy("upload"),
+               workers={"analyze": 2, "upload": 1}).run(clips)
+
+    assert peak == {"analyze": 2, "upload": 1}
+
+
+def test_retries_with_backoff(tmp_path, clips):
+    failures = iter([ConnectionError("busy"), ConnectionError("busy")])
+    delays = []
+
+    def upload(clip, timeline):
+        error = next(failures, None)
+        if error:
+            raise error
+
+    batch = make_batch(tmp_path, upload=upload, retries=3, backoff_s=1.5)
+    batch._sleep = delays.append
+    results = batch.run(clips[:1])
+
+    assert results["a"]["status"] == "uploaded"
+    assert delays == [1.5, 3.0]
+
+
+def test_failure_recorded(tmp_path, clips):
+    calls = []
+
+    def analyze(clip):
+        calls.append(clip.name)
+        if clip.name == "b":
+            raise FileNotFoundError("b.mp3")
+        raise RuntimeError("quota exceeded")
+
+    results = make_batch(tmp_path, analyze=analyze, retries=2).run(clips[:2])
+
+    assert calls.count("a") == 3 and calls.count("b") == 1  # Missing files aren't retried
+    assert results["a"] == {"status": "failed", "audio": str(clips[0].audio_path),
+                            "stage": "analyze", "error": "quota exceeded"}
+    entry = json.loads((tmp_path / "state" / "progress.json").read_text())["clips"]["a"]
+    assert entry["failed_stage"] == "analyze" and entry["attempts"] == 3
+
+
+def test_resume(tmp_path, clips):
+    def upload(clip, timeline):
+        if clip.name == "b":
+            raise ConnectionError("offline")
+
+    make_batch(tmp_path, upload=upload, retries=0).run(clips)
+    clips[2].audio_path.write_bytes(b"ID3 edited")
+
+    analyzed, uploaded = [], {}
+    results = make_batch(
+        tmp_path,
+        analyze=lambda clip: analyzed.append(clip.name) or clip.name,
+        upload=lambda clip, timeline: uploaded.update({clip.name: timeline}),
+    ).run(clips)
+
+    assert results["a"]["status"] == "skipped"
+    assert results["b"]["status"] == "uploaded"
+    assert uploaded["b"] == {"commands": [], "from": "analysis b"}  # Timeline from the first run
+    assert analyzed == ["c"]
+
+    make_batch(tmp_path, analyze=lambda clip: analyzed.append(clip.name) or clip.name,
+               settings={"prompt": "spooky"}).run(clips)
+    assert sorted(analyzed) == ["a", "b", "c", "c"]
+
+
+def test_dry_run_stops_after_choreography(tmp_path, clips):
+    batch = make_batch(tmp_path)
+    batch.upload_fn = None
+
+    results = batch.run(clips[:1])
+
+    assert results["a"]["status"] == "choreographed"
+    assert json.loads((tmp_path / "state" / "timelines" / "a.json").read_text())["from"] == "analysis a"
+
+
+def test_cli_directory(tmp_path, clips):
+    provider = MagicMock()
+    provider.cache_identity.return_value = {"provider": "gemini"}
+    provider.analyze_audio.side_effect = lambda path, prompt="": AudioAnalysis(
+        [WordTiming("boo", 100, 400, "round_vowel")], [], [], "happy", 1000, path)
+    state = tmp_path / "state"
+    with patch("skill.lipsync_cli.get_audio_provider", return_value=provider), \
+         patch("skill.lipsync_batch.upload_audio") as upload_audio, \
+         patch("skill.lipsync_batch.upload_timeline") as upload_timeline:
+        rc = main([str(clips[0].audio_path.parent), "--state-dir", str(state), "--no-cache"])
+
+    assert rc == 0
+    assert sorted(c[0][0] for c in upload_audio.call_args_list) == ["a.mp3", "b.mp3", "c.mp3"]
+    timelines = {c[0][0]: c[0][1] for c in upload_timeline.call_args_list}
+    assert timelines["b"]["audio_file"] == "b.mp3"
+    report = json.loads((state / "report.json").read_text())
+    assert report["counts"] == {"uploaded": 3}
+
+
+def test_cli_no_clips(tmp_path):
+    assert main([str(tmp_path)]) == 2
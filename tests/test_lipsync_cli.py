@@ -204,8 +204,8 @@ class TestLipSyncCLIMain:
         assert "test.mp3" in str(call_args)
 
     def test_calls_generate_timeline(self):
-        """generate_timeline() is called with an enriched prompt."""
-        rc, _, mock_gen, _, _ = self._run_main(["--dry-run"])
+        """With --embellish, generate_timeline() is called with an enriched prompt."""
+        rc, _, mock_gen, _, _ = self._run_main(["--dry-run", "--embellish"])
         assert rc == 0
         mock_gen.assert_called_once()
         prompt_arg = mock_gen.call_args[0][0]
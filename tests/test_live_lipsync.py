@@ -0,0 +1,191 @@
+"""
+Test suite for live amplitude-driven lip-sync.
+
+Tests that LiveLipSync turns a PCM stream into visemes as it arrives and
+that the face applies them on the next frame.
+
+Test Coverage:
+- Silence keeps the mouth released; speech opens it immediately
+- Hysteresis: the mouth stays open between the close and open thresholds
+- Bright (high band) and dark (low band) sounds pick wide and rounded
+- A brief change of shape is ignored; a sustained one is shown
+- Partial samples and stereo streams; release after silence and at stream end,
+  kept pending when the next stream starts before the frame takes it
+- The TCP server and a named pipe feed the tracker; the face applies the
+  viseme on the next step without the command router
+- The listener is opt-in: the face opens no lip-sync socket by default
+"""
+
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import pygame
+import pytest
+
+from live_lipsync import LiveLipSync, LiveLipSyncServer, read_stream
+from pumpkin_face import PumpkinFace
+
+
+RATE = 16000
+
+
+def tone(freq, ms, db=-12.0, channels=1):
+    t = np.arange(int(RATE * ms / 1000)) / RATE
+    samples = 10 ** (db / 20) * np.sqrt(2) * np.sin(2 * np.pi * freq * t)
+    if channels > 1:
+        samples = np.repeat(samples, channels)
+    return (samples * 32767).astype('<i2').tobytes()
+
+
+def silence(ms, channels=1):
+    return bytes(2 * channels * int(RATE * ms / 1000))
+
+
+def wait_until(condition, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_silence_then_speech():
+    lipsync = LiveLipSync()
+
+    assert lipsync.feed(silence(200)) == "neutral"
+    assert lipsync.take() is None
+    assert lipsync.feed(tone(1200, 30)) == "open"
+    assert lipsync.take() == "open"
+    assert lipsync.take() is None
+
+
+def test_hysteresis_between_thresholds():
+    lipsync = LiveLipSync(open_db=-30, close_db=-40)
+
+    assert lipsync.feed(tone(1200, 100, db=-35)) == "neutral"  # Not loud enough to open
+    lipsync.feed(tone(1200, 50, db=-20))
+    assert lipsync.feed(tone(1200, 100, db=-35)) == "open"  # Not quiet enough to close
+    assert lipsync.feed(tone(1200, 50, db=-50)) == "closed"
+    assert lipsync.feed(silence(400)) == "neutral"
+
+
+def test_band_shapes():
+    assert LiveLipSync().feed(tone(3500, 50)) == "wide"
+    assert LiveLipSync().feed(tone(250, 50)) == "rounded"
+
+
+def test_brief_shape_change_ignored():
+    lipsync = LiveLipSync(hold_ms=30)
+    lipsync.feed(tone(1200, 100))
+
+    assert lipsync.feed(tone(3500, 15)) == "open"
+    assert lipsync.feed(tone(1200, 50)) == "open"
+    assert lipsync.feed(tone(3500, 60)) == "wide"
+
+
+def test_partial_samples_and_stereo():
+    lipsync = LiveLipSync(channels=2)
+    data = tone(1200, 50, channels=2)
+
+    for i in range(0, len(data), 7):  # Reads split mid-sample and mid-frame
+        lipsync.feed(data[i:i + 7])
+
+    assert lipsync.viseme == "open"
+
+
+def test_stream_end_releases_mouth():
+    lipsync = LiveLipSync()
+    lipsync.feed(tone(1200, 50))
+    lipsync.take()
+
+    lipsync.end()
+
+    assert lipsync.take() == "neutral"
+
+
+def test_release_survives_next_stream_start():
+    lipsync = LiveLipSync()
+    lipsync.feed(tone(1200, 50))
+    lipsync.take()
+
+    lipsync.end()
+    lipsync.reset()  # A new client connects before the next frame
+
+    assert lipsync.take() == "neutral"
+    assert lipsync.take() is None
+
+
+def test_reset_releases_open_mouth():
+    lipsync = LiveLipSync()
+    lipsync.feed(tone(1200, 50))
+
+    lipsync.reset()
+
+    assert lipsync.viseme == "neutral"
+    assert lipsync.take() == "neutral"
+
+
+def test_listener_off_by_default():
+    face = PumpkinFace(width=1920, height=1080)
+
+    assert face.lipsync_port is None
+    assert face.live_lipsync is None
+
+
+def test_tcp_stream():
+    lipsync = LiveLipSync()
+    server = LiveLipSyncServer(lipsync, port=0)
+    server.start()
+    try:
+        with socket.create_connection(("localhost", server.port)) as client:
+            client.sendall(tone(1200, 100))
+            assert wait_until(lambda: lipsync.viseme == "open")
+        assert wait_until(lambda: lipsync.viseme == "neutral")
+    finally:
+        server.stop()
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="named pipes not available")
+def test_named_pipe(tmp_path):
+    pipe = tmp_path / "voice.pcm"
+    os.mkfifo(pipe)
+    lipsync = LiveLipSync()
+    seen = []
+    original = lipsync.feed
+    lipsync.feed = lambda data: seen.append(original(data)) or seen[-1]
+
+    def read():
+        with open(pipe, 'rb', buffering=0) as stream:
+            read_stream(lipsync, stream)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+
+    with open(pipe, 'wb') as writer:
+        writer.write(tone(3500, 100))
+    reader.join(5)
+
+    assert "wide" in seen
+    assert lipsync.take() == "neutral"
+
+
+def test_face_applies_viseme_next_frame():
+    pygame.init()
+    try:
+        face = PumpkinFace(width=1920, height=1080)
+        face.live_lipsync = LiveLipSync()
+        face.command_router.execute = None  # Must not go through the router
+
+        face.live_lipsync.feed(tone(250, 50))
+        face.step(1000.0 / 60.0)
+        assert face.mouth_viseme == "rounded"
+
+        face.live_lipsync.end()
+        face.step(1000.0 / 60.0)
+        assert face.mouth_viseme is None
+    finally:
+        pygame.quit()
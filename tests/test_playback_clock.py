@@ -0,0 +1,141 @@
+"""
+Test suite for audio-clock-locked playback.
+
+Tests the PlaybackClock that fuses coarse pygame.mixer.music.get_pos()
+readings with frame time, and the audio pause/resume/seek handling and
+dispatch lookahead in Playback.
+
+Test Coverage:
+- Clock advances on frame time between audio readings
+- Small audio errors are corrected gradually, large ones snap
+- Stale (repeated) audio readings are ignored
+- Seek re-anchors the clock via set_pos, or play(start=) when unsupported
+- Pause/resume pause and unpause the music stream
+- Audio-backed timelines dispatch commands one frame early
+"""
+
+from unittest.mock import Mock, patch
+
+import pygame
+import pytest
+
+from timeline import Timeline, Playback, PlaybackClock
+
+
+def test_clock_free_runs_without_audio():
+    clock = PlaybackClock()
+    clock.update(16.0)
+    assert clock.update(16.0) == 32.0
+
+
+def test_clock_corrects_small_error_gradually():
+    clock = PlaybackClock(correction_gain=0.25)
+    clock.update(100.0)
+    position = clock.update(0.0, 140.0)  # audio 40ms ahead
+    assert position == pytest.approx(110.0)
+
+
+def test_clock_snaps_on_large_error():
+    clock = PlaybackClock(snap_threshold_ms=100.0)
+    clock.update(16.0, 0.0)
+    assert clock.update(16.0, 900.0) == pytest.approx(900.0)
+
+
+def test_clock_ignores_stale_readings():
+    clock = PlaybackClock(correction_gain=0.5)
+    clock.update(10.0, 50.0)       # fresh: error 40 -> +20
+    first = clock.position_ms
+    second = clock.update(10.0, 50.0)  # same raw value again: no correction
+    assert second == pytest.approx(first + 10.0)
+
+
+def test_clock_reset_applies_offset_to_raw_readings():
+    clock = PlaybackClock(correction_gain=1.0)
+    clock.reset(5000.0, audio_raw_ms=1200.0)
+    assert clock.update(20.0, 1220.0) == pytest.approx(5020.0)
+
+    clock.reset(3000.0)  # stream restarted from zero
+    assert clock.update(20.0, 20.0) == pytest.approx(3020.0)
+
+
+@pytest.fixture
+def audio_playback(tmp_path):
+    timeline = Timeline(audio_file="song.mp3")
+    timeline.add_command(0, "mouth_open")
+    timeline.add_command(210, "mouth_closed")
+    timeline.add_command(400, "mouth_wide")
+    timeline.duration_ms = 5000
+    timeline.save(tmp_path / "song.json")
+
+    music = Mock()
+    music.get_pos.return_value = 0
+    with patch.object(pygame.mixer, "music", music), \
+         patch.object(pygame.mixer, "get_init", return_value=True):
+        playback = Playback(recordings_dir=tmp_path)
+        callback = Mock()
+        playback.set_command_callback(callback)
+        playback.play("song")
+        yield playback, music, callback
+
+
+def test_audio_timeline_follows_audio_position(audio_playback):
+    playback, music, callback = audio_playback
+    music.get_pos.return_value = 300
+    playback.update(16)
+    assert playback.current_position_ms == pytest.approx(300.0)
+
+
+def test_audio_timeline_dispatches_with_lookahead(audio_playback):
+    playback, music, callback = audio_playback
+    music.get_pos.return_value = 200
+    playback.update(16)  # snaps to 200; 210ms command is within one frame
+    # Both visemes are due this frame, so only the later one runs
+    assert [c[0][0] for c in callback.call_args_list] == ["mouth_closed"]
+
+
+def test_pause_and_resume_control_music(audio_playback):
+    playback, music, _ = audio_playback
+    playback.pause()
+    music.pause.assert_called_once()
+    playback.resume()
+    music.unpause.assert_called_once()
+
+
+def test_seek_moves_audio_with_set_pos(audio_playback):
+    playback, music, _ = audio_playback
+    music.get_pos.return_value = 250
+    playback.seek(2000)
+
+    music.set_pos.assert_called_once_with(2.0)
+    assert playback.clock.audio_offset_ms == pytest.approx(1750.0)
+
+    music.get_pos.return_value = 266
+    playback.update(16)
+    assert playback.current_position_ms == pytest.approx(2016.0)
+
+
+def test_seek_restarts_stream_when_set_pos_unsupported(audio_playback):
+    playback, music, _ = audio_playback
+    music.set_pos.side_effect = pygame.error("set_pos unsupported")
+    playback.pause()
+    playback.seek(1500)
+
+    music.play.assert_called_with(start=1.5)
+    assert music.pause.call_count == 2  # pause() and re-pause after restart
+    assert playback.clock.audio_offset_ms == pytest.approx(1500.0)
+
+
+def test_timeline_without_audio_ignores_mixer(tmp_path):
+    timeline = Timeline()
+    timeline.add_command(0, "blink")
+    timeline.add_command(20, "wink_left")
+    timeline.save(tmp_path / "plain.json")
+
+    playback = Playback(recordings_dir=tmp_path)
+    callback = Mock()
+    playback.set_command_callback(callback)
+    playback.play("plain")
+    playback.update(16)
+
+    assert playback.current_position_ms == 16
+    assert [c[0][0] for c in callback.call_args_list] == ["blink"]
@@ -0,0 +1,186 @@
+"""
+Test suite for layered timeline playback.
+
+Tests that LayeredPlayback runs several timelines at once on their own
+Playback engines and merges their commands per face channel.
+
+Test Coverage:
+- Layers on different channels all run
+- Shared channels go to the highest-priority layer, then to the
+  foreground (main) playback over every layer
+- Channel restriction per layer
+- Looping layers restart without reloading from disk
+- Finished layers are removed; invalid commands stop only their layer
+- Merged commands run in scheduled-time order with late_ms
+- layer_* router commands
+"""
+
+import json
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from playback_layers import LayeredPlayback, COMMAND_CHANNELS
+from timeline import Playback
+
+
+@pytest.fixture
+def layers(tmp_path):
+    callback = Mock()
+    mixer = LayeredPlayback(callback, tmp_path)
+    mixer.callback = callback
+    return mixer
+
+
+def executed(layers):
+    return [c[0][0] for c in layers.callback.call_args_list]
+
+
+def test_layers_on_different_channels_all_run(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "speech", [(0, "mouth_open"), (50, "mouth_closed")], 100)
+    save_timeline(tmp_path, "idle", [(0, "blink"), (50, "eyebrow_raise")], 100)
+    layers.play("speech", "speech", priority=10)
+    layers.play("idle", "idle")
+
+    layers.update(20)
+    layers.update(40)
+
+    assert executed(layers) == ["mouth_open", "blink", "mouth_closed", "eyebrow_raise"]
+
+
+def test_higher_priority_owns_shared_channel(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "speech", [(0, "mouth_open"), (0, "gaze")], 100)
+    save_timeline(tmp_path, "idle", [(0, "blink"), (0, "eyebrow_raise")], 100)
+    layers.play("idle", "idle", priority=0)
+    layers.play("speech", "speech", priority=10)
+
+    layers.update(20)
+
+    # Speech owns eyes, so the idle blink is dropped; eyebrows stay with idle
+    assert executed(layers) == ["mouth_open", "gaze", "eyebrow_raise"]
+    assert layers.get_status()["owners"] == {"eyebrows": "idle", "eyes": "speech", "mouth": "speech"}
+
+
+def test_foreground_outranks_layers(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "main", [(0, "mouth_open")], 1000)
+    save_timeline(tmp_path, "idle", [(0, "mouth_wide"), (0, "blink")], 100)
+    foreground = Playback(recordings_dir=tmp_path)
+    foreground.set_command_callback(Mock())
+    foreground.play("main")
+    layers.foreground = foreground
+
+    layers.play("idle", "idle", priority=99)
+    layers.update(20)
+
+    assert executed(layers) == ["blink"]
+    assert layers.get_status()["owners"]["mouth"] == "main"
+
+
+def test_channel_restriction(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "idle", [(0, "blink"), (0, "mouth_open")], 100)
+    layers.play("idle", "idle", channels=["eyes"])
+    layers.update(20)
+    assert executed(layers) == ["blink"]
+
+
+def test_unknown_channel_rejected(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "idle", [(0, "blink")], 100)
+    with pytest.raises(ValueError, match="Unknown channel"):
+        layers.play("idle", "idle", channels=["tail"])
+
+
+def test_loop_restarts_without_disk_io(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "idle", [(0, "blink")], 100)
+    layers.play("idle", "idle", loop=True)
+
+    with patch("timeline.Timeline.load", side_effect=AssertionError("disk I/O")):
+        for _ in range(5):
+            layers.update(60)
+
+    assert executed(layers) == ["blink", "blink", "blink"]
+    assert layers.layers["idle"].passes == 3
+
+
+def test_finished_layer_removed_after_last_commands(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "once", [(0, "blink"), (90, "wink_left")], 100)
+    layers.play("once", "once")
+
+    layers.update(50)
+    layers.update(60)
+
+    assert executed(layers) == ["blink", "wink_left"]
+    assert layers.layers == {}
+
+
+def test_invalid_command_stops_only_its_layer(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "bad", [(0, "bogus")], 100)
+    save_timeline(tmp_path, "good", [(0, "blink"), (50, "blink")], 100)
+
+    def execute(command, args, late_ms):
+        if command == "bogus":
+            raise ValueError("Unknown")
+
+    layers.callback.side_effect = execute
+    layers.play("bad", "bad")
+    layers.play("good", "good")
+
+    errors = layers.update(20)
+    layers.update(40)
+
+    assert errors == ["Layer 'bad': Error executing command 'bogus': Unknown"]
+    assert list(layers.layers) == ["good"]
+    assert executed(layers).count("blink") == 2
+
+
+def test_merged_in_scheduled_order_with_lateness(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "a", [(10, "blink")], 100)
+    save_timeline(tmp_path, "b", [(2, "mouth_open")], 100)
+    layers.play("a", "a", priority=5)
+    layers.play("b", "b")
+
+    layers.update(16)
+
+    assert layers.callback.call_args_list == [
+        call("mouth_open", {}, 14.0),
+        call("blink", {}, 6.0),
+    ]
+
+
+def test_replacing_layer_by_name(tmp_path, layers, save_timeline):
+    save_timeline(tmp_path, "a", [(0, "blink")], 100)
+    save_timeline(tmp_path, "b", [(0, "wink_left")], 100)
+    first = layers.play("idle", "a")
+    layers.play("idle", "b")
+
+    layers.update(20)
+
+    assert first.playback.state.value == "stopped"
+    assert executed(layers) == ["wink_left"]
+
+
+def test_channel_names():
+    assert set(COMMAND_CHANNELS.values()) == {"expression", "eyes", "eyebrows", "head", "nose", "mouth"}
+
+
+def test_layer_router_commands(tmp_path, save_timeline):
+    from command_handler import CommandRouter
+
+    save_timeline(tmp_path, "idle", [(0, "blink")], 100)
+    pumpkin = Mock()
+    pumpkin.timeline_playback = Playback(recordings_dir=tmp_path)
+    pumpkin.layers = LayeredPlayback(Mock(), tmp_path, foreground=pumpkin.timeline_playback)
+    pumpkin.recording_session.is_recording = False
+    router = CommandRouter(pumpkin, Mock())
+
+    assert router.execute("layer_play idle idle 3 loop") == "OK Layer idle playing idle.json (priority 3, loop)"
+    assert router.execute("layer_play x missing") == "ERROR File not found: missing"
+    assert router.execute("layer_play x ../idle") == "ERROR Invalid filename: path separators not allowed"
+    assert router.execute("layer_play x idle fast") == "ERROR Invalid layer option: fast"
+
+    status = json.loads(router.execute("layer_status"))
+    assert status["layers"][0]["name"] == "idle"
+    assert status["layers"][0]["loop"] is True
+
+    assert router.execute("layer_stop nope") == "ERROR No such layer: nope"
+    assert router.execute("layer_stop idle") == "OK Layer idle stopped"
+    assert router.execute("layer_stop all") == "OK All layers stopped"
@@ -0,0 +1,166 @@
+"""
+Test suite for playback speed control.
+
+Tests that Playback.set_rate scales the position clock, mutes audio away
+from 1x, and plays in reverse through the recording's bake.
+
+Test Coverage:
+- Forward rates scale the position and dispatch commands sooner
+- Out-of-range rates are rejected
+- Audio is paused away from 1x and re-seeked when the rate returns to 1x
+- Reverse playback reconstructs the face from the bake and holds at 0
+- Going forward again dispatches commands from the current position
+- Reverse needs a bake; playback_rate router command
+- A rejected reverse request leaves nested playback untouched
+"""
+
+from unittest.mock import Mock, patch
+
+import pygame
+import pytest
+
+from pumpkin_face import PumpkinFace
+from timeline import Playback, PlaybackState, Timeline
+from timeline_bake import bake_timeline, baked_path
+
+
+FRAME_MS = 1000.0 / 60.0
+
+
+def save_show(dir_path, audio_file=None):
+    timeline = Timeline(audio_file=audio_file)
+    timeline.add_command(0, "gaze", {"x": 10, "y": 0})
+    timeline.add_command(500, "gaze", {"x": 20, "y": 0})
+    timeline.add_command(1000, "gaze", {"x": 30, "y": 0})
+    timeline.add_command(1500, "mouth_open")
+    timeline.duration_ms = 2000
+    timeline.save(dir_path / "show.json")
+
+
+def test_forward_rate_scales_position(tmp_path):
+    save_show(tmp_path)
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play_audio = False
+    executed = []
+    playback.set_command_callback(lambda cmd, args: executed.append(cmd))
+
+    playback.play("show")
+    playback.set_rate(4)
+    playback.update(100)
+
+    assert playback.current_position_ms == 400
+    playback.update(100)
+    assert executed == ["gaze", "gaze"]
+    assert playback.get_status()["rate"] == 4.0
+
+
+def test_rate_range(tmp_path):
+    playback = Playback(recordings_dir=tmp_path)
+
+    for rate in (0, 0.1, 5, -8):
+        with pytest.raises(ValueError):
+            playback.set_rate(rate)
+    playback.set_rate(0.25)
+    assert playback.rate == 0.25
+
+
+def test_audio_muted_away_from_1x(tmp_path):
+    save_show(tmp_path, audio_file="song.mp3")
+    music = Mock()
+    music.get_pos.return_value = 0
+    with patch.object(pygame.mixer, "music", music), \
+         patch.object(pygame.mixer, "get_init", return_value=True):
+        playback = Playback(recordings_dir=tmp_path)
+        playback.play("show")
+
+        playback.set_rate(2)
+        music.pause.assert_called_once()
+        music.get_pos.return_value = 5000  # Audio readings no longer drive the position
+        playback.update(100)
+        assert playback.current_position_ms == 200
+
+        playback.set_rate(1)
+        music.set_pos.assert_called_once_with(0.2)
+        music.unpause.assert_called_once()
+
+
+@pytest.fixture
+def face(tmp_path):
+    pygame.init()
+    face = PumpkinFace(width=1920, height=1080)
+    face.timeline_playback.recordings_dir = tmp_path
+    face.timeline_playback.play_audio = False
+    face.command_router.pumpkin = face
+    yield face
+    pygame.quit()
+
+
+def test_reverse_reconstructs_from_bake(tmp_path, face):
+    save_show(tmp_path)
+    bake_timeline(tmp_path, "show", face=PumpkinFace(width=1920, height=1080)).save(
+        baked_path(tmp_path / "show.json"))
+    playback = face.timeline_playback
+    playback.play("show")
+    for _ in range(75):  # 1250ms
+        face.step(FRAME_MS)
+    assert face.pupil_angle_left == (30, 0)
+
+    playback.set_rate(-1)
+    for _ in range(30):  # Back to 750ms
+        face.step(FRAME_MS)
+    assert face.pupil_angle_left == (20, 0)
+
+    playback.set_rate(2)
+    face.step(FRAME_MS)
+    assert playback.baked is None
+    for _ in range(15):  # Forward past 1000ms again
+        face.step(FRAME_MS)
+    assert face.pupil_angle_left == (30, 0)
+
+    playback.set_rate(-4)
+    for _ in range(60):
+        face.step(FRAME_MS)
+    assert playback.current_position_ms == 0
+    assert playback.state == PlaybackState.PAUSED
+    assert face.pupil_angle_left == (10, 0)
+
+
+def test_reverse_needs_bake(tmp_path, face):
+    save_show(tmp_path)
+    face.timeline_playback.play("show")
+
+    response = face.command_router.execute("playback_rate -1")
+
+    assert response == "ERROR Reverse playback needs an up-to-date bake of show.json (bake_recording show.json)"
+    assert face.timeline_playback.rate == 1.0
+
+
+def test_rejected_reverse_keeps_nesting(tmp_path):
+    save_show(tmp_path)
+    root = Timeline()
+    root.add_command(0, "play_recording", {"filename": "show"})
+    root.duration_ms = 100
+    root.save(tmp_path / "root.json")
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play_audio = False
+    playback.play("root")
+    playback._preload_thread.join()
+    playback.update(FRAME_MS)
+    playback.update(200)
+    before = (playback.filename, len(playback._stack), playback.current_position_ms)
+    assert before[:2] == ("show.json", 1)
+
+    with pytest.raises(ValueError, match="root.json contains play_recording"):
+        playback.set_rate(-1)
+
+    assert (playback.filename, len(playback._stack), playback.current_position_ms) == before
+    assert playback.rate == 1.0 and playback.baked is None
+
+
+def test_playback_rate_command(tmp_path, face):
+    router = face.command_router
+
+    assert router.execute("playback_rate 2x") == "OK Playback rate 2x"
+    assert face.timeline_playback.rate == 2.0
+    assert router.execute("playback_rate fast").startswith("ERROR")
+    assert router.execute("playback_rate 10").startswith("ERROR Playback rate must be between 0.25x and 4x")
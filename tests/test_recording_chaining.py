@@ -44,6 +44,13 @@ def save_timeline(timeline, dir_path, filename):
     return filepath
 
 
+def play_prefetched(playback, filename):
+    """Start playback and let the nested recording prefetch finish."""
+    playback.play(filename)
+    if playback._preload_thread is not None:
+        playback._preload_thread.join()
+
+
 # Test cases
 
 def test_single_level_chaining_command_execution_order(tmp_path):
@@ -69,7 +76,7 @@ def test_single_level_chaining_command_execution_order(tmp_path):
     playback.set_command_callback(mock_callback)
     
     # Play parent
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     
     # Update to execute first command (neutral at 0ms)
     playback.update(100)
@@ -119,7 +126,7 @@ def test_chaining_completes_and_stops(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     
     # Execute all commands and advance to completion
     playback.update(100)   # neutral
@@ -151,7 +158,7 @@ def test_play_recording_not_dispatched_to_callback(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     playback.update(300)  # Execute neutral and trigger play_recording
     playback.update(600)  # Execute blink in sub
     
@@ -184,7 +191,7 @@ def test_stack_cleared_on_stop(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     playback.update(300)  # Enter sub-recording
     
     # Verify we're in nested state
@@ -225,7 +232,7 @@ def test_depth_limit_exceeded(tmp_path):
     playback.set_command_callback(mock_callback)
     
     # Play level 6 (which tries to nest 6 deep total)
-    playback.play("level6.json")
+    play_prefetched(playback, "level6.json")
     
     # Advance through multiple levels
     for _ in range(10):
@@ -253,7 +260,7 @@ def test_missing_sub_recording_file(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     
     # Execute first command
     playback.update(100)
@@ -311,7 +318,7 @@ def test_multi_level_nesting_parent_sub1_sub2(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     
     # Execute step by step
     playback.update(100)   # parent: neutral
@@ -352,7 +359,7 @@ def test_stack_depth_status_query(tmp_path):
     save_timeline(parent_timeline, tmp_path, "parent.json")
     
     playback = Playback(recordings_dir=tmp_path)
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     
     # Before entering sub
     status = playback.get_status()
@@ -382,7 +389,7 @@ def test_empty_filename_in_play_recording(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     playback.update(100)   # neutral
     playback.update(300)   # empty play_recording (should skip)
     playback.update(100)   # happy
@@ -412,7 +419,7 @@ def test_play_recording_near_end_of_parent(tmp_path):
     mock_callback = Mock()
     playback.set_command_callback(mock_callback)
     
-    playback.play("parent.json")
+    play_prefetched(playback, "parent.json")
     playback.update(100)    # neutral
     playback.update(900)   # should trigger play_recording
     
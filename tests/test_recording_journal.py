@@ -0,0 +1,139 @@
+"""
+Test suite for the crash-safe recording journal.
+
+Tests that RecordingSession streams captured commands to an append-only
+journal, finalizes it into a timeline on stop and recovers journals left
+behind by a crash.
+
+Test Coverage:
+- Commands reach the journal as they arrive; memory holds only the tail
+- fsyncs are batched
+- stop() output matches Timeline.save() byte for byte
+- cancel() and empty recordings remove the journal
+- Crashed journals (including a torn last line) are recovered
+- A failed save keeps the journal for recovery
+- Timestamps use the monotonic clock
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from timeline import RecordingSession, Timeline, finalize_journal
+
+
+def journals(path):
+    return sorted(path.glob(".recording_*.journal"))
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = RecordingSession(recordings_dir=tmp_path)
+    session.simplify_tolerance = None
+    return session
+
+
+def test_commands_stream_to_journal(tmp_path, session):
+    session.start()
+    for i in range(10):
+        session.record_command("set_expression", {"expression": "happy" if i % 2 else "sad"})
+
+    [journal] = journals(tmp_path)
+    assert len(journal.read_text().splitlines()) == 8
+    assert len(session.commands) == 2
+    assert session.command_count == 10
+
+
+def test_fsync_is_batched(session):
+    session.fsync_every = 4
+    session.fsync_interval_s = 3600
+    with patch("timeline.os.fsync") as fsync:
+        session.start()
+        for _ in range(12):
+            session.record_command("blink")
+
+        assert fsync.call_count == 2  # 10 entries journaled -> synced at 4 and 8
+
+
+def test_stop_matches_timeline_save(tmp_path, session):
+    session.start()
+    session.record_command("set_expression", {"expression": "happy"})
+    session.record_command("blink")
+    session.record_command("gaze", {"x": 10.5, "y": -3})
+    session.record_command("mouth_open")
+
+    filename = session.stop("take")
+
+    assert journals(tmp_path) == []
+    saved = (tmp_path / filename).read_text(encoding="utf-8")
+    timeline = Timeline.load(tmp_path / filename)
+    timeline.save(tmp_path / "resaved.json")
+    assert saved == (tmp_path / "resaved.json").read_text(encoding="utf-8")
+    assert [c.command for c in timeline.commands] == ["set_expression", "blink", "gaze", "mouth_open"]
+
+
+def test_cancel_removes_journal(tmp_path, session):
+    session.start()
+    for _ in range(5):
+        session.record_command("blink")
+    session.cancel()
+
+    assert journals(tmp_path) == []
+    assert session.command_count == 0
+
+
+def test_empty_recording_raises(tmp_path, session):
+    session.start()
+    with pytest.raises(ValueError):
+        session.stop("empty")
+    assert journals(tmp_path) == []
+
+
+def test_crashed_journal_is_recovered(tmp_path, session):
+    session.start()
+    for i in range(6):
+        session.record_command("eyebrow", {"value": i * 10})
+    session._journal.write('{"time_ms": 99, "comm')  # Torn write at the crash
+    session._journal.close()
+
+    recovered = RecordingSession(recordings_dir=tmp_path).recover_journals()
+
+    assert len(recovered) == 1 and recovered[0].startswith("recovered_")
+    assert journals(tmp_path) == []
+    commands = Timeline.load(tmp_path / recovered[0]).commands
+    assert [c.args["value"] for c in commands] == [0, 10, 20, 30]
+
+
+def test_failed_save_keeps_journal(tmp_path, session):
+    Timeline(commands=[]).save(tmp_path / "taken.json")
+    session.start()
+    session.record_command("blink")
+
+    with pytest.raises(FileExistsError):
+        session.stop("taken")
+
+    assert len(journals(tmp_path)) == 1
+    assert RecordingSession(recordings_dir=tmp_path).recover_journals()
+
+
+def test_finalize_simplifies_streams(tmp_path, session):
+    session.start()
+    for i in range(50):
+        with patch("timeline.time.monotonic", return_value=session.start_time / 1000 + i * 0.016):
+            session.record_command("gaze", {"x": i, "y": 0})
+    session._write_journal(session.commands)
+    session._close_journal()
+    [journal] = journals(tmp_path)
+
+    assert finalize_journal(journal, tmp_path / "sweep.json", simplify_tolerance=0.5) == 1
+    assert Timeline.load(tmp_path / "sweep.json").commands[0].command == "gaze_curve"
+
+
+def test_timestamps_ignore_wall_clock_jumps(session):
+    with patch("timeline.time.monotonic", return_value=100.0):
+        session.start()
+    with patch("timeline.time.monotonic", return_value=100.5), \
+            patch("timeline.time.time", return_value=0.0):
+        session.record_command("blink")
+
+    assert session.commands[0].time_ms == 500
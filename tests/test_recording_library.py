@@ -0,0 +1,149 @@
+"""
+Test suite for the recordings directory watcher.
+
+Tests that RecordingLibrary keeps pre-parsed timelines current and that
+playback uses them instead of reading files.
+
+Test Coverage:
+- Scans parse recordings; changed and deleted files are picked up
+- Stale entries are never returned
+- Large and invalid files are not cached; parsed timelines stay within a
+  byte budget, least recently used evicted first
+- The watcher thread notices new files (inotify or polling)
+- Playback, nested recordings and list_recordings use the library
+- A file replaced while playing doesn't disturb the running playback
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from recording_library import RecordingLibrary
+from timeline import Playback, Timeline
+
+
+def save(path, *commands, duration_ms=1000):
+    timeline = Timeline()
+    for time_ms, cmd, *args in commands:
+        timeline.add_command(time_ms, cmd, args[0] if args else None)
+    timeline.duration_ms = duration_ms
+    timeline.save(path)
+
+
+def wait_until(condition, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_refresh_parses_and_tracks_changes(tmp_path):
+    save(tmp_path / "a.json", (0, "blink"))
+    library = RecordingLibrary(tmp_path)
+
+    library.refresh()
+    first = library.get("a")
+    assert [c.command for c in first.commands] == ["blink"]
+
+    save(tmp_path / "a.json", (0, "wink_left"), (10, "blink"))
+    assert library.get("a") is None  # Changed on disk: never served stale
+    library.refresh("a.json")
+    assert [c.command for c in library.get("a.json").commands] == ["wink_left", "blink"]
+    assert [c.command for c in first.commands] == ["blink"]  # Old copy untouched
+
+    (tmp_path / "a.json").unlink()
+    library.refresh()
+    assert library.filenames() == []
+
+
+def test_large_and_invalid_files_not_cached(tmp_path):
+    save(tmp_path / "big.json", *[(i, "blink") for i in range(100)])
+    (tmp_path / "bad.json").write_text("{")
+    library = RecordingLibrary(tmp_path, max_parse_bytes=1000)
+
+    library.refresh()
+
+    assert library.filenames() == ["bad.json", "big.json"]
+    assert library.get("big") is None
+    assert library.get("bad") is None
+
+
+def test_least_recently_used_evicted_over_budget(tmp_path):
+    for name in ("a", "b", "c"):
+        save(tmp_path / f"{name}.json", (0, "blink"), (500, "wink_left"))
+    size = (tmp_path / "a.json").stat().st_size
+    library = RecordingLibrary(tmp_path, max_cache_bytes=size * 2 + size // 2)
+
+    library.refresh()
+    assert library.get("a") is None  # Parsed first, evicted by c
+    assert library.get("b") is not None
+
+    save(tmp_path / "a.json", (0, "blink"), (600, "wink_left"))
+    library.refresh("a.json")
+
+    assert library.get("c") is None  # Least recently used once b was read
+    assert library.get("a") is not None and library.get("b") is not None
+    assert library.filenames() == ["a.json", "b.json", "c.json"]
+    assert library._parsed_bytes <= library.max_cache_bytes
+
+
+def test_watcher_notices_new_files_with_inotify(tmp_path):
+    library = RecordingLibrary(tmp_path)
+    library.start()
+    try:
+        if not wait_until(lambda: library.using_inotify, 1.0):
+            pytest.skip("inotify not available")
+        save(tmp_path / "new.json", (0, "blink"))
+        assert wait_until(lambda: library.get("new") is not None)
+    finally:
+        library.stop()
+
+
+def test_watcher_polls_without_inotify(tmp_path):
+    library = RecordingLibrary(tmp_path, poll_interval_s=0.05)
+    with patch("recording_library._Inotify", side_effect=OSError("unavailable")):
+        library.start()
+        try:
+            save(tmp_path / "new.json", (0, "blink"))
+            assert wait_until(lambda: library.get("new") is not None)
+            assert not library.using_inotify
+        finally:
+            library.stop()
+
+
+def test_playback_uses_library(tmp_path):
+    save(tmp_path / "child.json", (0, "blink"), duration_ms=100)
+    save(tmp_path / "show.json", (0, "play_recording", {"filename": "child"}))
+    library = RecordingLibrary(tmp_path)
+    library.refresh()
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play_audio = False
+    playback.library = library
+
+    with patch("timeline.Timeline.load", side_effect=AssertionError("read from disk")):
+        playback.play("show", strict=True)
+        assert playback.timeline is library.get("show")
+        assert {r["filename"] for r in playback.list_recordings()} == {"child.json", "show.json"}
+
+
+def test_replacing_playing_file_is_safe(tmp_path):
+    save(tmp_path / "show.json", (0, "blink"), (500, "wink_left"))
+    library = RecordingLibrary(tmp_path)
+    library.refresh()
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play_audio = False
+    playback.library = library
+    executed = []
+    playback.set_command_callback(lambda cmd, args: executed.append(cmd))
+
+    playback.play("show")
+    playback.update(100)
+    save(tmp_path / "show.json", (0, "mouth_open"))
+    library.refresh()
+    playback.update(500)
+
+    assert executed == ["blink", "wink_left"]
+    assert [c.command for c in library.get("show").commands] == ["mouth_open"]
@@ -0,0 +1,268 @@
+"""
+Test suite for nested recording preloading.
+
+Tests that play() resolves the full play_recording tree ahead of time,
+prefetches it on a background thread, and validates it without playing.
+
+Test Coverage:
+- resolve_recording_tree loads every nested recording once
+- Missing files, cycles and excess nesting are reported as problems
+- Sub-recordings are switched to without reading from disk mid-frame,
+  and a frame never waits for an unfinished prefetch
+- strict play() stops a broken recording tree once the prefetch has
+  checked it, without resolving it on the calling thread
+- validate_recording command returns JSON problems; the play command
+  stops a broken tree before its first command
+"""
+
+import json
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from timeline import Timeline, Playback, PlaybackState, resolve_recording_tree
+
+
+def make_timeline(commands_list, duration_ms=None):
+    """Helper: create Timeline from list of (time_ms, command, args) tuples."""
+    timeline = Timeline()
+    for item in commands_list:
+        time_ms, cmd = item[0], item[1]
+        args = item[2] if len(item) > 2 else None
+        timeline.add_command(time_ms, cmd, args)
+    if duration_ms is not None:
+        timeline.duration_ms = duration_ms
+    return timeline
+
+
+def save(timeline, dir_path, name):
+    timeline.save(dir_path / f"{name}.json")
+
+
+def test_resolve_tree_loads_all_nested_recordings(tmp_path):
+    """Every recording reachable through play_recording is loaded."""
+    save(make_timeline([(0, "blink")], 500), tmp_path, "leaf")
+    save(make_timeline([(0, "play_recording", {"filename": "leaf"})], 500), tmp_path, "middle")
+    save(make_timeline([
+        (0, "play_recording", {"filename": "middle"}),
+        (100, "play_recording", {"filename": "leaf"}),
+    ], 1000), tmp_path, "root")
+
+    resolved, problems = resolve_recording_tree(tmp_path, "root")
+
+    assert problems == []
+    assert set(resolved) == {"root.json", "middle.json", "leaf.json"}
+    assert all(isinstance(t, Timeline) for t in resolved.values())
+
+
+def test_resolve_tree_reports_missing_file(tmp_path):
+    save(make_timeline([(200, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+
+    resolved, problems = resolve_recording_tree(tmp_path, "root.json")
+
+    assert len(problems) == 1
+    assert "ghost.json" in problems[0]
+    assert "200ms" in problems[0]
+    assert isinstance(resolved["ghost.json"], FileNotFoundError)
+
+
+def test_resolve_tree_detects_cycle(tmp_path):
+    save(make_timeline([(0, "play_recording", {"filename": "b"})], 500), tmp_path, "a")
+    save(make_timeline([(0, "play_recording", {"filename": "a"})], 500), tmp_path, "b")
+
+    _, problems = resolve_recording_tree(tmp_path, "a")
+
+    assert len(problems) == 1
+    assert "Cycle" in problems[0]
+    assert "a.json -> b.json -> a.json" in problems[0]
+
+
+def test_resolve_tree_reports_excess_depth(tmp_path):
+    for i in range(7):
+        if i == 0:
+            timeline = make_timeline([(0, "blink")], 500)
+        else:
+            timeline = make_timeline([(100, "play_recording", {"filename": f"level{i-1}"})], 1000)
+        save(timeline, tmp_path, f"level{i}")
+
+    resolved, problems = resolve_recording_tree(tmp_path, "level6", max_depth=5)
+
+    assert len(problems) == 1
+    assert "Maximum nesting depth (5)" in problems[0]
+    assert "level0.json" not in resolved
+
+
+def test_sub_recording_switch_does_no_disk_io(tmp_path):
+    """Once prefetched, play_recording must not call Timeline.load."""
+    save(make_timeline([(0, "blink")], 500), tmp_path, "sub")
+    save(make_timeline([
+        (0, "set_expression", {"expression": "neutral"}),
+        (200, "play_recording", {"filename": "sub"}),
+    ], 1000), tmp_path, "parent")
+
+    playback = Playback(recordings_dir=tmp_path)
+    callback = Mock()
+    playback.set_command_callback(callback)
+    playback.play("parent")
+    playback._preload_thread.join()
+
+    with patch.object(Timeline, "load", side_effect=AssertionError("in-frame load")):
+        errors = playback.update(300)
+        errors += playback.update(100)
+
+    assert errors == []
+    assert playback.filename == "sub.json"
+    assert [c[0][0] for c in callback.call_args_list] == ["set_expression", "blink"]
+
+
+def test_preload_problems_in_status(tmp_path):
+    save(make_timeline([(200, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play("root")
+    playback._preload_thread.join()
+
+    status = playback.get_status()
+    assert len(status["preload_problems"]) == 1
+    assert "ghost.json" in status["preload_problems"][0]
+
+
+def test_failed_sub_recording_does_not_leave_stack_entry(tmp_path):
+    save(make_timeline([(200, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play("root")
+    playback._preload_thread.join()
+    errors = playback.update(300)
+
+    assert errors
+    assert len(playback._stack) == 0
+
+
+def test_switch_waits_a_frame_for_unfinished_prefetch(tmp_path):
+    """The parent keeps playing until the prefetch is done; no join in the frame."""
+    save(make_timeline([(0, "blink")], 500), tmp_path, "sub")
+    save(make_timeline([
+        (0, "set_expression", {"expression": "neutral"}),
+        (200, "play_recording", {"filename": "sub"}),
+    ], 300), tmp_path, "parent")
+
+    playback = Playback(recordings_dir=tmp_path)
+    callback = Mock()
+    playback.set_command_callback(callback)
+    release = threading.Event()
+    real_resolve = resolve_recording_tree
+
+    def slow_resolve(*args, **kwargs):
+        release.wait(5)
+        return real_resolve(*args, **kwargs)
+
+    with patch("timeline.resolve_recording_tree", side_effect=slow_resolve):
+        playback.play("parent")
+        assert playback.update(400) == []  # Past the end of the parent, still waiting
+
+        assert playback.filename == "parent.json"
+        assert playback.state == PlaybackState.PLAYING
+        assert playback._stack == []
+        release.set()
+        playback._preload_thread.join()
+
+    playback.update(0)
+    playback.update(100)
+
+    assert playback.filename == "sub.json"
+    assert [c[0][0] for c in callback.call_args_list] == ["set_expression", "blink"]
+
+
+def test_strict_play_rejects_broken_tree(tmp_path):
+    save(make_timeline([(200, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play("root", strict=True)
+    playback._preload_thread.join()
+
+    errors = playback.update(100)
+
+    assert len(errors) == 1 and "root.json" in errors[0] and "ghost.json" in errors[0]
+    assert playback.state == PlaybackState.STOPPED
+
+
+def test_strict_play_resolves_on_the_prefetch_thread(tmp_path):
+    save(make_timeline([(0, "blink")], 500), tmp_path, "sub")
+    save(make_timeline([(0, "play_recording", {"filename": "sub"})], 1000), tmp_path, "root")
+
+    playback = Playback(recordings_dir=tmp_path)
+    threads = []
+
+    def resolve(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return resolve_recording_tree(*args, **kwargs)
+
+    with patch("timeline.resolve_recording_tree", side_effect=resolve):
+        playback.play("root", strict=True)
+        playback._preload_thread.join()
+
+    assert threads == [playback._preload_thread]
+
+    assert playback.update(100) == []
+    assert playback.filename == "sub.json"
+
+
+def test_strict_play_with_preloaded_tree_refuses_to_start(tmp_path):
+    save(make_timeline([(200, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+    preloaded = resolve_recording_tree(tmp_path, "root.json")
+
+    playback = Playback(recordings_dir=tmp_path)
+    with pytest.raises(ValueError, match="ghost.json"):
+        playback.play("root", strict=True, preloaded=preloaded)
+
+    assert playback.state == PlaybackState.STOPPED
+
+
+def test_validate_returns_problems_without_playing(tmp_path):
+    save(make_timeline([(0, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+    save(make_timeline([(0, "blink")], 500), tmp_path, "ok")
+
+    playback = Playback(recordings_dir=tmp_path)
+
+    assert playback.validate("ok") == []
+    assert len(playback.validate("root")) == 1
+    assert playback.state == PlaybackState.STOPPED
+
+
+def test_validate_recording_command(tmp_path):
+    from command_handler import CommandRouter
+
+    save(make_timeline([(0, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+
+    pumpkin = Mock()
+    pumpkin.timeline_playback = Playback(recordings_dir=tmp_path)
+    router = CommandRouter(pumpkin, Mock())
+
+    result = json.loads(router.execute("validate_recording root"))
+    assert result["filename"] == "root.json"
+    assert result["valid"] is False
+    assert "ghost.json" in result["problems"][0]
+
+    assert router.execute("validate_recording ../root").startswith("ERROR")
+
+
+def test_play_command_rejects_broken_tree(tmp_path):
+    from command_handler import CommandRouter
+
+    save(make_timeline([(200, "play_recording", {"filename": "ghost"})], 1000), tmp_path, "root")
+
+    pumpkin = Mock()
+    pumpkin.timeline_playback = Playback(recordings_dir=tmp_path)
+    pumpkin.recording_session.is_recording = False
+    router = CommandRouter(pumpkin, Mock())
+
+    callback = Mock()
+    pumpkin.timeline_playback.set_command_callback(callback)
+
+    assert router.execute("play root").startswith("OK Playing root.json")
+    pumpkin.timeline_playback._preload_thread.join()
+    errors = pumpkin.timeline_playback.update(300)
+
+    assert errors and "ghost.json" in errors[0]
+    assert pumpkin.timeline_playback.state == PlaybackState.STOPPED
+    callback.assert_not_called()
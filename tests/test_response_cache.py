@@ -0,0 +1,267 @@
+"""
+Test suite for skill/response_cache.py and system-prompt reuse in skill/generator.py.
+
+Tests that generate_timeline() replays cached responses to the same request
+instead of calling the LLM again, and that the Gemini provider refers to a
+context cache instead of resending the system prompt.
+
+Test Coverage:
+- Keys depend on provider, model, system prompt and user prompt
+- Entries expire after their time to live; old entries are evicted
+- generate_timeline() with a stub provider: hits, misses, invalid responses
+  are never cached, stale entries are regenerated
+- Gemini context cache created on the second request and reused; fallback
+  when caching is unavailable or the cache has gone; transient errors are
+  raised or retried, not treated as either; requests never wait for a
+  cache being created
+- OpenAI prompt_cache_key only against the OpenAI API
+- mr-pumpkin-record reuses the response unless --no-cache
+"""
+
+import json
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from skill.generator import _SYSTEM_PROMPT, GeminiProvider, LLMProvider, OpenAIProvider, generate_timeline
+from skill.response_cache import ResponseCache
+
+
+TIMELINE = {"version": "1.0", "duration_ms": 500, "commands": [{"time_ms": 0, "command": "blink"}]}
+
+
+class StubProvider(LLMProvider):
+    """Local provider that counts requests."""
+
+    def __init__(self, model="stub-1", response=json.dumps(TIMELINE)):
+        self.model = model
+        self.response = response
+        self.requests = []
+
+    def generate(self, system_prompt, user_prompt):
+        self.requests.append(user_prompt)
+        return self.response
+
+    def cache_identity(self):
+        return {"provider": "stub", "model": self.model}
+
+
+def test_key_parts(tmp_path):
+    cache = ResponseCache(tmp_path)
+    base = cache.key({"provider": "stub", "model": "a"}, "system", "blink")
+
+    assert base == cache.key({"model": "a", "provider": "stub"}, "system", "blink")
+    assert base != cache.key({"provider": "stub", "model": "b"}, "system", "blink")
+    assert base != cache.key({"provider": "stub", "model": "a"}, "system v2", "blink")
+    assert base != cache.key({"provider": "stub", "model": "a"}, "system", "wink")
+
+
+def test_ttl_and_eviction(tmp_path):
+    cache = ResponseCache(tmp_path, ttl_s=60)
+    cache.put("old", "response")
+    data = json.loads((tmp_path / "old.json").read_text())
+    data["created"] -= 61
+    (tmp_path / "old.json").write_text(json.dumps(data))
+    cache.put("new", "response")
+
+    assert cache.get("old") is None
+    assert not (tmp_path / "old.json").exists()
+    assert cache.get("new") == "response"
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.get("new") is None
+
+
+def test_generate_timeline_replays_response(tmp_path):
+    cache = ResponseCache(tmp_path)
+    provider = StubProvider()
+
+    first = generate_timeline("blink", provider=provider, cache=cache)
+    second = generate_timeline("blink", provider=provider, cache=cache)
+    generate_timeline("blink", provider=StubProvider(model="stub-2"), cache=cache)
+    generate_timeline("wink", provider=provider, cache=cache)
+
+    assert first == second == TIMELINE
+    assert provider.requests == ["blink", "wink"]
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+
+def test_invalid_responses_not_cached(tmp_path):
+    cache = ResponseCache(tmp_path)
+    with pytest.raises(ValueError):
+        generate_timeline("blink", provider=StubProvider(response="not json"), cache=cache)
+    assert not list(tmp_path.glob("*.json"))
+
+    provider = StubProvider()
+    cache.put(cache.key(provider.cache_identity(), _SYSTEM_PROMPT, "blink"), '{"version": "0.9"}')
+    assert generate_timeline("blink", provider=provider, cache=cache) == TIMELINE
+    assert provider.requests == ["blink"]
+
+
+def test_no_cache_by_default(tmp_path):
+    provider = StubProvider()
+    with patch.dict(os.environ, {"MR_PUMPKIN_CACHE_DIR": str(tmp_path)}):
+        generate_timeline("blink", provider=provider)
+        generate_timeline("blink", provider=provider)
+
+    assert len(provider.requests) == 2
+
+
+class _StubGenai:
+    """Stand-in google-genai client recording context caches and requests."""
+
+    def __init__(self, create_error=None, request_error=None):
+        self.create_error = create_error
+        self.request_error = request_error
+        self.created = []
+        self.requests = []
+        self.caches = Mock(create=self._create)
+        self.models = Mock(generate_content=self._generate)
+        self.gone = set()
+
+    def _create(self, model, config):
+        if self.create_error:
+            raise self.create_error
+        self.created.append(config.system_instruction)
+        cached = Mock()
+        cached.name = f"cachedContents/{len(self.created)}"
+        return cached
+
+    def _generate(self, model, contents, config):
+        if config.cached_content in self.gone:
+            raise RuntimeError("cached content not found")
+        if config.cached_content and self.request_error:
+            raise self.request_error
+        self.requests.append(config.cached_content or "full text")
+        return Mock(text=json.dumps(TIMELINE))
+
+
+def make_gemini(client):
+    with patch("google.genai.Client", return_value=client):
+        return GeminiProvider(api_key="test")
+
+
+def test_gemini_context_cache_reused():
+    client = _StubGenai()
+    provider = make_gemini(client)
+
+    for _ in range(3):
+        provider.generate("system prompt", "blink")
+    provider.generate("other system prompt", "blink")
+
+    assert client.requests == ["full text", "cachedContents/1", "cachedContents/1", "full text"]
+    assert client.created == ["system prompt"]
+
+
+def test_gemini_context_cache_expiry_and_loss():
+    client = _StubGenai()
+    provider = make_gemini(client)
+    provider.generate("system prompt", "blink")
+    provider.generate("system prompt", "blink")
+
+    client.gone.add("cachedContents/1")  # Deleted server-side
+    provider.generate("system prompt", "blink")
+    provider.generate("system prompt", "blink")  # Recreated
+
+    assert client.requests == ["full text", "cachedContents/1", "full text", "cachedContents/2"]
+
+    with patch("skill.generator.time.monotonic", return_value=time.monotonic() + GeminiProvider.CONTEXT_CACHE_TTL_S):
+        provider.generate("system prompt", "blink")
+    assert client.requests[-1] == "cachedContents/3"
+
+
+def test_gemini_context_cache_unavailable():
+    client = _StubGenai(create_error=RuntimeError("Cached content is too small"))
+    provider = make_gemini(client)
+
+    for _ in range(3):
+        provider.generate("system prompt", "blink")
+
+    assert client.requests == ["full text"] * 3
+
+
+def test_gemini_transient_create_error_retried():
+    from google.genai import errors
+
+    client = _StubGenai(create_error=errors.ServerError(503, {"error": {"message": "Service unavailable"}}))
+    provider = make_gemini(client)
+    provider.generate("system prompt", "blink")
+    provider.generate("system prompt", "blink")
+
+    client.create_error = None
+    provider.generate("system prompt", "blink")
+
+    assert client.requests == ["full text", "full text", "cachedContents/1"]
+
+
+def test_gemini_rate_limit_not_resent_without_cache():
+    from google.genai import errors
+
+    rate_limited = errors.ClientError(429, {"error": {"message": "Resource has been exhausted"}})
+    client = _StubGenai(request_error=rate_limited)
+    provider = make_gemini(client)
+    provider.generate("system prompt", "blink")
+
+    with pytest.raises(errors.ClientError):
+        provider.generate("system prompt", "blink")
+
+    client.request_error = None
+    provider.generate("system prompt", "blink")
+    assert client.requests == ["full text", "cachedContents/1"]  # Cache kept for the retry
+
+
+def test_gemini_requests_do_not_wait_for_cache_creation():
+    client = _StubGenai()
+    creating, release = threading.Event(), threading.Event()
+    create = client._create
+
+    def slow_create(model, config):
+        creating.set()
+        release.wait(5)
+        return create(model, config)
+
+    client.caches.create = slow_create
+    provider = make_gemini(client)
+    provider.generate("system prompt", "blink")
+    creator = threading.Thread(target=provider.generate, args=("system prompt", "blink"))
+    creator.start()
+    assert creating.wait(5)
+
+    provider.generate("system prompt", "blink")  # Sends the text instead of blocking on the create
+    release.set()
+    creator.join(5)
+
+    assert client.requests == ["full text", "full text", "cachedContents/1"]
+    assert client.created == ["system prompt"]
+
+
+@pytest.mark.parametrize("base_url, expect_key", [
+    ("https://api.openai.com/v1", True),
+    ("http://localhost:8080/v1", False),
+])
+def test_openai_prompt_cache_key(base_url, expect_key):
+    client = Mock()
+    client.chat.completions.create.return_value = Mock(choices=[Mock(message=Mock(content="{}"))])
+    with patch("openai.OpenAI", return_value=client):
+        OpenAIProvider(api_key="test", base_url=base_url).generate("system prompt", "blink")
+
+    kwargs = client.chat.completions.create.call_args.kwargs
+    assert ("prompt_cache_key" in kwargs) == expect_key
+    assert kwargs["messages"][0] == {"role": "system", "content": "system prompt"}
+
+
+def test_record_cli_reuses_response(tmp_path):
+    from skill.cli import main
+
+    provider = StubProvider()
+    with patch.dict(os.environ, {"MR_PUMPKIN_CACHE_DIR": str(tmp_path)}), \
+         patch("skill.generator.GeminiProvider", return_value=provider):
+        for extra in ([], [], ["--no-cache"]):
+            assert main(["make it blink", "-f", "blink", "--dry-run", *extra]) == 0
+
+    assert len(provider.requests) == 2
+    assert len(list((tmp_path / "responses").glob("*.json"))) == 1
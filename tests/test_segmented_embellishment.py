@@ -0,0 +1,231 @@
+"""
+Test suite for segmented embellishment of long lip-sync clips.
+
+Tests that long audio is cut at natural pauses, that each segment is
+embellished by its own concurrent LLM request knowing the face state it
+starts in, and that the segments merge into one valid timeline.
+
+Test Coverage:
+- plan_segments: short audio stays whole; cuts fall in the middle of the
+  longest pause near the limit, or after a word in non-stop speech
+- face_state: expression, gaze, eyebrows and head reduced to absolute
+  commands (relative turns, eyebrow steps and tweens played through)
+- merge_segments: commands kept within their window, state restored at
+  the cuts without relative moves building up (parts missing from the
+  state back to neutral), compiled mouth track, duration
+- choreograph(): segments requested concurrently with their window and
+  starting state; merged timeline validated; --segment 0 sends one request
+"""
+
+import json
+import re
+import threading
+from unittest.mock import MagicMock, patch
+
+from skill.audio_analyzer import AudioAnalysis, PauseSegment, WordTiming
+from skill.choreographer import compile_lipsync_timeline, face_state, merge_segments, plan_segments
+from skill.generator import LLMProvider
+from skill.lipsync_cli import choreograph, main
+from timeline import Timeline
+
+
+def long_analysis(seconds=90):
+    """A word every 500ms, with an 800ms pause after every 20 words."""
+    words, pauses = [], []
+    t = 0
+    while t < seconds * 1000:
+        if words and len(words) % 20 == 0:
+            pauses.append(PauseSegment(t - 100, t + 800, 900))
+            t += 800
+        words.append(WordTiming("la", t, t + 400, "open_vowel"))
+        t += 500
+    return AudioAnalysis(words, [], pauses, "happy", t, "long.mp3")
+
+
+def test_plan_segments():
+    analysis = long_analysis()
+
+    assert plan_segments(analysis, 120_000) == [(0, 90_400)]
+    segments = plan_segments(analysis, 30_000)
+    assert segments == [(0, 21_150), (21_150, 42_750), (42_750, 64_350), (64_350, 90_400)]  # Pause middles
+
+
+def test_plan_segments_without_pauses():
+    words = [WordTiming("la", t, t + 500, "open_vowel") for t in range(0, 20_000, 500)]  # Non-stop
+    analysis = AudioAnalysis(words, [], [], "happy", 20_000, "x.mp3")
+
+    segments = plan_segments(analysis, 7_000)
+
+    assert [start for start, _ in segments] == [0, 7_000, 14_000]
+    words[14] = WordTiming("laaa", 6_800, 7_300, "open_vowel")  # Runs over the limit
+    assert plan_segments(analysis, 7_000)[0] == (0, 7_300)
+
+
+def test_face_state():
+    commands = [
+        {"time_ms": 0, "command": "set_expression", "args": {"expression": "happy"}},
+        {"time_ms": 100, "command": "gaze", "args": {"x": 15.0, "y": 0.0}},
+        {"time_ms": 200, "command": "blink"},
+        {"time_ms": 300, "command": "set_expression", "args": {"expression": "sad"}},
+    ]
+
+    assert face_state(commands, 300) == {
+        "expression": {"command": "set_expression", "args": {"expression": "happy"}},
+        "gaze": {"command": "gaze", "args": {"x": 15.0, "y": 0.0}},
+    }
+    assert face_state(commands)["expression"]["args"] == {"expression": "sad"}
+
+
+def test_face_state_is_absolute():
+    commands = [
+        {"time_ms": 0, "command": "turn_up", "args": {"amount": 30}},
+        {"time_ms": 0, "command": "eyebrow_raise"},
+        {"time_ms": 100, "command": "turn_left"},
+        {"time_ms": 100, "command": "eyebrow_raise_left"},
+        {"time_ms": 200, "command": "gaze_to", "args": {"x": 20, "y": 5, "duration_ms": 400}},
+        {"time_ms": 300, "command": "center_head"},
+        {"time_ms": 300, "command": "eyebrow_reset"},
+    ]
+
+    assert face_state(commands, 300) == {
+        "head": {"command": "set_offset", "args": {"x": -50, "y": -30}},
+        "eyebrows": {"command": "eyebrow", "args": {"left": -20.0, "right": -10.0}},
+        "gaze": {"command": "gaze", "args": {"x": 20.0, "y": 5.0}},
+    }
+    assert face_state(commands)["head"] == {"command": "center_head"}
+    assert face_state(commands)["eyebrows"] == {"command": "eyebrow_reset"}
+
+
+def test_merge_restores_relative_state_once():
+    base = compile_lipsync_timeline(long_analysis(5))
+    raised = face_state([{"time_ms": 0, "command": "turn_up", "args": {"amount": 30}},
+                         {"time_ms": 0, "command": "eyebrow_raise"}])
+    settled = {"version": "1.0", "duration_ms": 100, "commands": [
+        {"time_ms": 0, "command": "center_head"},
+        {"time_ms": 0, "command": "eyebrow_reset"},
+    ]}
+    quiet = {"version": "1.0", "duration_ms": 100, "commands": [{"time_ms": 0, "command": "blink"}]}
+
+    merged = merge_segments(base, [(0, 2000, {}, settled), (2000, 3000, raised, quiet),
+                                   (3000, 4000, raised, quiet), (4000, 5000, {}, quiet)])
+
+    restored = [c for c in merged["commands"] if c["command"] in ("set_offset", "eyebrow", "turn_up",
+                                                                  "eyebrow_raise", "center_head",
+                                                                  "eyebrow_reset")]
+    assert restored == [{"time_ms": 0, "command": "center_head"},
+                        {"time_ms": 0, "command": "eyebrow_reset"},
+                        {"time_ms": 2000, "command": "eyebrow", "args": {"value": -10.0}},
+                        {"time_ms": 2000, "command": "set_offset", "args": {"x": 0, "y": -30}},
+                        {"time_ms": 4000, "command": "eyebrow_reset"},
+                        {"time_ms": 4000, "command": "center_head"}]
+    assert face_state(merged["commands"], 3999)["head"] == {"command": "set_offset", "args": {"x": 0, "y": -30}}
+
+
+def test_merge_resets_parts_missing_from_state():
+    """Parts the next segment wasn't told about go back to neutral at the cut."""
+    base = compile_lipsync_timeline(long_analysis(5))
+    happy = {"command": "set_expression", "args": {"expression": "happy"}}
+    first = {"version": "1.0", "duration_ms": 100, "commands": [
+        {"time_ms": 0, "command": "set_expression", "args": {"expression": "happy"}},
+        {"time_ms": 500, "command": "turn_left", "args": {"amount": 80}},
+        {"time_ms": 600, "command": "gaze", "args": {"x": 40, "y": 0}},
+    ]}
+    second = {"version": "1.0", "duration_ms": 100, "commands": [{"time_ms": 2500, "command": "blink"}]}
+
+    merged = merge_segments(base, [(0, 2000, {}, first), (2000, 5000, {"expression": happy}, second)])
+
+    state = face_state(merged["commands"])
+    assert state["head"] == {"command": "center_head"}
+    assert state["gaze"] == {"command": "gaze", "args": {"x": 0.0, "y": 0.0}}
+    assert state["expression"] == happy
+    assert [c["command"] for c in merged["commands"] if c["time_ms"] == 2000
+            and not c["command"].startswith("mouth_")] == ["gaze", "center_head"]
+
+
+def test_merge_segments():
+    base = compile_lipsync_timeline(long_analysis(20))
+    happy = {"command": "set_expression", "args": {"expression": "happy"}}
+    first = {"version": "1.0", "duration_ms": 20_000, "commands": [
+        {"time_ms": 0, "command": "set_expression", "args": {"expression": "happy"}},
+        {"time_ms": 5_000, "command": "set_expression", "args": {"expression": "surprised"}},
+        {"time_ms": 12_000, "command": "wink_left"},  # Belongs to the second segment
+    ]}
+    second = {"version": "1.0", "duration_ms": 500, "commands": [
+        {"time_ms": 0, "command": "blink"},  # Before its window
+        {"time_ms": 15_000, "command": "mouth_open"},
+        {"time_ms": 21_000, "command": "wink_right"},  # Past the audio, kept
+    ]}
+
+    merged = merge_segments(base, [(0, 10_400, {}, first), (10_400, 20_000, {"expression": happy}, second)])
+
+    names = [(c["time_ms"], c["command"]) for c in merged["commands"] if not c["command"].startswith("mouth_")]
+    assert names == [(0, "set_expression"), (5_000, "set_expression"), (10_400, "set_expression"),
+                     (21_000, "wink_right")]
+    assert [c for c in merged["commands"] if c["time_ms"] == 10_400 and c["command"] == "set_expression"][0]["args"] \
+        == {"expression": "happy"}  # Restored at the cut
+    assert [c for c in merged["commands"] if c["command"].startswith("mouth_")] == \
+        [c for c in base["commands"] if c["command"].startswith("mouth_")]
+    assert merged["duration_ms"] == 21_300
+
+
+class SegmentStub(LLMProvider):
+    """LLM stand-in answering each segment prompt with a wink in its window."""
+
+    def __init__(self, concurrent=1):
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.barrier = threading.Barrier(concurrent, timeout=5)
+
+    def generate(self, system_prompt, user_prompt):
+        with self.lock:
+            self.prompts.append(user_prompt)
+        self.barrier.wait()
+        match = re.search(r"covering (\d+)ms to (\d+)ms", user_prompt)
+        start_ms = int(match.group(1)) if match else 0
+        return json.dumps({"version": "1.0", "duration_ms": 1000, "commands": [
+            {"time_ms": start_ms, "command": "set_expression", "args": {"expression": "surprised"}},
+            {"time_ms": start_ms + 1000, "command": "wink_left"},
+        ]})
+
+
+def test_choreograph_segments_concurrently():
+    analysis = long_analysis()
+    provider = SegmentStub(concurrent=4)
+
+    timeline = choreograph(analysis, provider, prompt="spooky", segment_ms=30_000, max_workers=4)
+
+    assert len(provider.prompts) == 4
+    later = [p for p in provider.prompts if "part 1 of" not in p]
+    assert all('"expression": "happy"' in p and "spooky" in p for p in later)
+    assert all(p.count('"mouth_open"') < 70 for p in provider.prompts)  # Only its own words
+    winks = [c["time_ms"] for c in timeline["commands"] if c["command"] == "wink_left"]
+    assert winks == [1_000, 22_150, 43_750, 65_350]
+    times = [c["time_ms"] for c in timeline["commands"]]
+    assert times == sorted(times)
+    assert timeline["duration_ms"] == compile_lipsync_timeline(analysis)["duration_ms"]
+    assert Timeline.from_dict(timeline)
+
+
+def test_choreograph_one_request_for_short_or_unsegmented():
+    provider = SegmentStub()
+
+    choreograph(long_analysis(20), provider, segment_ms=30_000)
+    choreograph(long_analysis(), provider, segment_ms=0)
+
+    assert len(provider.prompts) == 2
+    assert not any("SEGMENT" in p for p in provider.prompts)
+
+
+def test_cli_segment_option(tmp_path):
+    audio = tmp_path / "long.mp3"
+    audio.write_bytes(b"ID3")
+    audio_provider = MagicMock()
+    audio_provider.analyze_audio.return_value = long_analysis()
+    llm = SegmentStub()
+    with patch("skill.lipsync_cli.get_audio_provider", return_value=audio_provider), \
+         patch("skill.lipsync_cli.GeminiProvider", return_value=llm):
+        rc = main([str(audio), "--embellish", "--segment", "45", "--dry-run", "--no-cache",
+                   "--analysis-window", "0"])
+
+    assert rc == 0
+    assert len(llm.prompts) == 3
@@ -0,0 +1,265 @@
+"""
+Test suite for the show queue scheduler.
+
+Tests that ShowQueue plays queued recordings back to back through a
+Playback engine, loops, shuffles, waits for scheduled start times, and
+hands off between recordings without a dropped frame.
+
+Test Coverage:
+- Back-to-back playback and gapless hand-off (carried-over frame time)
+- Next item prefetched so the hand-off does no disk I/O; an unfinished
+  prefetch delays the hand-off by a frame instead of blocking it
+- Loop and shuffle modes
+- Scheduled start times (HH:MM parsing, waiting)
+- Missing files and failed prefetches are skipped without loading in the
+  frame, external stop halts the show
+- queue_* router commands
+"""
+
+import json
+import threading
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+
+from show_queue import ShowQueue, QueueItem, parse_start_time
+from timeline import Timeline, Playback, PlaybackState, resolve_recording_tree
+
+
+@pytest.fixture
+def queue(tmp_path, save_timeline):
+    save_timeline(tmp_path, "a", [(0, "a_start")], 100)
+    save_timeline(tmp_path, "b", [(0, "b_start"), (50, "b_mid")], 100)
+    save_timeline(tmp_path, "c", [(0, "c_start")], 100)
+    playback = Playback(recordings_dir=tmp_path)
+    callback = Mock()
+    playback.set_command_callback(callback)
+    q = ShowQueue(playback)
+    q.callback = callback
+    return q
+
+
+def executed(queue):
+    return [c[0][0] for c in queue.callback.call_args_list]
+
+
+def step(queue, dt_ms):
+    """Run a frame once the background prefetch of the next item has finished."""
+    if queue._prefetch is not None:
+        queue._prefetch[1].join()
+    return queue.update(dt_ms)
+
+
+def test_plays_items_back_to_back(queue):
+    for name in ("a", "b", "c"):
+        queue.enqueue(name)
+    queue.start()
+
+    for _ in range(20):
+        step(queue, 40)
+
+    assert executed(queue) == ["a_start", "b_start", "b_mid", "c_start"]
+    assert not queue.is_running
+    assert queue.playback.state == PlaybackState.STOPPED
+
+
+def test_handoff_carries_frame_time_into_next_item(queue):
+    queue.enqueue("a")
+    queue.enqueue("b")
+    queue.start()
+    step(queue, 0)       # start a
+    step(queue, 90)      # a at 90ms
+    step(queue, 70)      # a ends at 100ms, 60ms carried into b
+
+    assert queue.playback.filename == "b.json"
+    assert queue.playback.current_position_ms == 60
+    assert executed(queue) == ["a_start", "b_start", "b_mid"]
+
+
+def test_handoff_uses_prefetched_timeline(queue):
+    queue.enqueue("a")
+    queue.enqueue("b")
+    queue.start()
+    step(queue, 0)
+    queue._prefetch[1].join()
+
+    with patch.object(Timeline, "load", side_effect=AssertionError("in-frame load")):
+        errors = step(queue, 150)
+
+    assert errors == []
+    assert queue.playback.filename == "b.json"
+
+
+def test_loop_repeats_queue(queue):
+    queue.enqueue("a")
+    queue.enqueue("c")
+    queue.set_loop(True)
+    queue.start()
+
+    for _ in range(12):
+        step(queue, 50)
+
+    assert executed(queue)[:4] == ["a_start", "c_start", "a_start", "c_start"]
+    assert queue.is_running
+    assert queue.get_status()["passes"] >= 2
+
+
+def test_shuffle_plays_every_item_once_per_pass(queue):
+    for name in ("a", "b", "c"):
+        queue.enqueue(name)
+    queue.set_shuffle(True)
+    queue.start()
+
+    for _ in range(20):
+        step(queue, 40)
+
+    starts = [name for name in executed(queue) if name.endswith("_start")]
+    assert sorted(starts) == ["a_start", "b_start", "c_start"]
+
+
+def test_missing_item_is_skipped(queue):
+    queue.enqueue("ghost")
+    queue.enqueue("a")
+    queue.start()
+
+    errors = step(queue, 0)
+    step(queue, 0)  # a is prefetched once ghost has failed
+
+    assert any("ghost.json" in e for e in errors)
+    assert queue.playback.filename == "a.json"
+
+
+def test_failed_prefetch_skips_item_without_loading_in_frame(queue):
+    queue.enqueue("a")
+    queue.enqueue("b")
+    with patch("show_queue.resolve_recording_tree", side_effect=OSError("disk gone")):
+        queue.start()
+        queue._prefetch[1].join()
+
+    real_load = Timeline.load
+
+    def load(path):
+        assert threading.current_thread() is not threading.main_thread(), "in-frame load"
+        return real_load(path)
+
+    with patch.object(Timeline, "load", side_effect=load):
+        errors = queue.update(0)
+        assert errors == ["Show queue skipped 'a.json': disk gone"]
+        assert queue.playback.state == PlaybackState.STOPPED
+        step(queue, 0)
+    assert queue.playback.filename == "b.json"
+
+
+def test_handoff_waits_a_frame_for_unfinished_prefetch(queue):
+    queue.enqueue("a")
+    queue.enqueue("b")
+    queue.start()
+    step(queue, 0)
+    release = threading.Event()
+    queue._prefetch = None  # Restart b's prefetch with a slow load
+    real_resolve = resolve_recording_tree
+    with patch("show_queue.resolve_recording_tree",
+               side_effect=lambda *args, **kwargs: release.wait(5) and real_resolve(*args, **kwargs)):
+        queue._prefetch_next()
+
+        assert queue.update(150) == []  # a ends; b is not ready
+
+        assert queue.playback.state == PlaybackState.STOPPED
+        assert queue.is_running and queue._current is None
+        release.set()
+        queue._prefetch[1].join()
+
+    queue.update(20)
+    queue.update(20)
+    assert queue.playback.filename == "b.json"
+    assert executed(queue) == ["a_start", "b_start"]
+
+
+def test_scheduled_item_waits_for_start_time(queue):
+    queue.enqueue("a", start_at=10_000.0)
+    queue.start()
+
+    with patch("show_queue.time.time", return_value=9_999.0):
+        step(queue, 20)
+    assert queue.playback.state == PlaybackState.STOPPED
+    assert queue.is_running
+
+    with patch("show_queue.time.time", return_value=10_000.0):
+        step(queue, 20)
+    assert queue.playback.filename == "a.json"
+
+
+def test_external_stop_halts_show(queue):
+    queue.enqueue("a")
+    queue.enqueue("b")
+    queue.start()
+    step(queue, 0)
+
+    queue.playback.stop()
+    step(queue, 20)
+    step(queue, 20)
+
+    assert not queue.is_running
+    assert queue.playback.state == PlaybackState.STOPPED
+
+
+def test_skip_starts_next_item(queue):
+    queue.enqueue("a")
+    queue.enqueue("b")
+    queue.start()
+    step(queue, 0)
+
+    queue.skip()
+    step(queue, 10)
+
+    assert queue.playback.filename == "b.json"
+
+
+def test_update_without_queue_drives_playback(queue):
+    queue.playback.play("a")
+    queue.update(10)
+    assert executed(queue) == ["a_start"]
+
+
+def test_parse_start_time_picks_next_occurrence():
+    now = datetime(2026, 10, 31, 18, 0, 0)
+    later = parse_start_time("19:30", now)
+    earlier = parse_start_time("17:00:15", now)
+
+    assert datetime.fromtimestamp(later) == datetime(2026, 10, 31, 19, 30)
+    assert datetime.fromtimestamp(earlier) == datetime(2026, 11, 1, 17, 0, 15)
+    with pytest.raises(ValueError):
+        parse_start_time("dusk", now)
+
+
+def test_queue_item_adds_json_extension():
+    assert QueueItem("show").filename == "show.json"
+
+
+def test_queue_router_commands(tmp_path, save_timeline):
+    from command_handler import CommandRouter
+
+    save_timeline(tmp_path, "a", [(0, "blink")], 100)
+    pumpkin = Mock()
+    pumpkin.timeline_playback = Playback(recordings_dir=tmp_path)
+    pumpkin.show_queue = ShowQueue(pumpkin.timeline_playback)
+    pumpkin.recording_session.is_recording = False
+    router = CommandRouter(pumpkin, Mock())
+
+    assert router.execute("queue_start") == "ERROR Show queue is empty"
+    assert router.execute("queue_add a") == "OK Queued a.json"
+    assert router.execute("queue_add a 21:30") == "OK Queued a.json at 21:30"
+    assert router.execute("queue_add a noon").startswith("ERROR")
+    assert router.execute("queue_loop on") == "OK Loop on"
+    assert router.execute("queue_shuffle maybe").startswith("ERROR")
+    assert router.execute("queue_start") == "OK Show queue started (2 items)"
+
+    status = json.loads(router.execute("queue_status"))
+    assert status["is_running"] is True
+    assert status["loop"] is True
+    assert status["upcoming"][1]["start_at"].endswith("21:30:00")
+
+    assert router.execute("queue_stop") == "OK Show queue stopped"
+    assert router.execute("queue_clear") == "OK Show queue cleared"
+    assert json.loads(router.execute("queue_status"))["item_count"] == 0
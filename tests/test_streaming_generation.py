@@ -0,0 +1,166 @@
+"""
+Test suite for streaming timeline generation (skill/generator.stream_timeline).
+
+Tests that commands are validated as the response streams in, and that an
+invalid response is abandoned at the first bad command and retried.
+
+Test Coverage:
+- Valid stream gives the same timeline as generate_timeline(), in batches
+- Unknown command, out-of-order time_ms or wrong version stops the stream
+  early; the request is retried; every attempt failing raises ValueError
+- Code fences and timestamp_ms repairs are handled as in generate_timeline()
+- Gemini and OpenAI providers stream and close the response
+- mr-pumpkin-record only connects to the server once a valid timeline
+  has been generated (the server handles one TCP client at a time)
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from skill.generator import (LLMProvider, GeminiProvider, OpenAIProvider, generate_timeline,
+                             stream_timeline)
+
+
+def document(commands, version="1.0", duration_ms=2000):
+    return json.dumps({"version": version, "duration_ms": duration_ms, "commands": commands}, indent=1)
+
+
+GOOD = [
+    {"time_ms": 0, "command": "set_expression", "args": {"expression": "happy"}},
+    {"time_ms": 500, "command": "blink"},
+    {"time_ms": 1000, "command": "wink_left"},
+    {"time_ms": 1500, "command": "blink"},
+]
+BAD_NAME = GOOD[:1] + [{"time_ms": 500, "command": "do_a_flip"}] + GOOD[2:]
+BAD_ORDER = GOOD[:2] + [{"time_ms": 100, "command": "blink"}] + GOOD[3:]
+
+
+class StreamingStub(LLMProvider):
+    """Local provider streaming canned responses in small chunks."""
+
+    def __init__(self, *responses, chunk=16):
+        self.responses = list(responses)
+        self.chunk = chunk
+        self.consumed = []  # Characters read from each response
+        self.closed = []
+
+    def generate(self, system_prompt, user_prompt):
+        return self.responses.pop(0)
+
+    def generate_stream(self, system_prompt, user_prompt):
+        text = self.responses.pop(0)
+        self.consumed.append(0)
+        try:
+            for i in range(0, len(text), self.chunk):
+                self.consumed[-1] = i + self.chunk
+                yield text[i:i + self.chunk]
+        finally:
+            self.closed.append(True)
+
+
+def test_valid_stream_in_batches():
+    provider = StreamingStub(document(GOOD))
+    batches = []
+
+    data = stream_timeline("blink", provider=provider, on_commands=batches.append)
+
+    assert data == generate_timeline("blink", provider=StreamingStub(document(GOOD)))
+    assert len(batches) >= 2
+    assert [c for batch in batches for c in batch] == GOOD
+    assert provider.closed == [True]
+
+
+@pytest.mark.parametrize("commands", [BAD_NAME, BAD_ORDER])
+def test_invalid_command_stops_early_and_retries(commands):
+    bad = document(commands + GOOD[3:] * 20)  # A long tail that should never be read
+    provider = StreamingStub(bad, document(GOOD))
+    batches, restarts = [], []
+
+    data = stream_timeline("blink", provider=provider, on_commands=batches.append,
+                           on_restart=lambda: restarts.append(len(batches)))
+
+    assert data["commands"] == GOOD
+    assert provider.consumed[0] < len(bad) / 4
+    assert provider.closed == [True, True]
+    assert restarts and sum(len(b) for b in batches[restarts[0]:]) == len(GOOD)
+
+
+def test_wrong_version_stops_at_first_command():
+    provider = StreamingStub(document(GOOD, version="2.0"), document(GOOD))
+
+    stream_timeline("blink", provider=provider)
+
+    assert provider.consumed[0] < len(document(GOOD))
+
+
+def test_all_attempts_fail():
+    provider = StreamingStub(*[document(BAD_NAME)] * 2)
+
+    with pytest.raises(ValueError, match="after 2 attempts.*do_a_flip"):
+        stream_timeline("blink", provider=provider, attempts=2)
+
+
+def test_fences_and_repairs():
+    commands = [{"timestamp_ms": 0, "command": "blink"}, {"time_ms": 300, "command": "wink_right"}]
+    text = "Here you go:\n```json\n" + document(commands) + "\n```\nEnjoy!"
+    batches = []
+
+    for chunk in (1, 7):
+        data = stream_timeline("blink", provider=StreamingStub(text, chunk=chunk), on_commands=batches.append)
+        assert data["commands"][0] == {"time_ms": 0, "command": "blink"}
+
+    with pytest.raises(ValueError):
+        stream_timeline("blink", provider=StreamingStub("I can't do that", chunk=4), attempts=1)
+
+
+def test_gemini_streams():
+    client = Mock()
+    client.models.generate_content_stream.return_value = iter([Mock(text='{"version"'), Mock(text=None),
+                                                                Mock(text=': "1.0"}')])
+    with patch("google.genai.Client", return_value=client):
+        provider = GeminiProvider(api_key="test")
+
+    assert "".join(provider.generate_stream("system", "blink")) == '{"version": "1.0"}'
+    config = client.models.generate_content_stream.call_args.kwargs["config"]
+    assert config.system_instruction == "system"
+
+
+def test_openai_streams_and_closes():
+    stream = Mock()
+    stream.__iter__ = Mock(return_value=iter([
+        Mock(choices=[Mock(delta=Mock(content='{"a"'))]),
+        Mock(choices=[]),
+        Mock(choices=[Mock(delta=Mock(content=": 1}"))]),
+    ]))
+    client = Mock()
+    client.chat.completions.create.return_value = stream
+    with patch("openai.OpenAI", return_value=client):
+        provider = OpenAIProvider(api_key="test")
+
+    chunks = provider.generate_stream("system", "blink")
+    assert next(chunks) == '{"a"'
+    chunks.close()
+
+    assert client.chat.completions.create.call_args.kwargs["stream"] is True
+    stream.close.assert_called_once()
+
+
+def test_record_cli_uploads_after_generating(tmp_path, monkeypatch, capsys):
+    from skill.cli import main
+
+    provider = StreamingStub(document(BAD_NAME), document(GOOD))
+
+    def upload_timeline(filename, timeline_dict, **kwargs):
+        assert provider.closed == [True, True]  # Both responses finished before connecting
+        uploads.append((filename, timeline_dict["commands"]))
+
+    uploads = []
+    monkeypatch.setenv("MR_PUMPKIN_CACHE_DIR", str(tmp_path / "cache"))
+    with patch("skill.generator.GeminiProvider", return_value=provider), \
+         patch("skill.uploader.upload_timeline", side_effect=upload_timeline):
+        assert main(["blink", "-f", "show"]) == 0
+
+    assert uploads == [("show", GOOD)]
+    assert "retrying" in capsys.readouterr().out
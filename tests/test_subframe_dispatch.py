@@ -0,0 +1,157 @@
+"""
+Test suite for sub-frame accurate timeline dispatch.
+
+Tests that Playback resolves dense commands inside one frame
+deterministically and passes each command's lateness to timed callbacks,
+and that PumpkinFace starts animations at the matching phase.
+
+Test Coverage:
+- Several visemes due in one frame collapse to the last one
+- Superseding only applies within a command group and before play_recording
+- Superseded commands are not re-run on the next frame
+- Timed callbacks receive late_ms; plain callbacks keep (command, args)
+- Face animations are advanced by late_ms, held animations are untouched
+"""
+
+from unittest.mock import Mock, call
+
+import pygame
+import pytest
+
+from pumpkin_face import PumpkinFace
+from timeline import Timeline, Playback
+
+
+def _play(tmp_path, commands, callback, timed=False):
+    timeline = Timeline()
+    for time_ms, command, args in commands:
+        timeline.add_command(time_ms, command, args)
+    timeline.save(tmp_path / "dense.json")
+    playback = Playback(recordings_dir=tmp_path)
+    playback.set_command_callback(callback, timed=timed)
+    playback.play("dense.json")
+    return playback
+
+
+def test_dense_visemes_keep_last(tmp_path):
+    callback = Mock()
+    playback = _play(tmp_path, [
+        (0, "mouth_open", {}),
+        (5, "mouth_wide", {}),
+        (10, "mouth_rounded", {}),
+        (40, "mouth_closed", {}),
+    ], callback)
+
+    playback.update(16.0)
+
+    assert callback.call_args_list == [call("mouth_rounded", {})]
+
+
+def test_superseded_commands_not_rerun(tmp_path):
+    callback = Mock()
+    playback = _play(tmp_path, [
+        (0, "mouth_open", {}),
+        (10, "mouth_wide", {}),
+        (40, "mouth_closed", {}),
+    ], callback)
+
+    playback.update(16.0)
+    playback.update(30.0)
+
+    assert callback.call_args_list == [call("mouth_wide", {}), call("mouth_closed", {})]
+
+
+def test_different_groups_all_run(tmp_path):
+    callback = Mock()
+    playback = _play(tmp_path, [
+        (0, "mouth_open", {}),
+        (4, "blink", {}),
+        (8, "blink", {}),
+        (10, "gaze", {"x": 10, "y": 0}),
+        (12, "mouth_closed", {}),
+    ], callback)
+
+    playback.update(16.0)
+
+    assert callback.call_args_list == [
+        call("blink", {}),
+        call("blink", {}),
+        call("gaze", {"x": 10, "y": 0}),
+        call("mouth_closed", {}),
+    ]
+
+
+def test_superseding_stops_at_play_recording(tmp_path):
+    sub = Timeline()
+    sub.add_command(0, "blink")
+    sub.save(tmp_path / "sub.json")
+
+    callback = Mock()
+    playback = _play(tmp_path, [
+        (0, "mouth_open", {}),
+        (5, "play_recording", {"filename": "sub"}),
+        (10, "mouth_wide", {}),
+    ], callback)
+
+    playback.update(16.0)
+
+    assert callback.call_args_list == [call("mouth_open", {})]
+
+
+def test_timed_callback_receives_lateness(tmp_path):
+    callback = Mock()
+    playback = _play(tmp_path, [
+        (2, "blink", {}),
+        (10, "wink_left", {}),
+        (100, "blink", {}),
+    ], callback, timed=True)
+
+    playback.update(16.0)
+
+    assert callback.call_args_list == [
+        call("blink", {}, 14.0),
+        call("wink_left", {}, 6.0),
+    ]
+
+
+class TestFacePhaseOffset:
+    """Test that timeline-started animations begin at their scheduled phase."""
+
+    @pytest.fixture
+    def pumpkin(self):
+        """Create a PumpkinFace instance for testing."""
+        pygame.init()
+        face = PumpkinFace(width=1920, height=1080)
+        yield face
+        pygame.quit()
+
+    def test_blink_advanced_by_lateness(self, pumpkin):
+        pumpkin._execute_timeline_command("blink", {}, late_ms=1000.0 / 60.0 * 2)
+        assert pumpkin.blink_progress == pytest.approx(2 * pumpkin.blink_speed)
+
+    def test_on_time_command_not_advanced(self, pumpkin):
+        pumpkin._execute_timeline_command("blink", {})
+        assert pumpkin.blink_progress == 0.0
+
+    def test_negative_lateness_ignored(self, pumpkin):
+        pumpkin._execute_timeline_command("mouth_open", {}, late_ms=-8.0)
+        assert pumpkin.mouth_transition_progress == 0.0
+
+    def test_viseme_transition_advanced(self, pumpkin):
+        pumpkin._execute_timeline_command("mouth_open", {}, late_ms=1000.0 / 60.0)
+        assert pumpkin.mouth_viseme == "open"
+        assert pumpkin.mouth_transition_progress == pytest.approx(pumpkin.mouth_transition_speed)
+
+    def test_head_movement_advanced(self, pumpkin):
+        pumpkin._execute_timeline_command("turn_left", {"amount": 50}, late_ms=100.0)
+        assert pumpkin.head_movement_progress == pytest.approx(0.1 / pumpkin.head_movement_duration)
+
+    def test_running_blink_not_moved(self, pumpkin):
+        pumpkin.blink()
+        pumpkin.blink_progress = 0.5
+        pumpkin._execute_timeline_command("blink", {}, late_ms=16.0)
+        assert pumpkin.blink_progress == 0.5
+
+    def test_phase_capped_at_completion(self, pumpkin):
+        pumpkin._execute_timeline_command("blink", {}, late_ms=10000.0)
+        assert pumpkin.blink_progress == 1.0
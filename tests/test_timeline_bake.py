@@ -0,0 +1,225 @@
+"""
+Test suite for baked timelines.
+
+Tests that bake_timeline compiles a recording into per-frame face tracks
+and that baked playback reproduces command playback by index lookup.
+
+Test Coverage:
+- Only channels the recording drives are baked
+- Baked playback matches command playback frame by frame
+- Save/load round trip and stale-bake detection; bakes at a frame rate
+  other than the face's 60 FPS are ignored
+- Playback uses an up-to-date bake only when use_baked is set
+- Baked eye animations are released when playback ends
+- Deleting or renaming a recording removes its bake
+- bake_recording bakes on a worker thread and reports it in timeline_status;
+  baked_playback router command
+"""
+
+import json
+import threading
+from unittest.mock import patch
+
+import pygame
+import pytest
+
+from pumpkin_face import PumpkinFace
+from timeline import FileManager, Playback
+from timeline_bake import FRAME_RATE, BakedTimeline, bake_timeline, baked_path, load_baked
+
+
+FRAME_MS = 1000.0 / 60.0
+
+
+def snapshot(face):
+    return (face.current_expression, face.target_expression, round(face.transition_progress, 4),
+            face.is_blinking, round(face.left_eye_scale, 4), round(face.right_eye_scale, 4),
+            face.pupil_angle_left, face.pupil_angle_right,
+            face.eyebrow_left_offset, face.eyebrow_right_offset,
+            face.mouth_viseme, face.projection_offset_x, face.projection_offset_y)
+
+
+@pytest.fixture
+def face(tmp_path):
+    pygame.init()
+    face = PumpkinFace(width=1920, height=1080)
+    face.timeline_playback.recordings_dir = tmp_path
+    face.timeline_playback.play_audio = False
+    face.command_router.pumpkin = face
+    yield face
+    pygame.quit()
+
+
+@pytest.fixture
+def show(tmp_path, save_timeline):
+    save_timeline(tmp_path, "show", [
+        (0, "set_expression", {"expression": "happy"}),
+        (100, "blink"),
+        (200, "wink_left"),
+        (300, "gaze", {"x": 20, "y": -10}),
+        (400, "eyebrow_raise"),
+        (500, "mouth_open"),
+        (600, "set_offset", {"x": 30, "y": -15}),
+    ], 800)
+    return "show"
+
+
+def test_bake_only_driven_channels(tmp_path, show):
+    baked = bake_timeline(tmp_path, show)
+
+    assert baked.channels == ["expression", "eyebrows", "eyes", "head", "mouth"]
+    assert "nose_scale" not in baked.tracks
+    assert baked.frame_count >= 800 / FRAME_MS
+
+
+def test_baked_playback_matches_command_playback(tmp_path, face, show):
+    baked = bake_timeline(tmp_path, show)
+
+    reference = []
+    face.timeline_playback.play(show)
+    for _ in range(baked.frame_count):
+        face.step(FRAME_MS)
+        reference.append(snapshot(face))
+
+    replay = PumpkinFace(width=1920, height=1080)
+    replay.timeline_playback.recordings_dir = tmp_path
+    replay.timeline_playback.play_audio = False
+    replay.timeline_playback.use_baked = True
+    replay.timeline_playback.play(show, baked=baked)
+    frames = []
+    for _ in range(baked.frame_count):
+        replay.step(FRAME_MS)
+        frames.append(snapshot(replay))
+
+    assert frames == reference
+
+
+def test_save_load_round_trip(tmp_path, show):
+    baked = bake_timeline(tmp_path, show)
+    baked.save(baked_path(tmp_path / "show.json"))
+
+    loaded = load_baked(tmp_path, show)
+
+    assert loaded is not None
+    assert loaded.frame_count == baked.frame_count
+    assert loaded.tracks == baked.tracks
+    assert loaded.sources == baked.sources
+
+
+def test_edited_recording_invalidates_bake(tmp_path, show, save_timeline):
+    bake_timeline(tmp_path, show).save(baked_path(tmp_path / "show.json"))
+    save_timeline(tmp_path, "show", [(0, "blink")], 100)
+
+    assert load_baked(tmp_path, show) is None
+
+
+def test_bake_at_another_frame_rate_is_ignored(tmp_path, show):
+    """The face animates a fixed step per frame, so only 60 FPS bakes match command playback."""
+    baked = bake_timeline(tmp_path, show)
+    assert baked.frame_rate == FRAME_RATE == 60
+    BakedTimeline(30, {name: column[::2] for name, column in baked.tracks.items()},
+                  baked.sources).save(baked_path(tmp_path / "show.json"))
+
+    assert load_baked(tmp_path, show) is None
+
+
+def test_invalid_bake_is_ignored(tmp_path, show):
+    baked_path(tmp_path / "show.json").write_bytes(b"MPBK garbage")
+
+    assert load_baked(tmp_path, show) is None
+    with pytest.raises(ValueError):
+        BakedTimeline.load(baked_path(tmp_path / "show.json"))
+
+
+def test_playback_uses_bake_only_when_enabled(tmp_path, face, show):
+    bake_timeline(tmp_path, show).save(baked_path(tmp_path / "show.json"))
+    playback = face.timeline_playback
+
+    playback.play(show)
+    assert playback.baked is None
+    playback.stop()
+
+    playback.use_baked = True
+    playback.play(show)
+    assert playback.baked is not None
+    assert playback.get_status()["baked"] is True
+    assert playback.get_duration() == playback.baked.duration_ms
+
+
+def test_baked_eyes_released_when_playback_stops(tmp_path, face, save_timeline):
+    save_timeline(tmp_path, "blinky", [(0, "blink")], 10)
+    baked = bake_timeline(tmp_path, "blinky")
+    playback = face.timeline_playback
+    playback.use_baked = True
+    playback.play("blinky", baked=baked)
+
+    face.step(FRAME_MS)
+    assert face.is_blinking
+
+    playback.stop()
+    face.step(FRAME_MS)
+
+    assert not face.is_blinking
+    assert face.blink_progress == 0.0
+
+
+def wait_for_bakes(router):
+    for thread in threading.enumerate():
+        if thread.name.startswith("bake-"):
+            thread.join(10)
+    return json.loads(router.execute("timeline_status"))["bakes"]
+
+
+def test_bake_recording_command(tmp_path, face, show):
+    response = face.command_router.execute("bake_recording show")
+
+    assert response == "OK Baking show.json"
+    assert wait_for_bakes(face.command_router)["show.json"].startswith("OK Baked show.json")
+    assert baked_path(tmp_path / "show.json").exists()
+
+    assert face.command_router.execute("baked_playback on") == "OK Baked playback on"
+    assert face.timeline_playback.use_baked
+    face.command_router.execute("play show")
+    assert face.timeline_playback.baked is not None
+
+
+def test_bake_recording_runs_off_the_calling_thread(tmp_path, face, show):
+    release = threading.Event()
+    real_bake = bake_timeline
+
+    def slow_bake(*args, **kwargs):
+        assert threading.current_thread() is not threading.main_thread()
+        release.wait(5)
+        return real_bake(*args, **kwargs)
+
+    with patch("timeline_bake.bake_timeline", side_effect=slow_bake):
+        assert face.command_router.execute("bake_recording show") == "OK Baking show.json"
+        assert face.command_router.execute("bake_recording show") == "ERROR Already baking show.json"
+        assert json.loads(face.command_router.execute("timeline_status"))["bakes"] == {"show.json": "baking"}
+        release.set()
+        assert wait_for_bakes(face.command_router)["show.json"].startswith("OK Baked")
+
+
+def test_bake_recording_missing_file(face):
+    assert face.command_router.execute("bake_recording nope") == "ERROR File not found: nope.json"
+    assert face.command_router.execute("baked_playback maybe").startswith("ERROR Usage")
+
+
+def test_delete_recording_removes_bake(tmp_path, face, show):
+    bake_timeline(tmp_path, show).save(baked_path(tmp_path / "show.json"))
+
+    face.timeline_playback.delete_recording(show)
+
+    assert not baked_path(tmp_path / "show.json").exists()
+
+
+def test_rename_recording_removes_bake(tmp_path, show):
+    bake_timeline(tmp_path, show).save(baked_path(tmp_path / "show.json"))
+    Playback(recordings_dir=tmp_path).rename_recording(show, "encore")
+    bake_timeline(tmp_path, "encore").save(baked_path(tmp_path / "encore.json"))
+    FileManager(recordings_dir=tmp_path).rename_timeline("encore", "finale")
+
+    assert not baked_path(tmp_path / "show.json").exists()
+    assert not baked_path(tmp_path / "encore.json").exists()
+    assert load_baked(tmp_path, "finale") is None
+    assert (tmp_path / "finale.json").exists()
@@ -0,0 +1,161 @@
+"""
+Test suite for binary timelines.
+
+Tests that recordings converted to the memory-mapped binary format load
+transparently through Timeline, Playback and FileManager.
+
+Test Coverage:
+- Write/read round trip (commands, args, metadata, duration)
+- Timeline.load uses only an up-to-date binary copy
+- Timeline.save refreshes an existing copy
+- A loaded copy can be replaced and deleted (read into memory on Windows)
+- Seeking binary-searches the time column
+- Delete/rename keep the copy alongside the recording
+- convert_recording router command
+"""
+
+import pytest
+
+from timeline import FileManager, Playback, Timeline
+from timeline_binary import BinaryCommands, binary_path, convert_recording, read_binary, write_binary
+
+
+def make_timeline():
+    timeline = Timeline(audio_file="song.mp3")
+    timeline.add_command(0, "set_expression", {"expression": "happy"})
+    timeline.add_command(100, "blink")
+    timeline.add_command(150, "gaze", {"x": 12.5, "y": -3})
+    timeline.add_command(300, "gaze", {"x": 12.5, "y": -3})
+    timeline.add_command(450, "play_recording", {"filename": "other"})
+    timeline.duration_ms = 1000
+    return timeline
+
+
+def test_round_trip(tmp_path):
+    timeline = make_timeline()
+    write_binary(timeline, tmp_path / "show.mpt")
+
+    loaded = read_binary(tmp_path / "show.mpt")
+
+    assert isinstance(loaded.commands, BinaryCommands)
+    assert loaded.to_dict() == timeline.to_dict()
+    assert loaded.commands[-1].args == {"filename": "other"}
+    assert [c.command for c in loaded.commands[1:3]] == ["blink", "gaze"]
+    assert loaded.has_command("play_recording")
+    assert not loaded.has_command("wink_left")
+
+
+def test_invalid_file(tmp_path):
+    (tmp_path / "bad.mpt").write_bytes(b"MPTL garbage")
+    (tmp_path / "empty.mpt").write_bytes(b"")
+
+    with pytest.raises(ValueError):
+        read_binary(tmp_path / "bad.mpt")
+    with pytest.raises(ValueError):
+        read_binary(tmp_path / "empty.mpt")
+
+
+def test_load_prefers_current_binary(tmp_path):
+    path = tmp_path / "show.json"
+    make_timeline().save(path)
+    assert not isinstance(Timeline.load(path).commands, BinaryCommands)
+
+    convert_recording(path)
+    assert isinstance(Timeline.load(path).commands, BinaryCommands)
+    assert not isinstance(Timeline.load(path, binary=False).commands, BinaryCommands)
+
+    # Editing the JSON outside Mr. Pumpkin makes the copy stale
+    path.write_text('{"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}]}')
+    loaded = Timeline.load(path)
+    assert not isinstance(loaded.commands, BinaryCommands)
+    assert [c.command for c in loaded.commands] == ["blink"]
+
+
+def test_save_refreshes_existing_binary(tmp_path):
+    path = tmp_path / "show.json"
+    make_timeline().save(path)
+    convert_recording(path)
+
+    timeline = Timeline.load(path)
+    timeline.commands = list(timeline.commands[:2])
+    timeline.save(path)
+
+    loaded = Timeline.load(path)
+    assert isinstance(loaded.commands, BinaryCommands)
+    assert [c.command for c in loaded.commands] == ["set_expression", "blink"]
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_replace_loaded_binary(tmp_path, monkeypatch, use_mmap):
+    monkeypatch.setattr("timeline_binary.USE_MMAP", use_mmap)
+    path = tmp_path / "show.json"
+    make_timeline().save(path)
+    convert_recording(path)
+    loaded = Timeline.load(path)
+    assert isinstance(loaded.commands._buffer, bytes) != use_mmap
+
+    edited = Timeline.load(path, binary=False)
+    edited.commands = edited.commands[:1]
+    edited.save(path)  # Replaces the loaded .mpt
+    assert [c.command for c in Timeline.load(path).commands] == ["set_expression"]
+    binary_path(path).unlink()
+
+    assert loaded.to_dict() == make_timeline().to_dict()  # The loaded copy stays readable
+
+
+def test_seek_uses_binary_copy(tmp_path):
+    make_timeline().save(tmp_path / "show.json")
+    convert_recording(tmp_path / "show.json")
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play_audio = False
+    executed = []
+    playback.set_command_callback(lambda cmd, args: executed.append(cmd))
+
+    playback.play("show")
+    assert isinstance(playback.timeline.commands, BinaryCommands)
+    playback.seek(150)
+    assert playback._last_executed_index == 1
+    playback.update(1)
+    assert executed == ["gaze"]
+    assert playback.timeline.index_before(10000) == 4
+
+
+def test_unsorted_records_seek_linearly(tmp_path):
+    timeline = Timeline()
+    timeline.add_command(200, "blink")
+    timeline.add_command(100, "wink_left")
+    write_binary(timeline, tmp_path / "odd.mpt")
+
+    loaded = read_binary(tmp_path / "odd.mpt")
+
+    assert not loaded.commands.is_sorted
+    assert loaded.index_before(150) == 1
+    assert loaded.index_before(250) == 1
+
+
+def test_delete_and_rename_keep_binary_alongside(tmp_path):
+    make_timeline().save(tmp_path / "show.json")
+    convert_recording(tmp_path / "show.json")
+    manager = FileManager(recordings_dir=tmp_path)
+
+    manager.rename_timeline("show", "renamed")
+    assert not binary_path(tmp_path / "show.json").exists()
+    assert isinstance(Timeline.load(tmp_path / "renamed.json").commands, BinaryCommands)
+
+    manager.delete_timeline("renamed")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_convert_recording_command(tmp_path):
+    from unittest.mock import MagicMock
+    from command_handler import CommandRouter
+
+    make_timeline().save(tmp_path / "show.json")
+    (tmp_path / "broken.json").write_text("{")
+    pumpkin = MagicMock()
+    pumpkin.timeline_playback = Playback(recordings_dir=tmp_path)
+    router = CommandRouter(pumpkin, MagicMock())
+
+    assert router.execute("convert_recording show") == "OK Converted show.json (5 commands)"
+    assert router.execute("convert_recording all") == "OK Converted 1 recordings (skipped invalid: broken.json)"
+    assert router.execute("convert_recording nope") == "ERROR File not found: nope.json"
@@ -0,0 +1,226 @@
+"""
+Test suite for the timeline optimizer.
+
+Tests that prune_commands drops only commands with no visible effect and
+that the optimizer runs on upload and through optimize_recording.
+
+Test Coverage:
+- Repeated expression, viseme and gaze/eyebrow/offset values are dropped
+- Setters overridden at the same time are dropped; ones a few ms apart,
+  which can land in different frames, are kept
+- Blinks and winks that start mid-blink/wink are dropped
+- Commands are kept whenever the face state is uncertain
+- Pruned timelines play back identically to the original
+- Uploads are optimized in place; optimize_recording command
+"""
+
+import json
+
+import pygame
+
+from pumpkin_face import PumpkinFace
+from timeline import FileManager, Timeline, TimelineEntry
+from timeline_optimize import optimize_file, optimize_recording, prune_commands
+
+
+FRAME_MS = 1000.0 / 60.0
+
+
+def entries(*commands):
+    return [TimelineEntry(time_ms, cmd, args[0] if args else None) for time_ms, cmd, *args in commands]
+
+
+def kept(*commands):
+    return [(c.time_ms, c.command) for c in prune_commands(entries(*commands))]
+
+
+def test_repeated_values_dropped():
+    assert kept(
+        (0, "set_expression", {"expression": "happy"}),
+        (1000, "set_expression", {"expression": "happy"}),
+        (1100, "mouth_open"),
+        (1200, "mouth_open"),
+        (1300, "gaze", {"x": 10, "y": 5}),
+        (1400, "gaze", {"lx": 10, "ly": 5, "rx": 10, "ry": 5}),
+        (1500, "gaze", {"x": 100, "y": 5}),
+        (1600, "gaze", {"x": 90, "y": 5}),  # Same after clamping
+        (1700, "eyebrow", {"value": 10}),
+        (1800, "eyebrow", {"left": 10, "right": 10}),
+        (1900, "set_offset", {"x": 3, "y": 4}),
+        (2000, "set_offset", {"x": 3, "y": 4}),
+    ) == [(0, "set_expression"), (1100, "mouth_open"), (1300, "gaze"), (1500, "gaze"),
+          (1700, "eyebrow"), (1900, "set_offset")]
+
+
+def test_setters_at_the_same_time_collapse():
+    assert kept(
+        (0, "mouth_closed"),
+        (0, "mouth_open"),
+        (100, "gaze", {"x": 1, "y": 1}),
+        (100, "blink"),
+        (100, "gaze", {"x": 2, "y": 2}),
+        (200, "mouth_wide"),
+        (210, "mouth_rounded"),
+    ) == [(0, "mouth_open"), (100, "blink"), (100, "gaze"), (200, "mouth_wide"),
+          (210, "mouth_rounded")]
+
+
+def test_setters_in_different_frames_kept():
+    """Setters less than a frame apart can still each be shown for a frame."""
+    pygame.init()
+    try:
+        commands = entries((10, "mouth_open"), (20, "mouth_wide"), (40, "mouth_rounded"))
+
+        assert prune_commands(commands) == commands
+        frames = play_frames(commands, 4)
+        assert [frame[9] for frame in frames] == ["open", "wide", "rounded", "rounded"]
+    finally:
+        pygame.quit()
+
+
+def test_overlapping_blinks_dropped():
+    assert kept(
+        (0, "blink"),
+        (300, "blink"),
+        (700, "blink"),
+        (710, "wink_left"),
+        (900, "wink_right"),
+    ) == [(0, "blink"), (700, "blink"), (710, "wink_left")]
+
+
+def test_uncertain_state_keeps_commands():
+    # Transition still running: the second set is not a no-op
+    assert len(kept((0, "set_expression", {"expression": "happy"}),
+                    (100, "set_expression", {"expression": "happy"}))) == 2
+    # A relative move in between
+    assert len(kept((0, "eyebrow", {"value": 10}), (100, "eyebrow_raise"),
+                    (200, "eyebrow", {"value": 10}))) == 3
+    # A roll restores the gaze it started from when it ends
+    assert len(kept((0, "gaze", {"x": 10, "y": 0}), (100, "roll_clockwise"),
+                    (200, "gaze", {"x": 10, "y": 0}), (2000, "gaze", {"x": 10, "y": 0}))) == 4
+    # A head turn is still moving when the offset is set
+    assert len(kept((0, "turn_left"), (100, "set_offset", {"x": 0, "y": 0}),
+                    (2000, "set_offset", {"x": 0, "y": 0}))) == 3
+    # A nested recording can change anything
+    assert len(kept((0, "mouth_open"), (100, "play_recording", {"filename": "x"}),
+                    (200, "mouth_open"))) == 3
+    # Setters on either side of a nested recording don't collapse
+    assert len(kept((0, "mouth_open"), (1, "play_recording", {"filename": "x"}),
+                    (2, "mouth_closed"))) == 3
+
+
+def snapshot(face):
+    return (face.current_expression, face.target_expression, round(face.transition_progress, 4),
+            face.is_blinking, round(face.blink_progress, 4), face.is_winking,
+            face.pupil_angle_left, face.pupil_angle_right, face.eyebrow_left_offset,
+            face.mouth_viseme, face.projection_offset_x, face.projection_offset_y)
+
+
+def play_frames(commands, frames):
+    face = PumpkinFace(width=1920, height=1080)
+    timeline = Timeline()
+    timeline.commands = commands
+    timeline.duration_ms = frames * FRAME_MS
+    playback = face.timeline_playback
+    playback.play_audio = False
+    playback.timeline = timeline
+    playback.filename = "test.json"
+    playback.state = playback.state.PLAYING
+    result = []
+    for _ in range(frames):
+        face.step(FRAME_MS)
+        result.append(snapshot(face))
+    return result
+
+
+def test_pruned_timeline_plays_the_same():
+    pygame.init()
+    try:
+        commands = entries(
+            (0, "set_expression", {"expression": "happy"}),
+            (50, "blink"),
+            (200, "blink"),
+            (400, "set_expression", {"expression": "happy"}),
+            (700, "set_expression", {"expression": "happy"}),
+            (800, "mouth_open"),
+            (900, "mouth_open"),
+            (950, "gaze", {"x": 20, "y": 10}),
+            (1000, "gaze", {"x": 20, "y": 10}),
+            (1100, "eyebrow", {"value": -20}),
+            (1200, "eyebrow", {"value": -20}),
+            (1300, "wink_left"),
+            (1400, "wink_right"),
+            (1500, "set_offset", {"x": 10, "y": 0}),
+            (1600, "set_offset", {"x": 10, "y": 0}),
+        )
+        pruned = prune_commands(commands)
+        assert len(pruned) < len(commands)
+
+        assert play_frames(pruned, 120) == play_frames(commands, 120)
+    finally:
+        pygame.quit()
+
+
+def redundant_timeline_json():
+    timeline = Timeline()
+    for i in range(10):
+        timeline.add_command(i * 100, "mouth_open")
+    timeline.duration_ms = 2000
+    return json.dumps(timeline.to_dict(), indent=2)
+
+
+def test_upload_is_optimized(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+
+    manager.upload_timeline("lips", redundant_timeline_json())
+
+    loaded = Timeline.load(tmp_path / "lips.json")
+    assert [c.command for c in loaded.commands] == ["mouth_open"]
+    assert loaded.duration_ms == 2000
+
+
+def test_upload_optimization_can_be_disabled(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+    manager.optimize_uploads = False
+
+    manager.upload_timeline("lips", redundant_timeline_json())
+
+    assert (tmp_path / "lips.json").read_text() == redundant_timeline_json()
+
+
+def test_optimize_file_leaves_minimal_timeline_untouched(tmp_path):
+    path = tmp_path / "minimal.json"
+    path.write_text('{"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}]}')
+
+    assert optimize_file(path) == (1, 1)
+    assert path.read_text() == '{"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}]}'
+
+
+def test_optimize_recording_prunes_and_simplifies(tmp_path):
+    timeline = Timeline()
+    timeline.add_command(0, "mouth_open")
+    timeline.add_command(10, "mouth_open")
+    for i in range(20):
+        timeline.add_command(100 + i * 20, "gaze", {"x": i, "y": 0})
+    timeline.save(tmp_path / "take.json")
+
+    assert optimize_recording(tmp_path / "take.json") == (22, 21)
+    before, after = optimize_recording(tmp_path / "take.json", tolerance=0.5)
+
+    assert (before, after) == (21, 2)
+
+
+def test_optimize_recording_command(tmp_path):
+    pygame.init()
+    try:
+        face = PumpkinFace(width=1920, height=1080)
+        face.timeline_playback.recordings_dir = tmp_path
+        face.command_router.pumpkin = face
+        timeline = Timeline()
+        timeline.add_command(0, "mouth_open")
+        timeline.add_command(100, "mouth_open")
+        timeline.save(tmp_path / "take.json")
+
+        assert face.command_router.execute("optimize_recording take") == "OK Optimized take.json: 2 -> 1 commands"
+    finally:
+        pygame.quit()
@@ -0,0 +1,158 @@
+"""
+Test suite for recording simplification.
+
+Tests that dense gaze/eyebrow/offset streams shrink to keyframe curves that
+stay within the tolerance, both at capture time and for saved recordings.
+
+Test Coverage:
+- RDP keeps the ends and every sample needed to meet the tolerance
+- Sampled streams become a single curve command; sparse commands stay
+- Gaps of more than about two frames, interrupting commands and
+  play_recording split streams (held steps never become ramps)
+- Curves played back stay within tolerance of the recorded samples
+- Held repeats are collapsed while recording; duration is preserved
+- simplify_recording and the record_tolerance / optimize_recording commands
+"""
+
+import math
+from unittest.mock import patch
+
+
+from keyframes import curve_from_command
+from timeline import Timeline, TimelineEntry, RecordingSession
+from timeline_simplify import rdp, simplify_commands, simplify_recording, stream_values
+
+
+def gaze_sweep(start_ms=0, samples=120, step_ms=16):
+    return [TimelineEntry(start_ms + i * step_ms, "gaze", {"x": 45 * math.sin(i / 20), "y": 0.0})
+            for i in range(samples)]
+
+
+def test_rdp_keeps_ends_and_corners():
+    times = [0, 1, 2, 3, 4]
+    values = [(0.0,), (1.0,), (2.0,), (1.0,), (0.0,)]
+
+    assert rdp(times, values, 0.1) == [0, 2, 4]
+    assert rdp(times, values, 5.0) == [0, 4]
+
+
+def test_stream_becomes_curve_within_tolerance():
+    commands = gaze_sweep()
+
+    simplified = simplify_commands(commands, tolerance=0.5)
+
+    assert len(simplified) == 1
+    curve_cmd = simplified[0]
+    assert curve_cmd.command == "gaze_curve"
+    assert curve_cmd.time_ms == 0
+    curve = curve_from_command("gaze_curve", curve_cmd.args, (0, 0, 0, 0))
+    for cmd in commands:
+        expected = stream_values("gaze", cmd.args)
+        actual = curve.evaluate(cmd.time_ms - curve_cmd.time_ms)
+        assert max(abs(a - b) for a, b in zip(actual, expected)) <= 0.5 + 1e-3
+
+
+def test_sparse_commands_unchanged():
+    commands = [TimelineEntry(0, "gaze", {"x": 10, "y": 0}),
+                TimelineEntry(1000, "gaze", {"x": 20, "y": 0}),
+                TimelineEntry(2000, "gaze", {"x": 30, "y": 0})]
+
+    assert simplify_commands(commands) == commands
+
+
+def test_held_steps_stay_steps():
+    """Samples more than about two frames apart are held, not ramped between."""
+    commands = [TimelineEntry(i * 200, "gaze", {"x": 10 * i, "y": 0}) for i in range(4)]
+
+    assert simplify_commands(commands) == commands
+    assert len(simplify_commands(gaze_sweep(step_ms=33))) == 1
+
+
+def test_interrupting_command_splits_stream():
+    commands = ([TimelineEntry(i * 16, "eyebrow", {"value": float(i)}) for i in range(10)]
+                + [TimelineEntry(170, "eyebrow_raise")]
+                + [TimelineEntry(180 + i * 16, "eyebrow", {"value": 5.0}) for i in range(10)])
+
+    simplified = simplify_commands(commands)
+
+    assert [c.command for c in simplified] == ["eyebrow_curve", "eyebrow_raise", "eyebrow_curve"]
+    assert simplified[0].args["keys"] == [[0, 0.0], [144, 9.0]]
+    assert simplified[2].time_ms == 180
+
+
+def test_other_features_interleave():
+    commands = []
+    for i in range(20):
+        commands.append(TimelineEntry(i * 16, "set_offset", {"x": i, "y": 0}))
+        if i == 10:
+            commands.append(TimelineEntry(i * 16, "blink"))
+
+    simplified = simplify_commands(commands)
+
+    assert [c.command for c in simplified] == ["offset_curve", "blink"]
+    assert simplified[0].args["keys"] == [[0, 0.0, 0.0], [304, 19.0, 0.0]]
+
+
+def test_independent_eyes_keep_four_values():
+    commands = [TimelineEntry(i * 16, "gaze", {"lx": i, "ly": 0, "rx": -i, "ry": 0}) for i in range(10)]
+
+    keys = simplify_commands(commands)[0].args["keys"]
+
+    assert keys[-1] == [144, 9.0, 0.0, -9.0, 0.0]
+
+
+def test_recording_collapses_holds_and_keeps_duration(tmp_path):
+    session = RecordingSession(recordings_dir=tmp_path)
+    with patch("timeline.time.monotonic", return_value=0.0):
+        session.start()
+    for i, x in enumerate([0, 5, 5, 5, 5, 5, 6]):
+        with patch("timeline.time.monotonic", return_value=i * 0.016):
+            session.record_command("gaze", {"x": x, "y": 0})
+    with patch("timeline.time.monotonic", return_value=0.2):
+        session.record_command("blink")
+
+    session.simplify_tolerance = None
+    filename = session.stop("raw")
+
+    commands = Timeline.load(tmp_path / filename).commands
+    assert [c.args.get("x") for c in commands] == [0, 5, 5, 6, None]
+    assert [c.time_ms for c in commands] == [0, 16, 80, 96, 200]
+
+
+def test_recording_simplifies_on_save(tmp_path):
+    session = RecordingSession(recordings_dir=tmp_path)
+    session.start()
+    session.commands = gaze_sweep() + [TimelineEntry(5000, "blink")]
+
+    session.stop("sweep")
+
+    timeline = Timeline.load(tmp_path / "sweep.json")
+    assert [c.command for c in timeline.commands] == ["gaze_curve", "blink"]
+    assert timeline.duration_ms == 5000
+
+
+def test_simplify_recording_in_place(tmp_path):
+    Timeline(commands=gaze_sweep(samples=60)).save(tmp_path / "sweep.json")
+
+    before, after = simplify_recording(tmp_path / "sweep.json")
+
+    assert (before, after) == (60, 1)
+    timeline = Timeline.load(tmp_path / "sweep.json")
+    assert timeline.duration_ms == 59 * 16
+
+
+def test_router_commands(tmp_path):
+    from command_handler import CommandRouter
+    pumpkin = type("Pumpkin", (), {})()
+    pumpkin.recording_session = RecordingSession(recordings_dir=tmp_path)
+    pumpkin.timeline_playback = type("PB", (), {"recordings_dir": tmp_path})()
+    router = CommandRouter(pumpkin, None)
+    Timeline(commands=gaze_sweep(samples=60)).save(tmp_path / "sweep.json")
+
+    assert router.execute("record_tolerance 2") == "OK Recording tolerance 2"
+    assert pumpkin.recording_session.simplify_tolerance == 2.0
+    assert router.execute("record_tolerance off") == "OK Recording tolerance off"
+    assert pumpkin.recording_session.simplify_tolerance is None
+    assert router.execute("record_tolerance -1").startswith("ERROR")
+    assert router.execute("optimize_recording sweep") == "OK Optimized sweep.json: 60 -> 1 commands"
+    assert router.execute("optimize_recording missing") == "ERROR File not found: missing.json"
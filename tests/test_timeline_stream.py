@@ -0,0 +1,217 @@
+"""
+Test suite for streaming timeline loading.
+
+Tests that large timelines are parsed incrementally, play before they have
+finished loading, and that uploads are validated while they are written.
+
+Test Coverage:
+- Parser yields commands as they complete, whatever the chunk boundaries
+- Parser rejects the same documents Timeline.load rejects
+- StreamingTimeline matches Timeline.load once loaded
+- Playback streams large files (also through the play command) and
+  doesn't end while still loading
+- Seeking waits for the commands it needs
+- Uploads validate while writing and leave nothing behind on error
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from timeline import FileManager, Playback, PlaybackState, Timeline
+from timeline_stream import StreamingTimeline, TimelineStreamParser
+
+
+def make_timeline(count, step_ms=10):
+    timeline = Timeline(audio_file="song.mp3")
+    for i in range(count):
+        timeline.add_command(i * step_ms, "gaze", {"x": i % 90, "y": -(i % 45)})
+    timeline.duration_ms = count * step_ms + 500
+    return timeline
+
+
+def parse_in_chunks(text, size):
+    parser = TimelineStreamParser()
+    commands = []
+    for start in range(0, len(text), size):
+        commands.extend(parser.feed(text[start:start + size]))
+    commands.extend(parser.close())
+    return parser, commands
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 100000])
+def test_parser_matches_json_load(size):
+    timeline = make_timeline(50)
+    text = json.dumps(timeline.to_dict(), indent=2)
+
+    parser, commands = parse_in_chunks(text, size)
+
+    assert [c.to_dict() for c in commands] == [c.to_dict() for c in timeline.commands]
+    assert parser.fields == {"version": "1.0", "duration_ms": 1000, "audio_file": "song.mp3"}
+    assert parser.command_count == 50
+
+
+def test_parser_yields_commands_before_document_ends():
+    parser = TimelineStreamParser()
+
+    assert parser.feed('{"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}, ') != []
+    assert [c.command for c in parser.feed('{"time_ms": 5, "command": "wink_left"}')] == ["wink_left"]
+    # A number at the end of a chunk may continue in the next one
+    assert parser.feed(', {"time_ms": 1') == []
+    assert [c.time_ms for c in parser.feed('2, "command": "blink"}]}')] == [12]
+    assert parser.close() == []
+
+
+@pytest.mark.parametrize("text", [
+    '{"version": "1.0", "commands": [',
+    '{"commands": []}',
+    '{"version": "1.0"}',
+    '{"version": "1.0", "commands": [{"time_ms": 0}]}',
+    '{"version": "1.0", "commands": []} extra',
+    '[]',
+    '{"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}, ]}',
+])
+def test_parser_rejects_invalid_documents(text):
+    parser = TimelineStreamParser()
+    with pytest.raises(ValueError):
+        parser.feed(text)
+        parser.close()
+
+
+def test_parser_bounds_pending_text():
+    parser = TimelineStreamParser(max_pending_chars=100)
+    parser.feed('{"version": "1.0", "commands": [{"time_ms": 0, "command": "')
+
+    with pytest.raises(ValueError):
+        parser.feed("x" * 200)
+
+
+def test_streaming_timeline_matches_load(tmp_path):
+    path = tmp_path / "big.json"
+    make_timeline(2000).save(path)
+
+    timeline = StreamingTimeline.open(path, first_window_ms=100, chunk_size=256)
+    timeline.wait_loaded()
+
+    loaded = Timeline.load(path)
+    assert not timeline.is_loading
+    assert timeline.error is None
+    assert [c.to_dict() for c in timeline.commands] == [c.to_dict() for c in loaded.commands]
+    assert timeline.duration_ms == loaded.duration_ms
+    assert timeline.audio_file == "song.mp3"
+
+
+def test_streaming_timeline_invalid_start(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text('{"version": "1.0", "commands": [{"oops": 1}]}')
+
+    with pytest.raises(ValueError):
+        StreamingTimeline.open(path)
+    with pytest.raises(FileNotFoundError):
+        StreamingTimeline.open(tmp_path / "missing.json")
+
+
+def test_streaming_timeline_keeps_commands_before_error(tmp_path):
+    path = tmp_path / "torn.json"
+    text = json.dumps(make_timeline(100).to_dict(), indent=2)
+    path.write_text(text[:len(text) // 2])
+
+    timeline = StreamingTimeline.open(path, first_window_ms=0, chunk_size=64)
+    timeline.wait_loaded()
+
+    assert 0 < len(timeline.commands) < 100
+    assert isinstance(timeline.error, ValueError)
+
+
+def test_playback_streams_large_files(tmp_path):
+    make_timeline(3000).save(tmp_path / "big.json")
+    make_timeline(10).save(tmp_path / "small.json")
+    playback = Playback(recordings_dir=tmp_path)
+    playback.play_audio = False
+    playback.stream_threshold_bytes = 10000
+    executed = []
+    playback.set_command_callback(lambda cmd, args: executed.append(args["x"]))
+
+    playback.play("small")
+    assert not isinstance(playback.timeline, StreamingTimeline)
+
+    playback.play("big")
+    assert isinstance(playback.timeline, StreamingTimeline)
+    playback.timeline.wait_loaded()
+    playback.update(35)
+    assert executed == [3]  # gaze commands due in one frame collapse to the last
+
+    playback.seek(20000)
+    assert playback.state == PlaybackState.PLAYING
+    playback.update(1)
+    assert executed[-1] == 2000 % 90
+
+
+def test_playback_does_not_end_while_loading(tmp_path):
+    playback = Playback(recordings_dir=tmp_path)
+    timeline = StreamingTimeline(tmp_path / "live.json")
+    timeline.commands.append(Timeline.from_dict(
+        {"version": "1.0", "commands": [{"time_ms": 0, "command": "blink"}]}).commands[0])
+    playback.timeline = timeline
+    playback.state = PlaybackState.PLAYING
+
+    playback.update(100)
+    assert playback.state == PlaybackState.PLAYING
+
+    timeline._loading = False
+    playback.update(100)
+    assert playback.state == PlaybackState.STOPPED
+
+
+def test_play_command_streams_large_file(tmp_path):
+    from command_handler import CommandRouter
+
+    make_timeline(3000).save(tmp_path / "big.json")
+    pumpkin = Mock()
+    pumpkin.timeline_playback = Playback(recordings_dir=tmp_path)
+    pumpkin.timeline_playback.play_audio = False
+    pumpkin.timeline_playback.stream_threshold_bytes = 10000
+    pumpkin.recording_session.is_recording = False
+    router = CommandRouter(pumpkin, Mock())
+
+    assert router.execute("play big").startswith("OK Playing big.json")
+
+    timeline = pumpkin.timeline_playback.timeline
+    assert isinstance(timeline, StreamingTimeline)
+    timeline.wait_loaded()
+    assert len(timeline.commands) == 3000
+
+
+def test_upload_validates_while_writing(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+    manager.optimize_uploads = False
+    text = json.dumps(make_timeline(20).to_dict(), indent=2)
+
+    upload = manager.open_upload("up")
+    for line in text.splitlines():
+        upload.write(line + "\n")
+    assert upload.finish() == 20
+
+    assert Timeline.load(tmp_path / "up.json").to_dict() == make_timeline(20).to_dict()
+    assert [p.name for p in tmp_path.iterdir()] == ["up.json"]
+
+
+def test_upload_rejects_invalid_timeline(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+
+    upload = manager.open_upload("bad")
+    with pytest.raises(ValueError):
+        upload.write('{"version": "1.0", "commands": [{"time_ms": 0}]}')
+    with pytest.raises(ValueError):
+        manager.upload_timeline("short", '{"version": "1.0", "commands": [')
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_existing_file(tmp_path):
+    manager = FileManager(recordings_dir=tmp_path)
+    manager.upload_timeline("once", '{"version": "1.0", "commands": []}')
+
+    with pytest.raises(FileExistsError):
+        manager.open_upload("once")
@@ -13,16 +13,50 @@ Design decisions:
 - Millisecond timestamps for sub-second precision
 - Flat file naming in ~/.mr-pumpkin/recordings/
 - Nested playback support (one timeline can trigger another)
+- Nested recordings are resolved and prefetched off the frame loop
+- Audio-backed timelines follow a smoothed, drift-corrected audio clock
+- Recordings with an up-to-date bake (see timeline_bake) play by per-frame
+  index lookup instead of command dispatch when use_baked is set
+- Commands due in the same frame that override each other (e.g. dense
+  visemes) collapse to the last one; timed callbacks get each command's
+  lateness so animations start at the right phase
 - Invalid commands during playback stop gracefully
+- Large recordings stream in on a background thread (see timeline_stream);
+  playback starts once the first window of commands is parsed
+- Recordings with an up-to-date binary copy (<name>.mpt, see timeline_binary)
+  load it memory-mapped instead of parsing JSON
+- Recordings drop held repeats while capturing and simplify sampled
+  gaze/eyebrow/offset streams into curves on save (see timeline_simplify)
+- Recordings are timed with the monotonic clock and journaled to disk as
+  they are captured; journals left by a crash are recovered on startup
 """
 
 import json
 import os
+import textwrap
+import threading
 import time
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
+
+from atomic_io import AtomicWriter, atomic_write
+
+
+# Commands that fully replace the state set by an earlier command of the same
+# group. When several of a group are due in one frame only the last one runs.
+SUPERSEDING_COMMANDS = {
+    "set_expression": "expression",
+    "gaze": "gaze",
+    "eyebrow": "eyebrow",
+    "set_offset": "offset",
+    "mouth_closed": "mouth",
+    "mouth_open": "mouth",
+    "mouth_wide": "mouth",
+    "mouth_rounded": "mouth",
+    "mouth_neutral": "mouth",
+}
 
 
 class PlaybackState(Enum):
@@ -73,8 +107,12 @@ class Timeline:
         version: Format version (for future compatibility)
         commands: List of TimelineEntry objects
         duration_ms: Total duration in milliseconds
+        is_loading: True while commands are still being appended (see
+            timeline_stream.StreamingTimeline)
     """
     
+    is_loading = False
+    
     def __init__(self, commands: Optional[List[TimelineEntry]] = None, version: str = "1.0", audio_file: Optional[str] = None):
         self.version = version
         self.commands = commands or []
@@ -109,6 +147,24 @@ class Timeline:
         """
         return [cmd for cmd in self.commands if cmd.time_ms <= position_ms]
     
+    def index_before(self, position_ms: float) -> int:
+        """Index of the last command before position_ms (-1 if none)."""
+        index_before = getattr(self.commands, "index_before", None)
+        if index_before is not None:
+            return index_before(position_ms)
+        last = -1
+        for i, cmd in enumerate(self.commands):
+            if cmd.time_ms < position_ms:
+                last = i
+        return last
+    
+    def has_command(self, command: str) -> bool:
+        """Whether any entry runs the given command."""
+        names = getattr(self.commands, "command_names", None)
+        if names is not None:
+            return command in names
+        return any(cmd.command == command for cmd in self.commands)
+    
     def get_commands_in_range(self, start_ms: int, end_ms: int) -> List[TimelineEntry]:
         """Get commands in a time range.
         
@@ -125,11 +181,12 @@ class Timeline:
         """Serialize timeline to dictionary for JSON encoding."""
         d = {
             "version": self.version,
-            "duration_ms": self.duration_ms,
-            "commands": [cmd.to_dict() for cmd in self.commands]
+            "duration_ms": self.duration_ms
         }
         if self.audio_file is not None:
             d["audio_file"] = self.audio_file
+        # Commands last, so streaming readers know the metadata up front
+        d["commands"] = [cmd.to_dict() for cmd in self.commands]
         return d
     
     @classmethod
@@ -158,19 +215,26 @@ class Timeline:
     def save(self, filepath: Path):
         """Save timeline to JSON file.
         
+        The file is replaced atomically (see atomic_io). A binary copy next
+        to the file (see timeline_binary) is rewritten so it stays current.
+        
         Args:
             filepath: Path to save file
         """
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with AtomicWriter(filepath) as f:
             json.dump(self.to_dict(), f, indent=2)
+        
+        from timeline_binary import binary_path, write_binary
+        if binary_path(filepath).exists():
+            write_binary(self, binary_path(filepath), source=filepath)
     
     @classmethod
-    def load(cls, filepath: Path) -> 'Timeline':
+    def load(cls, filepath: Path, binary: bool = True) -> 'Timeline':
         """Load timeline from JSON file.
         
         Args:
             filepath: Path to load file
+            binary: Use an up-to-date binary copy of the file if there is one
             
         Returns:
             Timeline object
@@ -182,6 +246,12 @@ class Timeline:
         if not filepath.exists():
             raise FileNotFoundError(f"Timeline file not found: {filepath}")
         
+        if binary:
+            from timeline_binary import load_binary
+            timeline = load_binary(filepath)
+            if timeline is not None:
+                return timeline
+        
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -191,6 +261,141 @@ class Timeline:
         return cls.from_dict(data)
 
 
+def resolve_recording_tree(recordings_dir: Path, filename: str, max_depth: int = 5,
+                           root: Optional[Timeline] = None,
+                           library=None) -> Tuple[Dict[str, Any], List[str]]:
+    """Load every recording reachable from a timeline through play_recording.
+    
+    Walks the play_recording references depth-first, loading each file once.
+    Problems (missing or invalid files, cycles, references nested deeper than
+    max_depth) are collected rather than raised so callers can decide whether
+    they are fatal.
+    
+    Args:
+        recordings_dir: Directory containing timeline files
+        filename: Root timeline filename (.json extension optional)
+        max_depth: Maximum nesting depth allowed by the playback engine
+        root: Already-loaded root timeline (skips loading it again)
+        library: RecordingLibrary whose pre-parsed timelines are used
+            instead of reading the files
+        
+    Returns:
+        Tuple of (resolved, problems) where resolved maps each filename to its
+        Timeline, or to the exception raised while loading it, and problems is
+        a list of human-readable error messages
+    """
+    if not filename.endswith('.json'):
+        filename = f"{filename}.json"
+    
+    resolved: Dict[str, Any] = {}
+    problems: List[str] = []
+    
+    def load(name: str):
+        if name not in resolved:
+            try:
+                cached = library.get(name) if library is not None else None
+                resolved[name] = cached or Timeline.load(Path(recordings_dir) / name)
+            except Exception as e:
+                resolved[name] = e
+        return resolved[name]
+    
+    def walk(name: str, path: List[str]):
+        timeline = resolved[name]
+        for cmd in timeline.commands:
+            if cmd.command != "play_recording":
+                continue
+            sub_name = cmd.args.get("filename", "")
+            if not sub_name:
+                continue
+            if not sub_name.endswith('.json'):
+                sub_name = f"{sub_name}.json"
+            chain = " -> ".join(path + [sub_name])
+            if sub_name in path:
+                problems.append(f"Cycle detected at {cmd.time_ms}ms in {name}: {chain}")
+                continue
+            if len(path) > max_depth:
+                problems.append(f"Maximum nesting depth ({max_depth}) exceeded at {cmd.time_ms}ms in {name}: {chain}")
+                continue
+            sub_timeline = load(sub_name)
+            if isinstance(sub_timeline, Exception):
+                problems.append(f"Cannot load sub-recording '{sub_name}' at {cmd.time_ms}ms in {name}: {sub_timeline}")
+                continue
+            walk(sub_name, path + [sub_name])
+    
+    if root is not None:
+        resolved[filename] = root
+    elif isinstance(load(filename), Exception):
+        problems.append(f"Cannot load recording '{filename}': {resolved[filename]}")
+        return resolved, problems
+    
+    walk(filename, [filename])
+    return resolved, problems
+
+
+class PlaybackClock:
+    """Playback position clock locked to an audio stream.
+    
+    pygame.mixer.music.get_pos() advances in coarse steps, can jump, and
+    does not account for seeks. The clock advances smoothly on frame time
+    (monotonic dt) between audio readings and steers toward each fresh
+    reading: small errors are corrected gradually, large ones (seek, stall,
+    buffer underrun) snap immediately.
+    
+    Attributes:
+        position_ms: Current fused position in milliseconds
+        audio_offset_ms: Added to raw audio readings (position of the last
+            seek minus the raw reading at that moment)
+        correction_gain: Fraction of the audio error corrected per reading
+        snap_threshold_ms: Errors larger than this snap to the audio position
+    """
+    
+    def __init__(self, correction_gain: float = 0.1, snap_threshold_ms: float = 120.0):
+        self.position_ms = 0.0
+        self.audio_offset_ms = 0.0
+        self.correction_gain = correction_gain
+        self.snap_threshold_ms = snap_threshold_ms
+        self._last_audio_raw: Optional[float] = None
+    
+    def reset(self, position_ms: float = 0.0, audio_raw_ms: Optional[float] = None):
+        """Restart the clock at a position.
+        
+        Args:
+            position_ms: New timeline position
+            audio_raw_ms: Raw audio reading at that position (None if the
+                audio stream restarts from zero)
+        """
+        self.position_ms = float(position_ms)
+        if audio_raw_ms is None:
+            self.audio_offset_ms = float(position_ms)
+        else:
+            self.audio_offset_ms = float(position_ms) - audio_raw_ms
+        self._last_audio_raw = audio_raw_ms
+    
+    def update(self, dt_ms: float, audio_raw_ms: Optional[float] = None) -> float:
+        """Advance the clock by one frame.
+        
+        Args:
+            dt_ms: Monotonic frame time in milliseconds
+            audio_raw_ms: Raw get_pos() reading, or None/negative if the audio
+                is not playing
+            
+        Returns:
+            The fused position in milliseconds
+        """
+        self.position_ms += dt_ms
+        
+        # Only fresh readings carry information; repeated values are stale
+        if audio_raw_ms is not None and audio_raw_ms >= 0 and audio_raw_ms != self._last_audio_raw:
+            self._last_audio_raw = audio_raw_ms
+            error = (audio_raw_ms + self.audio_offset_ms) - self.position_ms
+            if abs(error) > self.snap_threshold_ms:
+                self.position_ms += error
+            else:
+                self.position_ms += error * self.correction_gain
+        
+        return self.position_ms
+
+
 class Playback:
     """Frame-based playback engine for timelines.
     
@@ -201,6 +406,7 @@ class Playback:
         timeline: Currently loaded timeline
         current_position_ms: Current position in timeline (milliseconds)
         filename: Name of currently loaded file
+        rate: Playback speed factor (negative plays in reverse; see set_rate)
     """
     
     def __init__(self, recordings_dir: Optional[Path] = None):
@@ -221,58 +427,234 @@ class Playback:
         self.filename: Optional[str] = None
         self._last_executed_index = -1
         self._command_callback = None
+        self._timed_callback = False
         self._stack: List = []  # Stack for nested playback: list of (timeline, position_ms, last_executed_index, filename)
         self._max_depth = 5  # Prevent infinite nesting
+        
+        # Audio clock for audio-backed timelines
+        self.clock = PlaybackClock()
+        self._audio_timeline: Optional[Timeline] = None  # Timeline whose audio is playing
+        self.audio_lookahead_ms = 1000.0 / 60.0  # Dispatch one frame early so visemes land with the audio
+        self.play_audio = True  # False for engines that must not touch the shared music stream
+        
+        # Baked playback: per-frame face parameters instead of command dispatch
+        self.use_baked = False
+        self.baked = None  # BakedTimeline for the current recording, if any
+        
+        # Playback rate: speed factor on the position clock (negative plays in reverse)
+        self.rate = 1.0
+        self.min_rate = 0.25
+        self.max_rate = 4.0
+        self._scrub_baked = False  # self.baked was only loaded for reverse playback
+        
+        # Pre-parsed recordings kept current by a directory watcher, if any
+        self.library = None  # recording_library.RecordingLibrary
+        
+        # Recordings larger than this are parsed incrementally while playing
+        self.stream_threshold_bytes = 1 << 20
+        self.stream_first_window_ms = 2000.0
+        
+        # Nested recordings prefetched by a background thread when play() is called
+        self._preloaded: Dict[str, Any] = {}  # filename -> Timeline or load exception
+        self.preload_problems: List[str] = []
+        self._preload_thread: Optional[threading.Thread] = None
+        self._strict = False  # Stop the current recording if its prefetch finds problems
+        self._preload_lock = threading.Lock()
+        self._preload_generation = 0
     
-    def set_command_callback(self, callback):
+    def set_command_callback(self, callback, timed: bool = False):
         """Set callback function for executing commands.
         
         Args:
             callback: Function that takes (command, args) and executes it
+            timed: Also pass late_ms, how far the playback position is past the
+                command's scheduled time (negative inside the audio lookahead)
         """
         self._command_callback = callback
+        self._timed_callback = timed
     
-    def play(self, filename: str):
+    def play(self, filename: str, strict: bool = False,
+             preloaded: Optional[Tuple[Dict[str, Any], List[str]]] = None,
+             baked=None):
         """Load and start playing a timeline.
         
+        Nested recordings referenced through play_recording are resolved and
+        loaded on a background thread so that switching to them never does
+        file I/O inside a frame. Files over stream_threshold_bytes start
+        playing once their first stream_first_window_ms of commands are
+        parsed; the rest loads in the background.
+        
         Args:
             filename: Name of timeline file (without .json extension if not included)
+            strict: Stop playback (update() returns the problems) as soon as
+                the background prefetch finds a nested recording that is
+                missing, invalid, cyclic or nested too deeply; with preloaded,
+                refuse to start instead
+            preloaded: Result of resolve_recording_tree() for this filename;
+                when given, playback starts without touching the disk
+            baked: Already-loaded BakedTimeline for this filename (only used
+                when use_baked is set; otherwise one is looked up on disk)
             
         Raises:
             FileNotFoundError: If file doesn't exist
-            ValueError: If timeline is invalid
+            ValueError: If timeline is invalid (or, when strict, if the
+                preloaded recording tree has problems)
         """
         if not filename.endswith('.json'):
             filename = f"{filename}.json"
         
-        filepath = self.recordings_dir / filename
-        self.timeline = Timeline.load(filepath)
+        if preloaded is not None and isinstance(preloaded[0].get(filename), Timeline):
+            resolved, problems = preloaded
+            timeline = resolved[filename]
+            if strict and problems:
+                raise ValueError("; ".join(problems))
+        else:
+            # The tree is resolved (and, when strict, checked) on the prefetch thread
+            timeline = self._load_root(self.recordings_dir / filename)
+            resolved, problems = None, []
+        
+        self._strict = strict
+        if resolved is not None:
+            self._preload_thread = None
+            self._set_preloaded(self._preload_generation + 1, resolved, problems)
+        else:
+            self._start_preload(filename, timeline)
+        
+        self.timeline = timeline
         self.filename = filename
         self._last_executed_index = -1
+        self._stack.clear()
+        if self.rate < 0:
+            self.rate = 1.0  # A reverse rate would end a new recording immediately
+        
+        self.baked = None
+        self._scrub_baked = False
+        if self.use_baked:
+            if baked is None:
+                from timeline_bake import load_baked
+                baked = load_baked(self.recordings_dir, filename)
+            self.baked = baked
         
         # Start audio BEFORE marking state as PLAYING so get_pos() is already
         # ticking when the first update() call arrives.
-        if self.timeline.audio_file:
+        self._audio_timeline = None
+        if self.timeline.audio_file and self.play_audio:
             audio_path = self.recordings_dir / self.timeline.audio_file
             try:
                 import pygame
                 pygame.mixer.music.load(str(audio_path))
                 pygame.mixer.music.play()
+                if self.rate != 1.0:
+                    pygame.mixer.music.pause()  # Muted until the rate is back to 1x
+                self._audio_timeline = self.timeline
             except Exception as e:
                 import logging
                 logging.getLogger(__name__).warning(
                     "Audio playback failed for %s: %s", self.timeline.audio_file, e
                 )
         
+        self.clock.reset(0)
         self.current_position_ms = 0
         self.state = PlaybackState.PLAYING
     
+    def _load_root(self, filepath: Path) -> Timeline:
+        """Load a timeline to play, streaming it in when it is large."""
+        if self.library is not None:
+            cached = self.library.get(filepath.name)
+            if cached is not None:
+                return cached
+        try:
+            large = filepath.stat().st_size > self.stream_threshold_bytes
+        except OSError:
+            large = False
+        if not large:
+            return Timeline.load(filepath)
+        from timeline_binary import load_binary
+        timeline = load_binary(filepath)
+        if timeline is not None:
+            return timeline
+        from timeline_stream import StreamingTimeline
+        return StreamingTimeline.open(filepath, self.stream_first_window_ms)
+    
+    def validate(self, filename: str) -> List[str]:
+        """Check a recording and all of its nested recordings without playing.
+        
+        Args:
+            filename: Name of timeline file (.json extension optional)
+            
+        Returns:
+            List of problems found (empty if the recording tree is playable)
+        """
+        _, problems = resolve_recording_tree(self.recordings_dir, filename, self._max_depth, library=self.library)
+        return problems
+    
+    def _start_preload(self, filename: str, root: Timeline):
+        """Resolve and load the nested recording tree on a background thread."""
+        with self._preload_lock:
+            self._preload_generation += 1
+            generation = self._preload_generation
+            self._preloaded = {}
+            self.preload_problems = []
+        
+        if not root.is_loading and not root.has_command("play_recording"):
+            self._preload_thread = None
+            return
+        
+        def worker():
+            if root.is_loading:
+                root.wait_loaded()
+            resolved, problems = resolve_recording_tree(self.recordings_dir, filename, self._max_depth,
+                                                        root=root, library=self.library)
+            self._set_preloaded(generation, resolved, problems)
+        
+        self._preload_thread = threading.Thread(target=worker, name="playback-preload", daemon=True)
+        self._preload_thread.start()
+    
+    def _set_preloaded(self, generation: int, resolved: Dict[str, Any], problems: List[str]):
+        """Publish prefetch results unless a newer play() has superseded them."""
+        with self._preload_lock:
+            if generation < self._preload_generation:
+                return
+            self._preload_generation = generation
+            self._preloaded = resolved
+            self.preload_problems = problems
+    
+    def _preload_pending(self) -> bool:
+        """Whether the nested recording prefetch is still running."""
+        thread = self._preload_thread
+        return thread is not None and thread is not threading.current_thread() and thread.is_alive()
+    
+    def _get_sub_timeline(self, filename: str) -> Timeline:
+        """Return a prefetched sub-recording.
+        
+        Call once the prefetch has finished (see _preload_pending()); only
+        falls back to loading from disk for files outside the resolved tree.
+        
+        Raises:
+            FileNotFoundError: If the sub-recording doesn't exist
+            ValueError: If the sub-recording is invalid
+        """
+        with self._preload_lock:
+            sub_timeline = self._preloaded.get(filename)
+        
+        if sub_timeline is None and self.library is not None:
+            sub_timeline = self.library.get(filename)
+        if sub_timeline is None:
+            sub_timeline = Timeline.load(self.recordings_dir / filename)
+        elif isinstance(sub_timeline, Exception):
+            raise sub_timeline
+        return sub_timeline
+    
     def stop(self):
         """Stop playback and reset to beginning."""
         self.state = PlaybackState.STOPPED
         self.current_position_ms = 0
         self._last_executed_index = -1
         self._stack.clear()
+        self._audio_timeline = None
+        self.clock.reset(0)
+        if not self.play_audio:
+            return
         # Stop audio if playing
         try:
             import pygame
@@ -282,17 +664,63 @@ class Playback:
             pass
     
     def pause(self):
-        """Pause playback at current position."""
+        """Pause playback (and its audio) at current position."""
         if self.state == PlaybackState.PLAYING:
             self.state = PlaybackState.PAUSED
+            if self._audio_timeline is not None:
+                try:
+                    import pygame
+                    pygame.mixer.music.pause()
+                except Exception:
+                    pass
     
     def resume(self):
-        """Resume playback from paused state."""
+        """Resume playback (and its audio) from paused state."""
         if self.state == PlaybackState.PAUSED:
             self.state = PlaybackState.PLAYING
+            if self._audio_timeline is not None and self.rate == 1.0:
+                try:
+                    import pygame
+                    pygame.mixer.music.unpause()
+                except Exception:
+                    pass
+    
+    def _audio_position(self) -> Optional[float]:
+        """Raw audio position from the mixer, or None if audio isn't playing."""
+        try:
+            import pygame
+            if pygame.mixer.get_init():
+                audio_pos = pygame.mixer.music.get_pos()
+                if audio_pos >= 0:
+                    return float(audio_pos)
+        except Exception:
+            pass
+        return None
+    
+    def _seek_audio(self, position_ms: float):
+        """Move the audio stream to a timeline position and re-anchor the clock.
+        
+        Uses mixer.music.set_pos() where the format supports it (get_pos()
+        keeps counting from its old value); otherwise restarts the stream at
+        the position (get_pos() restarts from zero).
+        """
+        try:
+            import pygame
+            try:
+                pygame.mixer.music.set_pos(position_ms / 1000.0)
+                self.clock.reset(position_ms, self._audio_position())
+            except pygame.error:
+                pygame.mixer.music.play(start=position_ms / 1000.0)
+                if self.state == PlaybackState.PAUSED:
+                    pygame.mixer.music.pause()
+                self.clock.reset(position_ms)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning("Audio seek failed: %s", e)
+            self.clock.reset(position_ms, self._audio_position())
     
     def seek(self, position_ms: int):
-        """Seek to specific position in timeline.
+        """Seek to specific position in timeline (and its audio).
         
         Args:
             position_ms: Target position in milliseconds
@@ -301,14 +729,19 @@ class Playback:
             return
         
         # Clamp to valid range
-        position_ms = max(0, min(position_ms, self.timeline.duration_ms))
+        duration_ms = self.baked.duration_ms if self.baked is not None else self.timeline.duration_ms
+        position_ms = max(0, min(position_ms, duration_ms))
         self.current_position_ms = position_ms
         
+        if self._audio_timeline is not None and self.timeline is self._audio_timeline and self.rate == 1.0:
+            self._seek_audio(position_ms)
+        
+        # Commands up to the new position may still be streaming in
+        if self.timeline.is_loading:
+            self.timeline.wait_for(position_ms)
+        
         # Reset execution tracking for new position
-        self._last_executed_index = -1
-        for i, cmd in enumerate(self.timeline.commands):
-            if cmd.time_ms < position_ms:
-                self._last_executed_index = i
+        self._last_executed_index = self.timeline.index_before(position_ms)
     
     def update(self, dt_ms: float) -> List[str]:
         """Update playback state (call every frame).
@@ -322,38 +755,60 @@ class Playback:
         if self.state != PlaybackState.PLAYING or self.timeline is None:
             return []
         
-        # Advance position — lock to audio clock when audio is playing so
-        # animation stays frame-perfectly in sync with the mp3/wav.
-        if self.timeline.audio_file:
-            try:
-                import pygame
-                if pygame.mixer.get_init():
-                    audio_pos = pygame.mixer.music.get_pos()
-                    if audio_pos >= 0:
-                        self.current_position_ms = float(audio_pos)
-                    else:
-                        self.current_position_ms += dt_ms  # audio ended or not started
-                else:
-                    self.current_position_ms += dt_ms
-            except Exception:
+        if self._strict and self.preload_problems:
+            # Strict play found a broken recording tree once the prefetch finished
+            problems = "; ".join(self.preload_problems)
+            filename = self._stack[0][3] if self._stack else self.filename
+            self.stop()
+            return [f"Stopped {filename}: {problems}"]
+        
+        # Advance position — lock to the audio clock when audio is playing so
+        # animation stays in sync with the mp3/wav. The clock keeps running
+        # while a nested recording plays so the parent resumes in sync. At
+        # other rates the audio is muted and the position runs on frame time.
+        lookahead_ms = 0.0
+        if self.rate != 1.0:
+            self.current_position_ms += dt_ms * self.rate
+        elif self._audio_timeline is not None:
+            audio_position_ms = self.clock.update(dt_ms, self._audio_position())
+            if self.timeline is self._audio_timeline:
+                self.current_position_ms = audio_position_ms
+                lookahead_ms = self.audio_lookahead_ms
+            else:
                 self.current_position_ms += dt_ms
         else:
             self.current_position_ms += dt_ms
         
+        # Baked recordings are applied by the face per frame; nothing to dispatch
+        if self.baked is not None:
+            if self.current_position_ms >= self.baked.duration_ms:
+                self.stop()
+            elif self.current_position_ms <= 0 and self.rate < 0:
+                # Reverse playback holds on the first frame
+                self.current_position_ms = 0
+                self.pause()
+            return []
+        
         # Execute commands in current time window
         errors = []
-        for i, cmd in enumerate(self.timeline.commands):
-            # Skip already-executed commands
-            if i <= self._last_executed_index:
-                continue
+        waiting = False  # For the prefetch before switching to a nested recording
+        superseded = self._superseded_commands(lookahead_ms)
+        commands = self.timeline.commands
+        for i in range(self._last_executed_index + 1, len(commands)):
+            cmd = commands[i]
             
             # Stop if command is in the future
-            if cmd.time_ms > self.current_position_ms:
+            if cmd.time_ms > self.current_position_ms + lookahead_ms:
                 break
             
             # Handle play_recording command (nested playback)
             if cmd.command == "play_recording":
                 filename = cmd.args.get("filename", "")
+                if filename and len(self._stack) < self._max_depth and self._preload_pending():
+                    # Never wait for the prefetch inside a frame; the parent
+                    # keeps running and the switch is retried next frame
+                    waiting = True
+                    break
                 if filename and len(self._stack) < self._max_depth:
                     try:
                         # Push current state onto stack
@@ -364,11 +819,10 @@ class Playback:
                             self.filename
                         ))
                         
-                        # Load sub-recording
+                        # Switch to the prefetched sub-recording
                         if not filename.endswith('.json'):
                             filename = f"{filename}.json"
-                        sub_filepath = self.recordings_dir / filename
-                        sub_timeline = Timeline.load(sub_filepath)
+                        sub_timeline = self._get_sub_timeline(filename)
                         
                         # Switch to sub-recording
                         self.timeline = sub_timeline
@@ -379,6 +833,7 @@ class Playback:
                         # Break out of loop since we switched timelines
                         break
                     except Exception as e:
+                        self._stack.pop()
                         error_msg = f"Error loading sub-recording '{filename}' at {cmd.time_ms}ms: {e}"
                         errors.append(error_msg)
                         # Don't stop playback, just skip this command
@@ -391,8 +846,16 @@ class Playback:
             
             # Execute normal command
             if self._command_callback:
+                if i in superseded:
+                    # Overridden by a later command in this frame
+                    self._last_executed_index = i
+                    continue
                 try:
-                    self._command_callback(cmd.command, cmd.args)
+                    if self._timed_callback:
+                        self._command_callback(cmd.command, cmd.args,
+                                               self.current_position_ms - cmd.time_ms)
+                    else:
+                        self._command_callback(cmd.command, cmd.args)
                     self._last_executed_index = i
                 except Exception as e:
                     error_msg = f"Error executing command '{cmd.command}' at {cmd.time_ms}ms: {e}"
@@ -401,8 +864,10 @@ class Playback:
                     self.stop()
                     break
         
-        # Check if reached end (after executing commands)
-        if self.current_position_ms >= self.timeline.duration_ms:
+        # Check if reached end (after executing commands); a timeline that is
+        # still streaming in isn't finished even if the position is past its
+        # last parsed command
+        if self.current_position_ms >= self.timeline.duration_ms and not self.timeline.is_loading and not waiting:
             # Pop back to parent recording if there is one
             if self._stack:
                 parent_timeline, parent_position, parent_index, parent_filename = self._stack.pop()
@@ -415,19 +880,127 @@ class Playback:
         
         return errors
     
+    def set_rate(self, rate: float, baked=None):
+        """Change the playback speed.
+        
+        Rates other than 1x play without sound (pygame's music stream can't
+        be resampled); the audio is re-seeked to the playback position when
+        the rate returns to 1x. Negative rates play in reverse by applying
+        the baked face state for each position instead of running commands
+        backwards; when playback goes forward again, commands are dispatched
+        from the current position on.
+        
+        Args:
+            rate: Speed factor; its magnitude must be between min_rate and
+                max_rate (negative for reverse)
+            baked: BakedTimeline of the playing recording to reverse through
+                when no bake is loaded (default: the up-to-date bake on disk)
+            
+        Raises:
+            ValueError: If the rate is out of range, or reverse playback has
+                no bake to reconstruct the face from
+        """
+        rate = float(rate)
+        if not self.min_rate <= abs(rate) <= self.max_rate:
+            raise ValueError(f"Playback rate must be between {self.min_rate:g}x and {self.max_rate:g}x "
+                             f"(negative for reverse)")
+        
+        if rate < 0 and self.baked is None and self.timeline is not None:
+            self._start_reverse(baked)
+        elif rate > 0 and self._scrub_baked:
+            # Back to command dispatch from the reconstructed state
+            self.baked = None
+            self._scrub_baked = False
+            if self.timeline.is_loading:
+                self.timeline.wait_for(self.current_position_ms)
+            self._last_executed_index = self.timeline.index_before(self.current_position_ms)
+        
+        previous, self.rate = self.rate, rate
+        if self._audio_timeline is None or (previous == 1.0) == (rate == 1.0):
+            return
+        try:
+            import pygame
+            if rate != 1.0:
+                pygame.mixer.music.pause()
+                return
+            position_ms = self.current_position_ms
+            if self.timeline is not self._audio_timeline:
+                position_ms = next(position for timeline, position, _, _ in self._stack
+                                   if timeline is self._audio_timeline)
+            self._seek_audio(position_ms)
+            if self.state == PlaybackState.PLAYING:
+                pygame.mixer.music.unpause()
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning("Audio rate change failed: %s", e)
+    
+    def _start_reverse(self, baked):
+        """Load the bake that reverse playback reconstructs the face from.
+        
+        Playback is left untouched if reverse playback isn't possible.
+        """
+        # Bake positions count from the start of the root recording
+        root = self._stack[0] if self._stack else (self.timeline, self.current_position_ms, None, self.filename)
+        timeline, position_ms, _, filename = root
+        if timeline.has_command("play_recording"):
+            # Commands of nested recordings can't be swapped for the root's bake mid-play
+            raise ValueError(f"Reverse playback isn't supported for recordings with nested recordings "
+                             f"({filename} contains play_recording) unless they were started from their bake")
+        if baked is None:
+            from timeline_bake import load_baked
+            baked = load_baked(self.recordings_dir, filename)
+            if baked is None:
+                raise ValueError(f"Reverse playback needs an up-to-date bake of {filename} "
+                                 f"(bake_recording {filename})")
+        self.timeline, self.current_position_ms, self.filename = timeline, position_ms, filename
+        self._stack.clear()
+        self.baked = baked
+        self._scrub_baked = True
+    
+    def _superseded_commands(self, lookahead_ms: float) -> set:
+        """Find due commands that a later command in the same frame overrides.
+        
+        Only looks at commands before the next play_recording, since the
+        frame switches timelines there.
+        
+        Args:
+            lookahead_ms: Dispatch window past the current position
+            
+        Returns:
+            Set of command indices to skip
+        """
+        latest: Dict[str, int] = {}
+        superseded = set()
+        for i in range(self._last_executed_index + 1, len(self.timeline.commands)):
+            cmd = self.timeline.commands[i]
+            if cmd.time_ms > self.current_position_ms + lookahead_ms or cmd.command == "play_recording":
+                break
+            group = SUPERSEDING_COMMANDS.get(cmd.command)
+            if group is None:
+                continue
+            if group in latest:
+                superseded.add(latest[group])
+            latest[group] = i
+        return superseded
+    
     def get_status(self) -> Dict[str, Any]:
         """Get current playback status.
         
         Returns:
-            Dictionary with state, filename, position, duration, is_playing, stack_depth
+            Dictionary with state, filename, position, duration, is_playing,
+            stack_depth, preload_problems, baked and rate
         """
         return {
             "state": self.state.value,
             "filename": self.filename,
             "position_ms": self.current_position_ms,
-            "duration_ms": self.timeline.duration_ms if self.timeline else 0,
+            "duration_ms": (self.baked.duration_ms if self.baked is not None
+                            else self.timeline.duration_ms if self.timeline else 0),
             "is_playing": self.state == PlaybackState.PLAYING,
-            "stack_depth": len(self._stack)
+            "stack_depth": len(self._stack),
+            "preload_problems": list(self.preload_problems),
+            "baked": self.baked is not None,
+            "rate": self.rate
         }
     
     def get_duration(self, filename: Optional[str] = None) -> int:
@@ -446,6 +1019,8 @@ class Playback:
         if filename is None:
             if self.timeline is None:
                 return 0
+            if self.baked is not None:
+                return self.baked.duration_ms
             return self.timeline.duration_ms
         
         # Load file to get duration
@@ -468,7 +1043,7 @@ class Playback:
         recordings = []
         for filepath in self.recordings_dir.glob('*.json'):
             try:
-                timeline = Timeline.load(filepath)
+                timeline = self._load_listed(filepath)
                 stat = filepath.stat()
                 recordings.append({
                     "filename": filepath.name,
@@ -483,6 +1058,14 @@ class Playback:
         
         return recordings
     
+    def _load_listed(self, filepath: Path) -> Timeline:
+        """Load a recording for listing, using the library's copy when current."""
+        if self.library is not None:
+            cached = self.library.get(filepath.name)
+            if cached is not None:
+                return cached
+        return Timeline.load(filepath)
+    
     def delete_recording(self, filename: str):
         """Delete a recording file.
         
@@ -500,6 +1083,8 @@ class Playback:
             raise FileNotFoundError(f"Recording not found: {filename}")
         
         filepath.unlink()
+        filepath.with_suffix('.baked').unlink(missing_ok=True)  # Bake of the recording, if any
+        filepath.with_suffix('.mpt').unlink(missing_ok=True)  # Binary copy, if any
     
     def rename_recording(self, old_name: str, new_name: str):
         """Rename a recording file.
@@ -526,19 +1111,123 @@ class Playback:
             raise FileExistsError(f"Recording already exists: {new_name}")
         
         old_path.rename(new_path)
+        if old_path.with_suffix('.mpt').exists():
+            # The binary copy stays current: renaming keeps the JSON's size and mtime
+            old_path.with_suffix('.mpt').replace(new_path.with_suffix('.mpt'))
+        # A bake records its source filenames, so it can't follow the rename
+        old_path.with_suffix('.baked').unlink(missing_ok=True)
+
+
+def _journal_entries(journal_path: Path) -> Iterator[TimelineEntry]:
+    """Read a recording journal (one JSON entry per line) lazily.
+    
+    Stops at the first unreadable line, which is where a crash cut the
+    last write short.
+    """
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield TimelineEntry.from_dict(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                return
+
+
+def finalize_journal(journal_path: Path, filepath: Path,
+                     simplify_tolerance: Optional[float] = None) -> int:
+    """Turn a recording journal into a timeline file and delete the journal.
+    
+    Entries are streamed from the journal to the file, so memory use does
+    not grow with the length of the recording. The timeline is written to a
+    temporary file and moved into place once it is complete.
+    
+    Args:
+        journal_path: Journal written by RecordingSession
+        filepath: Timeline file to create
+        simplify_tolerance: Simplify gaze/eyebrow/offset streams with this
+            tolerance (see timeline_simplify); None keeps every sample
+        
+    Returns:
+        Number of commands written
+        
+    Raises:
+        ValueError: If the journal has no commands
+        FileExistsError: If filepath already exists (the journal is kept)
+    """
+    duration_ms = None
+    for entry in _journal_entries(journal_path):
+        duration_ms = entry.time_ms if duration_ms is None else max(duration_ms, entry.time_ms)
+    if duration_ms is None:
+        raise ValueError("Cannot save recording with no commands")
+    
+    entries: Iterable[TimelineEntry] = _journal_entries(journal_path)
+    if simplify_tolerance is not None:
+        from timeline_simplify import simplify_stream
+        entries = simplify_stream(entries, simplify_tolerance)
+    
+    count = write_timeline(filepath, entries, duration_ms, exclusive=True)
+    journal_path.unlink()
+    return count
+
+
+def write_timeline(filepath: Path, entries: Iterable[TimelineEntry], duration_ms,
+                   version: str = "1.0", audio_file: Optional[str] = None,
+                   exclusive: bool = False) -> int:
+    """Stream timeline entries to a file in the same layout as Timeline.save().
+    
+    The file is written to a temporary file, fsynced and moved into place
+    once it is complete, so entries may come from the file being replaced.
+    
+    Args:
+        filepath: Timeline file to write
+        entries: Commands in time order (consumed lazily)
+        duration_ms: Timeline duration
+        version: Format version
+        audio_file: Paired audio filename, if any
+        exclusive: Fail if filepath exists instead of replacing it
+        
+    Returns:
+        Number of commands written
+        
+    Raises:
+        FileExistsError: If exclusive and filepath exists
+    """
+    header = {"version": version, "duration_ms": duration_ms}
+    if audio_file is not None:
+        header["audio_file"] = audio_file
+    
+    count = 0
+    with AtomicWriter(filepath, exclusive=exclusive) as f:
+        f.write("{\n")
+        for key, value in header.items():
+            f.write(f"  {json.dumps(key)}: {json.dumps(value)},\n")
+        f.write('  "commands": [')
+        for entry in entries:
+            f.write(",\n" if count else "\n")
+            f.write(textwrap.indent(json.dumps(entry.to_dict(), indent=2), "    "))
+            count += 1
+        f.write("\n  ]\n}" if count else "]\n}")
+    return count
 
 
 class RecordingSession:
     """Recording session for capturing command sequences.
     
-    Captures commands with timestamps to create timelines.
+    Captures commands with timestamps to create timelines. Commands are
+    appended to a journal file in the recordings directory as they arrive
+    (fsynced in batches), so a crash loses at most the last few commands and
+    memory stays bounded however long the take is. stop() streams the
+    journal into the timeline file; recover_journals() saves journals left
+    behind by a crash.
     
     Attributes:
         is_recording: Whether recording is active
-        commands: List of captured TimelineEntry objects
-        start_time: Timestamp when recording started (milliseconds)
+        commands: Captured TimelineEntry objects not yet written to the journal
+        start_time: Monotonic clock reading when recording started (milliseconds)
+        command_count: Number of commands captured so far
     """
     
+    JOURNAL_SUFFIX = ".journal"
+    
     def __init__(self, recordings_dir: Optional[Path] = None):
         """Initialize recording session.
         
@@ -554,16 +1243,42 @@ class RecordingSession:
         self.is_recording = False
         self.commands: List[TimelineEntry] = []
         self.start_time: Optional[float] = None
+        # Max error (degrees/pixels) when simplifying gaze/eyebrow/offset streams on save; None keeps every sample
+        self.simplify_tolerance: Optional[float] = 0.5
+        self.fsync_every = 64  # Journal entries between fsyncs
+        self.fsync_interval_s = 1.0  # Longest time between fsyncs while commands arrive
+        
+        self._journal_path: Optional[Path] = None
+        self._journal = None  # Open journal file, created with the first written entry
+        self._journaled = 0  # Entries written to the journal
+        self._unsynced = 0
+        self._last_sync = 0.0
+    
+    @property
+    def command_count(self) -> int:
+        return self._journaled + len(self.commands)
+    
+    def elapsed_ms(self) -> int:
+        """Time since recording started in milliseconds (0 when not recording)."""
+        if not self.is_recording or self.start_time is None:
+            return 0
+        return int(time.monotonic() * 1000 - self.start_time)
     
     def start(self):
         """Begin command capture."""
+        self._close_journal(delete=True)
         self.is_recording = True
         self.commands = []
-        self.start_time = time.time() * 1000  # Convert to milliseconds
+        self.start_time = time.monotonic() * 1000  # Convert to milliseconds
+        stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        self._journal_path = self.recordings_dir / f".recording_{stamp}_{os.getpid()}{self.JOURNAL_SUFFIX}"
     
     def stop(self, filename: Optional[str] = None) -> str:
         """Stop recording and save timeline.
         
+        If the file can't be written the journal is kept, so the take is
+        recovered by recover_journals() on the next start.
+        
         Args:
             filename: Name for saved file (auto-generated if None)
             
@@ -579,7 +1294,8 @@ class RecordingSession:
         
         self.is_recording = False
         
-        if not self.commands:
+        if not self.command_count:
+            self._close_journal(delete=True)
             raise ValueError("Cannot save recording with no commands")
         
         # Auto-generate filename if not provided
@@ -593,13 +1309,21 @@ class RecordingSession:
         
         filepath = self.recordings_dir / filename
         
-        # Check if file exists
+        # Write out the buffered tail, then stream the journal into the timeline
+        self._write_journal(self.commands)
+        self.commands = []
+        journal_path = self._journal_path
+        self._close_journal()
+        
+        # Fail early if the name is taken; finalize_journal still refuses to
+        # replace a file that appears meanwhile
         if filepath.exists():
             raise FileExistsError(f"Recording already exists: {filename}")
         
-        # Create timeline and save
-        timeline = Timeline(commands=self.commands)
-        timeline.save(filepath)
+        try:
+            finalize_journal(journal_path, filepath, self.simplify_tolerance)
+        except FileExistsError:
+            raise FileExistsError(f"Recording already exists: {filename}")
         
         return filename
     
@@ -614,17 +1338,89 @@ class RecordingSession:
             return
         
         # Calculate time relative to recording start
-        current_time = time.time() * 1000  # Convert to milliseconds
+        current_time = time.monotonic() * 1000  # Convert to milliseconds
         time_ms = int(current_time - self.start_time)
         
+        # Repeats of a held gaze/eyebrow/offset value only move the end of the hold
+        if (command in ("gaze", "eyebrow", "set_offset") and len(self.commands) >= 2
+                and all(c.command == command and c.args == (args or {}) for c in self.commands[-2:])):
+            self.commands[-1].time_ms = time_ms
+            return
+        
         entry = TimelineEntry(time_ms, command, args)
         self.commands.append(entry)
+        
+        # Everything but the last two entries is final (holds only change the tail)
+        if len(self.commands) > 2:
+            self._write_journal(self.commands[:-2])
+            del self.commands[:-2]
     
     def cancel(self):
         """Cancel recording without saving."""
         self.is_recording = False
         self.commands = []
         self.start_time = None
+        self._close_journal(delete=True)
+    
+    def recover_journals(self) -> List[str]:
+        """Save recordings left behind in journals by a crash or power cut.
+        
+        Returns:
+            Filenames of the recovered recordings (recovered_<start>.json)
+        """
+        if not self.recordings_dir.exists():
+            return []
+        
+        recovered = []
+        for journal_path in sorted(self.recordings_dir.glob(f".recording_*{self.JOURNAL_SUFFIX}")):
+            if journal_path == self._journal_path:
+                continue
+            stamp = journal_path.name[len(".recording_"):-len(self.JOURNAL_SUFFIX)].rsplit("_", 1)[0]
+            filename = f"recovered_{stamp}.json"
+            n = 1
+            while (self.recordings_dir / filename).exists():
+                n += 1
+                filename = f"recovered_{stamp}_{n}.json"
+            try:
+                finalize_journal(journal_path, self.recordings_dir / filename, self.simplify_tolerance)
+                recovered.append(filename)
+            except ValueError:
+                journal_path.unlink()  # Crashed before anything was captured
+        return recovered
+    
+    def _write_journal(self, entries: List[TimelineEntry]):
+        """Append entries to the journal, fsyncing in batches."""
+        if not entries:
+            return
+        if self._journal is None:
+            self.recordings_dir.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self._journal_path, 'a', encoding='utf-8')
+            self._last_sync = time.monotonic()
+        self._journal.write("".join(json.dumps(entry.to_dict()) + "\n" for entry in entries))
+        self._journal.flush()  # Hand to the OS now: survives a process crash
+        self._journaled += len(entries)
+        self._unsynced += len(entries)
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval_s:
+            self._sync_journal()
+    
+    def _sync_journal(self):
+        """Flush the journal to disk (survives a power cut)."""
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+    
+    def _close_journal(self, delete: bool = False):
+        """Close the journal (fsynced), optionally deleting it."""
+        if self._journal is not None:
+            self._sync_journal()
+            self._journal.close()
+            self._journal = None
+        if delete and self._journal_path is not None and self._journal_path.exists():
+            self._journal_path.unlink()
+        self._journal_path = None
+        self._journaled = 0
+        self._unsynced = 0
 
 
 class FileManager:
@@ -644,6 +1440,9 @@ class FileManager:
             self.recordings_dir = home / '.mr-pumpkin' / 'recordings'
         else:
             self.recordings_dir = Path(recordings_dir)
+        
+        # Uploaded timelines are stripped of commands with no visible effect
+        self.optimize_uploads = True
     
     def list_recordings(self) -> List[Dict[str, Any]]:
         """List all available recordings.
@@ -712,28 +1511,31 @@ class FileManager:
             FileExistsError: If filename already exists
             ValueError: If JSON is invalid or structure is wrong
         """
-        if not filename.endswith('.json'):
-            filename = f"{filename}.json"
-        
-        filepath = self.recordings_dir / filename
+        upload = self.open_upload(filename)
+        upload.write(json_content)
+        upload.finish()
+    
+    def open_upload(self, filename: str):
+        """Start an upload that is validated and written as it arrives.
         
-        # Check if file exists
-        if filepath.exists():
-            raise FileExistsError(f"Recording already exists: {filename}")
+        Use for uploads too large to hold in memory: call write() with each
+        chunk of JSON, then finish() (or abort()). Commands with no visible
+        effect are removed on finish() when optimize_uploads is set.
         
-        # Validate JSON structure by parsing
-        try:
-            data = json.loads(json_content)
-            timeline = Timeline.from_dict(data)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON: {e}")
-        except Exception as e:
-            raise ValueError(f"Invalid timeline structure: {e}")
+        Args:
+            filename: Name for saved file
+            
+        Returns:
+            timeline_stream.TimelineUpload
+            
+        Raises:
+            FileExistsError: If filename already exists
+        """
+        from timeline_stream import TimelineUpload
         
-        # Save to file
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(json_content)
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        return TimelineUpload(self.recordings_dir / filename, optimize=self.optimize_uploads)
     
     def upload_audio(self, filename: str, audio_bytes: bytes) -> None:
         """Save raw audio bytes to the recordings directory.
@@ -750,11 +1552,10 @@ class FileManager:
             raise ValueError(f"Unsupported audio format: {filename}. Use .mp3, .wav, .ogg, .m4a, .aac, or .flac")
         
         filepath = self.recordings_dir / filename
-        if filepath.exists():
+        try:
+            atomic_write(filepath, audio_bytes, exclusive=True)
+        except FileExistsError:
             raise FileExistsError(f"Audio file already exists: {filename}")
-        
-        self.recordings_dir.mkdir(parents=True, exist_ok=True)
-        filepath.write_bytes(audio_bytes)
         print(f"Saved audio file: {filepath}")
     
     def delete_timeline(self, filename: str):
@@ -774,6 +1575,8 @@ class FileManager:
             raise FileNotFoundError(f"Recording not found: {filename}")
         
         filepath.unlink()
+        filepath.with_suffix('.baked').unlink(missing_ok=True)  # Bake of the recording, if any
+        filepath.with_suffix('.mpt').unlink(missing_ok=True)  # Binary copy, if any
     
     def rename_timeline(self, old_name: str, new_name: str):
         """Rename a timeline file.
@@ -800,3 +1603,8 @@ class FileManager:
             raise FileExistsError(f"Recording already exists: {new_name}")
         
         old_path.rename(new_path)
+        if old_path.with_suffix('.mpt').exists():
+            # The binary copy stays current: renaming keeps the JSON's size and mtime
+            old_path.with_suffix('.mpt').replace(new_path.with_suffix('.mpt'))
+        # A bake records its source filenames, so it can't follow the rename
+        old_path.with_suffix('.baked').unlink(missing_ok=True)
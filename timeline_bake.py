@@ -0,0 +1,406 @@
+"""
+Baked timelines for Mr. Pumpkin.
+
+This module provides:
+- BakedTimeline: Dense per-frame face parameter tracks for one recording
+- bake_timeline: Compile a recording (and its nested recordings) into tracks
+- load_baked: Load the up-to-date bake stored next to a recording
+
+Design decisions:
+- Baking runs the real face state machine headless at 60 FPS, the rate
+  its per-frame animation speeds (blinks, winks, transitions) assume, so
+  baked playback looks exactly like command playback started from the
+  default face; bakes at any other rate are ignored
+- Only the channels a recording drives are baked; the rest of the face
+  keeps following live commands and layers
+- Frame i holds the face state at the end of frame i; playback applies the
+  frame by index lookup and skips command dispatch entirely
+- Bakes are stored as <name>.baked next to <name>.json and record the size
+  and mtime of every source file, so edited recordings fall back to normal
+  playback until they are baked again
+- Flat little-endian float32 tracks (stdlib struct/array, no numpy needed)
+"""
+
+import argparse
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import AtomicWriter
+from timeline import PlaybackState, resolve_recording_tree
+
+
+# (track name, channel) — channels match playback_layers.COMMAND_CHANNELS
+TRACKS = [
+    ("current_expression", "expression"),
+    ("target_expression", "expression"),
+    ("transition_progress", "expression"),
+    ("is_blinking", "eyes"),
+    ("blink_progress", "eyes"),
+    ("is_winking", "eyes"),
+    ("winking_eye", "eyes"),
+    ("left_eye_scale", "eyes"),
+    ("right_eye_scale", "eyes"),
+    ("is_rolling", "eyes"),
+    ("pupil_angle", "eyes"),
+    ("gaze_left_x", "eyes"),
+    ("gaze_left_y", "eyes"),
+    ("gaze_right_x", "eyes"),
+    ("gaze_right_y", "eyes"),
+    ("eyebrow_left_offset", "eyebrows"),
+    ("eyebrow_right_offset", "eyebrows"),
+    ("nose_offset_x", "nose"),
+    ("nose_offset_y", "nose"),
+    ("nose_scale", "nose"),
+    ("mouth_viseme", "mouth"),
+    ("mouth_transition_progress", "mouth"),
+    ("projection_offset_x", "head"),
+    ("projection_offset_y", "head"),
+]
+
+EXPRESSIONS = ["neutral", "happy", "sad", "angry", "surprised", "scared", "sleeping"]
+VISEMES = [None, "closed", "open", "wide", "rounded"]
+WINK_EYES = [None, "left", "right"]
+FLAGS = {"is_blinking", "is_winking", "is_rolling"}
+
+FRAME_RATE = 60  # PumpkinFace advances its animations a fixed step per frame at this rate
+
+MAGIC = b"MPBK"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHIH")  # magic, version, frame_rate, frame_count, track_count
+_SOURCE = struct.Struct("<qq")  # mtime_ns, size
+
+
+def baked_path(json_path: Path) -> Path:
+    """Path of the bake stored next to a recording."""
+    return Path(json_path).with_suffix('.baked')
+
+
+def _read_track(face, name: str) -> float:
+    """Encode one face parameter as a float."""
+    if name in ("current_expression", "target_expression"):
+        return float(EXPRESSIONS.index(getattr(face, name).value))
+    if name == "mouth_viseme":
+        return float(VISEMES.index(face.mouth_viseme))
+    if name == "winking_eye":
+        return float(WINK_EYES.index(face.winking_eye))
+    if name.startswith("gaze_"):
+        angles = face.pupil_angle_left if "_left_" in name else face.pupil_angle_right
+        return float(angles[0] if name.endswith("_x") else angles[1])
+    return float(getattr(face, name))
+
+
+def _write_tracks(face, names: List[str], values: List[float]):
+    """Set face parameters from decoded track values."""
+    gaze = {}
+    for name, value in zip(names, values):
+        if name in ("current_expression", "target_expression"):
+            setattr(face, name, type(face.current_expression)(EXPRESSIONS[int(value)]))
+        elif name == "mouth_viseme":
+            face.mouth_viseme = VISEMES[int(value)]
+        elif name == "winking_eye":
+            face.winking_eye = WINK_EYES[int(value)]
+        elif name.startswith("gaze_"):
+            gaze[name] = value
+        elif name in FLAGS:
+            setattr(face, name, value > 0.5)
+        elif name.startswith("projection_offset_"):
+            setattr(face, name, int(round(value)))
+        else:
+            setattr(face, name, value)
+    if gaze:
+        face.pupil_angle_left = (gaze["gaze_left_x"], gaze["gaze_left_y"])
+        face.pupil_angle_right = (gaze["gaze_right_x"], gaze["gaze_right_y"])
+
+
+class BakedTimeline:
+    """Per-frame face parameter tracks compiled from a recording.
+
+    Attributes:
+        frame_rate: Frames per second the tracks were sampled at
+        tracks: Track name -> float32 array with one value per frame
+        sources: (filename, mtime_ns, size) of every recording baked in
+    """
+
+    def __init__(self, frame_rate: int, tracks: Dict[str, array],
+                 sources: Optional[List[Tuple[str, int, int]]] = None):
+        self.frame_rate = frame_rate
+        self.tracks = tracks
+        self.sources = sources or []
+        self._names = list(tracks)
+        self._columns = [tracks[name] for name in self._names]
+        self._channels = sorted({channel for name, channel in TRACKS if name in tracks})
+
+    @property
+    def frame_count(self) -> int:
+        return len(self._columns[0]) if self._columns else 0
+
+    @property
+    def duration_ms(self) -> float:
+        return self.frame_count * 1000.0 / self.frame_rate
+
+    @property
+    def channels(self) -> List[str]:
+        """Channels driven by this bake."""
+        return self._channels
+
+    def frame_index(self, position_ms: float) -> int:
+        """Frame to show at a playback position (clamped to the bake)."""
+        index = round(position_ms * self.frame_rate / 1000.0) - 1
+        return max(0, min(self.frame_count - 1, index))
+
+    def apply(self, face, position_ms: float):
+        """Set the baked face parameters for a playback position.
+
+        Args:
+            face: PumpkinFace to update
+            position_ms: Playback position in milliseconds
+        """
+        if not self._columns:
+            return
+        index = self.frame_index(position_ms)
+        _write_tracks(face, self._names, [column[index] for column in self._columns])
+
+    def release(self, face):
+        """Hand the baked channels back to the animation state machine.
+
+        Animations that were in flight when baked playback stopped are ended
+        at rest, since the state machine has no start state for them.
+
+        Args:
+            face: PumpkinFace to update
+        """
+        channels = self.channels
+        if "eyes" in channels:
+            face.is_blinking = False
+            face.blink_progress = 0.0
+            face.is_winking = False
+            face.winking_eye = None
+            face.left_eye_scale = 1.0
+            face.right_eye_scale = 1.0
+            face.is_rolling = False
+            face.rolling_progress = 0.0
+        if "nose" in channels:
+            face.is_twitching = False
+            face.is_scrunching = False
+            face.nose_offset_x = 0.0
+            face.nose_offset_y = 0.0
+            face.nose_scale = 1.0
+
+    def is_current(self, recordings_dir: Path) -> bool:
+        """Whether every source recording is unchanged since baking."""
+        for filename, mtime_ns, size in self.sources:
+            try:
+                stat = (Path(recordings_dir) / filename).stat()
+            except OSError:
+                return False
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return False
+        return True
+
+    def save(self, filepath: Path):
+        """Save to a .baked file (replaced atomically)."""
+        with AtomicWriter(filepath, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.frame_rate, self.frame_count, len(self._names)))
+            f.write(struct.pack("<H", len(self.sources)))
+            for filename, mtime_ns, size in self.sources:
+                encoded = filename.encode('utf-8')
+                f.write(struct.pack("<H", len(encoded)) + encoded + _SOURCE.pack(mtime_ns, size))
+            for name in self._names:
+                encoded = name.encode('utf-8')
+                f.write(struct.pack("<B", len(encoded)) + encoded)
+            for column in self._columns:
+                if sys.byteorder == 'big':
+                    column = array('f', column)
+                    column.byteswap()
+                f.write(column.tobytes())
+
+    @classmethod
+    def load(cls, filepath: Path) -> 'BakedTimeline':
+        """Load from a .baked file.
+
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If file is not a valid bake
+        """
+        with open(filepath, 'rb') as f:
+            data = f.read()
+
+        try:
+            magic, version, frame_rate, frame_count, track_count = _HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a version {VERSION} baked timeline")
+            offset = _HEADER.size
+
+            (source_count,) = struct.unpack_from("<H", data, offset)
+            offset += 2
+            sources = []
+            for _ in range(source_count):
+                (length,) = struct.unpack_from("<H", data, offset)
+                filename = data[offset + 2:offset + 2 + length].decode('utf-8')
+                offset += 2 + length
+                mtime_ns, size = _SOURCE.unpack_from(data, offset)
+                offset += _SOURCE.size
+                sources.append((filename, mtime_ns, size))
+
+            names = []
+            for _ in range(track_count):
+                length = data[offset]
+                names.append(data[offset + 1:offset + 1 + length].decode('utf-8'))
+                offset += 1 + length
+
+            column_bytes = frame_count * 4
+            if len(data) != offset + column_bytes * track_count:
+                raise ValueError("Truncated baked timeline")
+            tracks = {}
+            for name in names:
+                column = array('f')
+                column.frombytes(data[offset:offset + column_bytes])
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                tracks[name] = column
+                offset += column_bytes
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid baked timeline: {e}")
+
+        return cls(frame_rate, tracks, sources)
+
+
+def load_baked(recordings_dir: Path, filename: str) -> Optional[BakedTimeline]:
+    """Load the bake for a recording if it exists and is up to date.
+
+    Args:
+        recordings_dir: Directory containing timeline files
+        filename: Recording filename (.json extension optional)
+
+    Returns:
+        The bake, or None if there is none or it is stale, unreadable or
+        sampled at a rate other than FRAME_RATE
+    """
+    if not filename.endswith('.json'):
+        filename = f"{filename}.json"
+    path = baked_path(Path(recordings_dir) / filename)
+    if not path.exists():
+        return None
+    try:
+        baked = BakedTimeline.load(path)
+    except (OSError, ValueError) as e:
+        import logging
+        logging.getLogger(__name__).warning("Ignoring baked timeline %s: %s", path.name, e)
+        return None
+    if baked.frame_rate != FRAME_RATE:
+        import logging
+        logging.getLogger(__name__).warning("Ignoring baked timeline %s: baked at %d FPS, not %d",
+                                            path.name, baked.frame_rate, FRAME_RATE)
+        return None
+    return baked if baked.is_current(recordings_dir) else None
+
+
+def _is_animating(face) -> bool:
+    """Whether any animation started by the recording is still running."""
+    return (face.is_blinking or face.is_winking or face.is_rolling or face.is_moving_head
+            or face.is_twitching or face.is_scrunching or bool(face.curves)
+            or face.transition_progress < 1.0 or face.mouth_transition_progress < 1.0)
+
+
+def bake_timeline(recordings_dir: Path, filename: str,
+                  settle_ms: float = 2000.0, face=None) -> BakedTimeline:
+    """Compile a recording into per-frame face parameter tracks.
+
+    Plays the recording (with its nested recordings) through a headless
+    face at FRAME_RATE and samples the face after every frame.
+    Sampling continues after the last command until running animations
+    have finished (at most settle_ms).
+
+    Args:
+        recordings_dir: Directory containing timeline files
+        filename: Recording filename (.json extension optional)
+        settle_ms: Maximum time to keep sampling after the recording ends
+        face: PumpkinFace to run (default: a new one)
+
+    Returns:
+        The baked timeline
+
+    Raises:
+        FileNotFoundError: If the recording doesn't exist
+        ValueError: If the recording tree has problems or a command fails
+    """
+    from playback_layers import COMMAND_CHANNELS
+
+    if not filename.endswith('.json'):
+        filename = f"{filename}.json"
+    recordings_dir = Path(recordings_dir)
+
+    resolved, problems = resolve_recording_tree(recordings_dir, filename)
+    if isinstance(resolved.get(filename), Exception):
+        raise resolved[filename]
+    if problems:
+        raise ValueError("; ".join(problems))
+
+    channels = set()
+    for timeline in resolved.values():
+        channels.update(COMMAND_CHANNELS[cmd.command] for cmd in timeline.commands
+                        if cmd.command in COMMAND_CHANNELS)
+    names = [name for name, channel in TRACKS if channel in channels]
+
+    if face is None:
+        from pumpkin_face import PumpkinFace
+        face = PumpkinFace()
+    playback = face.timeline_playback
+    playback.recordings_dir = recordings_dir
+    playback.play_audio = False
+    playback.use_baked = False
+    playback.play(filename, preloaded=(resolved, problems))
+
+    frame_ms = 1000.0 / FRAME_RATE
+    columns = [array('f') for _ in names]
+    settle_frames = int(settle_ms / frame_ms)
+    while True:
+        errors = face.step(frame_ms)
+        if errors:
+            raise ValueError("; ".join(errors))
+        for column, name in zip(columns, names):
+            column.append(_read_track(face, name))
+        if playback.state == PlaybackState.STOPPED:
+            if settle_frames <= 0 or not _is_animating(face):
+                break
+            settle_frames -= 1
+
+    sources = []
+    for name, timeline in sorted(resolved.items()):
+        stat = (recordings_dir / name).stat()
+        sources.append((name, stat.st_mtime_ns, stat.st_size))
+
+    return BakedTimeline(FRAME_RATE, dict(zip(names, columns)), sources)
+
+
+def main():
+    """Bake recordings from the command line."""
+    parser = argparse.ArgumentParser(description="Bake Mr. Pumpkin recordings into per-frame tracks")
+    parser.add_argument("filenames", nargs="+", help="Recording filenames (.json extension optional)")
+    parser.add_argument("--recordings-dir", type=Path, default=Path.home() / '.mr-pumpkin' / 'recordings',
+                        help="Recordings directory (default: ~/.mr-pumpkin/recordings)")
+    args = parser.parse_args()
+
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    status = 0
+    for filename in args.filenames:
+        try:
+            baked = bake_timeline(args.recordings_dir, filename)
+            if not filename.endswith('.json'):
+                filename = f"{filename}.json"
+            baked.save(baked_path(args.recordings_dir / filename))
+            print(f"Baked {filename}: {baked.frame_count} frames, channels: {', '.join(baked.channels)}")
+        except Exception as e:
+            print(f"Error baking {filename}: {e}", file=sys.stderr)
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
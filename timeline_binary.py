@@ -0,0 +1,308 @@
+"""
+Binary timeline container for Mr. Pumpkin.
+
+This module provides:
+- BinaryCommands: Read-only command sequence decoded on demand from a
+  memory-mapped binary timeline
+- binary_path / write_binary / read_binary: Save and open binary timelines
+- load_binary: Open the up-to-date binary copy stored next to a recording
+- main: Convert existing recordings (python timeline_binary.py --all)
+
+Design decisions:
+- The JSON file stays the source of truth; <name>.mpt next to <name>.json is
+  a cache that records the JSON file's size and mtime and is ignored once
+  the JSON changes (Timeline.save keeps an existing copy current)
+- Layout: header, metadata (version/audio_file as JSON), string table of
+  command names, fixed-width records (time, command id, args offset,
+  args length) and an args blob of compact JSON, deduplicated
+- Files are opened with mmap and records are unpacked only when accessed, so
+  loading costs the same for ten commands or a million; seeks binary-search
+  the time column when the records are in time order
+- Files are replaced atomically, so on POSIX a mapping of the old file stays
+  valid. Windows can't replace or delete a mapped file, and loaded timelines
+  are cached for as long as they are in use, so there the file is read into
+  memory instead (records are still unpacked only when accessed)
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from atomic_io import AtomicWriter
+from timeline import Timeline, TimelineEntry
+
+
+MAGIC = b"MPTL"
+VERSION = 1
+FLAG_SORTED = 1  # Records are in ascending time order
+_HEADER = struct.Struct("<4sHHIIIqqd")  # magic, version, flags, command count, name count, metadata length,
+                                        # source mtime_ns, source size, duration_ms
+_RECORD = struct.Struct("<dIII")  # time_ms, command id, args offset, args length
+SUFFIX = '.mpt'
+USE_MMAP = sys.platform != "win32"  # A mapped file can't be replaced or deleted on Windows
+
+
+def binary_path(json_path: Path) -> Path:
+    """Path of the binary copy stored next to a recording."""
+    return Path(json_path).with_suffix(SUFFIX)
+
+
+class _Times(Sequence):
+    """Time column of a BinaryCommands (for bisect)."""
+
+    def __init__(self, commands: 'BinaryCommands'):
+        self._commands = commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __getitem__(self, i: int) -> float:
+        return self._commands.time_at(i)
+
+
+class BinaryCommands(Sequence):
+    """Commands of a binary timeline, unpacked from the mapping on access.
+
+    Attributes:
+        command_names: Every command name used by the timeline
+        is_sorted: Whether the records are in ascending time order
+    """
+
+    def __init__(self, buffer, count: int, names: List[str], records_offset: int,
+                 args_offset: int, is_sorted: bool):
+        self._buffer = buffer
+        self._count = count
+        self._records_offset = records_offset
+        self._args_offset = args_offset
+        self.command_names = names
+        self.is_sorted = is_sorted
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("command index out of range")
+        time_ms, command_id, offset, length = _RECORD.unpack_from(
+            self._buffer, self._records_offset + index * _RECORD.size)
+        args = None
+        if length:
+            start = self._args_offset + offset
+            args = json.loads(self._buffer[start:start + length].decode('utf-8'))
+        return TimelineEntry(_number(time_ms), self.command_names[command_id], args)
+
+    def time_at(self, index: int) -> float:
+        """Time of one command without decoding the rest of it."""
+        return _RECORD.unpack_from(self._buffer, self._records_offset + index * _RECORD.size)[0]
+
+    def index_before(self, position_ms: float) -> int:
+        """Index of the last command before position_ms (-1 if none)."""
+        if self.is_sorted:
+            return bisect_left(_Times(self), position_ms) - 1
+        last = -1
+        for i in range(self._count):
+            if self.time_at(i) < position_ms:
+                last = i
+        return last
+
+
+def _number(value: float):
+    """Times are stored as doubles; give whole numbers back as ints."""
+    return int(value) if value.is_integer() else value
+
+
+def write_binary(timeline: Timeline, filepath: Path, source: Optional[Path] = None):
+    """Save a timeline in the binary format.
+
+    Args:
+        timeline: Timeline to save
+        filepath: Destination (.mpt) file
+        source: JSON file the binary copy belongs to (its size and mtime are
+            recorded so edits to it can be detected)
+    """
+    mtime_ns = size = 0
+    if source is not None:
+        stat = Path(source).stat()
+        mtime_ns, size = stat.st_mtime_ns, stat.st_size
+
+    names: Dict[str, int] = {}
+    blobs: Dict[str, int] = {}
+    args_blob = bytearray()
+    records = bytearray()
+    previous = None
+    is_sorted = True
+    for cmd in timeline.commands:
+        command_id = names.setdefault(cmd.command, len(names))
+        offset = length = 0
+        if cmd.args:
+            encoded = json.dumps(cmd.args, separators=(',', ':'))
+            offset = blobs.get(encoded)
+            raw = encoded.encode('utf-8')
+            if offset is None:
+                offset = blobs[encoded] = len(args_blob)
+                args_blob += raw
+            length = len(raw)
+        records += _RECORD.pack(float(cmd.time_ms), command_id, offset, length)
+        if previous is not None and cmd.time_ms < previous:
+            is_sorted = False
+        previous = cmd.time_ms
+
+    metadata = {"version": timeline.version}
+    if timeline.audio_file is not None:
+        metadata["audio_file"] = timeline.audio_file
+    metadata_bytes = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+
+    with AtomicWriter(filepath, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, FLAG_SORTED if is_sorted else 0, len(records) // _RECORD.size,
+                             len(names), len(metadata_bytes), mtime_ns, size, float(timeline.duration_ms)))
+        f.write(metadata_bytes)
+        for name in names:
+            encoded = name.encode('utf-8')
+            f.write(struct.pack("<H", len(encoded)) + encoded)
+        f.write(records)
+        f.write(args_blob)
+
+
+def _close(buffer):
+    """Release a buffer read_binary() won't hand out (only mappings need closing)."""
+    if isinstance(buffer, mmap.mmap):
+        buffer.close()
+
+
+def read_binary(filepath: Path, source: Optional[Path] = None) -> Optional[Timeline]:
+    """Open a binary timeline.
+
+    Args:
+        filepath: Binary (.mpt) file
+        source: JSON file it must match; None to skip the check
+
+    Returns:
+        Timeline whose commands are a BinaryCommands, or None if it no longer
+        matches source
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If file is not a valid binary timeline
+    """
+    with open(filepath, 'rb') as f:
+        if USE_MMAP:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("Empty binary timeline")
+        else:
+            buffer = f.read()
+            if not buffer:
+                raise ValueError("Empty binary timeline")
+
+    try:
+        magic, version, flags, count, name_count, metadata_length, mtime_ns, size, duration_ms = \
+            _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} binary timeline")
+        if source is not None:
+            stat = Path(source).stat()
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                _close(buffer)
+                return None
+        offset = _HEADER.size
+        metadata = json.loads(buffer[offset:offset + metadata_length].decode('utf-8'))
+        offset += metadata_length
+
+        names = []
+        for _ in range(name_count):
+            (length,) = struct.unpack_from("<H", buffer, offset)
+            names.append(buffer[offset + 2:offset + 2 + length].decode('utf-8'))
+            offset += 2 + length
+
+        args_offset = offset + count * _RECORD.size
+        if len(buffer) < args_offset:
+            raise ValueError("Truncated binary timeline")
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        _close(buffer)
+        raise ValueError(f"Invalid binary timeline: {e}")
+    except ValueError:
+        _close(buffer)
+        raise
+
+    timeline = Timeline(version=metadata.get("version", "1.0"), audio_file=metadata.get("audio_file"))
+    timeline.commands = BinaryCommands(buffer, count, names, offset, args_offset, bool(flags & FLAG_SORTED))
+    timeline.duration_ms = _number(duration_ms)
+    return timeline
+
+
+def load_binary(json_path: Path) -> Optional[Timeline]:
+    """Open the binary copy of a recording if it exists and is up to date.
+
+    Args:
+        json_path: The recording's JSON file
+
+    Returns:
+        The timeline, or None if there is no current binary copy
+    """
+    path = binary_path(json_path)
+    if not path.exists():
+        return None
+    try:
+        return read_binary(path, source=json_path)
+    except (OSError, ValueError) as e:
+        import logging
+        logging.getLogger(__name__).warning("Ignoring binary timeline %s: %s", path.name, e)
+        return None
+
+
+def convert_recording(json_path: Path) -> int:
+    """Write (or refresh) the binary copy of a recording.
+
+    Returns:
+        Number of commands converted
+
+    Raises:
+        FileNotFoundError: If the recording doesn't exist
+        ValueError: If the recording is not a valid timeline
+    """
+    json_path = Path(json_path)
+    timeline = Timeline.load(json_path, binary=False)
+    write_binary(timeline, binary_path(json_path), source=json_path)
+    return len(timeline.commands)
+
+
+def main():
+    """Convert recordings from the command line."""
+    parser = argparse.ArgumentParser(description="Convert Mr. Pumpkin recordings to the binary timeline format")
+    parser.add_argument("filenames", nargs="*", help="Recording filenames (.json extension optional)")
+    parser.add_argument("--all", action="store_true", help="Convert every recording in the directory")
+    parser.add_argument("--recordings-dir", type=Path, default=Path.home() / '.mr-pumpkin' / 'recordings',
+                        help="Recordings directory (default: ~/.mr-pumpkin/recordings)")
+    args = parser.parse_args()
+
+    filenames = list(args.filenames)
+    if args.all:
+        filenames += sorted(p.name for p in args.recordings_dir.glob('*.json'))
+    if not filenames:
+        parser.error("give recording filenames or --all")
+
+    status = 0
+    for filename in filenames:
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        try:
+            count = convert_recording(args.recordings_dir / filename)
+            print(f"Converted {filename}: {count} commands")
+        except Exception as e:
+            print(f"Error converting {filename}: {e}", file=sys.stderr)
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
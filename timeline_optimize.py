@@ -0,0 +1,328 @@
+"""
+Redundant command removal for Mr. Pumpkin timelines.
+
+This module provides:
+- prune_stream / prune_commands: Drop commands that have no visible effect
+- optimize_file: Prune a timeline file in place (constant memory; used on
+  upload)
+- optimize_recording: Prune and simplify a saved recording (the
+  optimize_recording command)
+
+Design decisions:
+- The face is simulated through the command list, and only commands whose
+  effect is certain to be invisible are dropped:
+  - a mouth, expression, gaze, eyebrow or offset setter is dropped when it
+    sets the value the face already shows
+  - a blink or wink is dropped when the face would ignore it because it is
+    already blinking or winking
+  - a setter is dropped when another setter of the same kind follows at the
+    same time (the same collapse Playback does inside a frame); setters
+    even 1ms apart can fall in different frames, so both are kept
+- Values start unknown (a timeline can start from any face, though not in
+  the middle of an animation), and anything the simulation can't follow
+  makes them unknown again: relative moves, animations that may still be
+  running, play_recording and unknown commands
+- Animation lengths mirror PumpkinFace's per-frame speeds at 60 FPS, with a
+  frame of margin either way
+- Streams with a bounded lookahead (the setters at one timestamp), so large uploads are
+  optimized without loading them
+"""
+
+import argparse
+import math
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from playback_layers import COMMAND_CHANNELS
+from timeline import SUPERSEDING_COMMANDS, Timeline, TimelineEntry, write_timeline
+from timeline_simplify import STREAMS, simplify_stream, stream_values
+
+
+FRAME_MS = 1000.0 / 60.0
+BLINK_MS = math.ceil(1 / 0.03) * FRAME_MS  # PumpkinFace.blink_speed / wink_speed
+TRANSITION_MS = math.ceil(1 / 0.05) * FRAME_MS  # PumpkinFace.transition_speed
+ROLL_MS = 1000.0  # PumpkinFace.rolling_duration
+HEAD_MOVE_MS = 500.0  # PumpkinFace.head_movement_duration
+
+EXPRESSIONS = {"neutral", "happy", "sad", "angry", "surprised", "scared", "sleeping"}
+MOUTH_COMMANDS = {
+    "mouth_closed": "closed",
+    "mouth_open": "open",
+    "mouth_wide": "wide",
+    "mouth_rounded": "rounded",
+    "mouth_neutral": None,
+}
+# Setter command -> (feature, clamp applied by PumpkinFace)
+VALUE_COMMANDS = {
+    "gaze": ("gaze", lambda v: max(-90.0, min(90.0, v))),
+    "eyebrow": ("eyebrow", lambda v: max(-50.0, min(50.0, v))),
+    "set_offset": ("offset", lambda v: max(-500, min(500, int(v)))),
+}
+# Feature -> commands that change it without setting a known value
+TOUCHING_COMMANDS = {
+    "gaze": STREAMS["gaze"][1],
+    "eyebrow": STREAMS["eyebrow"][1],
+    "offset": STREAMS["set_offset"][1],
+}
+HEAD_MOVES = {"turn_left", "turn_right", "turn_up", "turn_down", "center_head"}
+
+_UNKNOWN = object()
+
+
+def _supersede(commands: Iterable[TimelineEntry]) -> Iterator[TimelineEntry]:
+    """Drop setters overridden by another setter of the same group at the same time."""
+    pending: Deque[List] = deque()  # [entry, dropped]
+    candidates: Dict[str, List] = {}  # group -> latest pending setter
+    last_ms = None
+
+    for cmd in commands:
+        if last_ms is not None and cmd.time_ms < last_ms:
+            candidates.clear()  # Out of order: don't look across the jump
+        last_ms = cmd.time_ms
+
+        group = SUPERSEDING_COMMANDS.get(cmd.command)
+        if cmd.command not in COMMAND_CHANNELS:
+            candidates.clear()
+        for feature, touching in TOUCHING_COMMANDS.items():
+            if cmd.command in touching:
+                candidates.pop(feature, None)
+
+        item = [cmd, False]
+        if group is not None:
+            previous = candidates.get(group)
+            if previous is not None and cmd.time_ms == previous[0].time_ms:
+                previous[1] = True
+            candidates[group] = item
+        pending.append(item)
+
+        while pending:
+            entry, dropped = pending[0]
+            group = SUPERSEDING_COMMANDS.get(entry.command)
+            if (not dropped and candidates.get(group) is pending[0]
+                    and cmd.time_ms == entry.time_ms):
+                break
+            pending.popleft()
+            if not dropped:
+                yield entry
+
+    for entry, dropped in pending:
+        if not dropped:
+            yield entry
+
+
+class _FaceModel:
+    """What the simulation knows about the face at the current command.
+
+    Values are None when unknown. *_busy_ms is when an animation that may be
+    running ends; *_drop_ms is until when one is certainly running.
+    """
+
+    def __init__(self, frame_ms: float):
+        self.frame_ms = frame_ms
+        self.reset()
+
+    def reset(self, time_ms: Optional[float] = None):
+        """Forget the face state.
+
+        Args:
+            time_ms: Time of a nested recording or unknown command, after
+                which any animation may be running; None for the start of the
+                timeline (a settled face showing unknown values)
+        """
+        self.expression = None
+        self.mouth = _UNKNOWN
+        self.values: Dict[str, Optional[Tuple]] = {"gaze": None, "eyebrow": None, "offset": None}
+        self.blink_drop_ms = self.wink_drop_ms = -math.inf
+        if time_ms is None:
+            self.expression_busy_ms = self.blink_busy_ms = self.wink_busy_ms = -math.inf
+            self.roll_end_ms = -math.inf
+            self.settled_ms = {"gaze": -math.inf, "eyebrow": -math.inf, "offset": -math.inf}
+        else:
+            self.expression_busy_ms = time_ms + TRANSITION_MS + self.frame_ms
+            self.blink_busy_ms = self.wink_busy_ms = time_ms + BLINK_MS + self.frame_ms
+            self.roll_end_ms = time_ms + ROLL_MS + 2 * BLINK_MS
+            self.settled_ms = {"gaze": self.roll_end_ms + self.frame_ms, "eyebrow": -math.inf,
+                               "offset": time_ms + HEAD_MOVE_MS + self.frame_ms}
+
+    def _pause_roll(self, time_ms: float):
+        """Rolls pause while the eyes blink or wink."""
+        if time_ms < self.roll_end_ms:
+            self.roll_end_ms += BLINK_MS + self.frame_ms
+            self.settled_ms["gaze"] = max(self.settled_ms["gaze"], self.roll_end_ms + self.frame_ms)
+
+    def keep(self, cmd: TimelineEntry) -> bool:
+        """Apply a command; False if it has no visible effect."""
+        t, command, args = cmd.time_ms, cmd.command, cmd.args
+
+        if command == "set_expression":
+            expression = args.get("expression", "neutral")
+            if expression == self.expression and t >= self.expression_busy_ms:
+                return False
+            # A transition in progress (the face ignores the current expression
+            # as a target) or a blink (which restores the expression it started
+            # with) makes the outcome uncertain
+            uncertain = t < self.expression_busy_ms or t < self.blink_busy_ms
+            self.expression = None if uncertain or expression not in EXPRESSIONS else expression
+            self.expression_busy_ms = t + TRANSITION_MS + self.frame_ms
+            return True
+
+        if command == "blink":
+            if t < self.blink_drop_ms:
+                return False  # PumpkinFace ignores blinks while blinking
+            if t < self.expression_busy_ms:
+                self.expression = None
+            if t >= self.blink_busy_ms:
+                self.blink_drop_ms = t + BLINK_MS - self.frame_ms
+            self.blink_busy_ms = max(self.blink_busy_ms, t + BLINK_MS + self.frame_ms)
+            self._pause_roll(t)
+            return True
+
+        if command in ("wink_left", "wink_right"):
+            if t < self.wink_drop_ms:
+                return False  # PumpkinFace ignores winks while winking
+            if t >= self.wink_busy_ms:
+                self.wink_drop_ms = t + BLINK_MS - self.frame_ms
+            self.wink_busy_ms = max(self.wink_busy_ms, t + BLINK_MS + self.frame_ms)
+            self._pause_roll(t)
+            return True
+
+        if command in MOUTH_COMMANDS:
+            viseme = MOUTH_COMMANDS[command]
+            if viseme == self.mouth:
+                return False
+            self.mouth = viseme
+            return True
+
+        if command in VALUE_COMMANDS:
+            feature, clamp = VALUE_COMMANDS[command]
+            try:
+                values = tuple(clamp(v) for v in stream_values(command, args))
+            except (TypeError, ValueError):
+                self.values[feature] = None
+                return True
+            if values == self.values[feature] and t >= self.settled_ms[feature]:
+                return False
+            self.values[feature] = values if t >= self.settled_ms[feature] else None
+            return True
+
+        for feature, touching in TOUCHING_COMMANDS.items():
+            if command in touching:
+                self.values[feature] = None
+        if command in ("roll_clockwise", "roll_counterclockwise"):
+            self.roll_end_ms = max(self.roll_end_ms, t + ROLL_MS)
+            self.settled_ms["gaze"] = max(self.settled_ms["gaze"], self.roll_end_ms + self.frame_ms)
+        elif command in HEAD_MOVES:
+            self.settled_ms["offset"] = max(self.settled_ms["offset"], t + HEAD_MOVE_MS + self.frame_ms)
+        elif command not in COMMAND_CHANNELS:
+            self.reset(t)  # play_recording, or a command this model doesn't know
+        return True
+
+
+def prune_stream(commands: Iterable[TimelineEntry], frame_ms: float = FRAME_MS) -> Iterator[TimelineEntry]:
+    """Drop commands that have no visible effect.
+
+    Args:
+        commands: Timeline commands in time order
+        frame_ms: Frame length (margin on animation lengths)
+
+    Yields:
+        The commands that are kept (unchanged)
+    """
+    model = _FaceModel(frame_ms)
+    last_ms = None
+    for cmd in _supersede(commands):
+        if last_ms is not None and cmd.time_ms < last_ms:
+            model.reset(cmd.time_ms)  # Out of order: the simulation can't follow
+        last_ms = cmd.time_ms
+        if model.keep(cmd):
+            yield cmd
+
+
+def prune_commands(commands: Iterable[TimelineEntry], frame_ms: float = FRAME_MS) -> List[TimelineEntry]:
+    """Drop commands that have no visible effect.
+
+    Args:
+        commands: Timeline commands in time order
+        frame_ms: Frame length (margin on animation lengths)
+
+    Returns:
+        New command list (kept commands are reused)
+    """
+    return list(prune_stream(commands, frame_ms))
+
+
+def optimize_file(filepath: Path) -> Tuple[int, int]:
+    """Prune a timeline file in place without loading it into memory.
+
+    Returns:
+        (commands before, commands after)
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a valid timeline
+    """
+    from timeline_stream import iter_timeline, scan_timeline
+
+    fields, before = scan_timeline(filepath)
+    after = sum(1 for _ in prune_stream(iter_timeline(filepath)))
+    if after < before:
+        write_timeline(filepath, prune_stream(iter_timeline(filepath)), fields["duration_ms"],
+                       fields["version"], fields.get("audio_file"))
+    return before, after
+
+
+def optimize_recording(filepath: Path, tolerance: Optional[float] = None) -> Tuple[int, int]:
+    """Prune a saved recording and optionally simplify its streams.
+
+    Args:
+        filepath: Recording file
+        tolerance: Simplify gaze/eyebrow/offset streams with this tolerance
+            (see timeline_simplify); None only prunes
+
+    Returns:
+        (commands before, commands after)
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a valid timeline
+    """
+    timeline = Timeline.load(filepath)
+    before = len(timeline.commands)
+    commands = prune_stream(timeline.commands)
+    if tolerance is not None:
+        commands = simplify_stream(commands, tolerance)
+    duration_ms = timeline.duration_ms
+    timeline.commands = list(commands)
+    timeline.duration_ms = duration_ms
+    if len(timeline.commands) < before:
+        timeline.save(filepath)
+    return before, len(timeline.commands)
+
+
+def main():
+    """Optimize recordings from the command line."""
+    parser = argparse.ArgumentParser(description="Remove commands with no visible effect from Mr. Pumpkin recordings")
+    parser.add_argument("filenames", nargs="+", help="Recording filenames (.json extension optional)")
+    parser.add_argument("--recordings-dir", type=Path, default=Path.home() / '.mr-pumpkin' / 'recordings',
+                        help="Recordings directory (default: ~/.mr-pumpkin/recordings)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="Also simplify gaze/eyebrow/offset streams with this error in degrees/pixels")
+    args = parser.parse_args()
+
+    status = 0
+    for filename in args.filenames:
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        try:
+            before, after = optimize_recording(args.recordings_dir / filename, args.tolerance)
+            print(f"{filename}: {before} -> {after} commands")
+        except Exception as e:
+            print(f"Error optimizing {filename}: {e}", file=sys.stderr)
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Recording simplification for Mr. Pumpkin.
+
+This module provides:
+- STREAMS: Continuous commands (gaze, eyebrow, set_offset) and their values
+- simplify_stream / simplify_commands: Replace sampled gaze/eyebrow/offset
+  streams with curves (one pass, bounded memory)
+- simplify_recording: Rewrite an existing recording file in place
+
+Design decisions:
+- A stream is a run of one continuous command sampled at least every
+  max_gap_ms with nothing else touching the same feature in between;
+  gaps, play_recording and other commands for the feature end the run.
+  The default gap is about two frames: playback holds each sample until
+  the next, so joining samples further apart would turn a held value
+  followed by a jump into a ramp that was never recorded
+- Runs are reduced with Ramer-Douglas-Peucker using the error at equal time
+  (the largest value difference from the line between kept samples), so
+  playback never strays more than the tolerance from the recorded values
+- Reduced runs become one gaze_curve/eyebrow_curve/offset_curve command with
+  linear keys; runs that can't shrink are left as they are
+- Exact repeats are always dropped (tolerance 0 only removes samples that
+  lie exactly on the line between their neighbours)
+- The timeline keeps its original duration
+"""
+
+import argparse
+import math
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from timeline import Timeline, TimelineEntry
+
+
+# command -> (curve command, interrupting commands)
+STREAMS = {
+    "gaze": ("gaze_curve", {"gaze_to", "gaze_curve", "roll_clockwise", "roll_counterclockwise"}),
+    "eyebrow": ("eyebrow_curve", {
+        "eyebrow_raise", "eyebrow_lower", "eyebrow_raise_left", "eyebrow_lower_left",
+        "eyebrow_raise_right", "eyebrow_lower_right", "eyebrow_reset", "eyebrow_to", "eyebrow_curve",
+    }),
+    "set_offset": ("offset_curve", {
+        "projection_reset", "jog_offset", "turn_left", "turn_right", "turn_up", "turn_down",
+        "center_head", "offset_to", "offset_curve",
+    }),
+}
+
+DEFAULT_TOLERANCE = 0.5  # Degrees of gaze / pixels of eyebrow and offset
+DEFAULT_MAX_GAP_MS = math.ceil(2 * 1000.0 / 60.0)  # Samples further apart than ~2 frames are separate moves
+DEFAULT_MAX_RUN = 4096  # Samples simplified at once (bounds memory for endless streams)
+
+
+def stream_values(command: str, args: Dict[str, Any]) -> Tuple[float, ...]:
+    """Full value tuple of a continuous command (gaze: lx, ly, rx, ry; eyebrow: left, right; offset: x, y)."""
+    if command == "gaze":
+        if all(args.get(k) is not None for k in ("lx", "ly", "rx", "ry")):
+            return (float(args["lx"]), float(args["ly"]), float(args["rx"]), float(args["ry"]))
+        x, y = float(args.get("x", 0)), float(args.get("y", 0))
+        return (x, y, x, y)
+    if command == "eyebrow":
+        if args.get("left") is not None and args.get("right") is not None:
+            return (float(args["left"]), float(args["right"]))
+        value = float(args.get("value", 0))
+        return (value, value)
+    return (float(args.get("x", 0)), float(args.get("y", 0)))
+
+
+def _error(times: Sequence[float], values: Sequence[Tuple[float, ...]], a: int, b: int, i: int) -> float:
+    """Largest difference between sample i and the line from sample a to sample b at its time."""
+    span = times[b] - times[a]
+    u = (times[i] - times[a]) / span if span else 0.0
+    return max(abs(va + (vb - va) * u - vi) for va, vb, vi in zip(values[a], values[b], values[i]))
+
+
+def rdp(times: Sequence[float], values: Sequence[Tuple[float, ...]], tolerance: float) -> List[int]:
+    """Indices of the samples Ramer-Douglas-Peucker keeps.
+
+    Args:
+        times: Sample times (ascending)
+        values: Value tuple per sample
+        tolerance: Maximum allowed error of the simplified polyline
+
+    Returns:
+        Sorted indices of kept samples (always includes the first and last)
+    """
+    if len(times) <= 2:
+        return list(range(len(times)))
+    keep = {0, len(times) - 1}
+    stack = [(0, len(times) - 1)]
+    while stack:
+        a, b = stack.pop()
+        worst, worst_error = None, tolerance
+        for i in range(a + 1, b):
+            error = _error(times, values, a, b, i)
+            if error > worst_error:
+                worst, worst_error = i, error
+        if worst is not None:
+            keep.add(worst)
+            stack.append((a, worst))
+            stack.append((worst, b))
+    return sorted(keep)
+
+
+def _curve_entry(command: str, times: List[float], values: List[Tuple[float, ...]]) -> TimelineEntry:
+    """Curve command reproducing a simplified run."""
+    curve_command = STREAMS[command][0]
+    half = len(values[0]) // 2
+    # Use the both-eyes/both-brows shorthand when the two sides never differ
+    if command != "set_offset" and all(v[:half] == v[half:] for v in values):
+        values = [v[:half] for v in values]
+    start = times[0]
+    keys = [[int(t - start)] + [round(x, 3) for x in v] for t, v in zip(times, values)]
+    return TimelineEntry(int(start), curve_command, {"keys": keys})
+
+
+class _Run:
+    """Samples of one stream waiting to be simplified."""
+
+    def __init__(self):
+        self.entries: List[TimelineEntry] = []
+        self.closed = False
+        self.curve: Optional[TimelineEntry] = None
+
+    def close(self, tolerance: float):
+        """Simplify the run; curve stays None if it can't shrink."""
+        self.closed = True
+        if len(self.entries) < 3:
+            return
+        command = self.entries[0].command
+        times = [float(cmd.time_ms) for cmd in self.entries]
+        values = [stream_values(command, cmd.args) for cmd in self.entries]
+        kept = rdp(times, values, tolerance)
+        if len(kept) < len(self.entries):
+            self.curve = _curve_entry(command, [times[k] for k in kept], [values[k] for k in kept])
+
+
+def simplify_stream(commands: Iterable[TimelineEntry], tolerance: float = DEFAULT_TOLERANCE,
+                    max_gap_ms: float = DEFAULT_MAX_GAP_MS,
+                    max_run: int = DEFAULT_MAX_RUN) -> Iterator[TimelineEntry]:
+    """Replace sampled gaze/eyebrow/offset streams with keyframe curves.
+
+    Works in one pass: commands are held back only while a stream that
+    started before them is still open, so memory is bounded by max_run
+    rather than by the length of the recording.
+
+    Args:
+        commands: Timeline commands in time order
+        tolerance: Maximum value error of the simplified streams
+        max_gap_ms: Longest pause between samples of one stream
+        max_run: Most samples simplified together (longer streams are split)
+
+    Yields:
+        Commands in time order (unchanged commands are reused)
+    """
+    pending: Deque[Tuple[TimelineEntry, Optional[_Run]]] = deque()
+    open_runs: Dict[str, _Run] = {}
+
+    def close(stream: str):
+        open_runs.pop(stream).close(tolerance)
+
+    def drain() -> Iterator[TimelineEntry]:
+        while pending and (pending[0][1] is None or pending[0][1].closed):
+            cmd, run = pending.popleft()
+            if run is None or run.curve is None:
+                yield cmd
+            elif cmd is run.entries[0]:
+                yield run.curve
+
+    for cmd in commands:
+        if cmd.command == "play_recording":
+            for stream in list(open_runs):
+                close(stream)
+        for stream, (_, interrupters) in STREAMS.items():
+            if cmd.command in interrupters and stream in open_runs:
+                close(stream)
+
+        run = None
+        if cmd.command in STREAMS:
+            run = open_runs.get(cmd.command)
+            if run is not None and (cmd.time_ms - run.entries[-1].time_ms > max_gap_ms
+                                    or len(run.entries) >= max_run):
+                close(cmd.command)
+                run = None
+            if run is None:
+                run = open_runs[cmd.command] = _Run()
+            run.entries.append(cmd)
+
+        pending.append((cmd, run))
+        yield from drain()
+
+    for stream in list(open_runs):
+        close(stream)
+    yield from drain()
+
+
+def simplify_commands(commands: List[TimelineEntry], tolerance: float = DEFAULT_TOLERANCE,
+                      max_gap_ms: float = DEFAULT_MAX_GAP_MS) -> List[TimelineEntry]:
+    """Replace sampled gaze/eyebrow/offset streams with keyframe curves.
+
+    Args:
+        commands: Timeline commands in time order
+        tolerance: Maximum value error of the simplified streams
+        max_gap_ms: Longest pause between samples of one stream
+
+    Returns:
+        New command list (unchanged commands are reused)
+    """
+    return list(simplify_stream(commands, tolerance, max_gap_ms))
+
+
+def simplify_recording(filepath: Path, tolerance: float = DEFAULT_TOLERANCE,
+                       max_gap_ms: float = DEFAULT_MAX_GAP_MS) -> Tuple[int, int]:
+    """Simplify a saved recording in place.
+
+    Args:
+        filepath: Recording file
+        tolerance: Maximum value error of the simplified streams
+        max_gap_ms: Longest pause between samples of one stream
+
+    Returns:
+        (commands before, commands after)
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a valid timeline
+    """
+    timeline = Timeline.load(filepath)
+    before = len(timeline.commands)
+    duration_ms = timeline.duration_ms
+    timeline.commands = simplify_commands(timeline.commands, tolerance, max_gap_ms)
+    timeline.duration_ms = duration_ms
+    if len(timeline.commands) < before:
+        timeline.save(filepath)
+    return before, len(timeline.commands)
+
+
+def main():
+    """Simplify recordings from the command line."""
+    parser = argparse.ArgumentParser(description="Shrink Mr. Pumpkin recordings by simplifying gaze, eyebrow and offset streams")
+    parser.add_argument("filenames", nargs="+", help="Recording filenames (.json extension optional)")
+    parser.add_argument("--recordings-dir", type=Path, default=Path.home() / '.mr-pumpkin' / 'recordings',
+                        help="Recordings directory (default: ~/.mr-pumpkin/recordings)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Maximum error in degrees/pixels (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--max-gap-ms", type=float, default=DEFAULT_MAX_GAP_MS,
+                        help=f"Longest pause inside one movement (default: {DEFAULT_MAX_GAP_MS})")
+    args = parser.parse_args()
+
+    status = 0
+    for filename in args.filenames:
+        if not filename.endswith('.json'):
+            filename = f"{filename}.json"
+        try:
+            before, after = simplify_recording(args.recordings_dir / filename, args.tolerance, args.max_gap_ms)
+            print(f"{filename}: {before} -> {after} commands")
+        except Exception as e:
+            print(f"Error simplifying {filename}: {e}", file=sys.stderr)
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
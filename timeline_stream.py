@@ -0,0 +1,413 @@
+"""
+Streaming timeline loading for Mr. Pumpkin.
+
+This module provides:
+- TimelineStreamParser: Incremental parser fed a timeline JSON document in
+  chunks; yields each command as soon as it is complete
+- StreamingTimeline: Timeline whose commands are parsed on a background
+  thread, so playback can start after the first window of commands
+- TimelineUpload: Validates an uploaded timeline while writing it to disk
+- iter_timeline / scan_timeline: Read a timeline file's commands or summary
+  in constant memory
+
+Design decisions:
+- Stdlib only: json.JSONDecoder.raw_decode decodes one value at a time from
+  a sliding text buffer, so memory holds at most one command (plus a chunk)
+- Validation matches Timeline.from_dict (top-level object with "version" and
+  "commands", every command with "time_ms" and "command")
+- A value that isn't complete after max_pending_chars is an error, which
+  keeps garbage input from growing the buffer without bound
+- Fields written before "commands" (version, duration_ms, audio_file) are
+  known as soon as commands start; Timeline.save writes them first
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from atomic_io import AtomicWriter
+from timeline import Timeline, TimelineEntry
+
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\r\n"
+
+
+class TimelineStreamParser:
+    """Incremental parser for timeline JSON documents.
+
+    Call feed() with successive chunks of text and close() at the end.
+
+    Attributes:
+        fields: Top-level fields other than "commands" parsed so far
+        command_count: Number of commands parsed so far
+        repair: Optional function applied to each command object before it
+            is validated (e.g. to rename fields a generator got wrong)
+    """
+
+    def __init__(self, max_pending_chars: int = 1 << 20,
+                 repair: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        self.fields: Dict[str, Any] = {}
+        self.command_count = 0
+        self.max_pending_chars = max_pending_chars
+        self.repair = repair
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._seen_commands = False
+        self._closed = False
+
+    def feed(self, text: str) -> List[TimelineEntry]:
+        """Parse another chunk of the document.
+
+        Args:
+            text: Next chunk of JSON text
+
+        Returns:
+            Commands completed by this chunk, in document order
+
+        Raises:
+            ValueError: If the document is not a valid timeline
+        """
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        return self._parse()
+
+    def close(self) -> List[TimelineEntry]:
+        """Finish parsing.
+
+        Returns:
+            Commands completed by the end of the document
+
+        Raises:
+            ValueError: If the document is incomplete or not a valid timeline
+        """
+        self._closed = True
+        commands = self._parse()
+        if self._state != "done":
+            raise ValueError("Invalid JSON: unexpected end of document")
+        if "version" not in self.fields:
+            raise ValueError("Timeline missing 'version' field")
+        if not self._seen_commands:
+            raise ValueError("Timeline missing 'commands' field")
+        return commands
+
+    def _skip_whitespace(self) -> bool:
+        """Advance past whitespace; False if the buffer ran out."""
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buf)
+
+    def _expect(self, chars: str) -> Optional[str]:
+        """Consume one of chars (after whitespace); None if more text is needed."""
+        if not self._skip_whitespace():
+            return None
+        char = self._buf[self._pos]
+        if char not in chars:
+            raise ValueError(f"Invalid JSON: expected {' or '.join(repr(c) for c in chars)} "
+                             f"at offset {self._pos}, found {char!r}")
+        self._pos += 1
+        return char
+
+    def _decode(self):
+        """Decode the next complete value; returns (True, value) or (False, None) if more text is needed."""
+        if not self._skip_whitespace():
+            return False, None
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            if self._closed or len(self._buf) - self._pos > self.max_pending_chars:
+                raise ValueError(f"Invalid JSON: {e}")
+            return False, None
+        # A number at the end of the buffer may continue in the next chunk
+        if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                and end == len(self._buf) and not self._closed):
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _parse(self) -> List[TimelineEntry]:
+        commands = []
+        while True:
+            state = self._state
+            if state == "start":
+                if self._expect("{") is None:
+                    break
+                self._state = "key_or_end"
+            elif state in ("key_or_end", "key"):
+                if not self._skip_whitespace():
+                    break
+                if state == "key_or_end" and self._buf[self._pos] == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                if self._buf[self._pos] != '"':
+                    raise ValueError(f"Invalid JSON: expected a field name at offset {self._pos}")
+                ok, key = self._decode()
+                if not ok:
+                    break
+                self._key = key
+                self._state = "colon"
+            elif state == "colon":
+                if self._expect(":") is None:
+                    break
+                self._state = "commands" if self._key == "commands" else "value"
+            elif state == "value":
+                ok, value = self._decode()
+                if not ok:
+                    break
+                self.fields[self._key] = value
+                self._state = "after_value"
+            elif state == "commands":
+                if self._expect("[") is None:
+                    break
+                self._seen_commands = True
+                self._state = "command_or_end"
+            elif state in ("command_or_end", "command"):
+                if not self._skip_whitespace():
+                    break
+                if state == "command_or_end" and self._buf[self._pos] == "]":
+                    self._pos += 1
+                    self._state = "after_value"
+                    continue
+                ok, value = self._decode()
+                if not ok:
+                    break
+                if self.repair is not None and isinstance(value, dict):
+                    value = self.repair(value)
+                try:
+                    commands.append(TimelineEntry.from_dict(value))
+                except (KeyError, TypeError, AttributeError) as e:
+                    raise ValueError(f"Invalid timeline structure: command {self.command_count}: {e!r}")
+                self.command_count += 1
+                self._state = "after_command"
+            elif state == "after_command":
+                char = self._expect(",]")
+                if char is None:
+                    break
+                self._state = "command" if char == "," else "after_value"
+            elif state == "after_value":
+                char = self._expect(",}")
+                if char is None:
+                    break
+                self._state = "key" if char == "," else "done"
+            else:  # done: only whitespace may follow
+                if self._skip_whitespace():
+                    raise ValueError(f"Invalid JSON: extra data at offset {self._pos}")
+                break
+        return commands
+
+
+def iter_timeline(filepath: Path, parser: Optional[TimelineStreamParser] = None,
+                  chunk_size: int = 1 << 16) -> Iterator[TimelineEntry]:
+    """Yield a timeline file's commands without loading the whole file.
+
+    Args:
+        filepath: Timeline file
+        parser: Parser to use (its fields are filled in as the file is read)
+        chunk_size: Characters read per chunk
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a valid timeline (raised when the
+            invalid part is reached)
+    """
+    parser = parser or TimelineStreamParser()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def scan_timeline(filepath: Path) -> Tuple[Dict[str, Any], int]:
+    """Validate a timeline file and read its top-level fields.
+
+    Returns:
+        (fields, command count); fields["duration_ms"] is filled in the way
+        Timeline.from_dict computes it when the file doesn't store one
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a valid timeline
+    """
+    parser = TimelineStreamParser()
+    last_ms = 0
+    for entry in iter_timeline(filepath, parser):
+        last_ms = max(last_ms, entry.time_ms)
+    fields = dict(parser.fields)
+    fields.setdefault("duration_ms", last_ms)
+    return fields, parser.command_count
+
+
+class StreamingTimeline(Timeline):
+    """Timeline whose commands are parsed on a background thread.
+
+    Commands are appended to self.commands as they are parsed. Playback
+    reads the list as it grows and does not end the timeline while
+    is_loading is set.
+
+    Attributes:
+        error: Exception that stopped loading early, if any
+    """
+
+    def __init__(self, filepath: Path, chunk_size: int = 1 << 16):
+        super().__init__()
+        self.filepath = Path(filepath)
+        self.chunk_size = chunk_size
+        self.error: Optional[Exception] = None
+        self._loading = True
+        self._duration_known = False
+        self._progress = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_loading(self) -> bool:
+        return self._loading
+
+    @classmethod
+    def open(cls, filepath: Path, first_window_ms: float = 2000.0,
+             chunk_size: int = 1 << 16) -> 'StreamingTimeline':
+        """Start loading a timeline file and wait for its first window.
+
+        Args:
+            filepath: Timeline file
+            first_window_ms: Return once commands up to this time are parsed
+            chunk_size: Characters read per chunk
+
+        Returns:
+            Timeline that keeps filling in the background
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the start of the file is not a valid timeline
+        """
+        filepath = Path(filepath)
+        if not filepath.exists():
+            raise FileNotFoundError(f"Timeline file not found: {filepath}")
+        timeline = cls(filepath, chunk_size)
+        timeline._thread = threading.Thread(target=timeline._load, name="timeline-stream", daemon=True)
+        timeline._thread.start()
+        timeline.wait_for(first_window_ms)
+        if timeline.error is not None and not timeline.commands:
+            raise timeline.error
+        return timeline
+
+    def wait_for(self, time_ms: float):
+        """Block until commands past time_ms are parsed or loading ends."""
+        with self._progress:
+            self._progress.wait_for(
+                lambda: not self._loading or (self.commands and self.commands[-1].time_ms > time_ms))
+
+    def wait_loaded(self):
+        """Block until the whole file is parsed."""
+        with self._progress:
+            self._progress.wait_for(lambda: not self._loading)
+
+    def _apply_fields(self, fields: Dict[str, Any]):
+        self.version = fields.get("version", self.version)
+        self.audio_file = fields.get("audio_file", self.audio_file)
+        if "duration_ms" in fields:
+            self.duration_ms = fields["duration_ms"]
+            self._duration_known = True
+
+    def _load(self):
+        parser = TimelineStreamParser()
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    commands = parser.feed(chunk) if chunk else parser.close()
+                    with self._progress:
+                        self._apply_fields(parser.fields)
+                        self.commands.extend(commands)
+                        if commands and not self._duration_known:
+                            self.duration_ms = max(self.duration_ms, commands[-1].time_ms)
+                        self._progress.notify_all()
+                    if not chunk:
+                        break
+        except (OSError, ValueError) as e:
+            self.error = e if isinstance(e, ValueError) else ValueError(f"Error reading timeline: {e}")
+            logger.warning("Stopped loading %s after %d commands: %s", self.filepath.name, len(self.commands), e)
+        finally:
+            with self._progress:
+                self._loading = False
+                self._progress.notify_all()
+
+
+class TimelineUpload:
+    """Timeline upload that is validated while it is written to disk.
+
+    Text is parsed as it arrives and written to a temporary file next to the
+    destination; finish() moves it into place once the whole document has
+    validated. Memory use does not depend on the size of the upload.
+    """
+
+    def __init__(self, filepath: Path, optimize: bool = False):
+        """Begin an upload.
+
+        Args:
+            filepath: Destination timeline file
+            optimize: Remove commands with no visible effect once the upload
+                is complete (see timeline_optimize)
+
+        Raises:
+            FileExistsError: If the destination already exists
+        """
+        self.filepath = Path(filepath)
+        if self.filepath.exists():
+            raise FileExistsError(f"Recording already exists: {self.filepath.name}")
+        self._writer = AtomicWriter(self.filepath, exclusive=True)
+        self._parser = TimelineStreamParser()
+        self.optimize = optimize
+
+    def write(self, text: str):
+        """Validate and store the next chunk of the document.
+
+        Raises:
+            ValueError: If the document is not a valid timeline (the upload
+                is aborted)
+        """
+        try:
+            self._parser.feed(text)
+        except ValueError:
+            self.abort()
+            raise
+        self._writer.file.write(text)
+
+    def finish(self) -> int:
+        """Validate the end of the document and save it.
+
+        Returns:
+            Number of commands in the saved timeline
+
+        Raises:
+            ValueError: If the document is incomplete or invalid
+            FileExistsError: If the destination appeared meanwhile
+        """
+        try:
+            self._parser.close()
+        except ValueError:
+            self.abort()
+            raise
+        try:
+            self._writer.commit()
+        except FileExistsError:
+            raise FileExistsError(f"Recording already exists: {self.filepath.name}")
+        if self.optimize:
+            from timeline_optimize import optimize_file
+            return optimize_file(self.filepath)[1]
+        return self._parser.command_count
+
+    def abort(self):
+        """Discard the upload."""
+        self._writer.discard()